@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Analytics stream worker for LemonNPie Backend API
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.analytics_stream import run_consumer
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write analytics stream events to the database")
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}", help="Consumer name within the group")
+    parser.add_argument("--batch-size", type=int, default=500, help="Entries read and written per batch")
+    parser.add_argument("--block-ms", type=int, default=1000, help="How long to wait for new entries")
+    args = parser.parse_args()
+
+    asyncio.run(run_consumer(args.name, batch_size=args.batch_size, block_ms=args.block_ms))
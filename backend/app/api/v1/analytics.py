@@ -9,8 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, desc
 
 from app.db.database import get_db
-from app.auth.dependencies import get_current_user, get_current_admin_user, get_middleware_admin_user
-from app.models.user import User
+from app.auth.dependencies import get_current_principal, get_current_admin_user, get_middleware_admin_user
+from app.auth.principal import Principal
 from app.models.analytics import AnalyticsReport, UserActivity, ContentMetrics, SystemMetrics
 from app.services.analytics_service import AnalyticsService
 from app.services.analytics_reporting_service import AnalyticsReportingService
@@ -40,7 +40,7 @@ router = APIRouter(tags=["analytics"])
 @router.post("/activities", response_model=UserActivityResponse)
 async def track_user_activity(
     activity: UserActivityCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Track a user activity event"""
@@ -63,7 +63,7 @@ async def track_user_activity(
 @router.get("/activities", response_model=List[UserActivityResponse])
 async def get_user_activities(
     filters: AnalyticsFilters = Depends(),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user activities with filtering"""
@@ -94,7 +94,7 @@ async def get_user_activities(
 async def get_user_activity_summary(
     start_date: Optional[datetime] = Query(None, description="Start date for summary"),
     end_date: Optional[datetime] = Query(None, description="End date for summary"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user activity summary"""
@@ -113,7 +113,7 @@ async def get_user_activity_summary(
 @router.post("/content-metrics", response_model=ContentMetricResponse)
 async def track_content_metric(
     metric: ContentMetricCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Track a content performance metric"""
@@ -155,7 +155,7 @@ async def get_content_performance(
 @router.post("/system-metrics", response_model=SystemMetricResponse)
 async def track_system_metric(
     metric: SystemMetricCreate,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Track a system performance metric (Admin only)"""
@@ -177,7 +177,7 @@ async def get_system_performance(
     component: Optional[str] = Query(None, description="Filter by component"),
     start_date: Optional[datetime] = Query(None, description="Start date for metrics"),
     end_date: Optional[datetime] = Query(None, description="End date for metrics"),
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get system performance summary (Admin only)"""
@@ -197,7 +197,8 @@ async def get_system_performance(
 async def get_user_engagement_report(
     start_date: Optional[datetime] = Query(None, description="Start date for report"),
     end_date: Optional[datetime] = Query(None, description="End date for report"),
-    current_user: User = Depends(get_current_admin_user),
+    exact_uniques: Optional[bool] = Query(None, description="Count unique users exactly instead of estimating"),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Generate user engagement report (Admin only)"""
@@ -205,7 +206,8 @@ async def get_user_engagement_report(
     
     report = await reporting_service.generate_user_engagement_report(
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        exact_uniques=exact_uniques
     )
     
     return report
@@ -215,7 +217,8 @@ async def get_user_engagement_report(
 async def get_content_popularity_report(
     start_date: Optional[datetime] = Query(None, description="Start date for report"),
     end_date: Optional[datetime] = Query(None, description="End date for report"),
-    current_user: User = Depends(get_current_admin_user),
+    exact_uniques: Optional[bool] = Query(None, description="Count unique users exactly instead of estimating"),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Generate content popularity report (Admin only)"""
@@ -223,7 +226,8 @@ async def get_content_popularity_report(
     
     report = await reporting_service.generate_content_popularity_report(
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        exact_uniques=exact_uniques
     )
     
     return report
@@ -233,7 +237,7 @@ async def get_content_popularity_report(
 async def get_system_health_report(
     start_date: Optional[datetime] = Query(None, description="Start date for report"),
     end_date: Optional[datetime] = Query(None, description="End date for report"),
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Generate system health report (Admin only)"""
@@ -252,7 +256,7 @@ async def get_analytics_dashboard(
     request: Request,
     start_date: Optional[datetime] = Query(None, description="Start date for dashboard"),
     end_date: Optional[datetime] = Query(None, description="End date for dashboard"),
-    current_user: User = Depends(get_middleware_admin_user),
+    current_user: Principal = Depends(get_middleware_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get comprehensive analytics dashboard (Admin only)"""
@@ -271,7 +275,7 @@ async def get_analytics_dashboard(
 async def create_analytics_report(
     report_request: AnalyticsReportCreate,
     background_tasks: BackgroundTasks,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Create and save an analytics report (Admin only)"""
@@ -335,7 +339,7 @@ async def get_analytics_reports(
     report_type: Optional[str] = Query(None, description="Filter by report type"),
     limit: int = Query(20, ge=1, le=100, description="Limit results"),
     offset: int = Query(0, ge=0, description="Offset for pagination"),
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Get saved analytics reports (Admin only)"""
@@ -361,7 +365,7 @@ async def get_analytics_reports(
 @router.get("/reports/{report_id}", response_model=AnalyticsReportResponse)
 async def get_analytics_report(
     report_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get a specific analytics report"""
@@ -383,7 +387,7 @@ async def get_analytics_report(
 async def export_analytics_report(
     report_id: UUID,
     format: str = Query("csv", description="Export format (csv, json)"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Export analytics report in specified format"""
@@ -423,7 +427,7 @@ async def export_analytics_report(
 # Utility Endpoints
 @router.post("/flush-metrics")
 async def flush_cached_metrics(
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Flush cached metrics from Redis to database (Admin only)"""
@@ -6,7 +6,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
 from app.auth.auth_service import auth_service
-from app.auth.dependencies import get_current_user
+from app.auth.dependencies import get_current_principal, get_current_user
+from app.auth.principal import Principal
 from app.schemas.auth import (
     UserRegistration, 
     UserLogin, 
@@ -200,7 +201,7 @@ async def refresh_token(
 
 @router.post("/logout")
 async def logout(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Logout current user
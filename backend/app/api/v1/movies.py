@@ -1,32 +1,47 @@
 """
 Movie API endpoints for LemonNPie Backend API
 """
-from typing import List
+from typing import List, Optional, Union
+from urllib.parse import quote
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.auth.dependencies import get_current_user, require_admin
-from app.models.user import User
+from app.auth.dependencies import get_optional_principal, require_admin
+from app.auth.principal import Principal
 from app.services.movie_service import MovieService
 from app.services.search_service import SearchService
 from app.schemas.movie import (
     MovieCreate, MovieUpdate, MovieResponse, MovieListResponse,
-    PaginatedMovieResponse, MovieSearchFilters, MovieSortBy, MovieListRequest
+    PaginatedMovieResponse, MovieSearchFilters, MovieSortBy, MovieListRequest, MovieSearchResponse
 )
+from app.models.enums import ContentType
 from app.core.exceptions import NotFoundError, ValidationError
 
 router = APIRouter(tags=["movies"])
 
+# Closest title or name when search results come from fuzzy matching (percent-encoded UTF-8)
+DID_YOU_MEAN_HEADER = "X-Did-You-Mean"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _set_did_you_mean(response: Response, did_you_mean: Optional[str]) -> None:
+    if did_you_mean:
+        response.headers[DID_YOU_MEAN_HEADER] = quote(did_you_mean)
+
 
 @router.get("/", response_model=PaginatedMovieResponse)
 async def get_movies(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor"),
+    include_total: bool = Query(False, description="Include an estimated total when paging by cursor"),
+    include_facets: bool = Query(False, description="Include facet counts of all matching movies"),
     # Filters
     genre: str = Query(None, description="Filter by genre"),
     year: int = Query(None, ge=1900, le=2030, description="Filter by release year"),
+    content_type: Optional[ContentType] = Query(None, alias="type", description="Filter by content type"),
     rating_min: float = Query(None, ge=0.0, le=10.0, description="Minimum rating"),
     rating_max: float = Query(None, ge=0.0, le=10.0, description="Maximum rating"),
     language: str = Query(None, description="Filter by language"),
@@ -35,6 +50,7 @@ async def get_movies(
     # Sorting
     sort_field: str = Query("created_at", pattern="^(title|release_date|rating|review_count|created_at)$", description="Sort field"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -42,8 +58,12 @@ async def get_movies(
     
     - **page**: Page number (default: 1)
     - **limit**: Items per page (default: 20, max: 100)
+    - **after**: Cursor to continue from (takes precedence over page)
+    - **include_total**: Return an estimated total when paging by cursor
+    - **include_facets**: Return counts per genre, language, decade, year, type and state
     - **genre**: Filter by genre
     - **year**: Filter by release year
+    - **type**: Filter by content type (movie, series)
     - **rating_min**: Minimum rating filter
     - **rating_max**: Maximum rating filter
     - **language**: Filter by language
@@ -51,6 +71,8 @@ async def get_movies(
     - **production_state**: Filter by production state
     - **sort_field**: Field to sort by (title, release_date, rating, review_count, created_at)
     - **sort_order**: Sort order (asc, desc)
+    
+    Signed-in viewers also get in_watchlist and is_favorite for each movie.
     """
     try:
         # Build filters
@@ -61,7 +83,8 @@ async def get_movies(
             rating_max=rating_max,
             language=language,
             director=director,
-            production_state=production_state
+            production_state=production_state,
+            type=content_type
         )
         
         # Build sort options
@@ -72,8 +95,14 @@ async def get_movies(
             page=page,
             limit=limit,
             filters=filters,
-            sort_by=sort_by
+            sort_by=sort_by,
+            after=after,
+            include_total=include_total,
+            include_facets=include_facets,
+            user_id=current_user.id if current_user else None
         )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -81,6 +110,7 @@ async def get_movies(
 @router.get("/trending", response_model=List[MovieListResponse])
 async def get_trending_movies(
     limit: int = Query(10, ge=1, le=50, description="Number of trending movies to return"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -90,7 +120,9 @@ async def get_trending_movies(
     """
     try:
         movie_service = MovieService(db)
-        return await movie_service.get_trending_movies(limit=limit)
+        movies = await movie_service.get_trending_movies(limit=limit)
+        await movie_service.apply_viewer_context(movies, current_user.id if current_user else None)
+        return movies
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -98,6 +130,7 @@ async def get_trending_movies(
 @router.get("/featured", response_model=List[MovieListResponse])
 async def get_featured_movies(
     limit: int = Query(10, ge=1, le=50, description="Number of featured movies to return"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -107,32 +140,47 @@ async def get_featured_movies(
     """
     try:
         movie_service = MovieService(db)
-        return await movie_service.get_featured_movies(limit=limit)
+        movies = await movie_service.get_featured_movies(limit=limit)
+        await movie_service.apply_viewer_context(movies, current_user.id if current_user else None)
+        return movies
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/search", response_model=List[MovieListResponse])
+@router.get("/search", response_model=Union[List[MovieListResponse], MovieSearchResponse])
 async def search_movies(
+    response: Response,
     q: str = Query(..., min_length=1, description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's X-Next-Cursor"),
+    include_facets: bool = Query(False, description="Return items with facet counts of all matches"),
     # Filters
     genre: str = Query(None, description="Filter by genre"),
     year: int = Query(None, ge=1900, le=2030, description="Filter by release year"),
+    content_type: Optional[ContentType] = Query(None, alias="type", description="Filter by content type"),
     language: str = Query(None, description="Filter by language"),
     director: str = Query(None, description="Filter by director name"),
     production_state: str = Query(None, description="Filter by production state"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Search movies with advanced filtering and ranking.
     
+    Misspelled queries fall back to typo-tolerant matching of titles, directors
+    and cast names; the closest spelling is then returned in X-Did-You-Mean.
+    The cursor for the next page is returned in X-Next-Cursor (and as
+    next_cursor with include_facets).
+    
     - **q**: Search query (required)
     - **page**: Page number (default: 1)
     - **limit**: Items per page (default: 20, max: 100)
+    - **after**: Cursor to continue from (takes precedence over page)
+    - **include_facets**: Return {items, facets, did_you_mean} instead of a list
     - **genre**: Filter by genre
     - **year**: Filter by release year
+    - **type**: Filter by content type (movie, series)
     - **language**: Filter by language
     - **director**: Filter by director name (partial match)
     - **production_state**: Filter by production state
@@ -150,16 +198,33 @@ async def search_movies(
             filters["director"] = director
         if production_state:
             filters["production_state"] = production_state
+        if content_type:
+            filters["type"] = content_type
         
         search_service = SearchService(db)
         offset = (page - 1) * limit
         
-        return await search_service.search_movies(
+        movies, did_you_mean, next_cursor = await search_service.search_movies_page(
             query=q,
             filters=filters if filters else None,
             limit=limit,
-            offset=offset
+            offset=offset,
+            after=after
         )
+        _set_did_you_mean(response, did_you_mean)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        await MovieService(db).apply_viewer_context(movies, current_user.id if current_user else None)
+        if include_facets:
+            return MovieSearchResponse(
+                items=movies,
+                facets=await search_service.get_search_facets(q, filters if filters else None),
+                did_you_mean=did_you_mean,
+                next_cursor=next_cursor
+            )
+        return movies
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -204,19 +269,27 @@ async def get_popular_searches(
 
 @router.get("/search/by-cast", response_model=List[MovieListResponse])
 async def search_movies_by_cast(
+    response: Response,
     actor: str = Query(..., min_length=2, description="Actor name"),
     limit: int = Query(20, ge=1, le=100, description="Number of movies to return"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Search movies by cast member name.
     
+    Misspelled names fall back to similar cast names; the closest one is
+    returned in X-Did-You-Mean.
+    
     - **actor**: Actor name (minimum 2 characters)
     - **limit**: Number of movies (default: 20, max: 100)
     """
     try:
         search_service = SearchService(db)
-        return await search_service.search_by_cast(actor, limit)
+        movies, did_you_mean = await search_service.search_by_cast_with_suggestion(actor, limit)
+        _set_did_you_mean(response, did_you_mean)
+        await MovieService(db).apply_viewer_context(movies, current_user.id if current_user else None)
+        return movies
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -244,7 +317,7 @@ async def get_movie(
 async def create_movie(
     movie_data: MovieCreate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Create a new movie (Admin only).
@@ -265,7 +338,7 @@ async def update_movie(
     movie_id: UUID,
     movie_data: MovieUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Update an existing movie (Admin only).
@@ -288,7 +361,7 @@ async def update_movie(
 async def delete_movie(
     movie_id: UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Delete a movie (Admin only).
@@ -337,6 +410,8 @@ async def get_movie_reviews(
     movie_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor"),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -345,6 +420,9 @@ async def get_movie_reviews(
     - **movie_id**: UUID of the movie
     - **page**: Page number (default: 1)
     - **limit**: Items per page (default: 20, max: 100)
+    - **after**: Cursor to continue from (takes precedence over page)
+    
+    Signed-in viewers also get their vote on each review (user_vote).
     """
     try:
         movie_service = MovieService(db)
@@ -352,10 +430,14 @@ async def get_movie_reviews(
         await movie_service.get_movie_by_id(movie_id)
         
         # Get reviews for the movie
-        reviews = await movie_service.get_movie_reviews(movie_id, page, limit)
+        reviews = await movie_service.get_movie_reviews(
+            movie_id, page, limit, after=after, user_id=current_user.id if current_user else None
+        )
         return reviews
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -8,8 +8,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.auth.dependencies import get_current_user, require_role
-from app.models import User
+from app.auth.dependencies import get_current_principal, require_role
+from app.auth.principal import Principal
 from app.models.enums import UserRole, NotificationType
 from app.services.notification_service import NotificationService
 from app.schemas.notification import (
@@ -30,19 +30,24 @@ async def get_notifications(
     unread_only: bool = Query(False, description="Get only unread notifications"),
     limit: int = Query(50, ge=1, le=100, description="Number of notifications to return"),
     offset: int = Query(0, ge=0, description="Number of notifications to skip"),
-    current_user: User = Depends(get_current_user),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor"),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get notifications for the current user
+    
+    Pass the previous response's `next_cursor` as `after` to fetch the next
+    page; it takes precedence over `offset`.
     """
     notification_service = NotificationService(db)
     
-    notifications = await notification_service.get_user_notifications(
+    notifications, next_cursor = await notification_service.get_user_notifications_page(
         user_id=current_user.id,
         unread_only=unread_only,
         limit=limit,
-        offset=offset
+        offset=offset,
+        after=after
     )
     
     unread_count = await notification_service.get_unread_count(current_user.id)
@@ -51,13 +56,14 @@ async def get_notifications(
         notifications=[NotificationResponse.from_orm(n) for n in notifications],
         total=len(notifications),
         unread_count=unread_count,
-        has_more=len(notifications) == limit
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor
     )
 
 
 @router.get("/stats", response_model=NotificationStats)
 async def get_notification_stats(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -87,7 +93,7 @@ async def get_notification_stats(
 @router.patch("/{notification_id}/read", response_model=NotificationResponse)
 async def mark_notification_read(
     notification_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -107,7 +113,7 @@ async def mark_notification_read(
 
 @router.patch("/read-all")
 async def mark_all_notifications_read(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -123,7 +129,7 @@ async def mark_all_notifications_read(
 @router.delete("/{notification_id}")
 async def delete_notification(
     notification_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -144,7 +150,7 @@ async def delete_notification(
 
 @router.get("/preferences", response_model=List[NotificationPreferenceResponse])
 async def get_notification_preferences(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -161,7 +167,7 @@ async def get_notification_preferences(
 async def update_notification_preference(
     notification_type: NotificationType,
     preference_update: NotificationPreferenceUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -184,7 +190,7 @@ async def update_notification_preference(
 @router.post("/bulk", response_model=dict)
 async def send_bulk_notifications(
     bulk_notification: NotificationBulkCreate,
-    current_user: User = Depends(require_role(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_role(UserRole.ADMIN)),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -213,7 +219,7 @@ async def send_bulk_notifications(
 
 @router.post("/cleanup")
 async def cleanup_old_notifications(
-    current_user: User = Depends(require_role(UserRole.ADMIN)),
+    current_user: Principal = Depends(require_role(UserRole.ADMIN)),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -232,19 +238,20 @@ async def cleanup_old_notifications(
 
 @router.get("/websocket/stats")
 async def get_websocket_stats(
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """
     Get WebSocket connection statistics (Admin only)
     """
     from app.services.notification_broadcaster import NotificationBroadcaster
     
-    stats = NotificationBroadcaster.get_connection_stats()
-    connected_users = NotificationBroadcaster.get_connected_users()
+    stats = await NotificationBroadcaster.get_connection_stats()
+    connected_users = await NotificationBroadcaster.get_connected_users()
     
     return {
         "stats": stats,
-        "connected_user_ids": [str(user_id) for user_id in connected_users]
+        "connected_user_ids": [str(user_id) for user_id in connected_users],
+        "delivery": NotificationBroadcaster.get_delivery_stats()
     }
 
 
@@ -252,7 +259,7 @@ async def get_websocket_stats(
 async def broadcast_system_announcement(
     title: str,
     message: str,
-    current_user: User = Depends(require_role(UserRole.ADMIN))
+    current_user: Principal = Depends(require_role(UserRole.ADMIN))
 ):
     """
     Broadcast a system announcement to all connected users (Admin only)
@@ -268,5 +275,5 @@ async def broadcast_system_announcement(
     return {
         "message": "System announcement broadcasted",
         "title": title,
-        "recipients": len(NotificationBroadcaster.get_connected_users())
+        "recipients": len(await NotificationBroadcaster.get_connected_users())
     }
\ No newline at end of file
@@ -8,7 +8,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.auth.dependencies import get_current_user, get_optional_current_user, require_moderator_or_admin
+from app.auth.dependencies import get_current_principal, get_optional_principal, require_moderator_or_admin
 from app.services.review_service import get_review_service, ReviewService
 from app.schemas.review import (
     ReviewCreate,
@@ -23,7 +23,7 @@ from app.schemas.review import (
     ReviewModerationAction,
     ReviewReportCreate
 )
-from app.models.user import User
+from app.auth.principal import Principal
 
 
 router = APIRouter(tags=["Reviews"])
@@ -32,7 +32,7 @@ router = APIRouter(tags=["Reviews"])
 @router.post("/", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
 async def create_review(
     review_data: ReviewCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -60,6 +60,8 @@ async def create_review(
 async def get_reviews(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor"),
+    include_total: bool = Query(False, description="Include an estimated total when paging by cursor"),
     movie_id: Optional[UUID] = Query(None, description="Filter by movie ID"),
     user_id: Optional[UUID] = Query(None, description="Filter by user ID"),
     rating_min: Optional[int] = Query(None, ge=1, le=10, description="Minimum rating filter"),
@@ -67,7 +69,7 @@ async def get_reviews(
     spoiler_warning: Optional[bool] = Query(None, description="Filter by spoiler warning"),
     sort_field: str = Query("created_at", pattern="^(created_at|updated_at|lemon_pie_rating|helpful_votes|helpfulness_score)$", description="Sort field"),
     sort_order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order"),
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -84,6 +86,10 @@ async def get_reviews(
     - **sort_field**: Field to sort by (created_at, updated_at, lemon_pie_rating, helpful_votes, helpfulness_score)
     - **sort_order**: Sort order (asc, desc)
     
+    **Cursor pagination:**
+    - **after**: Pass the previous response's `next_cursor` to fetch the next page (takes precedence over page)
+    - **include_total**: Return an estimated total when paging by cursor
+    
     Returns paginated list of reviews with user vote information if authenticated.
     Only approved reviews are shown by default.
     """
@@ -107,14 +113,16 @@ async def get_reviews(
         limit=limit,
         filters=filters,
         sort_by=sort_by,
-        user_id=user_id_for_votes
+        user_id=user_id_for_votes,
+        after=after,
+        include_total=include_total
     )
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
 async def get_review(
     review_id: UUID,
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -131,7 +139,7 @@ async def get_review(
 async def update_review(
     review_id: UUID,
     review_data: ReviewUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -157,7 +165,7 @@ async def update_review(
 @router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_review(
     review_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -174,7 +182,7 @@ async def delete_review(
 async def vote_on_review(
     review_id: UUID,
     vote_data: ReviewVoteCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -193,7 +201,7 @@ async def vote_on_review(
 @router.delete("/{review_id}/vote", response_model=ReviewResponse)
 async def remove_vote(
     review_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -241,7 +249,7 @@ async def get_overall_review_stats(
 async def get_trending_reviews(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=50, description="Items per page"),
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -267,7 +275,7 @@ async def get_trending_reviews(
 async def get_recent_reviews(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=50, description="Items per page"),
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -292,7 +300,7 @@ async def get_recent_reviews(
 async def report_review(
     review_id: UUID,
     report_data: ReviewReportCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -313,7 +321,7 @@ async def report_review(
 async def moderate_review(
     review_id: UUID,
     action_data: ReviewModerationAction,
-    current_user: User = Depends(require_moderator_or_admin),
+    current_user: Principal = Depends(require_moderator_or_admin),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -338,7 +346,7 @@ async def moderate_review(
 async def get_flagged_reviews(
     page: int = Query(1, ge=1, description="Page number"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: User = Depends(require_moderator_or_admin),
+    current_user: Principal = Depends(require_moderator_or_admin),
     db: AsyncSession = Depends(get_db),
     review_service: ReviewService = Depends(get_review_service)
 ):
@@ -7,8 +7,8 @@ from typing import Optional, Dict, Any
 import logging
 from uuid import UUID
 
-from app.auth.dependencies import get_current_user, require_admin
-from app.models.user import User
+from app.auth.dependencies import get_current_principal, require_admin
+from app.auth.principal import Principal
 from app.services.cloudinary_service import cloudinary_service
 from app.core.exceptions import LemonPieException
 
@@ -20,7 +20,7 @@ router = APIRouter(tags=["uploads"])
 @router.post("/avatar", response_model=Dict[str, Any])
 async def upload_user_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Upload user avatar image
@@ -88,7 +88,7 @@ async def upload_user_avatar(
 async def upload_movie_poster(
     file: UploadFile = File(...),
     movie_id: UUID = Form(...),
-    current_user: User = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Upload movie poster image (Admin only)
@@ -156,7 +156,7 @@ async def upload_movie_poster(
 @router.delete("/image/{public_id:path}")
 async def delete_image(
     public_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_principal)
 ):
     """
     Delete an image from Cloudinary
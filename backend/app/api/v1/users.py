@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
-from app.auth.dependencies import get_current_user, get_optional_current_user
+from app.auth.dependencies import get_current_principal, get_optional_principal
 from app.services.user_service import user_service
 from app.schemas.user import (
     UserProfileUpdate,
@@ -29,7 +29,7 @@ from app.schemas.privacy import (
     TwoFactorAuthVerifyRequest,
     TwoFactorAuthToggleRequest
 )
-from app.models.user import User
+from app.auth.principal import Principal
 
 
 router = APIRouter(tags=["User Management"])
@@ -37,7 +37,7 @@ router = APIRouter(tags=["User Management"])
 
 @router.get("/profile", response_model=UserProfileResponse)
 async def get_current_user_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -58,7 +58,7 @@ async def get_current_user_profile(
 @router.put("/profile", response_model=UserProfileResponse)
 async def update_current_user_profile(
     update_data: UserProfileUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -90,7 +90,8 @@ async def update_current_user_profile(
 async def get_user_watchlist(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: User = Depends(get_current_user),
+    after: Optional[str] = Query(None, description="Cursor from a previous response's next_cursor"),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -98,16 +99,17 @@ async def get_user_watchlist(
     
     - **page**: Page number (default: 1)
     - **per_page**: Items per page (default: 20, max: 100)
+    - **after**: Cursor to continue from (takes precedence over page)
     
     Returns paginated list of movies in the user's watchlist with movie details.
     """
-    return await user_service.get_user_watchlist(current_user.id, page, per_page, db)
+    return await user_service.get_user_watchlist(current_user.id, page, per_page, db, after=after)
 
 
 @router.get("/{user_id}", response_model=UserPublicProfile)
 async def get_user_profile(
     user_id: UUID,
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -128,7 +130,7 @@ async def get_user_profile(
 @router.get("/{user_id}/stats", response_model=UserStats)
 async def get_user_statistics(
     user_id: UUID,
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -156,7 +158,7 @@ async def get_user_statistics(
 @router.post("/{user_id}/follow")
 async def follow_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -180,7 +182,7 @@ async def follow_user(
 @router.delete("/{user_id}/follow")
 async def unfollow_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -199,7 +201,7 @@ async def get_user_followers(
     user_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -227,7 +229,7 @@ async def get_user_following(
     user_id: UUID,
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: Optional[User] = Depends(get_optional_current_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -254,7 +256,7 @@ async def get_user_following(
 async def get_activity_feed(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -276,7 +278,7 @@ async def get_activity_feed(
 @router.post("/watchlist/{movie_id}")
 async def add_to_watchlist(
     movie_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -294,7 +296,7 @@ async def add_to_watchlist(
 @router.delete("/watchlist/{movie_id}")
 async def remove_from_watchlist(
     movie_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -312,7 +314,7 @@ async def remove_from_watchlist(
 @router.post("/favorites/{movie_id}")
 async def add_to_favorites(
     movie_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -330,7 +332,7 @@ async def add_to_favorites(
 @router.delete("/favorites/{movie_id}")
 async def remove_from_favorites(
     movie_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -348,7 +350,7 @@ async def remove_from_favorites(
 async def get_user_favorites(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -366,7 +368,7 @@ async def get_user_favorites(
 
 @router.get("/privacy-settings", response_model=PrivacySettingsResponse)
 async def get_privacy_settings(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -381,7 +383,7 @@ async def get_privacy_settings(
 @router.put("/privacy-settings", response_model=PrivacySettingsResponse)
 async def update_privacy_settings(
     settings: PrivacySettingsUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -402,7 +404,7 @@ async def update_privacy_settings(
 @router.post("/change-password", response_model=PasswordChangeResponse)
 async def change_password(
     password_data: PasswordChangeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -421,7 +423,7 @@ async def change_password(
 
 @router.get("/2fa/status", response_model=TwoFactorAuthStatus)
 async def get_2fa_status(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -435,7 +437,7 @@ async def get_2fa_status(
 @router.post("/2fa/setup", response_model=TwoFactorAuthSetupResponse)
 async def setup_2fa(
     setup_data: TwoFactorAuthSetupRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -452,7 +454,7 @@ async def setup_2fa(
 @router.post("/2fa/verify")
 async def verify_2fa_setup(
     verify_data: TwoFactorAuthVerifyRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -468,7 +470,7 @@ async def verify_2fa_setup(
 @router.post("/2fa/toggle")
 async def toggle_2fa(
     toggle_data: TwoFactorAuthToggleRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -38,6 +38,8 @@ def setup_cors(app: FastAPI) -> None:
             "X-RateLimit-Remaining", 
             "X-RateLimit-Reset",
             "Retry-After",
+            "X-Did-You-Mean",
+            "X-Next-Cursor",
         ],
         max_age=86400,  # 24 hours
     )
@@ -1,18 +1,18 @@
 """
 Authentication dependencies for FastAPI endpoints
 """
-from typing import Optional
+from typing import Any, Dict, Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.jwt_service import jwt_service
+from app.auth.principal import Principal, decode_token, get_principal
 from app.db.database import get_db
 from app.models.user import User
 from app.models.enums import UserRole
-from sqlalchemy import select
 
 
 # HTTP Bearer token scheme
@@ -20,39 +20,89 @@ security = HTTPBearer()
 optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-) -> User:
-    """
-    Dependency to get the current authenticated user
-    """
-    token = credentials.credentials
-    
-    # Verify token and extract user ID
-    user_id = jwt_service.get_user_id_from_token(token)
-    
-    # Fetch user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+def _token_payload(request: Request, token: str) -> Dict[str, Any]:
+    """Claims of the request's token, as decoded by AuthMiddleware or decoded now"""
+    payload = getattr(request.state, "token_payload", None)
+    if payload is None:
+        payload = decode_token(token)
+    return payload
+
+
+async def _active_principal(user_id: UUID, db: AsyncSession) -> Principal:
+    """The user's principal, rejecting missing and inactive users"""
+    principal = await get_principal(user_id, db)
     
-    if user is None:
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Inactive user",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    return principal
+
+
+async def _load_user(principal: Principal, db: AsyncSession) -> User:
+    """The full user row behind a principal"""
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
+async def get_current_principal(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Dependency to get the current authenticated user's principal (cached, no user query on a hit)
+    """
+    payload = _token_payload(request, credentials.credentials)
+    user_id = jwt_service.get_user_id_from_payload(payload)
+    return await _active_principal(user_id, db)
+
+
+async def get_optional_principal(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[Principal]:
+    """
+    Dependency to optionally get the current user's principal (for endpoints that work with or without auth)
+    """
+    if credentials is None:
+        return None
+    
+    try:
+        payload = _token_payload(request, credentials.credentials)
+        user_id = jwt_service.get_user_id_from_payload(payload)
+        return await _active_principal(user_id, db)
+    except HTTPException:
+        return None
+
+
+async def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Dependency to get the current authenticated user (full row; prefer get_current_principal)
+    """
+    return await _load_user(principal, db)
+
+
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -68,35 +118,26 @@ async def get_current_active_user(
 
 
 async def get_optional_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    principal: Optional[Principal] = Depends(get_optional_principal),
     db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """
-    Dependency to optionally get the current user (for endpoints that work with or without auth)
+    Dependency to optionally get the current user (full row; prefer get_optional_principal)
     """
-    if credentials is None:
+    if principal is None:
         return None
     
     try:
-        token = credentials.credentials
-        user_id = jwt_service.get_user_id_from_token(token)
-        
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if user and user.is_active:
-            return user
+        return await _load_user(principal, db)
     except HTTPException:
-        pass
-    
-    return None
+        return None
 
 
 def require_role(required_role: UserRole):
     """
     Dependency factory to require a specific user role
     """
-    async def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         # Define role hierarchy
         role_hierarchy = {
             UserRole.USER: 0,
@@ -123,7 +164,7 @@ def require_roles(*allowed_roles: UserRole):
     """
     Dependency factory to require one of multiple roles
     """
-    async def roles_checker(current_user: User = Depends(get_current_user)) -> User:
+    async def roles_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if current_user.role not in allowed_roles:
             allowed_roles_str = ", ".join([role.value for role in allowed_roles])
             raise HTTPException(
@@ -143,7 +184,7 @@ require_critic = require_role(UserRole.CRITIC)
 require_moderator_or_admin = require_roles(UserRole.MODERATOR, UserRole.ADMIN)
 
 # Convenience function for admin users
-async def get_current_admin_user(current_user: User = Depends(require_admin)) -> User:
+async def get_current_admin_user(current_user: Principal = Depends(require_admin)) -> Principal:
     """
     Get current user and ensure they have admin role
     """
@@ -151,11 +192,9 @@ async def get_current_admin_user(current_user: User = Depends(require_admin)) ->
 
 
 # Middleware-compatible dependencies (use request.state set by AuthMiddleware)
-from fastapi import Request
-
-async def get_middleware_user(request: Request, db: AsyncSession = Depends(get_db)) -> User:
+async def get_middleware_principal(request: Request, db: AsyncSession = Depends(get_db)) -> Principal:
     """
-    Get current user from middleware state (set by AuthMiddleware)
+    Get the current user's principal from middleware state (set by AuthMiddleware)
     This avoids re-authentication when middleware already processed the request
     """
     user_id = getattr(request.state, 'user_id', None)
@@ -166,37 +205,28 @@ async def get_middleware_user(request: Request, db: AsyncSession = Depends(get_d
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Fetch user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Inactive user",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    return user
+    return await _active_principal(UUID(str(user_id)), db)
 
 
-async def get_middleware_admin_user(request: Request, db: AsyncSession = Depends(get_db)) -> User:
+async def get_middleware_user(
+    principal: Principal = Depends(get_middleware_principal),
+    db: AsyncSession = Depends(get_db)
+) -> User:
     """
-    Get current admin user from middleware state
-    This avoids re-authentication when middleware already processed the request
+    Get current user (full row) from middleware state
+    """
+    return await _load_user(principal, db)
+
+
+async def get_middleware_admin_user(principal: Principal = Depends(get_middleware_principal)) -> Principal:
+    """
+    Get current admin user's principal from middleware state
+    The role is checked against the cached principal, so role changes apply immediately
     """
-    user_role = getattr(request.state, 'user_role', None)
-    if user_role != UserRole.ADMIN:
+    if principal.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
     
-    return await get_middleware_user(request, db)
\ No newline at end of file
+    return principal
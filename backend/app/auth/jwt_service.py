@@ -113,7 +113,10 @@ class JWTService:
     
     def get_user_id_from_token(self, token: str) -> UUID:
         """Extract user ID from JWT token"""
-        payload = self.verify_token(token)
+        return self.get_user_id_from_payload(self.verify_token(token))
+    
+    def get_user_id_from_payload(self, payload: Dict[str, Any]) -> UUID:
+        """Extract user ID from verified JWT claims"""
         user_id_str = payload.get("sub")
         if user_id_str is None:
             raise HTTPException(
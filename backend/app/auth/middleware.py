@@ -2,92 +2,85 @@
 Authentication and authorization middleware
 """
 from typing import Optional, List
-from fastapi import Request, HTTPException, status
 from fastapi.security.utils import get_authorization_scheme_param
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+import structlog
 
-from app.auth.jwt_service import jwt_service
-from app.models.enums import UserRole
+from app.auth.principal import decode_token
+from app.middleware.asgi import get_request, get_state, send_error
 
+logger = structlog.get_logger(__name__)
 
-class AuthMiddleware(BaseHTTPMiddleware):
+
+class AuthMiddleware:
     """
     Middleware for handling authentication and authorization
     """
     
     def __init__(self, app, protected_paths: Optional[List[str]] = None):
-        super().__init__(app)
+        self.app = app
         self.protected_paths = protected_paths or []
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
         """
         Process request and add user context if authenticated
         """
-        # Extract token from Authorization header
-        authorization = request.headers.get("Authorization")
-        scheme, token = get_authorization_scheme_param(authorization)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Add user context to request state
-        request.state.user = None
-        request.state.user_id = None
-        request.state.user_role = None
+        state = get_state(scope)
+        state["user"] = None
+        state["user_id"] = None
+        state["user_role"] = None
+        state["token_payload"] = None
+        
+        # Extract token from Authorization header
+        authorization = get_request(scope).headers.get("Authorization")
+        scheme, token = get_authorization_scheme_param(authorization)
         
         if scheme.lower() == "bearer" and token:
-            print(f"AUTH: Found bearer token: {token[:20]}...")
             try:
-                # Verify token and extract user info
-                payload = jwt_service.verify_token(token)
-                request.state.user_id = payload.get("sub")
-                request.state.user_role = payload.get("role")
-                request.state.token_payload = payload
-                print(f"AUTH: Token verified. User ID: {request.state.user_id}, Role: {request.state.user_role}")
+                # Verify token (once per worker) and share its claims with the dependencies
+                payload = decode_token(token)
+                state["user_id"] = payload.get("sub")
+                state["user_role"] = payload.get("role")
+                state["token_payload"] = payload
             except Exception as e:
                 # Token verification failed, but continue without authentication
-                print(f"AUTH: Token verification failed: {e}")
-                pass
+                logger.debug("Token verification failed", error=str(e))
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
-class RoleBasedAccessMiddleware(BaseHTTPMiddleware):
+class RoleBasedAccessMiddleware:
     """
     Middleware for role-based access control on specific routes
     """
     
     def __init__(self, app, route_permissions: Optional[dict] = None):
-        super().__init__(app)
+        self.app = app
         # Route permissions mapping: {"/path": ["role1", "role2"]}
         self.route_permissions = route_permissions or {}
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
         """Check if user has required role for the requested route"""
-        print(f"MIDDLEWARE: Processing {request.method} {request.url.path}")
-        path = request.url.path
-        method = request.method.lower()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Check if route requires specific roles
-        route_key = f"{request.method.lower()}:{request.url.path}"
+        route_key = f"{scope['method'].lower()}:{scope['path']}"
         required_roles = self.route_permissions.get(route_key, [])
         
-        import logging
-        print(f"ROLE DEBUG: Route key: {route_key}")
-        print(f"ROLE DEBUG: Required roles: {required_roles}")
-        
         if required_roles:
-            user_role = getattr(request.state, 'user_role', None)
-            print(f"ROLE DEBUG: User role: {user_role}")
-            print(f"ROLE DEBUG: User role in required roles: {user_role in required_roles if user_role else False}")
+            user_role = get_state(scope).get('user_role')
             if not user_role or user_role not in required_roles:
-                print(f"ROLE DEBUG: Access denied - user role '{user_role}' not in required roles {required_roles}")
-                raise HTTPException(
-                    status_code=401,
-                    detail="Authentication required"
-                )
+                logger.debug("Access denied", route=route_key, user_role=user_role, required_roles=required_roles)
+                await send_error(scope, receive, send, 401, "Authentication required")
+                return
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
 def create_role_permissions_map() -> dict:
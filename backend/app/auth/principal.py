@@ -0,0 +1,126 @@
+"""
+Authenticated principal cache for LemonNPie Backend API
+
+Authorizing a request needs the token's claims and a handful of user fields,
+not the full user row. Verified tokens are kept in an in-process LRU keyed by
+a digest of the token, so each token's signature is checked once per worker.
+The user fields (the principal) are cached in L1 and Redis. AdminService
+invalidates them when it changes a user's role or suspends or activates them.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from uuid import UUID
+import hashlib
+import time
+
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.auth.jwt_service import jwt_service
+from app.cache.redis import get_user_cache_service
+from app.core.config import settings
+from app.models.enums import UserRole
+from app.models.user import User
+
+logger = structlog.get_logger(__name__)
+
+
+class Principal(BaseModel):
+    """The user fields needed to authenticate and authorize a request"""
+    id: UUID
+    name: str
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+    class Config:
+        from_attributes = True
+
+
+class TokenCache:
+    """LRU of verified token digests to their claims, each dropped at its token's expiry"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a token verified before and not yet expired"""
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[digest]
+            return None
+
+        self._entries.move_to_end(digest)
+        return payload
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Remember a verified token's claims until it expires"""
+        expires_at = payload.get("exp")
+        if not expires_at or self.max_entries <= 0:
+            return
+
+        self._entries[self._digest(token)] = (payload, float(expires_at))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every token"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a JWT, reusing the claims of a token verified before
+
+    Raises:
+        HTTPException: If the token is invalid or expired
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt_service.verify_token(token)
+        token_cache.set(token, payload)
+    return payload
+
+
+async def get_principal(user_id: UUID, db: AsyncSession) -> Optional[Principal]:
+    """The user's principal from cache, loaded from the database on a miss (None if no such user)"""
+    async def load() -> Optional[Principal]:
+        result = await db.execute(
+            select(User.id, User.name, User.role, User.is_active, User.is_verified).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        return Principal(**row._asdict()) if row is not None else None
+
+    try:
+        user_cache = await get_user_cache_service()
+    except RuntimeError:
+        # Redis not initialized
+        return await load()
+    return await user_cache.get_or_load_principal(str(user_id), load, Principal, settings.AUTH_PRINCIPAL_CACHE_TTL)
+
+
+async def invalidate_principal(user_id: UUID) -> None:
+    """Drop a user's cached principal here, in Redis and in every other worker's L1"""
+    try:
+        user_cache = await get_user_cache_service()
+        await user_cache.invalidate_principal(str(user_id))
+    except Exception as e:
+        logger.warning("Failed to invalidate principal", user_id=str(user_id), error=str(e))
@@ -1,175 +1,316 @@
 """
 Rate limiting service for API endpoints
+
+Limits use the generic cell rate algorithm (GCRA). Each key holds a single
+value, the theoretical arrival time (TAT) of its next request, so state is
+O(1) per key however large the limit is. A check is one atomic Lua script
+call (EVALSHA), which tests all of a request's limits (user, IP, endpoint)
+together and charges all of them or none.
+
+With RATE_LIMIT_LOCAL_TOKENS set, a check on a generous limit leases a few
+extra tokens in the same script call. The worker then spends them on the
+following requests without touching Redis. Leased tokens are charged up
+front, so a limit is never exceeded. The cost is that an unspent lease
+expires and its tokens are lost for the window.
 """
-from typing import Optional, Dict, Any
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import functools
+import hashlib
+import inspect
+import math
 import time
-import json
-from datetime import datetime, timedelta
 
 from fastapi import Request, HTTPException, status
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from limits import parse
+from redis.exceptions import NoScriptError
+from slowapi import Limiter
 from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from redis import Redis
+import structlog
 
 from app.core.config import settings
-from app.cache.redis import get_redis_client
+from app.cache.redis import get_redis
+
+logger = structlog.get_logger(__name__)
+
+# A lease takes at most this fraction of the smallest limit it is charged to
+LEASE_SHARE = 10
+# Requests whose leases are tracked in-process at once
+MAX_LOCAL_LEASES = 10000
+
+# KEYS: one per limit
+# ARGV[1]: tokens wanted; extra tokens are only leased when all of them fit
+# ARGV[2i], ARGV[2i + 1]: emission interval and period of KEYS[i], in ms
+# Returns {granted, retry_after_ms, remaining, reset_after_ms, tightest limit}
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) * 1000 + tonumber(clock[2]) / 1000
+local wanted = tonumber(ARGV[1])
+local tats, capacities = {}, {}
+local tightest = 1
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i])
+    local period = tonumber(ARGV[2 * i + 1])
+    tats[i] = math.max(tonumber(redis.call('GET', key)) or now, now)
+    capacities[i] = math.max(math.floor((now + period - tats[i]) / interval), 0)
+    if capacities[i] < capacities[tightest] then
+        tightest = i
+    end
+end
+
+local granted = wanted
+if capacities[tightest] < wanted then
+    granted = math.min(capacities[tightest], 1)
+end
+
+if granted == 0 then
+    local retry_after, denied = 0, tightest
+    for i in ipairs(KEYS) do
+        local wait = tats[i] + tonumber(ARGV[2 * i]) - tonumber(ARGV[2 * i + 1]) - now
+        if capacities[i] == 0 and wait > retry_after then
+            retry_after, denied = wait, i
+        end
+    end
+    return {0, math.ceil(retry_after), 0, math.ceil(tats[denied] - now), denied}
+end
+
+for i, key in ipairs(KEYS) do
+    tats[i] = tats[i] + granted * tonumber(ARGV[2 * i])
+    redis.call('SET', key, tats[i], 'PX', math.ceil(tats[i] - now))
+end
+return {granted, 0, capacities[tightest] - granted, math.ceil(tats[tightest] - now), tightest}
+"""
+GCRA_SCRIPT_SHA = hashlib.sha1(GCRA_SCRIPT.encode()).hexdigest()
+
+
+class Rate(NamedTuple):
+    """A limit of amount requests per period seconds"""
+    amount: int
+    period: float
+
+    def __str__(self) -> str:
+        return f"{self.amount}/{self.period:g}s"
+
+
+class RateLimitResult(NamedTuple):
+    """Outcome of a check against the tightest of a request's limits"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: Optional[float]
+
+    def info(self) -> Dict[str, Optional[int]]:
+        """Rate limit info dictionary (as returned by is_allowed)"""
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_time": int(time.time() + self.reset_after),
+            "retry_after": math.ceil(self.retry_after) if self.retry_after is not None else None
+        }
+
+
+class _Lease:
+    """Tokens granted by Redis ahead of time for one set of limits"""
+    __slots__ = ("tokens", "limit", "remaining", "expires_at")
+
+    def __init__(self, tokens: int, limit: int, remaining: int, ttl: float):
+        self.tokens = tokens
+        self.limit = limit
+        self.remaining = remaining
+        self.expires_at = time.monotonic() + ttl
+
+
+def parse_rate(limit: str) -> Rate:
+    """Parse a SlowAPI-style limit string ("60/minute", "5 per hour")"""
+    item = parse(limit)
+    return Rate(item.amount, item.get_expiry())
 
 
 class RateLimiter:
-    """Custom rate limiter with Redis backend"""
-    
-    def __init__(self, redis_client: Optional[Redis] = None):
-        self._redis_client = redis_client
-        self._redis = None
+    """GCRA rate limiter with Redis backend"""
+
+    def __init__(self):
         self.default_rate = f"{settings.RATE_LIMIT_PER_MINUTE}/minute"
-    
-    @property
-    def redis(self):
-        """Lazy initialization of Redis client"""
-        if self._redis is None:
-            if self._redis_client:
-                self._redis = self._redis_client
-            else:
-                try:
-                    self._redis = get_redis_client()
-                except RuntimeError:
-                    # Redis not initialized, return None for testing
-                    return None
-        return self._redis
-    
+        self._leases: Dict[tuple, _Lease] = {}
+
+    async def hit(self, limits: Sequence[Tuple[str, Rate]]) -> RateLimitResult:
+        """
+        Charge one request to every (key, rate) limit, or to none if any is exhausted
+
+        Args:
+            limits: Rate limit keys and the rate each is held to
+
+        Returns:
+            Result for the tightest limit
+        """
+        lease_key = tuple(limits)
+        result = self._take_leased(lease_key)
+        if result is not None:
+            return result
+
+        wanted = self._lease_size(limits)
+        try:
+            granted, retry_after_ms, remaining, reset_after_ms, tightest = await self._run_script(limits, wanted)
+        except Exception as e:
+            # Fail open: an outage must not take the API down with it
+            logger.warning("Rate limit check failed, allowing request", error=str(e))
+            rate = min((rate for _, rate in limits), key=lambda rate: rate.amount)
+            return RateLimitResult(True, rate.amount, rate.amount - 1, rate.period, None)
+
+        limit = limits[int(tightest) - 1][1].amount
+        if not granted:
+            return RateLimitResult(False, limit, 0, reset_after_ms / 1000, retry_after_ms / 1000)
+
+        if granted > 1:
+            self._store_lease(lease_key, _Lease(granted - 1, limit, remaining, settings.RATE_LIMIT_LOCAL_TTL_MS / 1000))
+        return RateLimitResult(True, limit, remaining + granted - 1, reset_after_ms / 1000, None)
+
     async def is_allowed(
-        self, 
-        key: str, 
-        limit: int, 
+        self,
+        key: str,
+        limit: int,
         window_seconds: int
     ) -> tuple[bool, Dict[str, Any]]:
         """
         Check if request is allowed based on rate limit
-        
+
         Returns:
             (is_allowed, info_dict)
         """
-        # If Redis is not available, allow all requests (for testing)
-        if self.redis is None:
-            info = {
-                "limit": limit,
-                "remaining": limit - 1,
-                "reset_time": int(time.time()) + window_seconds,
-                "retry_after": None
-            }
-            return True, info
-        
-        current_time = int(time.time())
-        window_start = current_time - window_seconds
-        
-        # Use Redis sorted set to track requests in time window
-        pipe = self.redis.pipeline()
-        
-        # Remove old entries
-        pipe.zremrangebyscore(key, 0, window_start)
-        
-        # Count current requests in window
-        pipe.zcard(key)
-        
-        # Add current request
-        pipe.zadd(key, {str(current_time): current_time})
-        
-        # Set expiration
-        pipe.expire(key, window_seconds)
-        
-        results = pipe.execute()
-        current_requests = results[1]
-        
-        is_allowed = current_requests < limit
-        
-        info = {
-            "limit": limit,
-            "remaining": max(0, limit - current_requests - 1),
-            "reset_time": current_time + window_seconds,
-            "retry_after": window_seconds if not is_allowed else None
-        }
-        
-        return is_allowed, info
-    
+        result = await self.hit([(key, Rate(limit, window_seconds))])
+        return result.allowed, result.info()
+
+    async def check_limits(self, limits: Sequence[Tuple[str, Rate]]) -> Dict[str, Any]:
+        """
+        Check several limits at once
+
+        Returns:
+            Rate limit info dictionary for the tightest limit
+
+        Raises:
+            HTTPException: If any limit is exceeded
+        """
+        result = await self.hit(limits)
+        info = result.info()
+
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={
+                    "error": "Rate limit exceeded",
+                    "limit": info["limit"],
+                    "retry_after": info["retry_after"]
+                },
+                headers={
+                    "X-RateLimit-Limit": str(info["limit"]),
+                    "X-RateLimit-Remaining": str(info["remaining"]),
+                    "X-RateLimit-Reset": str(info["reset_time"]),
+                    "Retry-After": str(info["retry_after"])
+                }
+            )
+
+        return info
+
     async def check_rate_limit(
-        self, 
-        request: Request, 
-        limit: int = None, 
+        self,
+        request: Request,
+        limit: int = None,
         window_seconds: int = 60,
         key_func: callable = None
     ) -> Dict[str, Any]:
         """
         Check rate limit for a request
-        
+
         Args:
             request: FastAPI request object
             limit: Number of requests allowed in window
             window_seconds: Time window in seconds
             key_func: Function to generate rate limit key
-        
+
         Returns:
             Rate limit info dictionary
-        
+
         Raises:
             HTTPException: If rate limit exceeded
         """
         if limit is None:
             limit = settings.RATE_LIMIT_PER_MINUTE
-        
+
         # Generate rate limit key
         if key_func:
             key = key_func(request)
         else:
             key = self._get_default_key(request)
-        
-        is_allowed, info = await self.is_allowed(key, limit, window_seconds)
-        
-        if not is_allowed:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail={
-                    "error": "Rate limit exceeded",
-                    "limit": info["limit"],
-                    "retry_after": info["retry_after"]
-                },
-                headers={
-                    "X-RateLimit-Limit": str(info["limit"]),
-                    "X-RateLimit-Remaining": str(info["remaining"]),
-                    "X-RateLimit-Reset": str(info["reset_time"]),
-                    "Retry-After": str(info["retry_after"])
-                }
-            )
-        
-        return info
-    
+
+        return await self.check_limits([(key, Rate(limit, window_seconds))])
+
+    async def _run_script(self, limits: Sequence[Tuple[str, Rate]], wanted: int) -> List[int]:
+        """Run the GCRA script, sending its source only if Redis doesn't have it cached"""
+        redis = await get_redis()
+        keys = [f"{key}:{rate}" for key, rate in limits]
+        args = [wanted]
+        for _, rate in limits:
+            args += [rate.period * 1000 / rate.amount, rate.period * 1000]
+
+        try:
+            return await redis.evalsha(GCRA_SCRIPT_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            return await redis.eval(GCRA_SCRIPT, len(keys), *keys, *args)
+
+    def _lease_size(self, limits: Sequence[Tuple[str, Rate]]) -> int:
+        """Tokens to ask for: the request's own, plus a lease on generous limits"""
+        share = min(rate.amount for _, rate in limits) // LEASE_SHARE
+        return max(min(settings.RATE_LIMIT_LOCAL_TOKENS, share), 1)
+
+    def _take_leased(self, lease_key: tuple) -> Optional[RateLimitResult]:
+        """Spend a leased token if this worker holds a live lease for the limits"""
+        lease = self._leases.get(lease_key)
+        if lease is None:
+            return None
+        if lease.expires_at <= time.monotonic():
+            del self._leases[lease_key]
+            return None
+
+        lease.tokens -= 1
+        if lease.tokens == 0:
+            del self._leases[lease_key]
+        return RateLimitResult(True, lease.limit, lease.remaining + lease.tokens, lease.expires_at - time.monotonic(), None)
+
+    def _store_lease(self, lease_key: tuple, lease: _Lease) -> None:
+        if len(self._leases) >= MAX_LOCAL_LEASES:
+            now = time.monotonic()
+            self._leases = {key: held for key, held in self._leases.items() if held.expires_at > now}
+            if len(self._leases) >= MAX_LOCAL_LEASES:
+                self._leases.clear()
+        self._leases[lease_key] = lease
+
     def _get_default_key(self, request: Request) -> str:
         """Generate default rate limit key based on IP and user"""
         ip_address = get_remote_address(request)
-        
+
         # If user is authenticated, use user ID
         user_id = getattr(request.state, 'user_id', None)
         if user_id:
             return f"rate_limit:user:{user_id}"
-        
+
         # Otherwise use IP address
         return f"rate_limit:ip:{ip_address}"
-    
+
     def get_user_key(self, request: Request) -> str:
         """Generate rate limit key for authenticated user"""
         user_id = getattr(request.state, 'user_id', None)
         if user_id:
             return f"rate_limit:user:{user_id}"
-        
+
         # Fallback to IP
         ip_address = get_remote_address(request)
         return f"rate_limit:ip:{ip_address}"
-    
+
     def get_ip_key(self, request: Request) -> str:
         """Generate rate limit key for IP address"""
         ip_address = get_remote_address(request)
         return f"rate_limit:ip:{ip_address}"
-    
+
     def get_endpoint_key(self, request: Request) -> str:
         """Generate rate limit key for specific endpoint"""
         ip_address = get_remote_address(request)
@@ -190,33 +331,57 @@ def get_limiter_key(request: Request) -> str:
 limiter = Limiter(key_func=get_limiter_key)
 
 
+def rate_limit(*rules: Tuple[str, Callable[[Request], str]]):
+    """
+    Enforce one or more limits on an endpoint, checked together in one Redis call
+
+    Args:
+        rules: (limit string, key function) pairs, e.g. ("60/minute", rate_limiter.get_user_key)
+
+    The endpoint must take a `request: Request` argument.
+    """
+    rates = [(parse_rate(limit), key_func) for limit, key_func in rules]
+
+    def decorator(func):
+        parameters = inspect.signature(func).parameters
+        request_name = next(
+            (name for name, parameter in parameters.items() if parameter.annotation is Request), None
+        )
+        if request_name is None:
+            raise TypeError(f"Rate limited endpoint {func.__name__} has no Request argument")
+        request_index = list(parameters).index(request_name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get(request_name)
+            if request is None and len(args) > request_index:
+                request = args[request_index]
+            await rate_limiter.check_limits([(key_func(request), rate) for rate, key_func in rates])
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 # Rate limit decorators for different scenarios
 def rate_limit_per_user(limit: str = "60/minute"):
     """Rate limit per authenticated user"""
-    def key_func(request: Request) -> str:
-        return rate_limiter.get_user_key(request)
-    
-    return limiter.limit(limit, key_func=key_func)
+    return rate_limit((limit, rate_limiter.get_user_key))
 
 
 def rate_limit_per_ip(limit: str = "100/minute"):
     """Rate limit per IP address"""
-    def key_func(request: Request) -> str:
-        return rate_limiter.get_ip_key(request)
-    
-    return limiter.limit(limit, key_func=key_func)
+    return rate_limit((limit, rate_limiter.get_ip_key))
 
 
 def rate_limit_per_endpoint(limit: str = "30/minute"):
     """Rate limit per endpoint per IP"""
-    def key_func(request: Request) -> str:
-        return rate_limiter.get_endpoint_key(request)
-    
-    return limiter.limit(limit, key_func=key_func)
+    return rate_limit((limit, rate_limiter.get_endpoint_key))
 
 
 # Specific rate limits for different endpoint types
 rate_limit_auth = rate_limit_per_ip("5/minute")  # Strict for auth endpoints
 rate_limit_api = rate_limit_per_user("60/minute")  # Standard for API
 rate_limit_search = rate_limit_per_user("30/minute")  # Moderate for search
-rate_limit_upload = rate_limit_per_user("10/minute")  # Conservative for uploads
\ No newline at end of file
+rate_limit_upload = rate_limit_per_user("10/minute")  # Conservative for uploads
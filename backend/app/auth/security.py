@@ -6,9 +6,9 @@ import html
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+from fastapi import HTTPException, status
+
+from app.middleware.asgi import get_request, send_error
 
 
 class SecurityUtils:
@@ -176,85 +176,93 @@ class SecurityUtils:
             return "very_strong"
 
 
-class SecurityMiddleware(BaseHTTPMiddleware):
+class SecurityMiddleware:
     """Middleware for request security validation and sanitization"""
     
+    # Security headers added to every response
+    SECURITY_HEADERS = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+        (b"content-security-policy", (
+            b"default-src 'self'; "
+            b"script-src 'self' 'unsafe-inline'; "
+            b"style-src 'self' 'unsafe-inline'; "
+            b"img-src 'self' data: https:; "
+            b"font-src 'self' https:; "
+            b"connect-src 'self' https:; "
+            b"frame-ancestors 'none';"
+        )),
+    ]
+    # Response headers replaced by the above or removed (server information)
+    DROPPED_HEADERS = frozenset(name for name, _ in SECURITY_HEADERS) | {b"server"}
+    
     def __init__(self, app, max_request_size: int = 10 * 1024 * 1024):  # 10MB default
-        super().__init__(app)
+        self.app = app
         self.max_request_size = max_request_size
         self.security_utils = SecurityUtils()
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
         """Process request for security validation"""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
         # Check request size
-        content_length = request.headers.get('content-length')
-        if content_length and int(content_length) > self.max_request_size:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Request too large"
-            )
-        
-        # Add security headers to response
-        response = await call_next(request)
-        
-        # Security headers
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Content-Security-Policy"] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline'; "
-            "style-src 'self' 'unsafe-inline'; "
-            "img-src 'self' data: https:; "
-            "font-src 'self' https:; "
-            "connect-src 'self' https:; "
-            "frame-ancestors 'none';"
-        )
-        
-        # Remove server information
-        if "server" in response.headers:
-            del response.headers["server"]
-        
-        return response
+        content_length = get_request(scope).headers.get('content-length')
+        if content_length and content_length.isdigit() and int(content_length) > self.max_request_size:
+            await send_error(scope, receive, send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "Request too large")
+            return
+        
+        async def send_with_security_headers(message):
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in self.DROPPED_HEADERS
+                ]
+                headers.extend(self.SECURITY_HEADERS)
+                message["headers"] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_security_headers)
 
 
-class InputValidationMiddleware(BaseHTTPMiddleware):
+class InputValidationMiddleware:
     """Middleware for input validation and sanitization"""
     
     def __init__(self, app, sanitize_inputs: bool = True):
-        super().__init__(app)
+        self.app = app
         self.sanitize_inputs = sanitize_inputs
         self.security_utils = SecurityUtils()
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
         """Validate and sanitize request inputs"""
+        # Nothing to validate without a query string
+        if scope["type"] != "http" or not scope.get("query_string"):
+            await self.app(scope, receive, send)
+            return
+        
+        request = get_request(scope)
         
         # Skip validation for certain content types
         content_type = request.headers.get('content-type', '')
         if content_type.startswith('multipart/form-data'):
             # Handle file uploads separately
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
         
-        # Validate query parameters
+        # Validate query parameters (path parameters are only known once routed,
+        # and are validated by their endpoints)
         for key, value in request.query_params.items():
             if not self.security_utils.validate_no_sql_injection(value):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid characters in query parameter: {key}"
-                )
-        
-        # Validate path parameters
-        for key, value in request.path_params.items():
-            if not self.security_utils.validate_no_sql_injection(str(value)):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Invalid characters in path parameter: {key}"
+                await send_error(
+                    scope, receive, send, status.HTTP_400_BAD_REQUEST,
+                    f"Invalid characters in query parameter: {key}"
                 )
+                return
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
 
 
 def validate_request_data(data: Dict[str, Any], sanitize: bool = True) -> Dict[str, Any]:
@@ -0,0 +1,251 @@
+"""
+Cache value codecs for LemonNPie Backend API
+
+Every stored value starts with a tag byte: the low six bits name the codec
+that produced the payload and the top two bits the compression applied to
+it. Pydantic models are stored as their JSON dump and can be restored with
+model_validate_json without building an intermediate dict.
+"""
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict, NamedTuple, Optional, Type
+from uuid import UUID
+import json
+import struct
+import zlib
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# Payload tags (low six bits of the tag byte)
+JSON_TAG = 0x01
+ORJSON_TAG = 0x02
+MSGPACK_TAG = 0x03
+PYDANTIC_TAG = 0x04
+ENVELOPE_TAG = 0x05
+
+# Compression flags (top two bits of the tag byte)
+ZLIB_FLAG = 0x40
+LZ4_FLAG = 0x80
+COMPRESSION_MASK = 0xC0
+
+# fresh_until and delta of a CacheEnvelope, as big-endian doubles
+ENVELOPE_HEADER = struct.Struct("!dd")
+
+
+class CodecError(ValueError):
+    """Raised when a cached payload cannot be encoded or decoded"""
+
+
+class CacheEnvelope(NamedTuple):
+    """Value stored by CacheService.get_or_set with its soft expiry"""
+    value: Any
+    fresh_until: float
+    delta: float
+
+
+def to_primitive(value: Any) -> Any:
+    """Convert types the JSON and msgpack encoders do not know natively"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not cacheable: {type(value).__name__}")
+
+
+class Codec:
+    """Encodes plain Python values (dicts, lists, scalars) to bytes"""
+
+    name = ""
+    tag = 0
+
+    def encode(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def decode(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    """Standard library JSON, always available"""
+
+    name = "json"
+    tag = JSON_TAG
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=to_primitive, separators=(",", ":")).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    """orjson: JSON with native datetime/UUID support and much faster dumps/loads"""
+
+    name = "orjson"
+    tag = ORJSON_TAG
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=to_primitive, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """MessagePack: compact binary encoding"""
+
+    name = "msgpack"
+    tag = MSGPACK_TAG
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=to_primitive, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+CODECS: Dict[str, Callable[[], Codec]] = {
+    JsonCodec.name: JsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+CODEC_DEPENDENCIES = {
+    OrjsonCodec.name: lambda: orjson,
+    MsgpackCodec.name: lambda: msgpack,
+}
+
+
+def available_codecs() -> Dict[str, Codec]:
+    """Instances of every codec whose dependency is installed"""
+    return {
+        name: factory()
+        for name, factory in CODECS.items()
+        if CODEC_DEPENDENCIES.get(name, lambda: True)() is not None
+    }
+
+
+class CacheCodec:
+    """
+    Tagged, optionally compressed encoding of cache values
+
+    Values are written with the configured codec; any known tag is accepted on
+    read, so switching codecs does not invalidate existing entries.
+    """
+
+    def __init__(
+        self,
+        codec: str = "orjson",
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024
+    ):
+        codecs = available_codecs()
+        if codec not in codecs:
+            raise CodecError(f"Cache codec '{codec}' is unknown or its package is not installed")
+        if compression not in (None, "", "none", "zlib", "lz4"):
+            raise CodecError(f"Unknown cache compression '{compression}'")
+        if compression == "lz4" and lz4_frame is None:
+            raise CodecError("lz4 compression requires the lz4 package")
+
+        self.codec = codecs[codec]
+        self.compression = compression if compression not in ("", "none") else None
+        self.compression_threshold = compression_threshold
+        self._decoders = {c.tag: c for c in codecs.values()}
+        self._json = codecs.get(OrjsonCodec.name) or codecs[JsonCodec.name]
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value, a Pydantic model or a CacheEnvelope to tagged bytes"""
+        if isinstance(value, CacheEnvelope):
+            header = bytes([ENVELOPE_TAG]) + ENVELOPE_HEADER.pack(value.fresh_until, value.delta)
+            return header + self.encode(value.value)
+
+        try:
+            if isinstance(value, BaseModel):
+                tag, payload = PYDANTIC_TAG, value.model_dump_json().encode()
+            else:
+                tag, payload = self.codec.tag, self.codec.encode(value)
+        except (TypeError, ValueError) as e:
+            raise CodecError(str(e)) from e
+
+        if self.compression and len(payload) >= self.compression_threshold:
+            if self.compression == "zlib":
+                tag, payload = tag | ZLIB_FLAG, zlib.compress(payload)
+            else:
+                tag, payload = tag | LZ4_FLAG, lz4_frame.compress(payload)
+
+        return bytes([tag]) + payload
+
+    def decode(self, data: bytes, model: Optional[Type[BaseModel]] = None) -> Any:
+        """
+        Decode tagged bytes
+
+        Args:
+            data: Bytes produced by encode
+            model: Pydantic model to restore the value as
+
+        Returns:
+            Decoded value (a model instance when model is given)
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        if not data:
+            raise CodecError("Empty cache payload")
+
+        tag = data[0]
+        if tag == ENVELOPE_TAG:
+            fresh_until, delta = ENVELOPE_HEADER.unpack_from(data, 1)
+            return CacheEnvelope(self.decode(data[1 + ENVELOPE_HEADER.size:], model), fresh_until, delta)
+
+        payload = data[1:]
+        compression = tag & COMPRESSION_MASK
+        tag &= ~COMPRESSION_MASK
+        try:
+            if compression == ZLIB_FLAG:
+                payload = zlib.decompress(payload)
+            elif compression == LZ4_FLAG:
+                if lz4_frame is None:
+                    raise CodecError("lz4 compressed payload but lz4 is not installed")
+                payload = lz4_frame.decompress(payload)
+            elif compression:
+                raise CodecError(f"Unknown compression flag {compression:#x}")
+
+            if tag == PYDANTIC_TAG:
+                if model is not None:
+                    return model.model_validate_json(payload)
+                return self._json.decode(payload)
+
+            decoder = self._decoders.get(tag)
+            if decoder is None:
+                raise CodecError(f"Unknown cache payload tag {tag:#x}")
+            value = decoder.decode(payload)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(str(e)) from e
+
+        if model is not None:
+            return model.model_validate(value)
+        return value
@@ -0,0 +1,130 @@
+"""
+In-process (L1) cache layered in front of Redis
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import time
+
+
+# Returned by LocalCache.get when a key is absent or expired
+MISSING = object()
+
+
+class CacheTierStats:
+    """Hit/miss counters for one cache tier"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        """Count a lookup"""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters and hit rate as a dict"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0
+        }
+
+    def reset(self) -> None:
+        """Zero the counters"""
+        self.hits = 0
+        self.misses = 0
+
+
+class LocalCache:
+    """
+    Size-bounded LRU cache with per-namespace TTLs
+
+    Values are stored already deserialized and handed out as-is, so callers
+    must treat them as read-only. The namespace of a key is its first
+    ":"-separated component; namespaces without a TTL are not cached here.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        namespace_ttls: Optional[Dict[str, int]] = None,
+        default_ttl: int = 0
+    ):
+        self.max_entries = max_entries
+        self.namespace_ttls = namespace_ttls or {}
+        self.default_ttl = default_ttl
+        self.stats = CacheTierStats()
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple[Any, float]]" = OrderedDict()
+
+    def ttl_for(self, key: str) -> int:
+        """L1 TTL in seconds for a key (0 means the key is not cached locally)"""
+        namespace = key.split(":", 1)[0]
+        return self.namespace_ttls.get(namespace, self.default_ttl)
+
+    def get(self, key: str) -> Any:
+        """
+        Get a value from the local cache
+
+        Returns:
+            Cached value, or MISSING if absent or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.record(False)
+            return MISSING
+
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats.record(False)
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.stats.record(True)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """
+        Store a value, capped at the namespace TTL and the given TTL
+
+        Returns:
+            True if the value was cached locally
+        """
+        local_ttl = self.ttl_for(key)
+        if ttl:
+            local_ttl = min(local_ttl, ttl)
+        if local_ttl <= 0 or value is None:
+            return False
+
+        self._entries[key] = (value, time.monotonic() + local_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def delete(self, key: str) -> bool:
+        """Drop a key from the local cache"""
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Drop every locally cached entry"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Counters and occupancy for the performance endpoints"""
+        return {
+            **self.stats.snapshot(),
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "namespace_ttls": dict(self.namespace_ttls)
+        }
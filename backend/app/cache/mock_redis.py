@@ -1,11 +1,17 @@
 """
 Mock Redis implementation for testing without Redis server
 """
-from typing import Optional, Any, Union, Dict, List
+from typing import Optional, Any, Union, Dict, List, Callable
 import json
 import asyncio
+import fnmatch
+import hashlib
+import math
+import random
+import time
 from datetime import datetime, timedelta
 import structlog
+from redis.exceptions import NoScriptError, ResponseError
 
 logger = structlog.get_logger(__name__)
 
@@ -15,6 +21,11 @@ class MockRedis:
     def __init__(self):
         self._data: Dict[str, Any] = {}
         self._expiry: Dict[str, datetime] = {}
+        self._streams: Dict[str, List[tuple]] = {}
+        self._stream_seq = 0
+        self._groups: Dict[tuple, Dict[str, Any]] = {}
+        self._scripts: set = set()
+        self._subscribers: List["MockPubSub"] = []
     
     async def ping(self) -> bool:
         """Mock ping"""
@@ -28,11 +39,31 @@ class MockRedis:
             return None
         return self._data.get(key)
     
-    async def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+    async def mget(self, keys: List[str], *args: str) -> List[Optional[str]]:
+        """Mock mget"""
+        if isinstance(keys, str):
+            keys = [keys, *args]
+        return [await self.get(key) for key in keys]
+    
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ex: Optional[int] = None,
+        px: Optional[int] = None,
+        nx: bool = False,
+        keepttl: bool = False
+    ) -> Optional[bool]:
         """Mock set"""
+        if nx and await self.exists(key):
+            return None
         self._data[key] = value
+        if not keepttl:
+            self._expiry.pop(key, None)
         if ex:
             self._expiry[key] = datetime.now() + timedelta(seconds=ex)
+        elif px:
+            self._expiry[key] = datetime.now() + timedelta(milliseconds=px)
         return True
     
     async def delete(self, *keys: str) -> int:
@@ -79,6 +110,32 @@ class MockRedis:
         
         return [key for key in self._data.keys() if key == pattern]
     
+    async def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        """Mock scan_iter with glob pattern matching"""
+        for key in list(self._data.keys()):
+            if match is None or fnmatch.fnmatchcase(key, match):
+                yield key
+    
+    async def randomkey(self) -> Optional[str]:
+        """Mock randomkey"""
+        if not self._data:
+            return None
+        return random.choice(list(self._data.keys()))
+    
+    async def dbsize(self) -> int:
+        """Mock dbsize"""
+        return len(self._data)
+    
+    async def incr(self, key: str) -> int:
+        """Mock incr"""
+        return await self.incrby(key, 1)
+    
+    async def incrby(self, key: str, amount: int = 1) -> int:
+        """Mock incrby"""
+        new_value = int(self._data.get(key, 0)) + amount
+        self._data[key] = str(new_value)
+        return new_value
+    
     async def incrbyfloat(self, key: str, increment: float) -> float:
         """Mock incrbyfloat"""
         current = float(self._data.get(key, 0))
@@ -86,6 +143,290 @@ class MockRedis:
         self._data[key] = str(new_value)
         return new_value
     
+    async def pfadd(self, name: str, *values: Any) -> int:
+        """Mock pfadd (members are kept in a set, so mock counts are exact)"""
+        members = await self.get(name)
+        created = members is None
+        if created:
+            members = self._data[name] = set()
+        before = len(members)
+        members.update(str(value) for value in values)
+        return int(created or len(members) > before)
+    
+    async def pfcount(self, *sources: str) -> int:
+        """Mock pfcount (cardinality of the union of the sources)"""
+        union = set()
+        for source in sources:
+            union |= await self.get(source) or set()
+        return len(union)
+    
+    async def pfmerge(self, dest: str, *sources: str) -> bool:
+        """Mock pfmerge"""
+        merged = set(await self.get(dest) or set())
+        for source in sources:
+            merged |= await self.get(source) or set()
+        self._data[dest] = merged
+        return True
+    
+    async def zadd(self, name: str, mapping: Dict[Any, float], nx: bool = False, xx: bool = False) -> int:
+        """Mock zadd (returns the number of new members)"""
+        members = await self.get(name)
+        if members is None:
+            if xx:
+                return 0
+            members = self._data[name] = {}
+        added = 0
+        for member, score in mapping.items():
+            member = str(member)
+            exists = member in members
+            if (nx and exists) or (xx and not exists):
+                continue
+            added += not exists
+            members[member] = float(score)
+        return added
+    
+    async def zrem(self, name: str, *values: Any) -> int:
+        """Mock zrem"""
+        members = await self.get(name) or {}
+        removed = sum(members.pop(str(value), None) is not None for value in values)
+        if name in self._data and not members:
+            await self.delete(name)
+        return removed
+    
+    async def zcard(self, name: str) -> int:
+        """Mock zcard"""
+        return len(await self.get(name) or {})
+    
+    async def zscore(self, name: str, value: Any) -> Optional[float]:
+        """Mock zscore"""
+        return (await self.get(name) or {}).get(str(value))
+    
+    def _sorted_members(self, members: Dict[str, float]) -> List[tuple]:
+        return sorted(members.items(), key=lambda item: (item[1], item[0]))
+    
+    async def zcount(self, name: str, min: Any, max: Any) -> int:
+        """Mock zcount"""
+        members = await self.get(name) or {}
+        return sum(_score_in_range(score, min, max) for score in members.values())
+    
+    async def zrange(
+        self, name: str, start: int, end: int, desc: bool = False, withscores: bool = False
+    ) -> List[Any]:
+        """Mock zrange (by rank)"""
+        items = self._sorted_members(await self.get(name) or {})
+        if desc:
+            items.reverse()
+        end = end + 1 if end >= 0 else max(len(items) + end + 1, 0)
+        items = items[start if start >= 0 else max(len(items) + start, 0):end]
+        return items if withscores else [member for member, _ in items]
+    
+    async def zrevrange(self, name: str, start: int, end: int, withscores: bool = False) -> List[Any]:
+        """Mock zrevrange"""
+        return await self.zrange(name, start, end, desc=True, withscores=withscores)
+    
+    async def zrevrangebyscore(
+        self,
+        name: str,
+        max: Any,
+        min: Any,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False
+    ) -> List[Any]:
+        """Mock zrevrangebyscore"""
+        items = [
+            item for item in reversed(self._sorted_members(await self.get(name) or {}))
+            if _score_in_range(item[1], min, max)
+        ]
+        if start is not None and num is not None:
+            items = items[start:start + num if num >= 0 else None]
+        return items if withscores else [member for member, _ in items]
+    
+    async def zremrangebyrank(self, name: str, min: int, max: int) -> int:
+        """Mock zremrangebyrank"""
+        members = await self.get(name) or {}
+        doomed = await self.zrange(name, min, max)
+        for member in doomed:
+            members.pop(member, None)
+        if name in self._data and not members:
+            await self.delete(name)
+        return len(doomed)
+    
+    async def zremrangebyscore(self, name: str, min: Any, max: Any) -> int:
+        """Mock zremrangebyscore"""
+        members = await self.get(name) or {}
+        doomed = [member for member, score in members.items() if _score_in_range(score, min, max)]
+        for member in doomed:
+            del members[member]
+        if name in self._data and not members:
+            await self.delete(name)
+        return len(doomed)
+    
+    async def sadd(self, name: str, *values: Any) -> int:
+        """Mock sadd"""
+        members = await self.get(name)
+        if members is None:
+            members = self._data[name] = set()
+        before = len(members)
+        members.update(str(value) for value in values)
+        return len(members) - before
+    
+    async def srem(self, name: str, *values: Any) -> int:
+        """Mock srem"""
+        members = await self.get(name) or set()
+        before = len(members)
+        members.difference_update(str(value) for value in values)
+        return before - len(members)
+    
+    async def sismember(self, name: str, value: Any) -> bool:
+        """Mock sismember"""
+        return str(value) in (await self.get(name) or set())
+    
+    async def smembers(self, name: str) -> set:
+        """Mock smembers"""
+        return set(await self.get(name) or set())
+    
+    async def hset(
+        self, name: str, key: Optional[str] = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Mock hset"""
+        fields = await self.get(name)
+        if fields is None:
+            fields = self._data[name] = {}
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        added = sum(str(field) not in fields for field in items)
+        fields.update((str(field), str(value)) for field, value in items.items())
+        return added
+    
+    async def hincrby(self, name: str, key: str, amount: int = 1) -> int:
+        """Mock hincrby"""
+        fields = await self.get(name)
+        if fields is None:
+            fields = self._data[name] = {}
+        new_value = int(fields.get(str(key), 0)) + amount
+        fields[str(key)] = str(new_value)
+        return new_value
+    
+    async def hdel(self, name: str, *keys: str) -> int:
+        """Mock hdel"""
+        fields = await self.get(name) or {}
+        removed = sum(fields.pop(str(key), None) is not None for key in keys)
+        if name in self._data and not fields:
+            await self.delete(name)
+        return removed
+    
+    async def hexists(self, name: str, key: str) -> bool:
+        """Mock hexists"""
+        return str(key) in (await self.get(name) or {})
+    
+    async def hgetall(self, name: str) -> Dict[str, str]:
+        """Mock hgetall"""
+        return dict(await self.get(name) or {})
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        """Mock publish to the MockPubSub instances subscribed to the channel"""
+        receivers = [pubsub for pubsub in self._subscribers if channel in pubsub.channels]
+        for pubsub in receivers:
+            pubsub.deliver(channel, message)
+        return len(receivers)
+    
+    def pubsub(self) -> "MockPubSub":
+        """Mock pubsub"""
+        return MockPubSub(self)
+    
+    async def xadd(
+        self,
+        name: str,
+        fields: Dict[str, Any],
+        id: str = "*",
+        maxlen: Optional[int] = None,
+        approximate: bool = True
+    ) -> str:
+        """Mock xadd"""
+        self._stream_seq += 1
+        entry_id = f"{int(time.time() * 1000)}-{self._stream_seq}"
+        entries = self._streams.setdefault(name, [])
+        entries.append((entry_id, dict(fields)))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        return entry_id
+    
+    async def xlen(self, name: str) -> int:
+        """Mock xlen"""
+        return len(self._streams.get(name, []))
+    
+    async def xgroup_create(self, name: str, groupname: str, id: str = "$", mkstream: bool = False) -> bool:
+        """Mock xgroup_create"""
+        if name not in self._streams:
+            if not mkstream:
+                raise ResponseError("ERR The XGROUP subcommand requires the key to exist")
+            self._streams[name] = []
+        if (name, groupname) in self._groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        last_id = self._streams[name][-1][0] if id == "$" and self._streams[name] else id
+        self._groups[(name, groupname)] = {"last_id": last_id, "pending": {}}
+        return True
+    
+    async def xreadgroup(
+        self,
+        groupname: str,
+        consumername: str,
+        streams: Dict[str, str],
+        count: Optional[int] = None,
+        block: Optional[int] = None,
+        noack: bool = False
+    ) -> List[list]:
+        """Mock xreadgroup (only the ">" new-entries form)"""
+        result = []
+        for name in streams:
+            group = self._groups[(name, groupname)]
+            entries = [
+                entry for entry in self._streams.get(name, [])
+                if _stream_id_key(entry[0]) > _stream_id_key(group["last_id"])
+            ][:count]
+            if not entries:
+                continue
+            group["last_id"] = entries[-1][0]
+            for entry_id, _ in entries:
+                group["pending"][entry_id] = {"consumer": consumername, "delivered": time.monotonic()}
+            result.append([name, entries])
+        
+        if not result and block:
+            await asyncio.sleep(min(block, 100) / 1000)
+        return result
+    
+    async def xack(self, name: str, groupname: str, *ids: str) -> int:
+        """Mock xack"""
+        pending = self._groups[(name, groupname)]["pending"]
+        return sum(1 for entry_id in ids if pending.pop(entry_id, None) is not None)
+    
+    async def xautoclaim(
+        self,
+        name: str,
+        groupname: str,
+        consumername: str,
+        min_idle_time: int,
+        start_id: str = "0-0",
+        count: Optional[int] = None
+    ) -> list:
+        """Mock xautoclaim"""
+        pending = self._groups[(name, groupname)]["pending"]
+        entries_by_id = dict(self._streams.get(name, []))
+        now = time.monotonic()
+        claimed = []
+        for entry_id in sorted(pending, key=_stream_id_key):
+            if _stream_id_key(entry_id) < _stream_id_key(start_id):
+                continue
+            if (now - pending[entry_id]["delivered"]) * 1000 < min_idle_time:
+                continue
+            if count is not None and len(claimed) >= count:
+                return [entry_id, claimed, []]
+            pending[entry_id] = {"consumer": consumername, "delivered": now}
+            claimed.append((entry_id, entries_by_id.get(entry_id)))
+        return ["0-0", claimed, []]
+    
     async def info(self) -> Dict[str, Any]:
         """Mock info"""
         return {
@@ -96,10 +437,197 @@ class MockRedis:
             "keyspace_misses": 10,
         }
     
+    async def script_load(self, script: str) -> str:
+        """Mock script load; only scripts with a Python emulation are accepted"""
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        if sha not in _script_emulations():
+            raise ResponseError("Mock Redis cannot run this script")
+        self._scripts.add(sha)
+        return sha
+    
+    async def evalsha(self, sha: str, numkeys: int, *keys_and_args: Any) -> Any:
+        """Mock evalsha, running the script's Python emulation"""
+        if sha not in self._scripts:
+            raise NoScriptError("No matching script. Please use EVAL.")
+        keys, args = list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:])
+        return await _script_emulations()[sha](self, keys, args)
+    
+    async def eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        """Mock eval (loads the script, as Redis caches it)"""
+        sha = await self.script_load(script)
+        return await self.evalsha(sha, numkeys, *keys_and_args)
+    
+    def pipeline(self, transaction: bool = True) -> "MockPipeline":
+        """Mock pipeline"""
+        return MockPipeline(self)
+    
     async def close(self):
         """Mock close"""
         pass
 
+
+class MockPipeline:
+    """Mock Redis pipeline that buffers commands and runs them on execute"""
+    
+    def __init__(self, client: MockRedis):
+        self._client = client
+        self._commands: List[tuple] = []
+    
+    def __getattr__(self, name: str):
+        def queue_command(*args, **kwargs) -> "MockPipeline":
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue_command
+    
+    async def execute(self) -> List[Any]:
+        """Run buffered commands in order and return their results"""
+        commands, self._commands = self._commands, []
+        results = []
+        for name, args, kwargs in commands:
+            results.append(await getattr(self._client, name)(*args, **kwargs))
+        return results
+    
+    async def __aenter__(self) -> "MockPipeline":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        self._commands = []
+
+
+class MockPubSub:
+    """Mock Redis pub/sub connection receiving MockRedis.publish calls"""
+    
+    def __init__(self, client: MockRedis):
+        self._client = client
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self.channels: set = set()
+    
+    def deliver(self, channel: str, data: Any) -> None:
+        self._messages.put_nowait({"type": "message", "pattern": None, "channel": channel, "data": data})
+    
+    async def subscribe(self, *channels: str) -> None:
+        """Mock subscribe"""
+        if self not in self._client._subscribers:
+            self._client._subscribers.append(self)
+        for channel in channels:
+            self.channels.add(channel)
+            self._messages.put_nowait({"type": "subscribe", "pattern": None, "channel": channel, "data": len(self.channels)})
+    
+    async def unsubscribe(self, *channels: str) -> None:
+        """Mock unsubscribe (all channels when none are given)"""
+        for channel in channels or list(self.channels):
+            self.channels.discard(channel)
+            self._messages.put_nowait({"type": "unsubscribe", "pattern": None, "channel": channel, "data": len(self.channels)})
+    
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: Optional[float] = 0.0) -> Optional[Dict[str, Any]]:
+        """Mock get_message, waiting up to timeout seconds (forever if None)"""
+        while True:
+            try:
+                if timeout == 0:
+                    message = self._messages.get_nowait()
+                else:
+                    message = await asyncio.wait_for(self._messages.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                return None
+            if not ignore_subscribe_messages or message["type"] == "message":
+                return message
+    
+    async def listen(self):
+        """Mock listen"""
+        while True:
+            yield await self.get_message(timeout=None)
+    
+    async def close(self) -> None:
+        """Mock close"""
+        self.channels.clear()
+        if self in self._client._subscribers:
+            self._client._subscribers.remove(self)
+
+
+def _score_in_range(score: float, min: Any, max: Any) -> bool:
+    """Whether a sorted-set score lies within Redis-style bounds ("-inf", "(5", 3.0, ...)"""
+    def bound(value: Any) -> tuple:
+        value = str(value)
+        exclusive = value.startswith("(")
+        return float(value.lstrip("(")), exclusive
+    
+    low, low_exclusive = bound(min)
+    high, high_exclusive = bound(max)
+    above = score > low if low_exclusive else score >= low
+    below = score < high if high_exclusive else score <= high
+    return above and below
+
+
+def _script_emulations() -> Dict[str, Callable]:
+    """Python stand-ins for the application's Lua scripts, by SHA1"""
+    from app.auth.rate_limiter import GCRA_SCRIPT_SHA
+    from app.services.unread_counters import ADJUST_SCRIPT_SHA, RECONCILE_SCRIPT_SHA
+    return {
+        GCRA_SCRIPT_SHA: _gcra_script,
+        ADJUST_SCRIPT_SHA: _adjust_unread_script,
+        RECONCILE_SCRIPT_SHA: _reconcile_unread_script,
+    }
+
+
+async def _gcra_script(client: MockRedis, keys: List[str], args: List[Any]) -> List[int]:
+    """Emulation of app.auth.rate_limiter.GCRA_SCRIPT (no other client runs in between)"""
+    now = time.time() * 1000
+    wanted = int(args[0])
+    intervals = [float(interval) for interval in args[1::2]]
+    periods = [float(period) for period in args[2::2]]
+    tats = [max(float(tat) if tat is not None else now, now) for tat in await client.mget(keys)]
+    capacities = [
+        max(math.floor((now + period - tat) / interval), 0)
+        for tat, interval, period in zip(tats, intervals, periods)
+    ]
+    tightest = capacities.index(min(capacities))
+    
+    granted = wanted if capacities[tightest] >= wanted else min(capacities[tightest], 1)
+    if granted == 0:
+        retry_after, denied = 0, tightest
+        for i, capacity in enumerate(capacities):
+            wait = tats[i] + intervals[i] - periods[i] - now
+            if capacity == 0 and wait > retry_after:
+                retry_after, denied = wait, i
+        return [0, math.ceil(retry_after), 0, math.ceil(tats[denied] - now), denied + 1]
+    
+    for i, key in enumerate(keys):
+        tats[i] += granted * intervals[i]
+        await client.set(key, repr(tats[i]), px=math.ceil(tats[i] - now))
+    return [granted, 0, capacities[tightest] - granted, math.ceil(tats[tightest] - now), tightest + 1]
+
+
+async def _adjust_unread_script(client: MockRedis, keys: List[str], args: List[Any]) -> List[int]:
+    """Emulation of app.services.unread_counters.ADJUST_SCRIPT"""
+    results = []
+    for key in keys:
+        value = await client.get(key)
+        if value is None:
+            results.append(-1)
+            continue
+        updated = max(int(value) + int(args[0]), 0)
+        await client.set(key, str(updated), keepttl=True)
+        results.append(updated)
+    return results
+
+
+async def _reconcile_unread_script(client: MockRedis, keys: List[str], args: List[Any]) -> int:
+    """Emulation of app.services.unread_counters.RECONCILE_SCRIPT"""
+    replaced = 0
+    for i, key in enumerate(keys):
+        value = await client.get(key)
+        if value is not None and str(value) == str(args[2 * i]):
+            await client.set(key, str(args[2 * i + 1]), keepttl=True)
+            replaced += 1
+    return replaced
+
+
+def _stream_id_key(entry_id: str) -> tuple:
+    """Sort key for stream entry ids ("<ms>-<seq>")"""
+    ms, _, seq = str(entry_id).partition("-")
+    return int(ms), int(seq or 0)
+
+
 # Global mock Redis instance
 mock_redis_client: Optional[MockRedis] = None
 
@@ -1,27 +1,59 @@
 """
 Redis cache configuration and connection management
 """
-from typing import Optional, Any, Union, Dict, List
+from typing import Optional, Any, Union, Dict, List, Iterable, Callable, Awaitable, Type
+import asyncio
 import json
-import pickle
+import math
+import random
+import time
+import uuid
 from datetime import timedelta
 import redis.asyncio as redis
 from redis.asyncio import ConnectionPool
+from pydantic import BaseModel
 import structlog
 
 from app.core.config import settings
+from app.cache.local import LocalCache, CacheTierStats, MISSING
+from app.cache.codecs import CacheCodec, CacheEnvelope
 
 logger = structlog.get_logger(__name__)
 
+# Prefix of the per-namespace generation counters used for invalidation
+GENERATION_PREFIX = "gen"
+
+# Search namespaces holding results derived from movie data
+SEARCH_RESULT_NAMESPACES = ("search:movies", "search:suggestions")
+
 # Global Redis connection pool
 redis_pool: Optional[ConnectionPool] = None
 redis_client: Optional[redis.Redis] = None
 
+# Value codec shared by every CacheService in this worker
+cache_codec: Optional[CacheCodec] = None
+
+# In-process L1 cache shared by every CacheService in this worker
+local_cache: Optional[LocalCache] = None
+redis_tier_stats = CacheTierStats()
+invalidation_listener: Optional[asyncio.Task] = None
+
+# Identifies this worker's messages on the invalidation channel
+WORKER_ID = uuid.uuid4().hex
+
+# Single-flight state for CacheService.get_or_set
+LOCK_PREFIX = "lock"
+LOCK_POLL_INTERVAL = 0.05
+_inflight_loads: Dict[str, asyncio.Future] = {}
+single_flight_stats = {"coalesced": 0, "stale_served": 0, "lock_waits": 0}
+
 
 async def init_redis() -> None:
     """Initialize Redis connection pool and client"""
     global redis_pool, redis_client
     
+    init_local_cache()
+    
     try:
         # Create connection pool
         redis_pool = ConnectionPool.from_url(
@@ -41,6 +73,9 @@ async def init_redis() -> None:
         
         logger.info("Redis connection initialized successfully")
         
+        if local_cache is not None:
+            start_invalidation_listener()
+        
     except Exception as e:
         logger.warning("Failed to initialize Redis - falling back to mock Redis", error=str(e))
         # Don't raise the exception, just log the warning and continue without Redis
@@ -59,7 +94,12 @@ async def init_redis() -> None:
 
 async def close_redis() -> None:
     """Close Redis connections"""
-    global redis_pool, redis_client
+    global redis_pool, redis_client, local_cache
+    
+    await stop_invalidation_listener()
+    if local_cache is not None:
+        local_cache.clear()
+        local_cache = None
     
     if redis_client:
         await redis_client.close()
@@ -70,6 +110,120 @@ async def close_redis() -> None:
     logger.info("Redis connections closed")
 
 
+def init_local_cache() -> Optional[LocalCache]:
+    """Create the in-process L1 cache if enabled in settings"""
+    global local_cache
+    
+    if settings.CACHE_L1_ENABLED and local_cache is None:
+        local_cache = LocalCache(
+            max_entries=settings.CACHE_L1_MAX_ENTRIES,
+            namespace_ttls=settings.cache_l1_namespace_ttls,
+            default_ttl=settings.CACHE_L1_DEFAULT_TTL
+        )
+    return local_cache
+
+
+def get_cache_codec() -> CacheCodec:
+    """Get the value codec configured in settings"""
+    global cache_codec
+    
+    if cache_codec is None:
+        cache_codec = CacheCodec(
+            codec=settings.CACHE_CODEC,
+            compression=settings.CACHE_COMPRESSION,
+            compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD
+        )
+    return cache_codec
+
+
+def get_local_cache() -> Optional[LocalCache]:
+    """Get the in-process L1 cache (None when disabled)"""
+    return local_cache
+
+
+def get_cache_tier_statistics() -> Dict[str, Any]:
+    """Per-tier hit/miss counters for the performance endpoints"""
+    return {
+        "l1": local_cache.get_statistics() if local_cache is not None else {"enabled": False},
+        "l2": redis_tier_stats.snapshot(),
+        "single_flight": dict(single_flight_stats)
+    }
+
+
+def start_invalidation_listener() -> None:
+    """Start the background task applying other workers' invalidations to L1"""
+    global invalidation_listener
+    
+    if invalidation_listener is None or invalidation_listener.done():
+        invalidation_listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """Stop the invalidation listener task"""
+    global invalidation_listener
+    
+    if invalidation_listener is not None:
+        invalidation_listener.cancel()
+        try:
+            await invalidation_listener
+        except (asyncio.CancelledError, Exception):
+            pass
+        invalidation_listener = None
+
+
+def apply_invalidation_message(data: Union[str, bytes]) -> None:
+    """Drop the keys named in an invalidation message from the local cache"""
+    if local_cache is None:
+        return
+    
+    try:
+        payload = json.loads(data)
+    except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
+        logger.warning("Ignoring malformed cache invalidation message")
+        return
+    
+    if payload.get("origin") == WORKER_ID:
+        return
+    
+    if payload.get("flush"):
+        local_cache.clear()
+        return
+    
+    for key in payload.get("keys", []):
+        local_cache.delete(key)
+
+
+async def _listen_for_invalidations() -> None:
+    """Subscribe to the invalidation channel and apply messages until cancelled"""
+    retry_delay = 1
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            
+            # Messages may have been missed while disconnected
+            if local_cache is not None:
+                local_cache.clear()
+            retry_delay = 1
+            
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    apply_invalidation_message(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Cache invalidation listener error, reconnecting", error=str(e))
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+
 async def get_redis() -> redis.Redis:
     """
     Get Redis client instance
@@ -98,36 +252,96 @@ async def get_redis() -> redis.Redis:
 class CacheService:
     """Redis cache service with TTL and invalidation strategies"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        local: Optional[LocalCache] = None,
+        codec: Optional[CacheCodec] = None
+    ):
         self.redis = redis_client
+        self.local = local
+        self.codec = codec or get_cache_codec()
         self.logger = structlog.get_logger(__name__)
     
-    async def get(self, key: str, default: Any = None) -> Any:
+    async def get(self, key: str, default: Any = None, model: Optional[Type[BaseModel]] = None) -> Any:
         """
         Get value from cache
         
         Args:
             key: Cache key
             default: Default value if key not found
+            model: Pydantic model to restore the value as
             
         Returns:
             Cached value or default
         """
+        return self._unwrap(await self._get_raw(key, default, model), default)
+    
+    async def _get_raw(self, key: str, default: Any = None, model: Optional[Type[BaseModel]] = None) -> Any:
+        """Get a cached value as stored, without unwrapping get_or_set envelopes"""
+        if self.local is not None:
+            value = self.local.get(key)
+            if value is not MISSING:
+                return self._as_model(value, model)
+        
         try:
             value = await self.redis.get(key)
+            redis_tier_stats.record(value is not None)
             if value is None:
                 return default
             
-            # Try to deserialize as JSON first, then pickle
-            try:
-                return json.loads(value)
-            except (json.JSONDecodeError, TypeError):
-                return pickle.loads(value)
+            value = self.codec.decode(value, model)
+            if self.local is not None:
+                self.local.set(key, value)
+            return value
                 
         except Exception as e:
             self.logger.error("Cache get error", key=key, error=str(e))
             return default
     
+    async def get_many(
+        self,
+        keys: List[str],
+        default: Any = None,
+        model: Optional[Type[BaseModel]] = None
+    ) -> List[Any]:
+        """
+        Get multiple values from cache in a single round-trip
+        
+        Args:
+            keys: Cache keys
+            default: Default value for keys not found
+            model: Pydantic model to restore the values as
+            
+        Returns:
+            List of cached values (or default) in the same order as keys
+        """
+        if not keys:
+            return []
+        
+        results: List[Any] = [MISSING] * len(keys)
+        if self.local is not None:
+            results = [self._as_model(self.local.get(key), model) for key in keys]
+        remote_positions = [i for i, value in enumerate(results) if value is MISSING]
+        if not remote_positions:
+            return [self._unwrap(value, default) for value in results]
+        
+        try:
+            values = await self.redis.mget([keys[i] for i in remote_positions])
+            for position, value in zip(remote_positions, values):
+                redis_tier_stats.record(value is not None)
+                if value is None:
+                    results[position] = default
+                    continue
+                
+                results[position] = self.codec.decode(value, model)
+                if self.local is not None:
+                    self.local.set(keys[position], results[position])
+            return [self._unwrap(value, default) for value in results]
+        except Exception as e:
+            self.logger.error("Cache get_many error", key_count=len(keys), error=str(e))
+            return [default if value is MISSING else self._unwrap(value, default) for value in results]
+    
     async def set(
         self, 
         key: str, 
@@ -146,11 +360,7 @@ class CacheService:
             True if successful, False otherwise
         """
         try:
-            # Serialize value
-            if isinstance(value, (dict, list, str, int, float, bool)):
-                serialized_value = json.dumps(value)
-            else:
-                serialized_value = pickle.dumps(value)
+            serialized_value = self.codec.encode(value)
             
             # Set with TTL
             if ttl:
@@ -160,12 +370,56 @@ class CacheService:
             else:
                 await self.redis.set(key, serialized_value)
             
+            if self.local is not None:
+                self.local.set(key, value, ttl)
+            
             return True
             
         except Exception as e:
             self.logger.error("Cache set error", key=key, error=str(e))
             return False
     
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        ttl: Optional[Union[int, timedelta]] = None
+    ) -> bool:
+        """
+        Set multiple values in cache using a single pipelined round-trip
+        
+        Args:
+            mapping: Cache keys mapped to values
+            ttl: Time to live applied to every key (seconds or timedelta)
+            
+        Returns:
+            True if successful, False otherwise
+        """
+        if not mapping:
+            return True
+        
+        try:
+            if isinstance(ttl, timedelta):
+                ttl = int(ttl.total_seconds())
+            
+            pipe = self.redis.pipeline(transaction=False)
+            for key, value in mapping.items():
+                serialized_value = self.codec.encode(value)
+                if ttl:
+                    pipe.setex(key, ttl, serialized_value)
+                else:
+                    pipe.set(key, serialized_value)
+            await pipe.execute()
+            
+            if self.local is not None:
+                for key, value in mapping.items():
+                    self.local.set(key, value, ttl)
+            
+            return True
+            
+        except Exception as e:
+            self.logger.error("Cache set_many error", key_count=len(mapping), error=str(e))
+            return False
+    
     async def delete(self, key: str) -> bool:
         """
         Delete key from cache
@@ -178,30 +432,299 @@ class CacheService:
         """
         try:
             result = await self.redis.delete(key)
+            await self.publish_invalidation([key])
             return result > 0
         except Exception as e:
             self.logger.error("Cache delete error", key=key, error=str(e))
             return False
     
-    async def delete_pattern(self, pattern: str) -> int:
+    async def delete_pattern(self, pattern: str, batch_size: int = 500) -> int:
         """
         Delete all keys matching pattern
         
+        Walks the keyspace with SCAN, so it is O(keyspace) but never blocks
+        Redis. Only meant for ad-hoc admin purges; application invalidation
+        uses generation counters (see bump_generation).
+        
         Args:
             pattern: Pattern to match (e.g., "user:*")
+            batch_size: Keys fetched per SCAN step and deleted per call
             
         Returns:
             Number of keys deleted
         """
         try:
-            keys = await self.redis.keys(pattern)
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            deleted = 0
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    deleted += await self.redis.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += await self.redis.delete(*batch)
+            await self.publish_invalidation(flush=True)
+            return deleted
         except Exception as e:
             self.logger.error("Cache delete pattern error", pattern=pattern, error=str(e))
             return 0
     
+    async def get_generation(self, namespace: str) -> int:
+        """
+        Get the current generation of a key namespace
+        
+        Args:
+            namespace: Namespace (e.g., "movie:<id>:reviews")
+            
+        Returns:
+            Generation number (0 if never bumped)
+        """
+        generation_key = cache_key(GENERATION_PREFIX, namespace)
+        if self.local is not None:
+            generation = self.local.get(generation_key)
+            if generation is not MISSING:
+                return generation
+        
+        try:
+            # Generations are raw INCR counters, not codec-encoded values
+            value = await self.redis.get(generation_key)
+            generation = int(value) if value is not None else 0
+            if self.local is not None:
+                self.local.set(generation_key, generation)
+            return generation
+        except Exception as e:
+            self.logger.error("Cache get generation error", namespace=namespace, error=str(e))
+            return 0
+    
+    async def bump_generation(self, namespace: str) -> int:
+        """
+        Invalidate every key in a namespace in O(1)
+        
+        Keys built with versioned_key embed the generation, so bumping it
+        makes all existing entries unreachable; they expire with their TTL.
+        
+        Args:
+            namespace: Namespace to invalidate
+            
+        Returns:
+            New generation number
+        """
+        try:
+            generation_key = cache_key(GENERATION_PREFIX, namespace)
+            generation = await self.redis.incr(generation_key)
+            await self.publish_invalidation([generation_key])
+            return generation
+        except Exception as e:
+            self.logger.error("Cache bump generation error", namespace=namespace, error=str(e))
+            return 0
+    
+    async def versioned_key(self, namespace: str, *parts: Any) -> str:
+        """
+        Build a cache key under the current generation of a namespace
+        
+        Args:
+            namespace: Namespace the key belongs to
+            *parts: Remaining key components
+            
+        Returns:
+            Cache key such as "<namespace>:g<generation>:<parts>"
+        """
+        generation = await self.get_generation(namespace)
+        return cache_key(namespace, f"g{generation}", *parts)
+    
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Union[int, timedelta] = 300,
+        stale_ttl: Optional[int] = None,
+        beta: Optional[float] = None,
+        model: Optional[Type[BaseModel]] = None
+    ) -> Any:
+        """
+        Get a cached value, computing it at most once across concurrent callers
+        
+        Concurrent misses in this process await a single in-flight load and a
+        short Redis lock does the same across processes. Entries remain readable
+        for stale_ttl seconds after they expire: one caller refreshes them while
+        the rest keep getting the old value. With beta > 0 an entry may be
+        refreshed early, with a probability rising as expiry approaches (XFetch).
+        
+        Args:
+            key: Cache key
+            loader: Coroutine function producing the value on a miss
+            ttl: Time to live for the fresh value
+            stale_ttl: Seconds to serve the value after ttl (default per namespace)
+            beta: Early expiration factor, 0 disables (default per namespace)
+            model: Pydantic model to restore the value as
+            
+        Returns:
+            Cached or freshly loaded value
+        """
+        if isinstance(ttl, timedelta):
+            ttl = int(ttl.total_seconds())
+        namespace = key.split(":", 1)[0]
+        if stale_ttl is None:
+            stale_ttl = settings.cache_stale_ttls.get(namespace, 0)
+        if beta is None:
+            beta = settings.cache_early_expiration_betas.get(namespace, 0.0)
+        
+        envelope = self._as_envelope(await self._get_raw(key, model=model))
+        if envelope is not None and not self._needs_refresh(envelope, beta):
+            return envelope.value
+        
+        inflight = _inflight_loads.get(key)
+        if inflight is not None:
+            if envelope is not None:
+                single_flight_stats["stale_served"] += 1
+                return envelope.value
+            single_flight_stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+        
+        future = asyncio.get_running_loop().create_future()
+        _inflight_loads[key] = future
+        try:
+            value = await self._load_with_lock(key, loader, ttl, stale_ttl, envelope, model)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so an unawaited future does not log a warning
+                future.exception()
+            raise
+        finally:
+            _inflight_loads.pop(key, None)
+    
+    async def _load_with_lock(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        envelope: Optional[CacheEnvelope],
+        model: Optional[Type[BaseModel]] = None
+    ) -> Any:
+        """Run the loader under the cross-process lock, or wait for its holder"""
+        lock_key = cache_key(LOCK_PREFIX, key)
+        token = uuid.uuid4().hex
+        acquired = await self._acquire_lock(lock_key, token)
+        
+        if not acquired:
+            if envelope is not None:
+                single_flight_stats["stale_served"] += 1
+                return envelope.value
+            
+            single_flight_stats["lock_waits"] += 1
+            envelope = await self._wait_for_value(key, model)
+            if envelope is not None:
+                return envelope.value
+            # The holder is slow or gone; load it ourselves
+        
+        try:
+            started = time.monotonic()
+            value = await loader()
+            if value is not None:
+                envelope = CacheEnvelope(value, time.time() + ttl, time.monotonic() - started)
+                await self.set(key, envelope, ttl + stale_ttl)
+            return value
+        finally:
+            if acquired:
+                await self._release_lock(lock_key, token)
+    
+    async def _acquire_lock(self, lock_key: str, token: str) -> bool:
+        """Take the short-lived load lock; proceed unlocked if Redis is unavailable"""
+        try:
+            return bool(await self.redis.set(lock_key, token, nx=True, px=settings.CACHE_LOCK_TIMEOUT_MS))
+        except Exception as e:
+            self.logger.warning("Cache lock error", key=lock_key, error=str(e))
+            return True
+    
+    async def _release_lock(self, lock_key: str, token: str) -> None:
+        """Release the load lock if we still own it"""
+        try:
+            owner = await self.redis.get(lock_key)
+            if isinstance(owner, bytes):
+                owner = owner.decode()
+            if owner == token:
+                await self.redis.delete(lock_key)
+        except Exception as e:
+            self.logger.warning("Cache unlock error", key=lock_key, error=str(e))
+    
+    async def _wait_for_value(self, key: str, model: Optional[Type[BaseModel]] = None) -> Optional[CacheEnvelope]:
+        """Poll Redis until the lock holder stores the value or the lock times out"""
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT_MS / 1000
+        while time.monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            try:
+                value = await self.redis.get(key)
+            except Exception:
+                return None
+            if value is not None:
+                try:
+                    return self._as_envelope(self.codec.decode(value, model))
+                except Exception:
+                    return None
+        return None
+    
+    @staticmethod
+    def _as_envelope(value: Any) -> Optional[CacheEnvelope]:
+        """Wrap a plain cached value as an always-fresh envelope"""
+        if value is None:
+            return None
+        if isinstance(value, CacheEnvelope):
+            return value
+        return CacheEnvelope(value, math.inf, 0)
+    
+    @staticmethod
+    def _needs_refresh(envelope: CacheEnvelope, beta: float) -> bool:
+        """Whether this caller should recompute the entry (expired or picked for early refresh)"""
+        now = time.time()
+        if now >= envelope.fresh_until:
+            return True
+        if beta <= 0 or envelope.delta <= 0:
+            return False
+        return now - envelope.delta * beta * math.log(1.0 - random.random()) >= envelope.fresh_until
+    
+    @staticmethod
+    def _unwrap(value: Any, default: Any = None) -> Any:
+        """Return the payload of a get_or_set envelope, or default once it has gone stale"""
+        if isinstance(value, CacheEnvelope):
+            return value.value if time.time() < value.fresh_until else default
+        return value
+    
+    @staticmethod
+    def _as_model(value: Any, model: Optional[Type[BaseModel]]) -> Any:
+        """Validate a locally cached plain value as model (L1 keeps what was set)"""
+        if model is None or value is MISSING or value is None:
+            return value
+        if isinstance(value, CacheEnvelope):
+            return value._replace(value=CacheService._as_model(value.value, model))
+        return value if isinstance(value, model) else model.model_validate(value)
+    
+    async def publish_invalidation(self, keys: Iterable[str] = (), flush: bool = False) -> None:
+        """
+        Drop keys from the local cache here and in every other worker
+        
+        Args:
+            keys: Keys to drop
+            flush: Drop the whole local cache instead
+        """
+        keys = list(keys)
+        if self.local is not None:
+            if flush:
+                self.local.clear()
+            for key in keys:
+                self.local.delete(key)
+        
+            try:
+                message = {"origin": WORKER_ID, "flush": True} if flush else {"origin": WORKER_ID, "keys": keys}
+                await self.redis.publish(settings.CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+            except Exception as e:
+                self.logger.warning("Cache invalidation publish error", error=str(e))
+    
     async def exists(self, key: str) -> bool:
         """
         Check if key exists in cache
@@ -285,18 +808,11 @@ def cache_result(ttl: Union[int, timedelta] = 300, key_prefix: str = ""):
             key_parts.extend(f"{k}:{v}" for k, v in sorted(kwargs.items()))
             cache_key_str = cache_key(*key_parts)
             
-            # Try to get from cache
-            cache_service = CacheService(await get_redis())
-            cached_result = await cache_service.get(cache_key_str)
-            
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache_service.set(cache_key_str, result, ttl)
-            
-            return result
+            # Concurrent misses share a single call to func
+            cache_service = await get_cache_service()
+            return await cache_service.get_or_set(
+                cache_key_str, lambda: func(*args, **kwargs), ttl
+            )
         
         return wrapper
     return decorator
@@ -323,7 +839,7 @@ async def get_cache_service() -> CacheService:
         CacheService: Cache service instance
     """
     redis_client = await get_redis()
-    return CacheService(redis_client)
+    return CacheService(redis_client, local_cache)
 
 
 class MovieCacheService:
@@ -343,6 +859,17 @@ class MovieCacheService:
         key = cache_key("movie", movie_id)
         return await self.cache.set(key, movie_data, ttl)
     
+    async def get_or_load_movie(
+        self,
+        movie_id: str,
+        loader: Callable[[], Awaitable[BaseModel]],
+        model: Type[BaseModel],
+        ttl: int = 3600
+    ) -> BaseModel:
+        """Get a cached movie model, loading it once for concurrent misses"""
+        key = cache_key("movie", movie_id)
+        return await self.cache.get_or_set(key, loader, ttl, model=model)
+    
     async def get_movie_stats(self, movie_id: str) -> Optional[Dict[str, Any]]:
         """Get cached movie statistics"""
         key = cache_key("movie", movie_id, "stats")
@@ -353,6 +880,24 @@ class MovieCacheService:
         key = cache_key("movie", movie_id, "stats")
         return await self.cache.set(key, stats_data, ttl)
     
+    async def get_movie_stats_many(self, movie_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get cached statistics for several movies with a single MGET"""
+        keys = [cache_key("movie", movie_id, "stats") for movie_id in movie_ids]
+        values = await self.cache.get_many(keys)
+        return {
+            movie_id: value
+            for movie_id, value in zip(movie_ids, values)
+            if value is not None
+        }
+    
+    async def set_movie_stats_many(self, stats_by_movie: Dict[str, Dict[str, Any]], ttl: int = 300) -> bool:
+        """Cache statistics for several movies for 5 minutes"""
+        mapping = {
+            cache_key("movie", movie_id, "stats"): stats_data
+            for movie_id, stats_data in stats_by_movie.items()
+        }
+        return await self.cache.set_many(mapping, ttl)
+    
     async def get_trending_movies(self) -> Optional[List[Dict[str, Any]]]:
         """Get cached trending movies"""
         key = cache_key("movies", "trending")
@@ -363,6 +908,11 @@ class MovieCacheService:
         key = cache_key("movies", "trending")
         return await self.cache.set(key, movies_data, ttl)
     
+    async def get_or_load_trending_movies(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]], ttl: int = 900) -> List[Dict[str, Any]]:
+        """Get cached trending movies, loading them once for concurrent misses"""
+        key = cache_key("movies", "trending")
+        return await self.cache.get_or_set(key, loader, ttl)
+    
     async def get_featured_movies(self) -> Optional[List[Dict[str, Any]]]:
         """Get cached featured movies"""
         key = cache_key("movies", "featured")
@@ -373,31 +923,43 @@ class MovieCacheService:
         key = cache_key("movies", "featured")
         return await self.cache.set(key, movies_data, ttl)
     
+    async def get_or_load_featured_movies(self, loader: Callable[[], Awaitable[List[Dict[str, Any]]]], ttl: int = 1800) -> List[Dict[str, Any]]:
+        """Get cached featured movies, loading them once for concurrent misses"""
+        key = cache_key("movies", "featured")
+        return await self.cache.get_or_set(key, loader, ttl)
+    
     async def get_movie_reviews(self, movie_id: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
         """Get cached movie reviews"""
-        key = cache_key("movie", movie_id, "reviews", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("movie", movie_id, "reviews"), f"p{page}", f"l{limit}")
         return await self.cache.get(key)
     
     async def set_movie_reviews(self, movie_id: str, page: int, limit: int, reviews_data: Dict[str, Any], ttl: int = 600) -> bool:
         """Cache movie reviews for 10 minutes"""
-        key = cache_key("movie", movie_id, "reviews", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("movie", movie_id, "reviews"), f"p{page}", f"l{limit}")
         return await self.cache.set(key, reviews_data, ttl)
     
     async def invalidate_movie(self, movie_id: str) -> int:
         """Invalidate all cached data for a movie"""
-        pattern = cache_key("movie", movie_id, "*")
-        return await self.cache.delete_pattern(pattern)
+        deleted = await self.invalidate_movie_stats(movie_id)
+        await self.cache.bump_generation(cache_key("movie", movie_id, "reviews"))
+        return deleted
+    
+    async def invalidate_movie_stats(self, movie_id: str) -> int:
+        """Invalidate cached statistics and the cached movie detail that embeds them"""
+        deleted = 0
+        for key in (cache_key("movie", movie_id, "stats"), cache_key("movie", movie_id)):
+            if await self.cache.delete(key):
+                deleted += 1
+        return deleted
     
     async def invalidate_movie_lists(self) -> int:
-        """Invalidate cached movie lists (trending, featured, etc.)"""
-        patterns = [
-            cache_key("movies", "trending"),
-            cache_key("movies", "featured"),
-            cache_key("movies", "search", "*")
-        ]
+        """Invalidate cached movie lists (trending, featured, search results)"""
         total_deleted = 0
-        for pattern in patterns:
-            total_deleted += await self.cache.delete_pattern(pattern)
+        for key in (cache_key("movies", "trending"), cache_key("movies", "featured")):
+            if await self.cache.delete(key):
+                total_deleted += 1
+        for namespace in SEARCH_RESULT_NAMESPACES:
+            await self.cache.bump_generation(namespace)
         return total_deleted
 
 
@@ -438,40 +1000,83 @@ class UserCacheService:
         key = cache_key("user", user_id, "stats")
         return await self.cache.set(key, stats_data, ttl)
     
+    async def get_or_load_user_stats(
+        self,
+        user_id: str,
+        loader: Callable[[], Awaitable[BaseModel]],
+        model: Type[BaseModel],
+        ttl: int = 600
+    ) -> BaseModel:
+        """Get cached user statistics, loading them once for concurrent misses"""
+        key = cache_key("user", user_id, "stats")
+        return await self.cache.get_or_set(key, loader, ttl, model=model)
+    
+    async def get_user_stats_many(self, user_ids: List[str], model: Type[BaseModel]) -> List[Optional[BaseModel]]:
+        """Get cached statistics of several users in one round trip (None where missing)"""
+        keys = [cache_key("user", user_id, "stats") for user_id in user_ids]
+        return await self.cache.get_many(keys, model=model)
+    
+    async def set_user_stats_many(self, stats: Dict[str, BaseModel], ttl: int = 600) -> bool:
+        """Cache statistics of several users for 10 minutes"""
+        return await self.cache.set_many(
+            {cache_key("user", user_id, "stats"): user_stats for user_id, user_stats in stats.items()}, ttl
+        )
+    
+    async def get_or_load_principal(
+        self,
+        user_id: str,
+        loader: Callable[[], Awaitable[Optional[BaseModel]]],
+        model: Type[BaseModel],
+        ttl: int = 300
+    ) -> Optional[BaseModel]:
+        """Get a user's cached auth principal, loading it once for concurrent misses"""
+        key = cache_key("principal", user_id)
+        return await self.cache.get_or_set(key, loader, ttl, model=model)
+    
+    async def invalidate_principal(self, user_id: str) -> bool:
+        """Invalidate a user's auth principal (role, status or name changed)"""
+        key = cache_key("principal", user_id)
+        return await self.cache.delete(key)
+    
     async def get_user_watchlist(self, user_id: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
         """Get cached user watchlist"""
-        key = cache_key("user", user_id, "watchlist", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "watchlist", f"p{page}", f"l{limit}")
         return await self.cache.get(key)
     
     async def set_user_watchlist(self, user_id: str, page: int, limit: int, watchlist_data: Dict[str, Any], ttl: int = 600) -> bool:
         """Cache user watchlist for 10 minutes"""
-        key = cache_key("user", user_id, "watchlist", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "watchlist", f"p{page}", f"l{limit}")
         return await self.cache.set(key, watchlist_data, ttl)
     
     async def get_user_favorites(self, user_id: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
         """Get cached user favorites"""
-        key = cache_key("user", user_id, "favorites", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "favorites", f"p{page}", f"l{limit}")
         return await self.cache.get(key)
     
     async def set_user_favorites(self, user_id: str, page: int, limit: int, favorites_data: Dict[str, Any], ttl: int = 600) -> bool:
         """Cache user favorites for 10 minutes"""
-        key = cache_key("user", user_id, "favorites", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "favorites", f"p{page}", f"l{limit}")
         return await self.cache.set(key, favorites_data, ttl)
     
     async def get_activity_feed(self, user_id: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
         """Get cached user activity feed"""
-        key = cache_key("user", user_id, "feed", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "feed", f"p{page}", f"l{limit}")
         return await self.cache.get(key)
     
     async def set_activity_feed(self, user_id: str, page: int, limit: int, feed_data: Dict[str, Any], ttl: int = 300) -> bool:
         """Cache activity feed for 5 minutes"""
-        key = cache_key("user", user_id, "feed", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "lists"), "feed", f"p{page}", f"l{limit}")
         return await self.cache.set(key, feed_data, ttl)
     
     async def invalidate_user(self, user_id: str) -> int:
         """Invalidate all cached data for a user"""
-        pattern = cache_key("user", user_id, "*")
-        return await self.cache.delete_pattern(pattern)
+        total_deleted = 0
+        for key in (cache_key("user", user_id, "profile"), cache_key("user", user_id, "stats"), cache_key("principal", user_id)):
+            if await self.cache.delete(key):
+                total_deleted += 1
+        await self.invalidate_user_lists(user_id)
+        await self.cache.bump_generation(cache_key("user", user_id, "reviews"))
+        return total_deleted
     
     async def invalidate_user_session(self, user_id: str) -> bool:
         """Invalidate user session"""
@@ -480,15 +1085,7 @@ class UserCacheService:
     
     async def invalidate_user_lists(self, user_id: str) -> int:
         """Invalidate user's cached lists (watchlist, favorites, feed)"""
-        patterns = [
-            cache_key("user", user_id, "watchlist", "*"),
-            cache_key("user", user_id, "favorites", "*"),
-            cache_key("user", user_id, "feed", "*")
-        ]
-        total_deleted = 0
-        for pattern in patterns:
-            total_deleted += await self.cache.delete_pattern(pattern)
-        return total_deleted
+        return await self.cache.bump_generation(cache_key("user", user_id, "lists"))
 
 
 class SearchCacheService:
@@ -500,22 +1097,27 @@ class SearchCacheService:
     
     async def get_search_results(self, query_hash: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached search results"""
-        key = cache_key("search", "movies", query_hash)
+        key = await self.cache.versioned_key(cache_key("search", "movies"), query_hash)
         return await self.cache.get(key)
     
     async def set_search_results(self, query_hash: str, results: List[Dict[str, Any]], ttl: int = 1800) -> bool:
         """Cache search results for 30 minutes"""
-        key = cache_key("search", "movies", query_hash)
+        key = await self.cache.versioned_key(cache_key("search", "movies"), query_hash)
         return await self.cache.set(key, results, ttl)
     
+    async def get_or_load_search_results(self, query_hash: str, loader: Callable[[], Awaitable[Dict[str, Any]]], ttl: int = 1800) -> Dict[str, Any]:
+        """Get cached search results, running the search once for concurrent misses"""
+        key = await self.cache.versioned_key(cache_key("search", "movies"), query_hash)
+        return await self.cache.get_or_set(key, loader, ttl)
+    
     async def get_search_suggestions(self, partial_query: str) -> Optional[List[str]]:
         """Get cached search suggestions"""
-        key = cache_key("search", "suggestions", partial_query.lower())
+        key = await self.cache.versioned_key(cache_key("search", "suggestions"), partial_query.lower())
         return await self.cache.get(key)
     
     async def set_search_suggestions(self, partial_query: str, suggestions: List[str], ttl: int = 3600) -> bool:
         """Cache search suggestions for 1 hour"""
-        key = cache_key("search", "suggestions", partial_query.lower())
+        key = await self.cache.versioned_key(cache_key("search", "suggestions"), partial_query.lower())
         return await self.cache.set(key, suggestions, ttl)
     
     async def get_popular_searches(self) -> Optional[List[str]]:
@@ -530,8 +1132,9 @@ class SearchCacheService:
     
     async def invalidate_search_cache(self) -> int:
         """Invalidate all search cache"""
-        pattern = cache_key("search", "*")
-        return await self.cache.delete_pattern(pattern)
+        for namespace in SEARCH_RESULT_NAMESPACES:
+            await self.cache.bump_generation(namespace)
+        return int(await self.cache.delete(cache_key("search", "popular")))
 
 
 class ReviewCacheService:
@@ -553,28 +1156,29 @@ class ReviewCacheService:
     
     async def get_user_reviews(self, user_id: str, page: int, limit: int) -> Optional[Dict[str, Any]]:
         """Get cached user reviews"""
-        key = cache_key("user", user_id, "reviews", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "reviews"), f"p{page}", f"l{limit}")
         return await self.cache.get(key)
     
     async def set_user_reviews(self, user_id: str, page: int, limit: int, reviews_data: Dict[str, Any], ttl: int = 600) -> bool:
         """Cache user reviews for 10 minutes"""
-        key = cache_key("user", user_id, "reviews", f"p{page}", f"l{limit}")
+        key = await self.cache.versioned_key(cache_key("user", user_id, "reviews"), f"p{page}", f"l{limit}")
         return await self.cache.set(key, reviews_data, ttl)
     
     async def invalidate_review_caches(self, user_id: str = None, movie_id: str = None) -> int:
         """Invalidate review-related caches"""
-        patterns = [cache_key("reviews", "trending")]
+        keys = [cache_key("reviews", "trending")]
         
         if user_id:
-            patterns.append(cache_key("user", user_id, "reviews", "*"))
+            await self.cache.bump_generation(cache_key("user", user_id, "reviews"))
         
         if movie_id:
-            patterns.append(cache_key("movie", movie_id, "reviews", "*"))
-            patterns.append(cache_key("movie", movie_id, "stats"))
+            await self.cache.bump_generation(cache_key("movie", movie_id, "reviews"))
+            keys.append(cache_key("movie", movie_id, "stats"))
         
         total_deleted = 0
-        for pattern in patterns:
-            total_deleted += await self.cache.delete_pattern(pattern)
+        for key in keys:
+            if await self.cache.delete(key):
+                total_deleted += 1
         return total_deleted
 
 
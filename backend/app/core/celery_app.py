@@ -9,7 +9,7 @@ celery_app = Celery(
     "lemonnpie",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["app.tasks.notification_tasks"]
+    include=["app.tasks.notification_tasks", "app.tasks.analytics_tasks", "app.tasks.feed_tasks"]
 )
 
 # Celery configuration
@@ -29,4 +29,18 @@ celery_app.conf.update(
 # Task routing
 celery_app.conf.task_routes = {
     "app.tasks.notification_tasks.*": {"queue": "notifications"},
+    "app.tasks.analytics_tasks.*": {"queue": "analytics"},
+    "app.tasks.feed_tasks.*": {"queue": "feeds"},
+}
+
+# Periodic tasks (run with `celery beat`)
+celery_app.conf.beat_schedule = {
+    "analytics-rollups": {
+        "task": "app.tasks.analytics_tasks.run_analytics_rollups_task",
+        "schedule": settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS,
+    },
+    "notification-unread-reconcile": {
+        "task": "app.tasks.notification_tasks.reconcile_unread_counters_task",
+        "schedule": settings.NOTIFICATION_UNREAD_RECONCILE_INTERVAL_SECONDS,
+    },
 }
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Configuration settings for LemonNPie Backend API
 """
-from typing import Optional, List
+from typing import Any, Callable, Optional, List, Dict
 from pydantic_settings import BaseSettings
 from pydantic import field_validator, Field
 
@@ -31,14 +31,88 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_POOL_SIZE: int = 10
     
+    # In-process (L1) cache in front of Redis
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_ENTRIES: int = 10000
+    CACHE_L1_DEFAULT_TTL: int = 0
+    CACHE_L1_NAMESPACE_TTLS: str = "movie:60,movies:60,search:120,gen:30,principal:30"
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    CACHE_CODEC: str = "orjson"  # orjson, msgpack or json
+    CACHE_COMPRESSION: str = "zlib"  # zlib, lz4 or none
+    CACHE_COMPRESSION_THRESHOLD: int = 1024  # bytes
+    
+    # Cache stampede protection (per-namespace "namespace:value,..." lists)
+    CACHE_LOCK_TIMEOUT_MS: int = 5000
+    CACHE_STALE_TTLS: str = "movie:300,movies:600,search:120"
+    CACHE_EARLY_EXPIRATION_BETAS: str = "movie:1.0,movies:1.0"
+    
+    # Analytics ingestion (buffered, batch-inserted off the request path)
+    ANALYTICS_QUEUE_MAX_SIZE: int = 10000
+    ANALYTICS_FLUSH_BATCH_SIZE: int = 500
+    ANALYTICS_FLUSH_INTERVAL_MS: int = 500
+    ANALYTICS_DRAIN_TIMEOUT: float = 10.0
+    ANALYTICS_SINK: str = "database"  # database, or stream (Redis Stream + analytics_worker.py)
+    ANALYTICS_STREAM_KEY: str = "analytics:events"
+    ANALYTICS_STREAM_GROUP: str = "analytics-writers"
+    ANALYTICS_STREAM_MAXLEN: int = 1000000
+    ANALYTICS_STREAM_CLAIM_IDLE_MS: int = 60000
+    
+    # Analytics rollups (hourly/daily aggregates maintained by a periodic job)
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = 300
+    ANALYTICS_ROLLUP_LAG_SECONDS: int = 300  # grace period before a period counts as closed
+    ANALYTICS_ROLLUP_MAX_PERIODS: int = 168  # periods processed per rollup per run
+    
+    # Response-time quantile sketches (per endpoint, status class and minute)
+    LATENCY_SKETCH_RELATIVE_ACCURACY: float = 0.01
+    LATENCY_SKETCH_FLUSH_INTERVAL_SECONDS: float = 60.0
+    LATENCY_SKETCH_MAX_KEYS: int = 5000  # in-memory sketches per worker between flushes
+    
+    # Unique visitor counts (Redis HyperLogLog per day; exact COUNT(DISTINCT) is opt-in)
+    ANALYTICS_EXACT_UNIQUES: bool = False
+    ANALYTICS_HLL_RETENTION_DAYS: int = 400
+    
+    # Full-text search (auto, postgres, sqlite or like)
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_TEXT_CONFIG: str = "simple"  # PostgreSQL text search configuration
+    # Typo-tolerant fallback when full-text search finds nothing (trigram similarity 0-1)
+    SEARCH_FUZZY_THRESHOLD: float = 0.3
+    SEARCH_FUZZY_POPULARITY_WEIGHT: float = 0.1  # score = similarity * (1 + weight * ln(1 + reviews))
+    
+    # In-process autocomplete index (per worker; changes are broadcast on the channel)
+    AUTOCOMPLETE_MAX_RESULTS: int = 10
+    AUTOCOMPLETE_REBUILD_INTERVAL_SECONDS: float = 600.0
+    AUTOCOMPLETE_CHANNEL: str = "search:autocomplete"
+    
+    # Activity feed timelines (capped Redis sorted sets, fanned out on write)
+    FEED_MAX_LENGTH: int = 500  # entries kept per timeline
+    FEED_CELEBRITY_FOLLOWERS: int = 10000  # accounts with this many followers are pulled at read time
+    FEED_TIMELINE_TTL_SECONDS: int = 604800  # unread timelines expire and are rebuilt on the next read
+    FEED_FANOUT_BATCH_SIZE: int = 500  # follower timelines per pipeline
+    FEED_BACKFILL_IN_BACKGROUND: bool = True  # backfill new follows in a Celery task
+    
+    # WebSocket delivery across processes (Redis pub/sub, sharded by user)
+    WEBSOCKET_CHANNEL_PREFIX: str = "ws"
+    WEBSOCKET_SHARDS: int = 64  # channels users are hashed onto; a process subscribes to its users' shards
+    WEBSOCKET_PRESENCE_TTL: int = 60  # seconds a process's presence survives without a heartbeat
+    WEBSOCKET_PRESENCE_HEARTBEAT: int = 20  # seconds between presence heartbeats
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 100  # messages queued per socket before the overflow policy applies
+    WEBSOCKET_OVERFLOW_POLICY: str = "drop_oldest"  # drop_oldest or disconnect
+    WEBSOCKET_SEND_TIMEOUT: float = 10.0  # seconds a single send may take before the socket is closed
+    NOTIFICATION_UNREAD_COUNTER_TTL: int = 86400  # seconds an unread counter lives before it is recounted
+    NOTIFICATION_UNREAD_RECONCILE_INTERVAL_SECONDS: int = 300  # how often counters are corrected against the database
+    
     # JWT settings
     SECRET_KEY: str = "local-development-secret-key-for-testing-only-123456789"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # verified tokens kept per worker (0 disables)
+    AUTH_PRINCIPAL_CACHE_TTL: int = 300  # seconds a user's role and status are cached in Redis
     
     # Rate limiting
     RATE_LIMIT_PER_MINUTE: int = 60
+    RATE_LIMIT_LOCAL_TOKENS: int = 0  # tokens leased per Redis check and spent in-process (0 disables)
+    RATE_LIMIT_LOCAL_TTL_MS: int = 1000  # how long a worker keeps an unspent lease
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -55,9 +129,34 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
         return self.ALLOWED_ORIGINS
     
+    @property
+    def cache_l1_namespace_ttls(self) -> Dict[str, int]:
+        """Parse CACHE_L1_NAMESPACE_TTLS ("namespace:seconds,...") into a dict"""
+        return _parse_namespace_values(self.CACHE_L1_NAMESPACE_TTLS, int)
+    
+    @property
+    def cache_stale_ttls(self) -> Dict[str, int]:
+        """Parse CACHE_STALE_TTLS ("namespace:seconds,...") into a dict"""
+        return _parse_namespace_values(self.CACHE_STALE_TTLS, int)
+    
+    @property
+    def cache_early_expiration_betas(self) -> Dict[str, float]:
+        """Parse CACHE_EARLY_EXPIRATION_BETAS ("namespace:beta,...") into a dict"""
+        return _parse_namespace_values(self.CACHE_EARLY_EXPIRATION_BETAS, float)
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
+def _parse_namespace_values(value: str, cast: Callable[[str], Any]) -> Dict[str, Any]:
+    """Parse a "namespace:value,..." setting into a dict"""
+    values = {}
+    for item in value.split(","):
+        if ":" in item:
+            namespace, raw = item.rsplit(":", 1)
+            values[namespace.strip()] = cast(raw)
+    return values
+
+
 settings = Settings()
\ No newline at end of file
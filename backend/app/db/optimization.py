@@ -48,6 +48,13 @@ class DatabaseOptimizer:
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_user_created ON reviews(user_id, created_at)",
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_movies_type_date ON movies(type, release_date)",
             
+            # Keyset pagination indexes ((sort_key, id) seeks)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_movies_created_id ON movies(created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_created_id ON reviews(created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reviews_movie_created_id ON reviews(movie_id, created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_notifications_user_created_id ON notifications(user_id, created_at, id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_watchlist_user_added ON user_watchlist(user_id, added_at, movie_id)",
+            
             # Relationship table indexes
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_movie_genres_movie_id ON movie_genres(movie_id)",
             "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_movie_genres_genre ON movie_genres(genre)",
@@ -209,21 +216,34 @@ class QueryOptimizer:
         base_query: str, 
         order_column: str, 
         limit: int, 
-        offset: int
+        offset: int = 0,
+        after: bool = False,
+        descending: bool = False,
+        id_column: str = "id"
     ) -> str:
-        """Generate optimized pagination query using cursor-based pagination"""
+        """
+        Generate a pagination query, seeking instead of offsetting when paging by cursor
+        
+        With ``after`` the query seeks past the last row served using the
+        ``:after_key`` and ``:after_id`` bind parameters (see
+        app.db.pagination for signed cursors), so every page costs the same.
+        The id column is always used as a tiebreaker to keep the order stable.
+        """
+        direction = "DESC" if descending else "ASC"
+        order_by = f"{order_column} {direction}, {id_column} {direction}"
         
-        # For large offsets, cursor-based pagination is more efficient
-        if offset > 1000:
+        if after:
+            comparator = "<" if descending else ">"
             return f"""
-            {base_query}
-            ORDER BY {order_column}
+            SELECT * FROM ({base_query}) AS page_source
+            WHERE ({order_column}, {id_column}) {comparator} (:after_key, :after_id)
+            ORDER BY {order_by}
             LIMIT {limit}
             """
-        else:
-            return f"""
+        
+        return f"""
             {base_query}
-            ORDER BY {order_column}
+            ORDER BY {order_by}
             LIMIT {limit} OFFSET {offset}
             """
 
@@ -0,0 +1,225 @@
+"""
+Keyset (cursor) pagination utilities for LemonNPie Backend API
+"""
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import DateTime, Select, asc, desc, func, literal, select, text, tuple_
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.exceptions import ValidationError
+
+
+class InvalidCursorError(ValidationError):
+    """Cursor is malformed, tampered with or issued for a different listing"""
+
+    def __init__(self, message: str = "Invalid pagination cursor"):
+        super().__init__(message)
+
+
+def _signature(payload: bytes) -> bytes:
+    """Truncated HMAC-SHA256 of a cursor payload"""
+    return hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()[:16]
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _encode_value(value: Any) -> List[Any]:
+    """Tag a key value so it decodes back to the same Python type"""
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, UUID):
+        return ["u", str(value)]
+    if isinstance(value, Enum):
+        return ["v", value.value]
+    return ["v", value]
+
+
+def _decode_value(tagged: List[Any]) -> Any:
+    tag, value = tagged
+    if tag == "dt":
+        return datetime.fromisoformat(value)
+    if tag == "d":
+        return date.fromisoformat(value)
+    if tag == "u":
+        return UUID(value)
+    return value
+
+
+def encode_cursor(scope: str, values: Sequence[Any]) -> str:
+    """
+    Build an opaque, signed cursor for a position in a listing
+
+    Args:
+        scope: Listing identity (e.g. "movies:created_at:desc"); a cursor is
+            only accepted by the listing that issued it
+        values: Sort key values of the last row served, tiebreaker last
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(
+        {"s": scope, "k": [_encode_value(value) for value in values]},
+        separators=(",", ":")
+    ).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(payload))}"
+
+
+def decode_cursor(scope: str, cursor: str) -> List[Any]:
+    """
+    Verify a cursor and return the sort key values it points past
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed, its signature does not
+            match or it was issued for another scope
+    """
+    try:
+        encoded_payload, encoded_signature = cursor.split(".", 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, TypeError):
+        raise InvalidCursorError()
+
+    if not hmac.compare_digest(signature, _signature(payload)):
+        raise InvalidCursorError()
+
+    try:
+        data = json.loads(payload)
+        values = [_decode_value(tagged) for tagged in data["k"]]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError()
+
+    if data.get("s") != scope:
+        raise InvalidCursorError("Pagination cursor does not match this listing")
+
+    return values
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over ``(sort_key, id)``
+
+    Rows are ordered by the sort expression with the id column as a stable
+    tiebreaker in the same direction, and each page seeks past the last row
+    of the previous one with ``(sort_key, id) < (:k, :id)`` (``>`` when
+    ascending), so deep pages cost the same as the first. Both key values are
+    appended to the selected columns, so rows keep their original positions.
+    """
+
+    def __init__(self, scope: str, sort_column: Any, id_column: Any, descending: bool = True):
+        self.scope = scope
+        self.sort_column = sort_column
+        self.id_column = id_column
+        self.descending = descending
+
+    def _sort_expression(self, dialect_name: str) -> Any:
+        """Sort key as compared in SQL"""
+        if dialect_name == "sqlite" and isinstance(self.sort_column.type, DateTime):
+            # SQLite keeps server-default timestamps without fractional seconds
+            # and ORM-written ones with them; compare on one text format
+            return func.strftime("%Y-%m-%d %H:%M:%f", self.sort_column)
+        return self.sort_column
+
+    def _order(self, query: Select, sort_key: Any) -> Select:
+        """Apply the stable ``(sort_key, id)`` ordering"""
+        direction = desc if self.descending else asc
+        return query.order_by(direction(sort_key), direction(self.id_column))
+
+    def _seek(self, query: Select, sort_key: Any, after: Optional[str]) -> Select:
+        """Restrict the query to rows after the given cursor"""
+        if not after:
+            return query
+
+        sort_value, id_value = decode_cursor(self.scope, after)
+        row_key = tuple_(sort_key, self.id_column)
+        cursor_key = tuple_(
+            literal(sort_value, sort_key.type),
+            literal(id_value, self.id_column.type)
+        )
+        if self.descending:
+            return query.where(row_key < cursor_key)
+        return query.where(row_key > cursor_key)
+
+    async def fetch_page(
+        self,
+        db: AsyncSession,
+        query: Select,
+        limit: int,
+        after: Optional[str] = None,
+        offset: int = 0
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Fetch one page of rows after a cursor
+
+        One extra row is read to know whether another page exists, so no
+        COUNT(*) is needed. ``offset`` only serves legacy page-numbered
+        requests; the returned cursor lets those clients continue by seeking.
+
+        Returns:
+            Rows of the page and the cursor for the next page (None on the last page)
+        """
+        sort_key = self._sort_expression(db.get_bind().dialect.name)
+        query = query.add_columns(
+            sort_key.label("_cursor_sort_key"),
+            self.id_column.label("_cursor_id")
+        )
+        query = self._order(self._seek(query, sort_key, after), sort_key).limit(limit + 1)
+        if offset:
+            query = query.offset(offset)
+
+        result = await db.execute(query)
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_row = rows[-1]
+            next_cursor = encode_cursor(self.scope, [last_row[-2], last_row[-1]])
+
+        return rows, next_cursor
+
+
+async def count_rows(db: AsyncSession, query: Select, estimate: bool = False) -> int:
+    """
+    Count the rows a listing query would return
+
+    With ``estimate`` on PostgreSQL the planner's row estimate is used instead
+    of running COUNT(*); other databases always count exactly.
+    """
+    count_query = query.order_by(None).limit(None).offset(None)
+
+    if estimate and db.get_bind().dialect.name == "postgresql":
+        try:
+            compiled = count_query.compile(
+                dialect=db.get_bind().dialect,
+                compile_kwargs={"literal_binds": True}
+            )
+        except CompileError:
+            # Bind values that cannot be rendered inline; count exactly instead
+            compiled = None
+
+        if compiled is not None:
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            plan = result.scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+
+    result = await db.execute(select(func.count()).select_from(count_query.subquery()))
+    return result.scalar() or 0
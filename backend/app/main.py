@@ -33,6 +33,10 @@ from app.core.exceptions import (
 )
 from app.db.database import init_db, close_db
 from app.cache.redis import init_redis, close_redis
+from app.services.analytics_ingest import init_analytics_ingest, close_analytics_ingest
+from app.services.latency_sketch import init_latency_sketches, close_latency_sketches
+from app.services.autocomplete import init_autocomplete, close_autocomplete
+from app.middleware.analytics_middleware import AnalyticsMiddleware
 from app.auth.cors import setup_cors
 from app.auth.middleware import AuthMiddleware, RoleBasedAccessMiddleware, create_role_permissions_map
 from app.auth.security import SecurityMiddleware, InputValidationMiddleware
@@ -46,6 +50,7 @@ from app.api.v1.admin import router as admin_router
 from app.api.v1.notifications import router as notifications_router
 from app.api.v1.analytics import router as analytics_router
 from app.websocket.endpoints import websocket_endpoint
+from app.websocket.manager import connection_manager
 
 # Configure logging
 configure_logging()
@@ -66,11 +71,28 @@ async def lifespan(app: FastAPI):
     await init_redis()
     logger.info("Redis initialized")
     
+    # Start buffered analytics ingestion
+    await init_analytics_ingest()
+    await init_latency_sketches()
+    
+    # Build this worker's autocomplete index in the background
+    await init_autocomplete()
+    
+    # Receive WebSocket messages sent by other processes
+    await connection_manager.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down LemonNPie Backend API")
     
+    await connection_manager.stop()
+    
+    # Flush queued analytics while the database is still available
+    await close_analytics_ingest()
+    await close_latency_sketches()
+    await close_autocomplete()
+    
     # Close database connections
     await close_db()
     logger.info("Database connections closed")
@@ -80,6 +102,31 @@ async def lifespan(app: FastAPI):
     logger.info("Redis connections closed")
 
 
+def setup_middleware(app: FastAPI) -> None:
+    """Add the request middleware stack (shared with benchmark_middleware.py)"""
+    # Add version middleware (order matters - should be before auth)
+    app.add_middleware(APIVersionMiddleware, enable_version_validation=True)
+    app.add_middleware(ResponseTransformMiddleware)
+    
+    # Add security middleware (order matters - middleware executes in reverse order)
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(AnalyticsMiddleware)
+    app.add_middleware(
+        RoleBasedAccessMiddleware, 
+        route_permissions=create_role_permissions_map()
+    )
+    app.add_middleware(AuthMiddleware)
+    app.add_middleware(InputValidationMiddleware)
+    app.add_middleware(SecurityMiddleware)
+    
+    # Trusted host middleware (security)
+    if not settings.DEBUG:
+        app.add_middleware(
+            TrustedHostMiddleware,
+            allowed_hosts=["localhost", "127.0.0.1", "*.lemonnpie.com"]
+        )
+
+
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
     
@@ -103,26 +150,7 @@ def create_app() -> FastAPI:
     # This ensures CORS headers are added to all responses including errors
     setup_cors(app)
     
-    # Add version middleware (order matters - should be before auth)
-    app.add_middleware(APIVersionMiddleware, enable_version_validation=True)
-    app.add_middleware(ResponseTransformMiddleware)
-    
-    # Add security middleware (order matters - middleware executes in reverse order)
-    app.add_middleware(LoggingMiddleware)
-    app.add_middleware(
-        RoleBasedAccessMiddleware, 
-        route_permissions=create_role_permissions_map()
-    )
-    app.add_middleware(AuthMiddleware)
-    app.add_middleware(InputValidationMiddleware)
-    app.add_middleware(SecurityMiddleware)
-    
-    # Trusted host middleware (security)
-    if not settings.DEBUG:
-        app.add_middleware(
-            TrustedHostMiddleware,
-            allowed_hosts=["localhost", "127.0.0.1", "*.lemonnpie.com"]
-        )
+    setup_middleware(app)
     
     # Rate limiting
     app.state.limiter = limiter
@@ -2,23 +2,21 @@
 Middleware for automatic analytics tracking
 """
 import time
-import json
-from typing import Callable, Optional
+from typing import Optional
 from uuid import UUID
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import StreamingResponse
+from fastapi import Request
 
+from app.middleware.asgi import get_request, get_state
 from app.services.analytics_service import AnalyticsService
-from app.db.database import get_db
-from app.auth.dependencies import get_current_user_optional
+from app.services.analytics_ingest import get_analytics_queue
+from app.services.latency_sketch import get_latency_recorder
 
 
-class AnalyticsMiddleware(BaseHTTPMiddleware):
+class AnalyticsMiddleware:
     """Middleware to automatically track user activities and system metrics"""
     
     def __init__(self, app, track_system_metrics: bool = True, track_user_activities: bool = True):
-        super().__init__(app)
+        self.app = app
         self.track_system_metrics = track_system_metrics
         self.track_user_activities = track_user_activities
         
@@ -37,14 +35,70 @@ class AnalyticsMiddleware(BaseHTTPMiddleware):
             "GET /api/v1/movies/search": "search_movies",
         }
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
         start_time = time.time()
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
         
+        # Process the request; an endpoint that raises is recorded too (as a
+        # 500 unless its response had already started)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Calculate response time (up to the last body chunk, so streams count in full)
+            response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            self._record(scope, status_code, response_time)
+    
+    def _record(self, scope, status_code: int, response_time: float) -> None:
+        """Record the request's latency and queue its analytics events"""
         # Get request info
-        method = request.method
-        path = str(request.url.path)
+        method = scope["method"]
+        path = scope["path"]
         endpoint_key = f"{method} {path}"
         
+        # Route template, so latency aggregates per endpoint rather than per URL
+        route_path = getattr(scope.get("route"), "path", None)
+        
+        latency_recorder = get_latency_recorder()
+        if latency_recorder is not None:
+            latency_recorder.record(
+                f"{method} {route_path}" if route_path else "unmatched",
+                status_code,
+                response_time
+            )
+        
+        # Queue the events; the ingestion flusher writes them in batches
+        analytics_queue = get_analytics_queue()
+        if analytics_queue is None:
+            return
+        
+        if self.track_system_metrics:
+            analytics_queue.track_system_metric(
+                metric_name="response_time",
+                metric_value=response_time,
+                metric_unit="ms",
+                component="api",
+                extra_data={
+                    "endpoint": endpoint_key,
+                    "route": f"{method} {route_path}" if route_path else None,
+                    "status_code": status_code,
+                    "method": method,
+                    "path": path
+                }
+            )
+        
+        if not self.track_user_activities:
+            return
+        
         # Try to match with tracked endpoints (handle path parameters)
         activity_type = None
         for pattern, activity in self.tracked_endpoints.items():
@@ -52,72 +106,27 @@ class AnalyticsMiddleware(BaseHTTPMiddleware):
                 activity_type = activity
                 break
         
-        # Get user info if available
-        user_id = None
-        session_id = None
-        try:
-            # Extract user from request if authenticated
-            if hasattr(request.state, 'user'):
-                user_id = request.state.user.id
-            # Get session ID from headers or cookies
-            session_id = request.headers.get('X-Session-ID') or request.cookies.get('session_id')
-        except Exception:
-            pass
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Calculate response time
-        response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        
-        # Track metrics asynchronously (don't block the response)
-        if self.track_system_metrics or (self.track_user_activities and activity_type):
-            try:
-                # Get database session
-                async for db in get_db():
-                    analytics_service = AnalyticsService(db)
-                    
-                    # Track system metrics
-                    if self.track_system_metrics:
-                        await analytics_service.track_system_metric(
-                            metric_name="response_time",
-                            metric_value=response_time,
-                            metric_unit="ms",
-                            component="api",
-                            extra_data={
-                                "endpoint": endpoint_key,
-                                "status_code": response.status_code,
-                                "method": method,
-                                "path": path
-                            }
-                        )
-                    
-                    # Track user activity
-                    if self.track_user_activities and activity_type:
-                        # Extract resource info from path
-                        resource_type, resource_id = self._extract_resource_info(path, activity_type)
-                        
-                        await analytics_service.track_user_activity(
-                            user_id=user_id,
-                            activity_type=activity_type,
-                            resource_type=resource_type,
-                            resource_id=resource_id,
-                            session_id=session_id,
-                            ip_address=self._get_client_ip(request),
-                            user_agent=request.headers.get('User-Agent'),
-                            extra_data={
-                                "endpoint": endpoint_key,
-                                "status_code": response.status_code,
-                                "response_time_ms": response_time
-                            }
-                        )
-                    
-                    break  # Exit the async generator
-            except Exception as e:
-                # Log error but don't fail the request
-                print(f"Analytics tracking error: {e}")
-        
-        return response
+        if activity_type:
+            request = get_request(scope)
+            
+            # Extract resource info from path
+            resource_type, resource_id = self._extract_resource_info(path, activity_type)
+            
+            analytics_queue.track_user_activity(
+                # Set by AuthMiddleware further down the stack
+                user_id=get_state(scope).get('user_id'),
+                activity_type=activity_type,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                session_id=request.headers.get('X-Session-ID') or request.cookies.get('session_id'),
+                ip_address=self._get_client_ip(request),
+                user_agent=request.headers.get('User-Agent'),
+                extra_data={
+                    "endpoint": endpoint_key,
+                    "status_code": status_code,
+                    "response_time_ms": response_time
+                }
+            )
     
     def _match_endpoint_pattern(self, endpoint: str, pattern: str) -> bool:
         """Check if endpoint matches pattern (handling path parameters)"""
@@ -203,51 +212,39 @@ async def track_custom_event(
     extra_data: Optional[dict] = None
 ):
     """Helper function to track custom analytics events"""
-    try:
-        # Get user info
-        user_id = None
-        if hasattr(request.state, 'user'):
-            user_id = request.state.user.id
-        
-        session_id = request.headers.get('X-Session-ID') or request.cookies.get('session_id')
-        
-        # Get database session
-        async for db in get_db():
-            analytics_service = AnalyticsService(db)
-            
-            await analytics_service.track_user_activity(
-                user_id=user_id,
-                activity_type=activity_type,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                session_id=session_id,
-                ip_address=request.headers.get('X-Forwarded-For', '').split(',')[0].strip() or 
-                          request.headers.get('X-Real-IP') or 
-                          (request.client.host if request.client else None),
-                user_agent=request.headers.get('User-Agent'),
-                extra_data=extra_data
-            )
-            break
-    except Exception as e:
-        print(f"Custom event tracking error: {e}")
+    analytics_queue = get_analytics_queue()
+    if analytics_queue is None:
+        return
+    
+    analytics_queue.track_user_activity(
+        user_id=getattr(request.state, 'user_id', None),
+        activity_type=activity_type,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        session_id=request.headers.get('X-Session-ID') or request.cookies.get('session_id'),
+        ip_address=request.headers.get('X-Forwarded-For', '').split(',')[0].strip() or 
+                  request.headers.get('X-Real-IP') or 
+                  (request.client.host if request.client else None),
+        user_agent=request.headers.get('User-Agent'),
+        extra_data=extra_data
+    )
 
 
 # Content metrics helper
 async def track_content_view(content_type: str, content_id: UUID, request: Request):
     """Helper function to track content views"""
     try:
-        async for db in get_db():
-            analytics_service = AnalyticsService(db)
-            
-            # Increment view count
-            await analytics_service.increment_content_metric(
-                content_type=content_type,
-                content_id=content_id,
-                metric_type="views"
-            )
-            
-            # Track detailed view metric
-            await analytics_service.track_content_metric(
+        # Increment view count
+        await AnalyticsService(None).increment_content_metric(
+            content_type=content_type,
+            content_id=content_id,
+            metric_type="views"
+        )
+        
+        # Track detailed view metric
+        analytics_queue = get_analytics_queue()
+        if analytics_queue is not None:
+            analytics_queue.track_content_metric(
                 content_type=content_type,
                 content_id=content_id,
                 metric_type="view",
@@ -259,6 +256,5 @@ async def track_content_view(content_type: str, content_id: UUID, request: Reque
                                 (request.client.host if request.client else None)
                 }
             )
-            break
     except Exception as e:
         print(f"Content view tracking error: {e}")
\ No newline at end of file
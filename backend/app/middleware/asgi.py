@@ -0,0 +1,58 @@
+"""
+Helpers shared by the pure-ASGI middlewares of LemonNPie Backend API
+
+Every middleware in the stack sees the same scope. The Request built for it
+is kept in the scope, so headers, query parameters and cookies are parsed
+once, by whichever layer asks first, and reused by the rest. Its state is
+scope["state"], i.e. the same request.state the endpoints see.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+# Scope key of the Request shared by the middlewares
+SCOPE_REQUEST_KEY = "lemonnpie.request"
+
+
+def get_request(scope: Scope) -> Request:
+    """
+    The Request shared by the middlewares for this scope
+
+    Only headers, query parameters, cookies and state should be read through
+    it: the body belongs to the endpoint.
+    """
+    request = scope.get(SCOPE_REQUEST_KEY)
+    if request is None:
+        request = scope[SCOPE_REQUEST_KEY] = Request(scope)
+    return request
+
+
+def get_state(scope: Scope) -> Dict[str, Any]:
+    """The request.state dict of the scope"""
+    return scope.setdefault("state", {})
+
+
+async def send_error(
+    scope: Scope,
+    receive: Receive,
+    send: Send,
+    status_code: int,
+    message: str,
+    headers: Optional[Dict[str, str]] = None
+) -> None:
+    """Answer with the API's error body (as http_exception_handler renders it) without calling the app"""
+    response = JSONResponse(
+        status_code=status_code,
+        content={
+            "error": "http_error",
+            "message": message,
+            "details": {},
+            "timestamp": datetime.utcnow().isoformat(),
+            "path": scope["path"],
+        },
+        headers=headers
+    )
+    await response(scope, receive, send)
@@ -1,77 +1,79 @@
 """
 API Version middleware for LemonNPie Backend API
 """
-from fastapi import Request, Response, HTTPException, status
+from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from datetime import datetime
 import logging
 
 from app.core.versioning import APIVersionManager, VersionCompatibilityHandler
+from app.middleware.asgi import get_request, get_state
 
 
 logger = logging.getLogger(__name__)
 
 
-class APIVersionMiddleware(BaseHTTPMiddleware):
+class APIVersionMiddleware:
     """
     Middleware to handle API versioning and compatibility
     """
     
+    # System endpoints are not versioned
+    SYSTEM_ENDPOINTS = ('/api/info', '/api/versions', '/api/migration-guides')
+    
     def __init__(self, app, enable_version_validation: bool = True):
-        super().__init__(app)
+        self.app = app
         self.enable_version_validation = enable_version_validation
+        self.supported_versions = ", ".join(v.value for v in APIVersionManager.VERSIONS.keys())
     
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope, receive, send):
         """Process request with version handling"""
+        path = scope.get("path", "")
+        if (scope["type"] != "http" or not path.startswith('/api/')
+                or path.startswith(self.SYSTEM_ENDPOINTS)):
+            await self.app(scope, receive, send)
+            return
         
-        # Skip version handling for non-API routes
-        if not request.url.path.startswith('/api/'):
-            return await call_next(request)
-        
-        # Skip version handling for system endpoints
-        system_endpoints = ['/api/info', '/api/versions', '/api/migration-guides']
-        if any(request.url.path.startswith(endpoint) for endpoint in system_endpoints):
-            return await call_next(request)
-        
+        request = get_request(scope)
         try:
             # Extract API version from request
             api_version = APIVersionManager.get_version_from_request(request)
             
             # Validate version if enabled
             if self.enable_version_validation and not APIVersionManager.validate_version(api_version):
-                return self._create_version_error_response(request, api_version)
-            
-            # Add version to request state
-            request.state.api_version = api_version
+                await self._create_version_error_response(request, api_version)(scope, receive, send)
+                return
             
             # Get version info for headers
             version_info = APIVersionManager.get_version_info(api_version)
-            
-            # Log version usage for analytics
-            logger.info(
-                f"API request",
-                extra={
-                    "api_version": api_version.value if hasattr(api_version, 'value') else str(api_version),
-                    "endpoint": request.url.path,
-                    "method": request.method,
-                    "user_agent": request.headers.get("user-agent", ""),
-                    "ip_address": request.client.host if request.client else "unknown"
-                }
-            )
-            
-            # Process the request
-            response = await call_next(request)
-            
-            # Add version headers to response
-            self._add_version_headers(response, api_version, version_info)
-            
-            return response
-            
         except Exception as e:
             logger.error(f"Error in version middleware: {str(e)}", exc_info=True)
             # Continue processing without version handling on error
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+        
+        # Add version to request state
+        get_state(scope)["api_version"] = api_version
+        
+        # Log version usage for analytics
+        logger.info(
+            f"API request",
+            extra={
+                "api_version": api_version.value if hasattr(api_version, 'value') else str(api_version),
+                "endpoint": path,
+                "method": scope["method"],
+                "user_agent": request.headers.get("user-agent", ""),
+                "ip_address": request.client.host if request.client else "unknown"
+            }
+        )
+        
+        async def send_with_version_headers(message):
+            if message["type"] == "http.response.start":
+                self._add_version_headers(MutableHeaders(scope=message), api_version, version_info)
+            await send(message)
+        
+        await self.app(scope, receive, send_with_version_headers)
     
     def _create_version_error_response(self, request: Request, api_version) -> JSONResponse:
         """Create error response for unsupported version"""
@@ -97,54 +99,44 @@ class APIVersionMiddleware(BaseHTTPMiddleware):
             }
         )
     
-    def _add_version_headers(self, response: Response, api_version, version_info: dict):
-        """Add version-related headers to response"""
+    def _add_version_headers(self, headers: MutableHeaders, api_version, version_info: dict):
+        """Add version-related headers to the response start message"""
         # Basic version headers
-        response.headers["X-API-Version"] = api_version.value if hasattr(api_version, 'value') else str(api_version)
-        response.headers["X-API-Version-Status"] = version_info["status"].value if hasattr(version_info["status"], 'value') else str(version_info["status"])
+        headers["X-API-Version"] = api_version.value if hasattr(api_version, 'value') else str(api_version)
+        headers["X-API-Version-Status"] = version_info["status"].value if hasattr(version_info["status"], 'value') else str(version_info["status"])
         
         # Add deprecation headers if applicable
         if version_info["status"].value == "deprecated":
-            response.headers["Deprecation"] = "true"
-            response.headers["Warning"] = f'299 - "API version {api_version.value} is deprecated"'
+            headers["Deprecation"] = "true"
+            headers["Warning"] = f'299 - "API version {api_version.value} is deprecated"'
             
             if version_info.get("sunset_date"):
-                response.headers["Sunset"] = version_info["sunset_date"]
+                headers["Sunset"] = version_info["sunset_date"]
         
         # Add supported versions header
-        supported_versions = [v.value for v in APIVersionManager.VERSIONS.keys()]
-        response.headers["X-Supported-API-Versions"] = ", ".join(supported_versions)
+        headers["X-Supported-API-Versions"] = self.supported_versions
         
         # Add links to version information
-        response.headers["Link"] = (
+        headers["Link"] = (
             f'</api/versions>; rel="version-info", '
             f'</api/migration-guides>; rel="migration-guides"'
         )
 
 
-class ResponseTransformMiddleware(BaseHTTPMiddleware):
+class ResponseTransformMiddleware:
     """
     Middleware to transform responses for backward compatibility
     """
     
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
         """Transform response based on API version"""
-        
-        # Process the request
-        response = await call_next(request)
-        
-        # Skip transformation for non-API routes or non-JSON responses
-        if (not request.url.path.startswith('/api/') or 
-            not response.headers.get("content-type", "").startswith("application/json")):
-            return response
-        
-        # Get API version from request state
-        api_version = getattr(request.state, 'api_version', APIVersionManager.DEFAULT_VERSION)
-        
-        # Transform response if needed (for future version compatibility)
-        # Currently v1 is the only version, so no transformation needed
-        
-        return response
+        # Transform response if needed (for future version compatibility).
+        # Currently v1 is the only version, so responses pass straight through;
+        # a transform would wrap send for application/json responses under /api/.
+        await self.app(scope, receive, send)
 
 
 def create_version_middleware(enable_validation: bool = True) -> APIVersionMiddleware:
@@ -18,6 +18,7 @@ from app.models.relationships import (
 from app.models.moderation import UserReport, Notification, NotificationPreference
 from app.models.privacy import UserPrivacySettings
 from app.models.search import MovieSearchIndex
+from app.models.movie_stats import MovieStatistics
 from app.models.analytics import (
     UserActivity,
     ContentMetrics,
@@ -25,6 +26,14 @@ from app.models.analytics import (
     AnalyticsReport,
     UserEngagementMetrics
 )
+from app.models.analytics_rollups import (
+    ActivityRollup,
+    ActiveUserRollup,
+    SystemMetricRollup,
+    ReviewRollup,
+    LatencySketch,
+    RollupWatermark
+)
 from app.models.enums import UserRole, ContentType, ModerationStatus, VoteType, CastRole, NotificationType
 
 __all__ = [
@@ -43,11 +52,18 @@ __all__ = [
     "NotificationPreference",
     "UserPrivacySettings",
     "MovieSearchIndex",
+    "MovieStatistics",
     "UserActivity",
     "ContentMetrics",
     "SystemMetrics",
     "AnalyticsReport",
     "UserEngagementMetrics",
+    "ActivityRollup",
+    "ActiveUserRollup",
+    "SystemMetricRollup",
+    "ReviewRollup",
+    "LatencySketch",
+    "RollupWatermark",
     "UserRole",
     "ContentType",
     "ModerationStatus",
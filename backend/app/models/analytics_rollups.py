@@ -0,0 +1,110 @@
+"""
+Pre-aggregated analytics rollup models for LemonNPie Backend API
+"""
+from uuid import uuid4
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, Index, JSON, LargeBinary, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class ActivityRollup(Base):
+    """
+    Hourly user activity counts per activity type.
+
+    unique_users counts distinct signed-in users within the hour only; it
+    cannot be summed across hours (see ActiveUserRollup for DAU/WAU/MAU).
+    """
+    __tablename__ = "activity_rollups"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    granularity = Column(String(10), nullable=False)  # hour
+    period_start = Column(DateTime(timezone=True), nullable=False)
+    activity_type = Column(String(100), nullable=False)
+    event_count = Column(Integer, default=0, nullable=False)
+    unique_users = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("granularity", "period_start", "activity_type", name="uq_activity_rollups_period_type"),
+        Index("idx_activity_rollups_period", "granularity", "period_start"),
+    )
+
+
+class ActiveUserRollup(Base):
+    """Daily, rolling 7-day and rolling 30-day active users ending on each day"""
+    __tablename__ = "active_user_rollups"
+
+    day = Column(Date, primary_key=True)
+    daily_active_users = Column(Integer, default=0, nullable=False)
+    weekly_active_users = Column(Integer, default=0, nullable=False)
+    monthly_active_users = Column(Integer, default=0, nullable=False)
+    new_users = Column(Integer, default=0, nullable=False)
+
+
+class SystemMetricRollup(Base):
+    """
+    Hourly system metric aggregates with a fixed-bucket histogram.
+
+    One row per (metric, component) with an empty endpoint, plus one per
+    API endpoint route for request metrics. Rows for the same key merge by
+    summing counts and histograms, so any range of hours can be combined.
+    """
+    __tablename__ = "system_metric_rollups"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    granularity = Column(String(10), nullable=False)  # hour
+    period_start = Column(DateTime(timezone=True), nullable=False)
+    metric_name = Column(String(100), nullable=False)
+    component = Column(String(100), nullable=False, default="")
+    endpoint = Column(String(255), nullable=False, default="")
+    sample_count = Column(Integer, default=0, nullable=False)
+    value_sum = Column(Float, default=0.0, nullable=False)
+    value_min = Column(Float, nullable=True)
+    value_max = Column(Float, nullable=True)
+    error_count = Column(Integer, default=0, nullable=False)
+    histogram = Column(JSON, nullable=False)  # counts per LATENCY_BUCKETS_MS bucket
+
+    __table_args__ = (
+        Index("idx_system_metric_rollups_period", "granularity", "period_start"),
+        Index("idx_system_metric_rollups_metric", "metric_name", "component", "endpoint"),
+    )
+
+
+class ReviewRollup(Base):
+    """Reviews created per day with their rating sum and distinct reviewers"""
+    __tablename__ = "review_rollups"
+
+    day = Column(Date, primary_key=True)
+    review_count = Column(Integer, default=0, nullable=False)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    reviewer_count = Column(Integer, default=0, nullable=False)
+
+
+class LatencySketch(Base):
+    """
+    Serialized DDSketch of request latencies for one minute, endpoint and status class.
+
+    Each API worker writes its own rows; readers merge every row in a window.
+    """
+    __tablename__ = "latency_sketches"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    minute = Column(DateTime(timezone=True), nullable=False)
+    endpoint = Column(String(255), nullable=False)
+    status_class = Column(String(3), nullable=False)  # 2xx, 4xx, 5xx, ...
+    sample_count = Column(Integer, default=0, nullable=False)
+    sketch = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("idx_latency_sketches_minute", "minute"),
+        Index("idx_latency_sketches_endpoint_minute", "endpoint", "minute"),
+    )
+
+
+class RollupWatermark(Base):
+    """End (exclusive) of the last period each rollup job has processed"""
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(100), primary_key=True)
+    processed_until = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -39,6 +39,7 @@ class Movie(Base):
     watchlist_entries = relationship("UserWatchlist", back_populates="movie", cascade="all, delete-orphan")
     favorite_entries = relationship("UserFavorite", back_populates="movie", cascade="all, delete-orphan")
     search_index = relationship("MovieSearchIndex", back_populates="movie", uselist=False, cascade="all, delete-orphan")
+    statistics = relationship("MovieStatistics", back_populates="movie", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Movie(id={self.id}, title={self.title}, type={self.type})>"
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""
+Materialized movie statistics model for LemonNPie Backend API
+"""
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+
+class MovieStatistics(Base):
+    """
+    Per-movie review aggregates maintained incrementally on review writes.
+
+    Only approved reviews are counted. Category averages are derived from the
+    stored sums and counts; the overall average is kept as a column so listings
+    can filter and sort on it.
+    """
+    __tablename__ = "movie_stats"
+
+    movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    review_count = Column(Integer, default=0, nullable=False, index=True)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    average_rating = Column(Float, default=0.0, nullable=False, index=True)
+
+    # Category rating sums and counts (category ratings are optional per review)
+    cultural_authenticity_sum = Column(Integer, default=0, nullable=False)
+    cultural_authenticity_count = Column(Integer, default=0, nullable=False)
+    production_quality_sum = Column(Integer, default=0, nullable=False)
+    production_quality_count = Column(Integer, default=0, nullable=False)
+    story_sum = Column(Integer, default=0, nullable=False)
+    story_count = Column(Integer, default=0, nullable=False)
+    acting_sum = Column(Integer, default=0, nullable=False)
+    acting_count = Column(Integer, default=0, nullable=False)
+    cinematography_sum = Column(Integer, default=0, nullable=False)
+    cinematography_count = Column(Integer, default=0, nullable=False)
+
+    # LemonNPie rating histogram (1-10)
+    rating_1 = Column(Integer, default=0, nullable=False)
+    rating_2 = Column(Integer, default=0, nullable=False)
+    rating_3 = Column(Integer, default=0, nullable=False)
+    rating_4 = Column(Integer, default=0, nullable=False)
+    rating_5 = Column(Integer, default=0, nullable=False)
+    rating_6 = Column(Integer, default=0, nullable=False)
+    rating_7 = Column(Integer, default=0, nullable=False)
+    rating_8 = Column(Integer, default=0, nullable=False)
+    rating_9 = Column(Integer, default=0, nullable=False)
+    rating_10 = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Relationships
+    movie = relationship("Movie", back_populates="statistics")
+
+    def __repr__(self):
+        return f"<MovieStatistics(movie_id={self.movie_id}, review_count={self.review_count}, average_rating={self.average_rating})>"
@@ -1,27 +1,76 @@
 """
 Search index models for LemonNPie Backend API
 """
-from sqlalchemy import Column, DateTime, ForeignKey, text, Text
+from sqlalchemy import Column, DDL, DateTime, ForeignKey, event, text, Text
 from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 
 from app.db.database import Base
+from app.models.movie import Movie
+from app.models.relationships import MovieCast
 
 
 class MovieSearchIndex(Base):
     __tablename__ = "movie_search_index"
     
     movie_id = Column(UUID(as_uuid=True), ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
-    # Use Text for SQLite compatibility, TSVECTOR for PostgreSQL in production
-    search_vector = Column(Text)
-    title_vector = Column(Text)
-    content_vector = Column(Text)
+    # Weighted tsvectors on PostgreSQL; plain document text elsewhere (see app.services.search_backends)
+    search_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"))
+    title_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"))
+    content_vector = Column(Text().with_variant(TSVECTOR(), "postgresql"))
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Relationships
     movie = relationship("Movie", back_populates="search_index")
     
     def __repr__(self):
-        return f"<MovieSearchIndex(movie_id={self.movie_id})>"
\ No newline at end of file
+        return f"<MovieSearchIndex(movie_id={self.movie_id})>"
+
+
+# GIN index for tsvector matching on PostgreSQL
+event.listen(
+    MovieSearchIndex.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS idx_movie_search_vector "
+        "ON movie_search_index USING GIN (search_vector)"
+    ).execute_if(dialect="postgresql")
+)
+
+# FTS5 mirror of the documents on SQLite, keyed by movie_search_index rowid
+event.listen(
+    MovieSearchIndex.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movie_search_fts USING fts5("
+        "titles, cast_names, credits, plot, tokenize = 'unicode61 remove_diacritics 2')"
+    ).execute_if(dialect="sqlite")
+)
+event.listen(
+    MovieSearchIndex.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS movie_search_fts").execute_if(dialect="sqlite")
+)
+
+# Trigram indexes for typo-tolerant name search on PostgreSQL
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+for _table, _column in (
+    (Movie.__table__, "title"),
+    (Movie.__table__, "local_title"),
+    (Movie.__table__, "director"),
+    (MovieCast.__table__, "actor_name"),
+):
+    event.listen(
+        _table,
+        "after_create",
+        DDL(
+            f"CREATE INDEX IF NOT EXISTS idx_{_table.name}_{_column}_trgm "
+            f"ON {_table.name} USING GIN ({_column} gin_trgm_ops)"
+        ).execute_if(dialect="postgresql")
+    )
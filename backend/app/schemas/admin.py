@@ -114,10 +114,11 @@ class ReviewModerationItem(BaseModel):
 class ReviewModerationResponse(BaseModel):
     """Paginated review moderation response"""
     reviews: List[ReviewModerationItem]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 class ModerationAction(BaseModel):
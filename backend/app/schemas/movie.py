@@ -93,6 +93,9 @@ class MovieListResponse(BaseModel):
     genres: List[str] = []
     stats: MovieStats
     created_at: datetime
+    # Set for signed-in viewers only
+    in_watchlist: Optional[bool] = None
+    is_favorite: Optional[bool] = None
 
     class Config:
         from_attributes = True
@@ -121,11 +124,30 @@ class MovieListRequest(BaseModel):
     sort_by: Optional[MovieSortBy] = None
 
 
+class MovieFacets(BaseModel):
+    """Movie counts per facet value for a result set, most common first"""
+    genre: Dict[str, int] = {}
+    language: Dict[str, int] = {}
+    decade: Dict[str, int] = {}
+    year: Dict[str, int] = {}
+    type: Dict[str, int] = {}
+    production_state: Dict[str, int] = {}
+
+
 class PaginatedMovieResponse(BaseModel):
     items: List[MovieListResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     limit: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+    next_cursor: Optional[str] = None
+    facets: Optional[MovieFacets] = None
+
+
+class MovieSearchResponse(BaseModel):
+    items: List[MovieListResponse]
+    facets: Optional[MovieFacets] = None
+    did_you_mean: Optional[str] = None
+    next_cursor: Optional[str] = None
\ No newline at end of file
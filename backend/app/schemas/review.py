@@ -142,12 +142,13 @@ class ReviewListRequest(BaseModel):
 class PaginatedReviewResponse(BaseModel):
     """Schema for paginated review response"""
     items: List[ReviewListResponse]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     limit: int
-    pages: int
+    pages: Optional[int] = None
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
 
 
 class ReviewStats(BaseModel):
@@ -137,11 +137,12 @@ class MovieListItem(BaseModel):
 class MovieListResponse(BaseModel):
     """Schema for movie list response with pagination"""
     movies: List[MovieListItem]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
     
     class Config:
         from_attributes = True
\ No newline at end of file
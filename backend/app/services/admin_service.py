@@ -14,6 +14,7 @@ from app.models.user import User
 from app.models.movie import Movie
 from app.models.review import Review
 from app.models.moderation import UserReport, Notification
+from app.models.analytics import UserActivity
 from app.models.relationships import UserFollow, UserWatchlist, UserFavorite, ReviewVote
 from app.models.enums import UserRole, ModerationStatus, VoteType
 from app.schemas.admin import (
@@ -21,7 +22,13 @@ from app.schemas.admin import (
     UserListItem, UserListResponse, ReviewModerationItem, ReviewModerationResponse,
     ReportItem, ReportListResponse, AnalyticsDateRange, AnalyticsFilter
 )
+from app.auth.principal import invalidate_principal
+from app.core.config import settings
 from app.core.exceptions import LemonPieException
+from app.db.pagination import KeysetPaginator
+from app.services.movie_stats_service import MovieStatsService, review_stats_snapshot
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.unique_counters import count_active_users, get_counter_client
 
 logger = structlog.get_logger(__name__)
 
@@ -31,6 +38,8 @@ class AdminService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.stats_service = MovieStatsService(db)
+        self.rollups = AnalyticsRollupService(db)
     
     async def get_system_metrics(self) -> SystemMetrics:
         """Get system-wide metrics for admin dashboard"""
@@ -284,6 +293,7 @@ class AdminService:
             user.updated_at = datetime.utcnow()
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             # Log the action
             logger.info(
@@ -316,6 +326,7 @@ class AdminService:
             user.updated_at = datetime.utcnow()
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             # Create notification for user
             notification = Notification(
@@ -358,6 +369,7 @@ class AdminService:
             user.updated_at = datetime.utcnow()
             
             await self.db.commit()
+            await invalidate_principal(user_id)
             
             # Create notification for user
             notification = Notification(
@@ -390,14 +402,22 @@ class AdminService:
         return result.scalar()
     
     async def _count_active_users(self, start_date: date, end_date: date) -> int:
-        """Count active users in date range"""
-        # Users who created reviews or logged in (simplified - would need login tracking)
+        """Count distinct signed-in users with any activity in date range"""
+        if not settings.ANALYTICS_EXACT_UNIQUES:
+            counters = await get_counter_client()
+            if counters is not None:
+                try:
+                    return await count_active_users(counters, start_date, end_date)
+                except Exception as e:
+                    logger.warning("Unique counters failed, using exact count", error=str(e))
+        
         result = await self.db.execute(
-            select(func.count(func.distinct(Review.user_id)))
+            select(func.count(func.distinct(UserActivity.user_id)))
             .where(
                 and_(
-                    Review.created_at >= start_date,
-                    Review.created_at <= end_date + timedelta(days=1)
+                    UserActivity.created_at >= start_date,
+                    UserActivity.created_at < end_date + timedelta(days=1),
+                    UserActivity.user_id.isnot(None)
                 )
             )
         )
@@ -447,31 +467,19 @@ class AdminService:
     
     async def _get_user_growth(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
         """Get user growth data"""
-        # Daily user registrations
-        query = text("""
-            SELECT DATE(created_at) as date, COUNT(*) as count
-            FROM users
-            WHERE DATE(created_at) BETWEEN :start_date AND :end_date
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-        
-        result = await self.db.execute(query, {"start_date": start_date, "end_date": end_date})
-        return [{"date": str(row.date), "count": row.count} for row in result.fetchall()]
+        # Daily user registrations (daily rollups for closed days)
+        new_users = await self.rollups.new_users_by_day(start_date, end_date)
+        return [{"date": str(day), "count": count} for day, count in new_users.items()]
     
     async def _get_user_activity(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
         """Get user activity patterns"""
-        # Daily review activity
-        query = text("""
-            SELECT DATE(created_at) as date, COUNT(*) as reviews, COUNT(DISTINCT user_id) as active_users
-            FROM reviews
-            WHERE DATE(created_at) BETWEEN :start_date AND :end_date
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-        
-        result = await self.db.execute(query, {"start_date": start_date, "end_date": end_date})
-        return [{"date": str(row.date), "reviews": row.reviews, "active_users": row.active_users} for row in result.fetchall()]
+        # Daily review activity (daily rollups for closed days)
+        review_days = await self.rollups.review_days(start_date, end_date)
+        return [
+            {"date": str(day), "reviews": count, "active_users": reviewers}
+            for day, (count, _, reviewers) in review_days.items()
+            if count
+        ]
     
     async def _get_role_distribution(self) -> Dict[str, int]:
         """Get user role distribution"""
@@ -546,22 +554,15 @@ class AdminService:
     
     async def _get_review_trends(self, start_date: date, end_date: date) -> List[Dict[str, Any]]:
         """Get review submission trends"""
-        query = text("""
-            SELECT DATE(created_at) as date, COUNT(*) as count, AVG(lemon_pie_rating) as avg_rating
-            FROM reviews
-            WHERE DATE(created_at) BETWEEN :start_date AND :end_date
-            GROUP BY DATE(created_at)
-            ORDER BY date
-        """)
-        
-        result = await self.db.execute(query, {"start_date": start_date, "end_date": end_date})
+        review_days = await self.rollups.review_days(start_date, end_date)
         return [
             {
-                "date": str(row.date),
-                "count": row.count,
-                "avg_rating": float(row.avg_rating) if row.avg_rating else 0
+                "date": str(day),
+                "count": count,
+                "avg_rating": rating_sum / count
             }
-            for row in result.fetchall()
+            for day, (count, rating_sum, _) in review_days.items()
+            if count
         ]
     
     async def _get_rating_distribution(self) -> Dict[int, int]:
@@ -650,9 +651,10 @@ class AdminService:
         status: Optional[ModerationStatus] = None,
         is_flagged: Optional[bool] = None,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        after: Optional[str] = None
     ) -> ReviewModerationResponse:
-        """Get reviews for moderation dashboard"""
+        """Get reviews for moderation dashboard (seekable with ``after``)"""
         try:
             # Build query
             query = select(Review).options(
@@ -672,28 +674,35 @@ class AdminService:
             if conditions:
                 query = query.where(and_(*conditions))
             
-            # Apply sorting
-            sort_column = getattr(Review, sort_by, Review.created_at)
-            if sort_order.lower() == "desc":
-                query = query.order_by(desc(sort_column))
-            else:
-                query = query.order_by(asc(sort_column))
-            
-            # Get total count
-            count_query = select(func.count(Review.id))
-            if conditions:
-                count_query = count_query.where(and_(*conditions))
-            
-            total_result = await self.db.execute(count_query)
-            total = total_result.scalar()
+            # Apply sorting; review id breaks ties
+            sort_column = Review.__table__.c.get(sort_by)
+            if sort_column is None:
+                sort_column = Review.__table__.c.created_at
+            sort_order = "desc" if sort_order.lower() == "desc" else "asc"
+            paginator = KeysetPaginator(
+                f"moderation_reviews:{sort_column.key}:{sort_order}",
+                sort_column,
+                Review.id,
+                descending=sort_order == "desc"
+            )
             
-            # Apply pagination
-            offset = (page - 1) * per_page
-            query = query.offset(offset).limit(per_page)
+            if after:
+                total = None
+                rows, next_cursor = await paginator.fetch_page(self.db, query, per_page, after=after)
+            else:
+                # Get total count
+                count_query = select(func.count(Review.id))
+                if conditions:
+                    count_query = count_query.where(and_(*conditions))
+                
+                total_result = await self.db.execute(count_query)
+                total = total_result.scalar()
+                
+                # Apply pagination
+                offset = (page - 1) * per_page
+                rows, next_cursor = await paginator.fetch_page(self.db, query, per_page, offset=offset)
             
-            # Execute query
-            result = await self.db.execute(query)
-            reviews = result.scalars().all()
+            reviews = [row[0] for row in rows]
             
             # Convert to response format
             review_items = []
@@ -712,6 +721,13 @@ class AdminService:
                     report_count=len(review.reports)
                 ))
             
+            if after:
+                return ReviewModerationResponse(
+                    reviews=review_items,
+                    per_page=per_page,
+                    next_cursor=next_cursor
+                )
+            
             total_pages = (total + per_page - 1) // per_page
             
             return ReviewModerationResponse(
@@ -719,8 +735,11 @@ class AdminService:
                 total=total,
                 page=page,
                 per_page=per_page,
-                total_pages=total_pages
+                total_pages=total_pages,
+                next_cursor=next_cursor
             )
+        except LemonPieException:
+            raise
         except Exception as e:
             logger.error("Failed to get reviews for moderation", error=str(e))
             raise LemonPieException("Failed to retrieve reviews for moderation", 500)
@@ -736,6 +755,7 @@ class AdminService:
                 raise LemonPieException("Review not found", 404)
             
             # Apply moderation action
+            stats_before = review_stats_snapshot(review)
             if action == "approve":
                 review.moderation_status = ModerationStatus.APPROVED
                 review.is_flagged = False
@@ -747,8 +767,14 @@ class AdminService:
                 raise LemonPieException("Invalid moderation action", 400)
             
             review.updated_at = datetime.utcnow()
+            stats_changed = await self.stats_service.record_review_change(
+                review.movie_id, stats_before, review_stats_snapshot(review)
+            )
             await self.db.commit()
             
+            if stats_changed:
+                await self.stats_service.invalidate_cached_stats([review.movie_id])
+            
             # Create notification for review author if rejected
             if action == "reject":
                 notification = Notification(
@@ -788,9 +814,11 @@ class AdminService:
                 raise LemonPieException("No reviews found", 404)
             
             moderated_count = 0
+            changed_movie_ids = set()
             
             # Apply moderation action to each review
             for review in reviews:
+                stats_before = review_stats_snapshot(review)
                 if action == "approve":
                     review.moderation_status = ModerationStatus.APPROVED
                     review.is_flagged = False
@@ -804,6 +832,11 @@ class AdminService:
                 review.updated_at = datetime.utcnow()
                 moderated_count += 1
                 
+                if await self.stats_service.record_review_change(
+                    review.movie_id, stats_before, review_stats_snapshot(review)
+                ):
+                    changed_movie_ids.add(review.movie_id)
+                
                 # Create notification for review author if rejected
                 if action == "reject":
                     notification = Notification(
@@ -817,6 +850,9 @@ class AdminService:
             
             await self.db.commit()
             
+            if changed_movie_ids:
+                await self.stats_service.invalidate_cached_stats(changed_movie_ids)
+            
             logger.info(
                 "Bulk review moderation completed",
                 review_count=moderated_count,
@@ -0,0 +1,430 @@
+"""
+Buffered analytics ingestion for LemonNPie Backend API
+
+Request handlers hand analytics rows to an in-memory bounded queue and return
+immediately; a background flusher writes them with one multi-row INSERT per
+table every ANALYTICS_FLUSH_INTERVAL_MS or ANALYTICS_FLUSH_BATCH_SIZE events.
+When the queue is full new events are dropped and counted rather than making
+requests wait on the database.
+
+With ANALYTICS_SINK=stream the flusher appends batches to a Redis Stream
+instead, and analytics_worker.py consumers write them to the database (see
+app.services.analytics_stream).
+"""
+import asyncio
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, insert, select
+import structlog
+
+from app.core.config import settings
+from app.db import database
+from app.models.analytics import ContentMetrics, SystemMetrics, UserActivity, UserEngagementMetrics
+from app.services.unique_counters import get_counter_client, record_unique_visitors
+
+logger = structlog.get_logger(__name__)
+
+# Event kinds and the table each is written to
+ACTIVITY = "activity"
+SYSTEM_METRIC = "system_metric"
+CONTENT_METRIC = "content_metric"
+# Counter deltas, summed per (content, metric) before becoming content_metrics rows
+CONTENT_INCREMENT = "content_increment"
+
+SINK_DATABASE = "database"
+SINK_STREAM = "stream"
+
+EVENT_TABLES = {
+    ACTIVITY: UserActivity,
+    SYSTEM_METRIC: SystemMetrics,
+    CONTENT_METRIC: ContentMetrics,
+}
+
+# Counters of a UserEngagementMetrics row
+ENGAGEMENT_FIELDS = (
+    "session_count",
+    "pages_viewed",
+    "movies_viewed",
+    "reviews_written",
+    "reviews_voted",
+    "social_interactions",
+)
+
+# Log the first drop and then every Nth, so a flood does not flood the logs too
+DROP_LOG_EVERY = 1000
+
+
+def engagement_increments(activity_type: str) -> Dict[str, int]:
+    """Engagement counters bumped by one activity of the given type"""
+    if activity_type == "login":
+        return {"session_count": 1}
+    if activity_type == "view_movie":
+        return {"movies_viewed": 1, "pages_viewed": 1}
+    if activity_type == "write_review":
+        return {"reviews_written": 1}
+    if activity_type == "vote_review":
+        return {"reviews_voted": 1}
+    if activity_type in ["follow_user", "unfollow_user"]:
+        return {"social_interactions": 1}
+    return {"pages_viewed": 1}
+
+
+def _id(value: Optional[Any]) -> Optional[str]:
+    """Analytics tables store ids as strings"""
+    return str(value) if value is not None else None
+
+
+class AnalyticsIngestQueue:
+    """Bounded in-memory queue of analytics rows with a batching background flusher"""
+
+    def __init__(
+        self,
+        max_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_ms: int = 500,
+        sink: str = SINK_DATABASE
+    ):
+        if sink not in (SINK_DATABASE, SINK_STREAM):
+            raise ValueError(f"Unknown analytics sink '{sink}'")
+
+        self.max_size = max_size
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.batches = 0
+        self.flush_errors = 0
+        self.failed = 0
+        self.last_flush_ms = 0.0
+
+    # Producers
+    def track_user_activity(
+        self,
+        user_id: Optional[UUID],
+        activity_type: str,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[UUID] = None,
+        extra_data: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> bool:
+        """Queue a user activity row; returns False if it was dropped"""
+        return self._enqueue(ACTIVITY, {
+            "id": str(uuid4()),
+            "user_id": _id(user_id),
+            "session_id": session_id,
+            "activity_type": activity_type,
+            "resource_type": resource_type,
+            "resource_id": _id(resource_id),
+            "extra_data": extra_data,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "created_at": datetime.utcnow(),
+        })
+
+    def track_system_metric(
+        self,
+        metric_name: str,
+        metric_value: float,
+        metric_unit: Optional[str] = None,
+        component: Optional[str] = None,
+        extra_data: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Queue a system metric row; returns False if it was dropped"""
+        return self._enqueue(SYSTEM_METRIC, {
+            "id": str(uuid4()),
+            "metric_name": metric_name,
+            "metric_value": metric_value,
+            "metric_unit": metric_unit,
+            "component": component,
+            "extra_data": extra_data,
+            "timestamp": datetime.utcnow(),
+        })
+
+    def track_content_metric(
+        self,
+        content_type: str,
+        content_id: UUID,
+        metric_type: str,
+        metric_value: float = 1.0,
+        extra_data: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Queue a content metric row; returns False if it was dropped"""
+        return self._enqueue(CONTENT_METRIC, {
+            "id": str(uuid4()),
+            "content_type": content_type,
+            "content_id": _id(content_id),
+            "metric_type": metric_type,
+            "metric_value": metric_value,
+            "extra_data": extra_data,
+            "date": datetime.utcnow(),
+        })
+
+    def increment_content_metric(
+        self,
+        content_type: str,
+        content_id: UUID,
+        metric_type: str,
+        increment: float = 1.0
+    ) -> bool:
+        """Queue a counter delta; deltas for the same metric are summed on write"""
+        return self._enqueue(CONTENT_INCREMENT, {
+            "content_type": content_type,
+            "content_id": _id(content_id),
+            "metric_type": metric_type,
+            "metric_value": increment,
+            "date": datetime.utcnow(),
+        })
+
+    def _enqueue(self, kind: str, row: Dict[str, Any]) -> bool:
+        """Add an event without waiting; drop it if the queue is full or closing"""
+        if self._stopping:
+            self._record_drop(kind)
+            return False
+
+        try:
+            self.queue.put_nowait((kind, row))
+        except asyncio.QueueFull:
+            self._record_drop(kind)
+            return False
+
+        self.enqueued += 1
+        if self.queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _record_drop(self, kind: str) -> None:
+        self.dropped += 1
+        if self.dropped % DROP_LOG_EVERY == 1:
+            logger.warning(
+                "Analytics queue full, dropping events",
+                kind=kind,
+                dropped=self.dropped,
+                queue_depth=self.queue.qsize()
+            )
+
+    # Flusher
+    def start(self) -> None:
+        """Start the background flusher"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting events and flush everything still queued"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                logger.warning("Analytics flusher did not drain in time", queue_depth=self.queue.qsize())
+            self._task = None
+
+    async def _run(self) -> None:
+        """Flush every interval, or sooner once a full batch is waiting"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+        # Drain what arrived before shutdown
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write every queued event in batches; returns the number written"""
+        written = 0
+        while not self.queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            written += await self._write_batch(batch)
+        return written
+
+    async def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Hand one batch to the configured sink"""
+        started = time.perf_counter()
+        try:
+            if self.sink == SINK_STREAM:
+                await self._publish_batch(batch)
+            else:
+                async with database.async_session_maker() as db:
+                    await write_analytics_batch(db, batch)
+                    await db.commit()
+        except Exception as e:
+            self.flush_errors += 1
+            self.failed += len(batch)
+            logger.error("Analytics batch write failed", sink=self.sink, events=len(batch), error=str(e))
+            return 0
+
+        self.batches += 1
+        self.flushed += len(batch)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(batch)
+
+    async def _publish_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """Append a batch to the event stream, writing it directly if Redis is unavailable"""
+        from app.services.analytics_stream import publish_events
+        from app.cache.redis import get_redis
+
+        try:
+            await publish_events(await get_redis(), batch)
+        except Exception as e:
+            logger.warning("Analytics stream unavailable, writing batch directly", error=str(e))
+            async with database.async_session_maker() as db:
+                await write_analytics_batch(db, batch)
+                await db.commit()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Queue depth and counters for the performance endpoints"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "flush_errors": self.flush_errors,
+            "failed": self.failed,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+async def write_analytics_batch(db, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Write a batch of analytics events with one multi-row INSERT per table
+
+    Content counter deltas are summed per metric first, and activities are
+    folded into the per-user daily engagement rows and the unique-visitor
+    counters. The caller commits.
+    """
+    rows_by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    increments: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    for kind, row in batch:
+        if kind != CONTENT_INCREMENT:
+            rows_by_kind[kind].append(row)
+            continue
+
+        key = (row["content_type"], row["content_id"], row["metric_type"])
+        total = increments.get(key)
+        if total is None:
+            increments[key] = dict(row, id=str(uuid4()), extra_data=None)
+        else:
+            total["metric_value"] += row["metric_value"]
+            total["date"] = max(total["date"], row["date"])
+    rows_by_kind[CONTENT_METRIC].extend(increments.values())
+
+    for kind, rows in rows_by_kind.items():
+        if rows:
+            await db.execute(insert(EVENT_TABLES[kind]).values(rows))
+
+    if rows_by_kind.get(ACTIVITY):
+        await update_engagement_metrics(db, rows_by_kind[ACTIVITY])
+        await update_unique_counters(rows_by_kind[ACTIVITY])
+
+
+async def update_unique_counters(activities: List[Dict[str, Any]]) -> None:
+    """Add a batch's users and movie viewers to the HyperLogLog counters (best effort)"""
+    redis_client = await get_counter_client()
+    if redis_client is None:
+        return
+    try:
+        await record_unique_visitors(redis_client, activities)
+    except Exception as e:
+        logger.warning("Failed to update unique counters", error=str(e))
+
+
+async def update_engagement_metrics(db, activities: List[Dict[str, Any]]) -> None:
+    """Fold a batch of activities into the per-user daily engagement rows"""
+    increments: Dict[Tuple[str, date], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    last_activity: Dict[Tuple[str, date], datetime] = {}
+    for activity in activities:
+        if activity["user_id"] is None:
+            continue
+        key = (activity["user_id"], activity["created_at"].date())
+        for field, amount in engagement_increments(activity["activity_type"]).items():
+            increments[key][field] += amount
+        last_activity[key] = max(last_activity.get(key, activity["created_at"]), activity["created_at"])
+
+    if not increments:
+        return
+
+    for day in {day for _, day in increments}:
+        user_ids = [user_id for user_id, key_day in increments if key_day == day]
+        result = await db.execute(
+            select(UserEngagementMetrics).where(
+                UserEngagementMetrics.user_id.in_(user_ids),
+                func.date(UserEngagementMetrics.date) == day
+            )
+        )
+        existing = {row.user_id: row for row in result.scalars().all()}
+
+        new_rows = []
+        for user_id in user_ids:
+            key = (user_id, day)
+            engagement = existing.get(user_id)
+            if engagement is None:
+                new_rows.append({
+                    "id": str(uuid4()),
+                    "user_id": user_id,
+                    "date": last_activity[key],
+                    "last_activity": last_activity[key],
+                    **{field: increments[key].get(field, 0) for field in ENGAGEMENT_FIELDS},
+                })
+                continue
+
+            for field, amount in increments[key].items():
+                setattr(engagement, field, (getattr(engagement, field) or 0) + amount)
+            engagement.last_activity = last_activity[key]
+
+        if new_rows:
+            await db.execute(insert(UserEngagementMetrics).values(new_rows))
+
+
+# Global ingestion queue, created during application startup
+analytics_queue: Optional[AnalyticsIngestQueue] = None
+
+
+async def init_analytics_ingest() -> None:
+    """Create the ingestion queue and start its flusher"""
+    global analytics_queue
+
+    analytics_queue = AnalyticsIngestQueue(
+        max_size=settings.ANALYTICS_QUEUE_MAX_SIZE,
+        batch_size=settings.ANALYTICS_FLUSH_BATCH_SIZE,
+        flush_interval_ms=settings.ANALYTICS_FLUSH_INTERVAL_MS,
+        sink=settings.ANALYTICS_SINK
+    )
+    analytics_queue.start()
+    logger.info("Analytics ingestion started", sink=settings.ANALYTICS_SINK)
+
+
+async def close_analytics_ingest() -> None:
+    """Flush queued events and stop the flusher"""
+    global analytics_queue
+
+    if analytics_queue:
+        await analytics_queue.stop(timeout=settings.ANALYTICS_DRAIN_TIMEOUT)
+        logger.info("Analytics ingestion drained", **analytics_queue.get_statistics())
+        analytics_queue = None
+
+
+def get_analytics_queue() -> Optional[AnalyticsIngestQueue]:
+    """Get the ingestion queue (None before startup or after shutdown)"""
+    return analytics_queue
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Union
 from uuid import UUID
 from io import StringIO
+import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc, asc, text
 from sqlalchemy.orm import selectinload
@@ -14,13 +15,16 @@ from sqlalchemy.orm import selectinload
 from app.models.analytics import (
     UserActivity,
     ContentMetrics,
-    SystemMetrics,
     AnalyticsReport,
     UserEngagementMetrics
 )
 from app.models.user import User
 from app.models.movie import Movie
 from app.models.review import Review
+from app.services.analytics_rollup_service import AnalyticsRollupService, MetricAggregate
+from app.services.latency_sketch import load_latency_sketches, merge_sketches
+from app.services.unique_counters import count_active_users, count_movie_viewers, get_counter_client
+from app.core.config import settings
 from app.schemas.analytics import (
     UserEngagementReport,
     ContentPopularityReport,
@@ -28,17 +32,21 @@ from app.schemas.analytics import (
     AnalyticsDashboard
 )
 
+logger = structlog.get_logger(__name__)
+
 
 class AnalyticsReportingService:
     """Service for generating analytics reports and insights"""
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.rollups = AnalyticsRollupService(db)
     
     async def generate_user_engagement_report(
         self,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        exact_uniques: Optional[bool] = None
     ) -> UserEngagementReport:
         """Generate comprehensive user engagement report"""
         if not start_date:
@@ -54,15 +62,7 @@ class AnalyticsReportingService:
         total_users = total_users_result.scalar()
         
         # Active users (users with activity in the period)
-        active_users_stmt = select(func.count(func.distinct(UserActivity.user_id))).where(
-            and_(
-                UserActivity.created_at >= start_date,
-                UserActivity.created_at <= end_date,
-                UserActivity.user_id.isnot(None)
-            )
-        )
-        active_users_result = await self.db.execute(active_users_stmt)
-        active_users = active_users_result.scalar() or 0
+        active_users = await self._count_active_users(start_date, end_date, exact_uniques)
         
         # New users in period
         new_users_stmt = select(func.count(User.id)).where(
@@ -106,44 +106,16 @@ class AnalyticsReportingService:
         avg_session_result = await self.db.execute(avg_session_stmt)
         avg_session_duration = avg_session_result.scalar() or 0.0
         
-        # Top activities
-        top_activities_stmt = select(
-            UserActivity.activity_type,
-            func.count(UserActivity.id).label("count")
-        ).where(
-            and_(
-                UserActivity.created_at >= start_date,
-                UserActivity.created_at <= end_date
-            )
-        ).group_by(UserActivity.activity_type).order_by(desc("count")).limit(10)
-        
-        top_activities_result = await self.db.execute(top_activities_stmt)
+        # Top activities (hourly rollups, raw rows for the open tail)
+        activity_counts = await self.rollups.activity_counts(start_date, end_date)
         top_activities = [
-            {"activity_type": row.activity_type, "count": row.count}
-            for row in top_activities_result.fetchall()
+            {"activity_type": activity_type, "count": count}
+            for activity_type, count in sorted(activity_counts.items(), key=lambda item: item[1], reverse=True)[:10]
         ]
         
-        # Daily engagement trends
-        daily_trends_stmt = select(
-            func.date(UserActivity.created_at).label("date"),
-            func.count(func.distinct(UserActivity.user_id)).label("active_users"),
-            func.count(UserActivity.id).label("total_activities")
-        ).where(
-            and_(
-                UserActivity.created_at >= start_date,
-                UserActivity.created_at <= end_date,
-                UserActivity.user_id.isnot(None)
-            )
-        ).group_by(func.date(UserActivity.created_at)).order_by(func.date(UserActivity.created_at))
-        
-        daily_trends_result = await self.db.execute(daily_trends_stmt)
-        engagement_trends = {}
-        for row in daily_trends_result.fetchall():
-            date_str = row.date.isoformat()
-            engagement_trends[date_str] = {
-                "active_users": row.active_users,
-                "total_activities": row.total_activities
-            }
+        # Daily engagement trends (daily active user rollups for closed days)
+        daily_activity = await self.rollups.daily_activity(start_date, end_date)
+        engagement_trends = {day.isoformat(): values for day, values in daily_activity.items()}
         
         return UserEngagementReport(
             period={
@@ -162,7 +134,8 @@ class AnalyticsReportingService:
     async def generate_content_popularity_report(
         self,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        exact_uniques: Optional[bool] = None
     ) -> ContentPopularityReport:
         """Generate content popularity and performance report"""
         if not start_date:
@@ -234,7 +207,6 @@ class AnalyticsReportingService:
                 m.id,
                 m.title,
                 m.release_date,
-                COUNT(DISTINCT ua.user_id) as unique_viewers,
                 COUNT(ua.id) as total_interactions
             FROM movies m
             JOIN user_activities ua ON m.id = ua.resource_id 
@@ -243,7 +215,7 @@ class AnalyticsReportingService:
                 AND ua.created_at <= :end_date
             GROUP BY m.id, m.title, m.release_date
             HAVING COUNT(ua.id) > 5
-            ORDER BY total_interactions DESC, unique_viewers DESC
+            ORDER BY total_interactions DESC
             LIMIT 10
         """)
         recent_start = end_date - timedelta(days=7)  # Last 7 days for trending
@@ -251,41 +223,36 @@ class AnalyticsReportingService:
             "recent_start": recent_start,
             "end_date": end_date
         })
+        trending_rows = trending_result.fetchall()
+        unique_viewers = await self._count_movie_viewers(
+            [str(row.id) for row in trending_rows], recent_start, end_date, exact_uniques
+        )
         trending_content = [
             {
                 "id": str(row.id),
                 "title": row.title,
                 "release_date": row.release_date.isoformat() if row.release_date else None,
-                "unique_viewers": row.unique_viewers,
+                "unique_viewers": unique_viewers.get(str(row.id), 0),
                 "total_interactions": row.total_interactions
             }
-            for row in trending_result.fetchall()
+            for row in trending_rows
         ]
         
         # Content engagement rates (reviews per view)
-        engagement_rates_stmt = text("""
-            SELECT 
-                'movies' as content_type,
-                COALESCE(
-                    COUNT(DISTINCT r.id) * 100.0 / NULLIF(SUM(CASE WHEN cm.metric_type = 'views' THEN cm.metric_value ELSE 0 END), 0),
-                    0
-                ) as engagement_rate
-            FROM movies m
-            LEFT JOIN reviews r ON m.id = r.movie_id 
-                AND r.created_at >= :start_date 
-                AND r.created_at <= :end_date
-            LEFT JOIN content_metrics cm ON m.id = cm.content_id 
-                AND cm.content_type = 'movie'
-                AND cm.date >= :start_date 
-                AND cm.date <= :end_date
-        """)
-        engagement_rates_result = await self.db.execute(engagement_rates_stmt, {
-            "start_date": start_date,
-            "end_date": end_date
-        })
-        content_engagement_rates = {}
-        for row in engagement_rates_result.fetchall():
-            content_engagement_rates[row.content_type] = float(row.engagement_rate)
+        review_count = await self.rollups.review_count(start_date, end_date)
+        views_stmt = select(func.sum(ContentMetrics.metric_value)).where(
+            and_(
+                ContentMetrics.content_type == "movie",
+                ContentMetrics.metric_type == "views",
+                ContentMetrics.date >= start_date,
+                ContentMetrics.date <= end_date
+            )
+        )
+        views_result = await self.db.execute(views_stmt)
+        total_views = views_result.scalar() or 0
+        content_engagement_rates = {
+            "movies": review_count * 100.0 / total_views if total_views else 0.0
+        }
         
         return ContentPopularityReport(
             period={
@@ -310,73 +277,44 @@ class AnalyticsReportingService:
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Component health metrics
-        component_health_stmt = select(
-            SystemMetrics.component,
-            SystemMetrics.metric_name,
-            func.avg(SystemMetrics.metric_value).label("average"),
-            func.min(SystemMetrics.metric_value).label("minimum"),
-            func.max(SystemMetrics.metric_value).label("maximum")
-        ).where(
-            and_(
-                SystemMetrics.timestamp >= start_date,
-                SystemMetrics.timestamp <= end_date,
-                SystemMetrics.component.isnot(None)
-            )
-        ).group_by(SystemMetrics.component, SystemMetrics.metric_name)
+        # Hourly metric rollups merged with raw samples for the open tail
+        summary = await self.rollups.system_metric_summary(start_date, end_date)
         
-        component_health_result = await self.db.execute(component_health_stmt)
+        # Component health metrics
         component_health = {}
-        for row in component_health_result.fetchall():
-            if row.component not in component_health:
-                component_health[row.component] = {}
-            component_health[row.component][row.metric_name] = {
-                "average": float(row.average),
-                "minimum": float(row.minimum),
-                "maximum": float(row.maximum)
-            }
-        
-        # Performance metrics summary
-        performance_stmt = select(
-            SystemMetrics.metric_name,
-            func.avg(SystemMetrics.metric_value).label("average"),
-            func.percentile_cont(0.95).within_group(SystemMetrics.metric_value).label("p95"),
-            func.percentile_cont(0.99).within_group(SystemMetrics.metric_value).label("p99")
-        ).where(
-            and_(
-                SystemMetrics.timestamp >= start_date,
-                SystemMetrics.timestamp <= end_date
-            )
-        ).group_by(SystemMetrics.metric_name)
+        components = {}
+        metrics = {}
+        for (metric_name, component, endpoint), aggregate in summary.items():
+            if endpoint:
+                continue
+            metrics.setdefault(metric_name, MetricAggregate()).merge_aggregate(aggregate)
+            if not component:
+                continue
+            components.setdefault(component, MetricAggregate()).merge_aggregate(aggregate)
+            component_health.setdefault(component, {}).update({
+                f"{metric_name}_average": aggregate.average,
+                f"{metric_name}_minimum": aggregate.minimum,
+                f"{metric_name}_maximum": aggregate.maximum
+            })
         
-        performance_result = await self.db.execute(performance_stmt)
-        performance_metrics = {}
-        for row in performance_result.fetchall():
-            performance_metrics[row.metric_name] = {
-                "average": float(row.average),
-                "p95": float(row.p95) if row.p95 else 0.0,
-                "p99": float(row.p99) if row.p99 else 0.0
+        # Performance metrics summary (histogram percentile estimates, refined below for request latency)
+        performance_metrics = {
+            metric_name: {
+                "average": aggregate.average,
+                "p95": aggregate.quantile(0.95),
+                "p99": aggregate.quantile(0.99)
             }
+            for metric_name, aggregate in metrics.items()
+        }
         
-        # Error rates (from system metrics with success=false)
-        error_rates_stmt = text("""
-            SELECT 
-                component,
-                COUNT(CASE WHEN extra_data->>'success' = 'false' THEN 1 END) * 100.0 / COUNT(*) as error_rate
-            FROM system_metrics 
-            WHERE timestamp >= :start_date 
-                AND timestamp <= :end_date 
-                AND extra_data IS NOT NULL
-                AND component IS NOT NULL
-            GROUP BY component
-        """)
-        error_rates_result = await self.db.execute(error_rates_stmt, {
-            "start_date": start_date,
-            "end_date": end_date
-        })
-        error_rates = {}
-        for row in error_rates_result.fetchall():
-            error_rates[row.component] = float(row.error_rate)
+        # Request latency percentiles from the merged per-minute sketches
+        latency = merge_sketches((await load_latency_sketches(self.db, start_date, end_date)).values())
+        if latency is not None:
+            performance_metrics.setdefault("response_time", {"average": latency.average})
+            performance_metrics["response_time"].update(latency.quantiles())
+        
+        # Error rates (failed or 5xx samples per component)
+        error_rates = {component: aggregate.error_rate for component, aggregate in components.items()}
         
         # Calculate overall health score (0-100)
         # Based on response times, error rates, and system availability
@@ -411,6 +349,66 @@ class AnalyticsReportingService:
             uptime_percentage=uptime_percentage
         )
     
+    def _use_exact_uniques(self, exact_uniques: Optional[bool]) -> bool:
+        return settings.ANALYTICS_EXACT_UNIQUES if exact_uniques is None else exact_uniques
+    
+    async def _count_active_users(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        exact_uniques: Optional[bool] = None
+    ) -> int:
+        """Distinct signed-in users with activity in the period (HyperLogLog estimate unless exact)"""
+        if not self._use_exact_uniques(exact_uniques):
+            counters = await get_counter_client()
+            if counters is not None:
+                try:
+                    return await count_active_users(counters, start_date.date(), end_date.date())
+                except Exception as e:
+                    logger.warning("Unique counters failed, using exact count", error=str(e))
+        
+        active_users_stmt = select(func.count(func.distinct(UserActivity.user_id))).where(
+            and_(
+                UserActivity.created_at >= start_date,
+                UserActivity.created_at <= end_date,
+                UserActivity.user_id.isnot(None)
+            )
+        )
+        active_users_result = await self.db.execute(active_users_stmt)
+        return active_users_result.scalar() or 0
+    
+    async def _count_movie_viewers(
+        self,
+        movie_ids: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        exact_uniques: Optional[bool] = None
+    ) -> Dict[str, int]:
+        """Distinct viewers of each movie in the period (HyperLogLog estimate unless exact)"""
+        if not movie_ids:
+            return {}
+        if not self._use_exact_uniques(exact_uniques):
+            counters = await get_counter_client()
+            if counters is not None:
+                try:
+                    return await count_movie_viewers(counters, movie_ids, start_date.date(), end_date.date())
+                except Exception as e:
+                    logger.warning("Unique counters failed, using exact count", error=str(e))
+        
+        viewers_stmt = select(
+            UserActivity.resource_id,
+            func.count(func.distinct(UserActivity.user_id)).label("unique_viewers")
+        ).where(
+            and_(
+                UserActivity.resource_type == "movie",
+                UserActivity.resource_id.in_(movie_ids),
+                UserActivity.created_at >= start_date,
+                UserActivity.created_at <= end_date
+            )
+        ).group_by(UserActivity.resource_id)
+        viewers_result = await self.db.execute(viewers_stmt)
+        return {row.resource_id: row.unique_viewers for row in viewers_result.fetchall()}
+    
     async def generate_dashboard_data(
         self,
         start_date: Optional[datetime] = None,
@@ -0,0 +1,626 @@
+"""
+Analytics rollup service for LemonNPie Backend API
+
+An incremental job folds closed hours and days of the raw user_activities,
+system_metrics, users and reviews tables into rollup tables. Each rollup keeps
+a watermark (the end of the last period it processed) so every period is
+aggregated exactly once. Periods close ANALYTICS_ROLLUP_LAG_SECONDS after they
+end, to let buffered analytics events land; rows arriving later than that are
+not reflected in the rollups.
+
+Reports read rollups for the closed part of a range and the raw tables only
+for the still-open tail and any partial period at the head of the range.
+"""
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import and_, delete, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.core.config import settings
+from app.models.analytics import SystemMetrics, UserActivity
+from app.models.analytics_rollups import (
+    ActivityRollup,
+    ActiveUserRollup,
+    SystemMetricRollup,
+    ReviewRollup,
+    RollupWatermark
+)
+from app.models.review import Review
+from app.models.user import User
+
+logger = structlog.get_logger(__name__)
+
+HOUR = "hour"
+DAY = "day"
+
+# Rollup names, as stored in rollup_watermarks
+ROLLUP_ACTIVITY_HOURLY = "activity_hourly"
+ROLLUP_SYSTEM_METRICS_HOURLY = "system_metrics_hourly"
+ROLLUP_ACTIVE_USERS_DAILY = "active_users_daily"
+ROLLUP_REVIEWS_DAILY = "reviews_daily"
+
+# Upper bounds (ms) of the histogram buckets; a final bucket holds the rest
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# UUID or numeric path segments, replaced so one route maps to one endpoint
+ID_SEGMENT = re.compile(
+    r"/(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)(?=/|$)"
+)
+
+MetricKey = Tuple[str, str, str]  # (metric_name, component, endpoint)
+DateRange = Tuple[datetime, datetime]
+
+
+def period_length(granularity: str) -> timedelta:
+    return timedelta(hours=1) if granularity == HOUR else timedelta(days=1)
+
+
+def floor_period(value: datetime, granularity: str) -> datetime:
+    """Start of the hour or day containing value"""
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value if granularity == HOUR else value.replace(hour=0)
+
+
+def ceil_period(value: datetime, granularity: str) -> datetime:
+    """Start of the first whole hour or day at or after value"""
+    floored = floor_period(value, granularity)
+    return floored if floored == value else floored + period_length(granularity)
+
+
+def naive_utc(value: Any) -> Optional[datetime]:
+    """Database timestamps as naive UTC datetimes, the form the app works in"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, dt_time.min)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def as_date(value: Any) -> date:
+    """DATE() results are strings on SQLite and dates on PostgreSQL"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def metric_endpoint(extra_data: Optional[Dict[str, Any]]) -> str:
+    """Route of a request metric ("" for metrics not tied to an endpoint)"""
+    if not extra_data:
+        return ""
+    endpoint = extra_data.get("route") or extra_data.get("endpoint")
+    return ID_SEGMENT.sub("/{id}", endpoint)[:255] if endpoint else ""
+
+
+def is_error_metric(extra_data: Optional[Dict[str, Any]]) -> bool:
+    """Whether a metric sample records a failed operation"""
+    if not extra_data:
+        return False
+    if str(extra_data.get("success")).lower() == "false":
+        return True
+    status_code = extra_data.get("status_code")
+    return isinstance(status_code, int) and status_code >= 500
+
+
+class MetricAggregate:
+    """Count, sum, min, max, errors and bucket histogram of a metric; mergeable"""
+
+    __slots__ = ("count", "total", "minimum", "maximum", "errors", "histogram")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.errors = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, value: float, error: bool = False) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.errors += int(error)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+
+    def merge(self, count: int, total: float, minimum: Optional[float], maximum: Optional[float],
+              errors: int, histogram: List[int]) -> None:
+        if not count:
+            return
+        self.count += count
+        self.total += total
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+        self.errors += errors
+        for index, bucket_count in enumerate(histogram[:len(self.histogram)]):
+            self.histogram[index] += bucket_count
+
+    def merge_aggregate(self, other: "MetricAggregate") -> None:
+        self.merge(other.count, other.total, other.minimum, other.maximum, other.errors, other.histogram)
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors * 100.0 / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating linearly inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.histogram):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = LATENCY_BUCKETS_MS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.maximum
+                lower, upper = max(lower, self.minimum), min(upper, self.maximum)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.maximum
+
+
+class AnalyticsRollupService:
+    """Maintains the analytics rollup tables and answers range queries from them"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # Incremental rollup job
+    async def run(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Roll up every period closed since each rollup's watermark; returns periods processed"""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+        rollups = (
+            (ROLLUP_ACTIVITY_HOURLY, HOUR, [UserActivity.created_at], self._rollup_activity),
+            (ROLLUP_SYSTEM_METRICS_HOURLY, HOUR, [SystemMetrics.timestamp], self._rollup_system_metrics),
+            (ROLLUP_ACTIVE_USERS_DAILY, DAY, [UserActivity.created_at, User.created_at], self._rollup_active_users),
+            (ROLLUP_REVIEWS_DAILY, DAY, [Review.created_at], self._rollup_reviews),
+        )
+
+        processed = {}
+        for name, granularity, source_columns, rollup in rollups:
+            processed[name] = await self._run_rollup(name, granularity, source_columns, rollup, cutoff)
+        return processed
+
+    async def _run_rollup(
+        self,
+        name: str,
+        granularity: str,
+        source_columns: List[Any],
+        rollup: Callable[[datetime, datetime], Any],
+        cutoff: datetime
+    ) -> int:
+        """Process closed periods from the watermark on, at most ANALYTICS_ROLLUP_MAX_PERIODS per run"""
+        step = period_length(granularity)
+        closed_until = floor_period(cutoff, granularity)
+        start = await self.get_watermark(name)
+        if start is None:
+            # First run: start from the oldest raw row
+            earliest = await self._earliest(source_columns)
+            start = floor_period(earliest, granularity) if earliest else closed_until
+
+        end = min(closed_until, start + step * settings.ANALYTICS_ROLLUP_MAX_PERIODS)
+        if end <= start:
+            await self._set_watermark(name, start)
+            await self.db.commit()
+            return 0
+
+        try:
+            await rollup(start, end)
+            await self._set_watermark(name, end)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error("Analytics rollup failed", rollup=name, start=start.isoformat(), error=str(e))
+            raise
+
+        periods = int((end - start) / step)
+        logger.info("Analytics rollup complete", rollup=name, periods=periods, processed_until=end.isoformat())
+        return periods
+
+    async def get_watermark(self, name: str) -> Optional[datetime]:
+        """End of the last period a rollup has processed (None before its first run)"""
+        watermark = await self.db.get(RollupWatermark, name)
+        return naive_utc(watermark.processed_until) if watermark else None
+
+    async def _set_watermark(self, name: str, processed_until: datetime) -> None:
+        watermark = await self.db.get(RollupWatermark, name)
+        if watermark is None:
+            self.db.add(RollupWatermark(name=name, processed_until=processed_until))
+        else:
+            watermark.processed_until = processed_until
+
+    async def _earliest(self, columns: List[Any]) -> Optional[datetime]:
+        values = []
+        for column in columns:
+            result = await self.db.execute(select(func.min(column)))
+            values.append(naive_utc(result.scalar()))
+        values = [value for value in values if value is not None]
+        return min(values) if values else None
+
+    def _hour_bucket(self, column):
+        """SQL expression truncating a timestamp to the hour"""
+        if self.db.get_bind().dialect.name == "postgresql":
+            return func.date_trunc(literal_column("'hour'"), column)
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+
+    async def _rollup_activity(self, start: datetime, end: datetime) -> None:
+        bucket = self._hour_bucket(UserActivity.created_at)
+        result = await self.db.execute(
+            select(
+                bucket.label("period_start"),
+                UserActivity.activity_type,
+                func.count(UserActivity.id).label("event_count"),
+                func.count(func.distinct(UserActivity.user_id)).label("unique_users")
+            )
+            .where(and_(UserActivity.created_at >= start, UserActivity.created_at < end))
+            .group_by(bucket, UserActivity.activity_type)
+        )
+        rows = [
+            {
+                "id": str(uuid4()),
+                "granularity": HOUR,
+                "period_start": naive_utc(row.period_start),
+                "activity_type": row.activity_type,
+                "event_count": row.event_count,
+                "unique_users": row.unique_users,
+            }
+            for row in result.fetchall()
+        ]
+
+        await self.db.execute(
+            delete(ActivityRollup).where(and_(
+                ActivityRollup.granularity == HOUR,
+                ActivityRollup.period_start >= start,
+                ActivityRollup.period_start < end
+            ))
+        )
+        if rows:
+            await self.db.execute(insert(ActivityRollup).values(rows))
+
+    async def _rollup_system_metrics(self, start: datetime, end: datetime) -> None:
+        await self.db.execute(
+            delete(SystemMetricRollup).where(and_(
+                SystemMetricRollup.granularity == HOUR,
+                SystemMetricRollup.period_start >= start,
+                SystemMetricRollup.period_start < end
+            ))
+        )
+
+        # One hour at a time, so memory stays bounded by the busiest hour
+        hour = start
+        while hour < end:
+            aggregates = await self._aggregate_raw_metrics(hour, hour + timedelta(hours=1))
+            rows = [
+                {
+                    "id": str(uuid4()),
+                    "granularity": HOUR,
+                    "period_start": hour,
+                    "metric_name": metric_name,
+                    "component": component,
+                    "endpoint": endpoint,
+                    "sample_count": aggregate.count,
+                    "value_sum": aggregate.total,
+                    "value_min": aggregate.minimum,
+                    "value_max": aggregate.maximum,
+                    "error_count": aggregate.errors,
+                    "histogram": aggregate.histogram,
+                }
+                for (metric_name, component, endpoint), aggregate in aggregates.items()
+            ]
+            if rows:
+                await self.db.execute(insert(SystemMetricRollup).values(rows))
+            hour += timedelta(hours=1)
+
+    async def _rollup_active_users(self, start: datetime, end: datetime) -> None:
+        rows = []
+        day = start
+        while day < end:
+            day_end = day + timedelta(days=1)
+            rows.append({
+                "day": day.date(),
+                "daily_active_users": await self._count_active_users(day, day_end),
+                "weekly_active_users": await self._count_active_users(day_end - timedelta(days=7), day_end),
+                "monthly_active_users": await self._count_active_users(day_end - timedelta(days=30), day_end),
+                "new_users": await self._count_new_users(day, day_end),
+            })
+            day = day_end
+
+        await self.db.execute(
+            delete(ActiveUserRollup).where(and_(
+                ActiveUserRollup.day >= start.date(),
+                ActiveUserRollup.day < end.date()
+            ))
+        )
+        await self.db.execute(insert(ActiveUserRollup).values(rows))
+
+    async def _rollup_reviews(self, start: datetime, end: datetime) -> None:
+        rows = [
+            {"day": day, "review_count": count, "rating_sum": rating_sum, "reviewer_count": reviewers}
+            for day, (count, rating_sum, reviewers) in (await self._raw_review_days(start, end)).items()
+        ]
+
+        await self.db.execute(
+            delete(ReviewRollup).where(and_(ReviewRollup.day >= start.date(), ReviewRollup.day < end.date()))
+        )
+        if rows:
+            await self.db.execute(insert(ReviewRollup).values(rows))
+
+    # Range queries (rollups for closed periods, raw rows for the rest)
+    async def _split_range(
+        self,
+        name: str,
+        granularity: str,
+        start: datetime,
+        end: datetime
+    ) -> Tuple[Optional[DateRange], List[DateRange]]:
+        """
+        Split [start, end) into the part covered by a rollup and the parts to read raw
+
+        Returns:
+            (rollup range or None, list of raw ranges)
+        """
+        watermark = await self.get_watermark(name)
+        if watermark is None:
+            return None, [(start, end)]
+
+        rollup_start = ceil_period(start, granularity)
+        rollup_end = min(floor_period(end, granularity), watermark)
+        if rollup_end <= rollup_start:
+            return None, [(start, end)]
+
+        raw_ranges = []
+        if start < rollup_start:
+            raw_ranges.append((start, rollup_start))
+        if rollup_end < end:
+            raw_ranges.append((rollup_end, end))
+        return (rollup_start, rollup_end), raw_ranges
+
+    async def activity_counts(self, start: datetime, end: datetime) -> Dict[str, int]:
+        """Number of activities of each type in [start, end)"""
+        counts: Dict[str, int] = defaultdict(int)
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_ACTIVITY_HOURLY, HOUR, start, end)
+
+        if rollup_range:
+            result = await self.db.execute(
+                select(ActivityRollup.activity_type, func.sum(ActivityRollup.event_count).label("count"))
+                .where(and_(
+                    ActivityRollup.granularity == HOUR,
+                    ActivityRollup.period_start >= rollup_range[0],
+                    ActivityRollup.period_start < rollup_range[1]
+                ))
+                .group_by(ActivityRollup.activity_type)
+            )
+            for row in result.fetchall():
+                counts[row.activity_type] += int(row.count)
+
+        for raw_start, raw_end in raw_ranges:
+            result = await self.db.execute(
+                select(UserActivity.activity_type, func.count(UserActivity.id).label("count"))
+                .where(and_(UserActivity.created_at >= raw_start, UserActivity.created_at < raw_end))
+                .group_by(UserActivity.activity_type)
+            )
+            for row in result.fetchall():
+                counts[row.activity_type] += row.count
+
+        return dict(counts)
+
+    async def daily_activity(self, start: datetime, end: datetime) -> Dict[date, Dict[str, int]]:
+        """Signed-in active users and total activities for each day in [start, end)"""
+        totals: Dict[date, int] = defaultdict(int)
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_ACTIVITY_HOURLY, HOUR, start, end)
+        if rollup_range:
+            result = await self.db.execute(
+                select(ActivityRollup.period_start, func.sum(ActivityRollup.event_count).label("count"))
+                .where(and_(
+                    ActivityRollup.granularity == HOUR,
+                    ActivityRollup.period_start >= rollup_range[0],
+                    ActivityRollup.period_start < rollup_range[1]
+                ))
+                .group_by(ActivityRollup.period_start)
+            )
+            for row in result.fetchall():
+                totals[naive_utc(row.period_start).date()] += int(row.count)
+        for raw_start, raw_end in raw_ranges:
+            for day, (count, _) in (await self._raw_activity_days(raw_start, raw_end)).items():
+                totals[day] += count
+
+        active_users: Dict[date, int] = {}
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_ACTIVE_USERS_DAILY, DAY, start, end)
+        if rollup_range:
+            result = await self.db.execute(
+                select(ActiveUserRollup.day, ActiveUserRollup.daily_active_users)
+                .where(and_(
+                    ActiveUserRollup.day >= rollup_range[0].date(),
+                    ActiveUserRollup.day < rollup_range[1].date()
+                ))
+            )
+            for row in result.fetchall():
+                active_users[as_date(row.day)] = row.daily_active_users
+        for raw_start, raw_end in raw_ranges:
+            for day, (_, users) in (await self._raw_activity_days(raw_start, raw_end)).items():
+                active_users[day] = users
+
+        return {
+            day: {"active_users": active_users.get(day, 0), "total_activities": totals.get(day, 0)}
+            for day in sorted(set(totals) | {day for day, users in active_users.items() if users})
+        }
+
+    async def new_users_by_day(self, start_date: date, end_date: date) -> Dict[date, int]:
+        """Registrations per day for start_date..end_date inclusive"""
+        start, end = self._day_bounds(start_date, end_date)
+        counts: Dict[date, int] = {}
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_ACTIVE_USERS_DAILY, DAY, start, end)
+
+        if rollup_range:
+            result = await self.db.execute(
+                select(ActiveUserRollup.day, ActiveUserRollup.new_users)
+                .where(and_(
+                    ActiveUserRollup.day >= rollup_range[0].date(),
+                    ActiveUserRollup.day < rollup_range[1].date(),
+                    ActiveUserRollup.new_users > 0
+                ))
+            )
+            counts.update({as_date(row.day): row.new_users for row in result.fetchall()})
+
+        for raw_start, raw_end in raw_ranges:
+            day_column = func.date(User.created_at)
+            result = await self.db.execute(
+                select(day_column.label("day"), func.count(User.id).label("count"))
+                .where(and_(User.created_at >= raw_start, User.created_at < raw_end))
+                .group_by(day_column)
+            )
+            counts.update({as_date(row.day): row.count for row in result.fetchall()})
+
+        return dict(sorted(counts.items()))
+
+    async def review_days(self, start_date: date, end_date: date) -> Dict[date, Tuple[int, int, int]]:
+        """(review count, rating sum, distinct reviewers) per day for start_date..end_date inclusive"""
+        start, end = self._day_bounds(start_date, end_date)
+        days: Dict[date, Tuple[int, int, int]] = {}
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_REVIEWS_DAILY, DAY, start, end)
+
+        if rollup_range:
+            result = await self.db.execute(
+                select(ReviewRollup)
+                .where(and_(ReviewRollup.day >= rollup_range[0].date(), ReviewRollup.day < rollup_range[1].date()))
+            )
+            for rollup in result.scalars().all():
+                days[as_date(rollup.day)] = (rollup.review_count, rollup.rating_sum, rollup.reviewer_count)
+
+        for raw_start, raw_end in raw_ranges:
+            days.update(await self._raw_review_days(raw_start, raw_end))
+
+        return dict(sorted(days.items()))
+
+    async def review_count(self, start: datetime, end: datetime) -> int:
+        """Reviews created in [start, end)"""
+        total = 0
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_REVIEWS_DAILY, DAY, start, end)
+        if rollup_range:
+            result = await self.db.execute(
+                select(func.sum(ReviewRollup.review_count))
+                .where(and_(ReviewRollup.day >= rollup_range[0].date(), ReviewRollup.day < rollup_range[1].date()))
+            )
+            total += int(result.scalar() or 0)
+        for raw_start, raw_end in raw_ranges:
+            result = await self.db.execute(
+                select(func.count(Review.id))
+                .where(and_(Review.created_at >= raw_start, Review.created_at < raw_end))
+            )
+            total += result.scalar() or 0
+        return total
+
+    async def system_metric_summary(self, start: datetime, end: datetime) -> Dict[MetricKey, MetricAggregate]:
+        """Merged aggregates per (metric, component, endpoint) for [start, end)"""
+        aggregates: Dict[MetricKey, MetricAggregate] = defaultdict(MetricAggregate)
+        rollup_range, raw_ranges = await self._split_range(ROLLUP_SYSTEM_METRICS_HOURLY, HOUR, start, end)
+
+        if rollup_range:
+            result = await self.db.execute(
+                select(SystemMetricRollup).where(and_(
+                    SystemMetricRollup.granularity == HOUR,
+                    SystemMetricRollup.period_start >= rollup_range[0],
+                    SystemMetricRollup.period_start < rollup_range[1]
+                ))
+            )
+            for rollup in result.scalars().all():
+                aggregates[(rollup.metric_name, rollup.component, rollup.endpoint)].merge(
+                    rollup.sample_count, rollup.value_sum, rollup.value_min, rollup.value_max,
+                    rollup.error_count, rollup.histogram
+                )
+
+        for raw_start, raw_end in raw_ranges:
+            for key, aggregate in (await self._aggregate_raw_metrics(raw_start, raw_end)).items():
+                aggregates[key].merge_aggregate(aggregate)
+
+        return dict(aggregates)
+
+    # Raw-table aggregation shared by the job and the open tail of range queries
+    async def _aggregate_raw_metrics(self, start: datetime, end: datetime) -> Dict[MetricKey, MetricAggregate]:
+        result = await self.db.execute(
+            select(
+                SystemMetrics.metric_name,
+                SystemMetrics.component,
+                SystemMetrics.metric_value,
+                SystemMetrics.extra_data
+            ).where(and_(SystemMetrics.timestamp >= start, SystemMetrics.timestamp < end))
+        )
+
+        aggregates: Dict[MetricKey, MetricAggregate] = defaultdict(MetricAggregate)
+        for row in result:
+            component = row.component or ""
+            error = is_error_metric(row.extra_data)
+            aggregates[(row.metric_name, component, "")].add(row.metric_value, error)
+            endpoint = metric_endpoint(row.extra_data)
+            if endpoint:
+                aggregates[(row.metric_name, component, endpoint)].add(row.metric_value, error)
+        return aggregates
+
+    async def _raw_activity_days(self, start: datetime, end: datetime) -> Dict[date, Tuple[int, int]]:
+        """(activities, distinct signed-in users) per day"""
+        day_column = func.date(UserActivity.created_at)
+        result = await self.db.execute(
+            select(
+                day_column.label("day"),
+                func.count(UserActivity.id).label("total_activities"),
+                func.count(func.distinct(UserActivity.user_id)).label("active_users")
+            )
+            .where(and_(UserActivity.created_at >= start, UserActivity.created_at < end))
+            .group_by(day_column)
+        )
+        return {as_date(row.day): (row.total_activities, row.active_users) for row in result.fetchall()}
+
+    async def _raw_review_days(self, start: datetime, end: datetime) -> Dict[date, Tuple[int, int, int]]:
+        day_column = func.date(Review.created_at)
+        result = await self.db.execute(
+            select(
+                day_column.label("day"),
+                func.count(Review.id).label("review_count"),
+                func.sum(Review.lemon_pie_rating).label("rating_sum"),
+                func.count(func.distinct(Review.user_id)).label("reviewers")
+            )
+            .where(and_(Review.created_at >= start, Review.created_at < end))
+            .group_by(day_column)
+        )
+        return {
+            as_date(row.day): (row.review_count, int(row.rating_sum or 0), row.reviewers)
+            for row in result.fetchall()
+        }
+
+    async def _count_active_users(self, start: datetime, end: datetime) -> int:
+        result = await self.db.execute(
+            select(func.count(func.distinct(UserActivity.user_id))).where(and_(
+                UserActivity.created_at >= start,
+                UserActivity.created_at < end,
+                UserActivity.user_id.isnot(None)
+            ))
+        )
+        return result.scalar() or 0
+
+    async def _count_new_users(self, start: datetime, end: datetime) -> int:
+        result = await self.db.execute(
+            select(func.count(User.id)).where(and_(User.created_at >= start, User.created_at < end))
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    def _day_bounds(start_date: date, end_date: date) -> DateRange:
+        """[start, end) datetimes spanning whole days start_date..end_date"""
+        return (
+            datetime.combine(start_date, dt_time.min),
+            datetime.combine(end_date, dt_time.min) + timedelta(days=1)
+        )
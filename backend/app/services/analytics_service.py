@@ -21,7 +21,10 @@ from app.models.analytics import (
 from app.models.user import User
 from app.models.movie import Movie
 from app.models.review import Review
-from app.cache.redis import get_redis_client
+from app.cache.redis import get_redis
+from app.services.analytics_ingest import engagement_increments, get_analytics_queue, update_unique_counters
+from app.services.analytics_rollup_service import AnalyticsRollupService
+from app.services.latency_sketch import load_latency_sketches, merge_sketches, summarize_sketch
 
 
 class AnalyticsService:
@@ -34,7 +37,7 @@ class AnalyticsService:
     async def get_redis(self):
         """Get Redis client for caching"""
         if not self.redis:
-            self.redis = await get_redis_client()
+            self.redis = await get_redis()
         return self.redis
     
     # User Activity Tracking
@@ -65,6 +68,15 @@ class AnalyticsService:
         await self.db.commit()
         await self.db.refresh(activity)
         
+        await update_unique_counters([{
+            "user_id": activity.user_id,
+            "activity_type": activity.activity_type,
+            "resource_id": activity.resource_id,
+            "session_id": activity.session_id,
+            "ip_address": activity.ip_address,
+            "created_at": activity.created_at,
+        }])
+        
         # Update user engagement metrics asynchronously
         if user_id:
             asyncio.create_task(self._update_user_engagement_metrics(user_id, activity_type))
@@ -94,19 +106,8 @@ class AnalyticsService:
                 self.db.add(engagement)
             
             # Update metrics based on activity type
-            if activity_type == "login":
-                engagement.session_count += 1
-            elif activity_type == "view_movie":
-                engagement.movies_viewed += 1
-                engagement.pages_viewed += 1
-            elif activity_type == "write_review":
-                engagement.reviews_written += 1
-            elif activity_type == "vote_review":
-                engagement.reviews_voted += 1
-            elif activity_type in ["follow_user", "unfollow_user"]:
-                engagement.social_interactions += 1
-            else:
-                engagement.pages_viewed += 1
+            for field, amount in engagement_increments(activity_type).items():
+                setattr(engagement, field, (getattr(engagement, field) or 0) + amount)
             
             engagement.last_activity = datetime.utcnow()
             
@@ -148,6 +149,12 @@ class AnalyticsService:
         increment: float = 1.0
     ):
         """Increment a content metric (like view count)"""
+        # Summed in memory by the ingestion pipeline when it is running
+        analytics_queue = get_analytics_queue()
+        if analytics_queue is not None:
+            analytics_queue.increment_content_metric(content_type, content_id, metric_type, increment)
+            return
+        
         redis = await self.get_redis()
         cache_key = f"content_metric:{content_type}:{content_id}:{metric_type}"
         
@@ -321,77 +328,82 @@ class AnalyticsService:
         if not end_date:
             end_date = datetime.utcnow()
         
-        conditions = [
-            SystemMetrics.timestamp >= start_date,
-            SystemMetrics.timestamp <= end_date
-        ]
-        
-        if component:
-            conditions.append(SystemMetrics.component == component)
-        
-        # Metric summary
-        stmt = select(
-            SystemMetrics.metric_name,
-            SystemMetrics.component,
-            func.avg(SystemMetrics.metric_value).label("average"),
-            func.min(SystemMetrics.metric_value).label("minimum"),
-            func.max(SystemMetrics.metric_value).label("maximum"),
-            func.count(SystemMetrics.id).label("count")
-        ).where(and_(*conditions)).group_by(
-            SystemMetrics.metric_name,
-            SystemMetrics.component
-        )
-        
-        result = await self.db.execute(stmt)
+        # Hourly rollups for closed hours, raw rows for the open tail
+        summary = await AnalyticsRollupService(self.db).system_metric_summary(start_date, end_date)
         metrics = {}
-        for row in result.fetchall():
-            key = f"{row.component or 'system'}:{row.metric_name}"
-            metrics[key] = {
-                "average": float(row.average),
-                "minimum": float(row.minimum),
-                "maximum": float(row.maximum),
-                "count": row.count
+        for (metric_name, metric_component, endpoint), aggregate in summary.items():
+            if endpoint or (component and metric_component != component):
+                continue
+            metrics[f"{metric_component or 'system'}:{metric_name}"] = {
+                "average": aggregate.average,
+                "minimum": aggregate.minimum,
+                "maximum": aggregate.maximum,
+                "count": aggregate.count
             }
         
+        # Response-time percentiles from the merged latency sketches
+        endpoints = {}
+        if component in (None, "api"):
+            sketches = await load_latency_sketches(self.db, start_date, end_date)
+            by_endpoint = {}
+            for (endpoint, _), sketch in sketches.items():
+                by_endpoint.setdefault(endpoint, []).append(sketch)
+            endpoints = {
+                endpoint: summarize_sketch(merge_sketches(endpoint_sketches))
+                for endpoint, endpoint_sketches in by_endpoint.items()
+            }
+            overall = merge_sketches(sketches.values())
+            if overall is not None:
+                metrics.setdefault("api:response_time", {}).update(overall.quantiles())
+        
         return {
             "component": component,
             "period": {
                 "start_date": start_date.isoformat(),
                 "end_date": end_date.isoformat()
             },
-            "metrics": metrics
+            "metrics": metrics,
+            "endpoints": endpoints
         }
     
     # Batch operations for performance
-    async def flush_cached_metrics(self):
-        """Flush cached metrics from Redis to database"""
+    async def flush_cached_metrics(self, batch_size: int = 500) -> int:
+        """Flush Redis content counters (written when the ingestion queue is not running) to the database"""
         redis = await self.get_redis()
         
-        # Get all cached content metrics
-        pattern = "content_metric:*"
-        keys = await redis.keys(pattern)
-        
         metrics_to_insert = []
-        for key in keys:
-            try:
-                # Parse key: content_metric:type:id:metric_type
-                parts = key.decode().split(":")
-                if len(parts) == 4:
-                    _, content_type, content_id, metric_type = parts
-                    value = await redis.get(key)
-                    
-                    if value:
+        keys = []
+        
+        async def drain(batch_keys: List[Any]) -> None:
+            # GET and DEL in one transaction so concurrent increments are not lost
+            pipe = redis.pipeline(transaction=True)
+            for key in batch_keys:
+                pipe.get(key)
+                pipe.delete(key)
+            results = await pipe.execute()
+            
+            for key, value in zip(batch_keys, results[::2]):
+                try:
+                    # Parse key: content_metric:type:id:metric_type
+                    parts = (key.decode() if isinstance(key, bytes) else key).split(":")
+                    if len(parts) == 4 and value:
+                        _, content_type, content_id, metric_type = parts
                         metrics_to_insert.append(ContentMetrics(
                             content_type=content_type,
-                            content_id=UUID(content_id),
+                            content_id=content_id,
                             metric_type=metric_type,
                             metric_value=float(value)
                         ))
-                        
-                        # Delete the cached key
-                        await redis.delete(key)
-            except Exception as e:
-                print(f"Error processing cached metric {key}: {e}")
+                except Exception as e:
+                    print(f"Error processing cached metric {key}: {e}")
+        
+        async for key in redis.scan_iter(match="content_metric:*", count=batch_size):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                await drain(keys)
+                keys = []
+        if keys:
+            await drain(keys)
         
         # Bulk insert
         if metrics_to_insert:
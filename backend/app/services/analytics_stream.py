@@ -0,0 +1,299 @@
+"""
+Analytics event stream for LemonNPie Backend API
+
+With ANALYTICS_SINK=stream the API processes append compact analytics events
+to a Redis Stream and return. Consumer-group workers (analytics_worker.py)
+read them in batches, aggregate each batch in memory and bulk-write it to the
+analytics tables, acknowledging entries only after the transaction commits.
+Delivery is at-least-once: entries left pending by a worker that died are
+reclaimed with XAUTOCLAIM once they have been idle for
+ANALYTICS_STREAM_CLAIM_IDLE_MS. A batch that fails for any reason other than
+the database being unreachable is split until the entries that cannot be
+written are isolated; those move to the dead-letter stream ({stream}:dead)
+so one bad event cannot stall the workers.
+"""
+import asyncio
+import signal
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis.exceptions import ResponseError
+from sqlalchemy.exc import DisconnectionError, InterfaceError, OperationalError
+import structlog
+
+from app.cache.codecs import CacheCodec, CodecError
+from app.core.config import settings
+from app.db import database
+from app.services.analytics_ingest import (
+    ACTIVITY, CONTENT_INCREMENT, CONTENT_METRIC, EVENT_TABLES, SYSTEM_METRIC, write_analytics_batch
+)
+
+logger = structlog.get_logger(__name__)
+
+# Datetime fields of each event kind, restored from their ISO form on decode
+DATETIME_FIELDS = {
+    ACTIVITY: ("created_at",),
+    SYSTEM_METRIC: ("timestamp",),
+    CONTENT_METRIC: ("date",),
+    CONTENT_INCREMENT: ("date",),
+}
+
+# Write failures that mean the database is unavailable, not that the batch is bad
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, OSError)
+
+# Stream entries are small; compressing them costs more than it saves
+event_codec = CacheCodec(codec="orjson", compression=None)
+
+
+def encode_event(kind: str, row: Dict[str, Any]) -> Dict[str, bytes]:
+    """Stream entry fields for one analytics event"""
+    return {"k": kind.encode(), "d": event_codec.encode(row)}
+
+
+def decode_event(fields: Dict[Any, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Decode a stream entry back into an analytics event
+
+    Args:
+        fields: Entry fields as returned by XREADGROUP (bytes or str keys)
+
+    Returns:
+        (kind, row) tuple accepted by write_analytics_batch
+    """
+    fields = {(k.decode() if isinstance(k, bytes) else k): v for k, v in fields.items()}
+    kind = fields["k"].decode() if isinstance(fields["k"], bytes) else fields["k"]
+    if kind not in DATETIME_FIELDS:
+        raise CodecError(f"Unknown analytics event kind '{kind}'")
+
+    row = event_codec.decode(fields["d"])
+    for field in DATETIME_FIELDS[kind]:
+        if row.get(field):
+            row[field] = datetime.fromisoformat(row[field])
+    return kind, row
+
+
+async def publish_events(redis_client, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Append a batch of events to the stream in one pipelined round trip"""
+    pipe = redis_client.pipeline(transaction=False)
+    for kind, row in batch:
+        pipe.xadd(
+            settings.ANALYTICS_STREAM_KEY,
+            encode_event(kind, row),
+            maxlen=settings.ANALYTICS_STREAM_MAXLEN,
+            approximate=True
+        )
+    await pipe.execute()
+
+
+class AnalyticsStreamConsumer:
+    """Consumer-group member that bulk-writes stream entries to the analytics tables"""
+
+    def __init__(
+        self,
+        redis_client,
+        consumer_name: str,
+        batch_size: int = 500,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 60000,
+        stream: Optional[str] = None,
+        group: Optional[str] = None
+    ):
+        self.redis = redis_client
+        self.consumer_name = consumer_name
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.stream = stream or settings.ANALYTICS_STREAM_KEY
+        self.group = group or settings.ANALYTICS_STREAM_GROUP
+        self.dead_letter_stream = f"{self.stream}:dead"
+
+        self.processed = 0
+        self.batches = 0
+        self.malformed = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+        self.errors = 0
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and the stream) if they do not exist yet"""
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_batch(self) -> List[Tuple[Any, Dict[Any, Any]]]:
+        """Read up to batch_size new entries, blocking up to block_ms for the first"""
+        response = await self.redis.xreadgroup(
+            self.group,
+            self.consumer_name,
+            {self.stream: ">"},
+            count=self.batch_size,
+            block=self.block_ms
+        )
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def process(self, entries: List[Tuple[Any, Dict[Any, Any]]]) -> int:
+        """
+        Write a batch of entries in one transaction, then acknowledge them
+
+        Entries that cannot be decoded are acknowledged and counted so they do
+        not come back on every reclaim. If the database is unavailable nothing
+        is acknowledged and the entries stay pending for a later retry; any
+        other write failure is narrowed down to the entries causing it, which
+        are dead-lettered.
+        """
+        batch = []
+        skipped = []
+        for entry_id, fields in entries:
+            if fields is None:
+                # Trimmed from the stream while pending
+                skipped.append(entry_id)
+                continue
+            try:
+                batch.append((entry_id, fields, decode_event(fields)))
+            except (CodecError, KeyError, ValueError) as e:
+                self.malformed += 1
+                skipped.append(entry_id)
+                logger.warning("Dropping malformed analytics event", entry_id=entry_id, error=str(e))
+
+        written = await self._write(batch) if batch else 0
+        if skipped:
+            await self.redis.xack(self.stream, self.group, *skipped)
+        self.processed += written
+        self.batches += 1
+        return written
+
+    async def _write(self, batch: List[Tuple[Any, Dict[Any, Any], Tuple[str, Dict[str, Any]]]]) -> int:
+        """
+        Write and acknowledge (entry id, fields, event) triples, halving the batch on failure
+
+        Returns:
+            Number of events written
+        """
+        try:
+            async with database.async_session_maker() as db:
+                await write_analytics_batch(db, [event for _, _, event in batch])
+                await db.commit()
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                await self._dead_letter(batch[0], e)
+                return 0
+            middle = len(batch) // 2
+            return await self._write(batch[:middle]) + await self._write(batch[middle:])
+
+        await self.redis.xack(self.stream, self.group, *[entry_id for entry_id, _, _ in batch])
+        return len(batch)
+
+    async def _dead_letter(self, item: Tuple[Any, Dict[Any, Any], Tuple[str, Dict[str, Any]]], error: Exception) -> None:
+        """Move an entry that cannot be written to the dead-letter stream and acknowledge it"""
+        entry_id, fields, _ = item
+        await self.redis.xadd(
+            self.dead_letter_stream,
+            {**fields, "entry": entry_id, "error": str(error)[:1000]},
+            maxlen=settings.ANALYTICS_STREAM_MAXLEN,
+            approximate=True
+        )
+        await self.redis.xack(self.stream, self.group, entry_id)
+        self.dead_lettered += 1
+        logger.error("Dead-lettered analytics event", entry_id=entry_id, error=str(error))
+
+    async def reclaim_pending(self) -> int:
+        """Take over and process entries another consumer read but never acknowledged"""
+        written = 0
+        start_id = "0-0"
+        while True:
+            response = await self.redis.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer_name,
+                min_idle_time=self.claim_idle_ms,
+                start_id=start_id,
+                count=self.batch_size
+            )
+            start_id, entries = response[0], response[1]
+            if entries:
+                self.reclaimed += len(entries)
+                written += await self.process(entries)
+            if start_id in ("0-0", b"0-0") or not entries:
+                return written
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """Consume until stop_event is set, reclaiming stale entries periodically"""
+        await self.ensure_group()
+
+        # Reclaiming happens inside the guarded loop, startup included, so a
+        # failing reclaim backs off instead of crashing the worker
+        last_reclaim = None
+        backoff = 1.0
+        while not stop_event.is_set():
+            try:
+                now = asyncio.get_running_loop().time()
+                if last_reclaim is None or (now - last_reclaim) * 1000 >= self.claim_idle_ms:
+                    await self.reclaim_pending()
+                    last_reclaim = now
+
+                entries = await self.read_batch()
+                if entries:
+                    await self.process(entries)
+                backoff = 1.0
+            except Exception as e:
+                self.errors += 1
+                logger.error("Analytics consumer error", consumer=self.consumer_name, error=str(e))
+                try:
+                    await asyncio.wait_for(stop_event.wait(), backoff)
+                except asyncio.TimeoutError:
+                    pass
+                backoff = min(backoff * 2, 30.0)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Consumer counters"""
+        return {
+            "consumer": self.consumer_name,
+            "processed": self.processed,
+            "batches": self.batches,
+            "malformed": self.malformed,
+            "reclaimed": self.reclaimed,
+            "dead_lettered": self.dead_lettered,
+            "errors": self.errors,
+        }
+
+
+async def run_consumer(consumer_name: str, batch_size: int = 500, block_ms: int = 1000) -> None:
+    """Run one consumer until SIGINT/SIGTERM, as started by analytics_worker.py"""
+    from app.cache.redis import close_redis, get_redis, init_redis
+    from app.db.database import close_db, init_db
+
+    await init_db()
+    await init_redis()
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+
+    consumer = AnalyticsStreamConsumer(
+        await get_redis(),
+        consumer_name,
+        batch_size=batch_size,
+        block_ms=block_ms,
+        claim_idle_ms=settings.ANALYTICS_STREAM_CLAIM_IDLE_MS
+    )
+    logger.info(
+        "Analytics consumer started",
+        consumer=consumer_name,
+        stream=consumer.stream,
+        group=consumer.group,
+        tables=sorted(table.__tablename__ for table in EVENT_TABLES.values())
+    )
+    try:
+        await consumer.run(stop_event)
+    finally:
+        logger.info("Analytics consumer stopped", **consumer.get_statistics())
+        await close_redis()
+        await close_db()
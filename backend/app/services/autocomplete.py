@@ -0,0 +1,502 @@
+"""
+In-process autocomplete index for LemonNPie Backend API
+
+Each worker keeps every movie title, local title, director and cast name in
+one sorted array of normalized word-start keys, so the suggestions for a
+prefix are a bisect away and never touch the database or Redis. Names are
+case- and diacritic-folded (Ọ̀gá, Ẹ̀gbọ́n and Ɗan Kano match oga, egbon and dan
+kano) and ranked by popularity, the summed review counts of the movies they
+appear in. The top suggestions of every short prefix are precomputed because
+those ranges cover much of the array.
+
+MovieService publishes changed movie ids; every worker re-indexes just those
+movies, and a periodic full rebuild keeps popularity current. The same
+refresher maintains the worker's fuzzy-search and facet indexes.
+"""
+import asyncio
+import heapq
+import json
+import re
+import sys
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+import structlog
+
+from app.core.config import settings
+from app.db import database
+from app.models.movie import Movie
+from app.models.movie_stats import MovieStatistics
+from app.models.relationships import MovieCast
+from app.services.facet_index import FacetIndex, load_movie_facets
+
+logger = structlog.get_logger(__name__)
+
+# Separates a key's word-start suffix from the entry it belongs to; sorts
+# before any character a normalized key can contain
+KEY_SEPARATOR = "\x00"
+PREFIX_END = "\U0010ffff"
+
+# Letters NFKD does not decompose (Hausa hooked letters) and apostrophes
+FOLD_TABLE = str.maketrans({"ɓ": "b", "ɗ": "d", "ƙ": "k", "ƴ": "y", "'": "", "’": "", "ʼ": ""})
+
+# (movie_id, [(kind, name)], popularity); kind is "title", "director" or "cast"
+MovieNames = Tuple[Any, List[Tuple[str, str]], float]
+
+
+def normalize(text: str) -> str:
+    """Case- and diacritic-folded words of text, separated by single spaces"""
+    folded = (text or "").casefold()
+    if not folded.isascii():
+        decomposed = unicodedata.normalize("NFKD", folded)
+        folded = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", folded.translate(FOLD_TABLE)))
+
+
+class _Entry:
+    __slots__ = ("text", "refs", "score")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.refs: Dict[Any, float] = {}  # movie id -> popularity
+        self.score = 0.0
+
+
+class AutocompleteIndex:
+    """
+    Sorted-array prefix index of suggestion strings
+
+    Every suggestion is stored once per word start ("the wedding party",
+    "wedding party", "party"), so a prefix of any word matches.
+    """
+
+    def __init__(self, max_results: int = 10, cached_prefix_length: int = 2):
+        self.max_results = max_results
+        self.cached_prefix_length = cached_prefix_length
+        self._keys: List[str] = []
+        self._entries: Dict[str, _Entry] = {}
+        self._movie_entries: Dict[Any, Set[str]] = {}
+        self._top: Dict[str, List[str]] = {}
+        self.ready = False
+
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.incremental_updates = 0
+        self.last_update_ms = 0.0
+        self.queries = 0
+
+    @staticmethod
+    def _suffixes(entry_key: str) -> List[str]:
+        words = entry_key.split(" ")
+        return [" ".join(words[start:]) for start in range(len(words))]
+
+    def _short_prefixes(self, entry_key: str) -> Set[str]:
+        return {
+            suffix[:length]
+            for suffix in self._suffixes(entry_key)
+            for length in range(1, min(len(suffix), self.cached_prefix_length) + 1)
+        }
+
+    def _add_ref(self, movie_id: Any, name: str, popularity: float) -> Optional[str]:
+        """Attach a movie to a suggestion; returns the entry key if it is new"""
+        entry_key = normalize(name)
+        if not entry_key:
+            return None
+        entry = self._entries.get(entry_key)
+        created = entry is None
+        if created:
+            entry = self._entries[entry_key] = _Entry(name.strip())
+        entry.score += popularity - entry.refs.get(movie_id, 0.0)
+        entry.refs[movie_id] = popularity
+        self._movie_entries.setdefault(movie_id, set()).add(entry_key)
+        return entry_key if created else None
+
+    def build(self, movies: Iterable[MovieNames]) -> None:
+        """Replace the whole index"""
+        started = time.perf_counter()
+        self._entries, self._movie_entries = {}, {}
+        for movie_id, names, popularity in movies:
+            for _, name in names:
+                self._add_ref(movie_id, name, popularity)
+
+        self._keys = sorted(
+            f"{suffix}{KEY_SEPARATOR}{entry_key}"
+            for entry_key in self._entries
+            for suffix in self._suffixes(entry_key)
+        )
+        prefixes: Set[str] = set()
+        for entry_key in self._entries:
+            prefixes |= self._short_prefixes(entry_key)
+        self._top = {prefix: self._scan(prefix, self.max_results) for prefix in prefixes}
+
+        self.ready = True
+        self.builds += 1
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+
+    def replace(self, other: "AutocompleteIndex") -> None:
+        """Take over another index's contents (built elsewhere, e.g. in a thread)"""
+        self._keys, self._entries, self._movie_entries, self._top = (
+            other._keys, other._entries, other._movie_entries, other._top
+        )
+        self.ready = True
+        self.builds += 1
+        self.last_build_ms = other.last_build_ms
+
+    def update_movies(self, movies: Iterable[MovieNames], removed: Iterable[Any] = ()) -> None:
+        """Re-index some movies (their names and popularity) and drop removed ones"""
+        started = time.perf_counter()
+        previous_scores: Dict[str, float] = {}
+        added: Set[str] = set()
+        attached: Set[str] = set()
+
+        # Detach the movies from all their current suggestions first
+        movies = list(movies)
+        for movie_id in [movie_id for movie_id, _, _ in movies] + list(removed):
+            for entry_key in self._movie_entries.pop(movie_id, set()):
+                entry = self._entries[entry_key]
+                previous_scores.setdefault(entry_key, entry.score)
+                entry.score -= entry.refs.pop(movie_id, 0.0)
+
+        for movie_id, names, popularity in movies:
+            for _, name in names:
+                entry_key = self._add_ref(movie_id, name, popularity)
+                if entry_key:
+                    added.add(entry_key)
+            attached |= self._movie_entries.get(movie_id, set())
+
+        for entry_key in added:
+            for suffix in self._suffixes(entry_key):
+                insort(self._keys, f"{suffix}{KEY_SEPARATOR}{entry_key}")
+        demoted: Set[str] = set()
+        for entry_key, previous_score in previous_scores.items():
+            entry = self._entries[entry_key]
+            if not entry.refs:
+                del self._entries[entry_key]
+                for suffix in self._suffixes(entry_key):
+                    key = f"{suffix}{KEY_SEPARATOR}{entry_key}"
+                    position = bisect_left(self._keys, key)
+                    if position < len(self._keys) and self._keys[position] == key:
+                        del self._keys[position]
+            if entry_key not in self._entries or entry.score < previous_score:
+                demoted.add(entry_key)
+
+        touched_by_prefix: Dict[str, Set[str]] = defaultdict(set)
+        for entry_key in attached | set(previous_scores):
+            for prefix in self._short_prefixes(entry_key):
+                touched_by_prefix[prefix].add(entry_key)
+        for prefix, touched in touched_by_prefix.items():
+            self._update_top(prefix, touched, demoted)
+
+        self.incremental_updates += 1
+        self.last_update_ms = (time.perf_counter() - started) * 1000
+
+    def _update_top(self, prefix: str, touched: Set[str], demoted: Set[str]) -> None:
+        """
+        Refresh a short prefix's precomputed top entries after some entries changed
+
+        Untouched entries keep their scores, so unless a current top entry fell
+        or disappeared the new top is among the current top and the touched
+        entries; otherwise the prefix range is scanned again.
+        """
+        current = self._top.get(prefix, [])
+        if demoted.intersection(current):
+            top = self._scan(prefix, self.max_results)
+        else:
+            candidates = set(current) | {entry_key for entry_key in touched if entry_key in self._entries}
+            top = heapq.nsmallest(
+                self.max_results, candidates, key=lambda entry_key: (-self._entries[entry_key].score, entry_key)
+            )
+        if top:
+            self._top[prefix] = top
+        else:
+            self._top.pop(prefix, None)
+
+    def _scan(self, prefix: str, limit: int) -> List[str]:
+        """Best entry keys among the keys starting with prefix"""
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + PREFIX_END, start)
+        candidates = {key.split(KEY_SEPARATOR, 1)[1] for key in self._keys[start:end]}
+        return heapq.nsmallest(
+            limit, candidates, key=lambda entry_key: (-self._entries[entry_key].score, entry_key)
+        )
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """Most popular suggestions with a word starting with prefix"""
+        self.queries += 1
+        normalized = normalize(prefix)
+        if not normalized:
+            return []
+        if len(normalized) <= self.cached_prefix_length and limit <= self.max_results:
+            entry_keys = self._top.get(normalized, [])[:limit]
+        else:
+            entry_keys = self._scan(normalized, limit)
+        return [self._entries[entry_key].text for entry_key in entry_keys]
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures and their strings"""
+        size = sys.getsizeof(self._keys) + sum(sys.getsizeof(key) for key in self._keys)
+        size += sys.getsizeof(self._entries) + sum(
+            sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry.text) + sys.getsizeof(entry.refs)
+            for key, entry in self._entries.items()
+        )
+        size += sys.getsizeof(self._movie_entries) + sum(
+            sys.getsizeof(entry_keys) for entry_keys in self._movie_entries.values()
+        )
+        size += sys.getsizeof(self._top) + sum(sys.getsizeof(top) for top in self._top.values())
+        return size
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Size, memory and rebuild timings for the performance endpoints"""
+        return {
+            "ready": self.ready,
+            "suggestions": len(self._entries),
+            "keys": len(self._keys),
+            "movies": len(self._movie_entries),
+            "cached_prefixes": len(self._top),
+            "memory_bytes": self.memory_bytes(),
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 2),
+            "incremental_updates": self.incremental_updates,
+            "last_update_ms": round(self.last_update_ms, 2),
+            "queries": self.queries,
+        }
+
+
+async def load_movie_names(db, movie_ids: Optional[List[Any]] = None) -> List[MovieNames]:
+    """Titles, local title, director and cast of movies with their review counts"""
+    query = select(
+        Movie.id, Movie.title, Movie.local_title, Movie.director, MovieStatistics.review_count
+    ).outerjoin(MovieStatistics, MovieStatistics.movie_id == Movie.id)
+    cast_query = select(MovieCast.movie_id, MovieCast.actor_name)
+    if movie_ids is not None:
+        query = query.where(Movie.id.in_(movie_ids))
+        cast_query = cast_query.where(MovieCast.movie_id.in_(movie_ids))
+
+    cast: Dict[Any, List[str]] = defaultdict(list)
+    for movie_id, actor_name in await db.execute(cast_query):
+        cast[movie_id].append(actor_name)
+
+    return [
+        (
+            row.id,
+            [
+                (kind, name)
+                for kind, name in (
+                    ("title", row.title),
+                    ("title", row.local_title),
+                    ("director", row.director),
+                    *(("cast", actor_name) for actor_name in cast[row.id])
+                )
+                if name
+            ],
+            float(row.review_count or 0)
+        )
+        for row in await db.execute(query)
+    ]
+
+
+class AutocompleteRefresher:
+    """
+    Keeps a worker's index current: queued movie refreshes plus periodic full rebuilds
+
+    The fuzzy trigram index, when given, is built and refreshed from the same
+    movie names; the facet index, when given, from the movies' facet values.
+    """
+
+    def __init__(
+        self,
+        index: AutocompleteIndex,
+        rebuild_interval: float = 600.0,
+        fuzzy_index=None,
+        facet_index: Optional[FacetIndex] = None
+    ):
+        self.index = index
+        self.fuzzy_index = fuzzy_index
+        self.facet_index = facet_index
+        self.rebuild_interval = rebuild_interval
+        self._pending: Set[Any] = set()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks: List[asyncio.Task] = []
+        self.errors = 0
+
+    def start(self) -> None:
+        """Build the index in the background and keep it fresh"""
+        if not self._tasks:
+            self._stopping = False
+            self._tasks.append(asyncio.create_task(self._run()))
+            from app.cache import redis as redis_cache
+            if redis_cache.redis_client is not None:
+                self._tasks.append(asyncio.create_task(self._listen(redis_cache.redis_client)))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self, movie_ids: Iterable[Any]) -> None:
+        """Queue movies for re-indexing"""
+        self._pending.update(movie_ids)
+        self._wakeup.set()
+
+    async def rebuild(self) -> None:
+        """Build a fresh index in a thread and swap it in"""
+        async with database.async_session_maker() as db:
+            movies = await load_movie_names(db)
+            facets = await load_movie_facets(db) if self.facet_index is not None else []
+        fresh = AutocompleteIndex(self.index.max_results, self.index.cached_prefix_length)
+        await asyncio.to_thread(fresh.build, movies)
+        self.index.replace(fresh)
+        if self.fuzzy_index is not None:
+            fresh_fuzzy = type(self.fuzzy_index)()
+            await asyncio.to_thread(fresh_fuzzy.build, movies)
+            self.fuzzy_index.replace(fresh_fuzzy)
+        if self.facet_index is not None:
+            fresh_facets = FacetIndex()
+            await asyncio.to_thread(fresh_facets.build, facets)
+            self.facet_index.replace(fresh_facets)
+
+    async def refresh(self, movie_ids: List[Any]) -> None:
+        async with database.async_session_maker() as db:
+            movies = await load_movie_names(db, movie_ids)
+            facets = await load_movie_facets(db, movie_ids) if self.facet_index is not None else []
+        found = {movie_id for movie_id, _, _ in movies}
+        removed = [movie_id for movie_id in movie_ids if movie_id not in found]
+        self.index.update_movies(movies, removed=removed)
+        if self.fuzzy_index is not None:
+            self.fuzzy_index.update_movies(movies, removed=removed)
+        if self.facet_index is not None:
+            self.facet_index.update_movies(facets, removed=removed)
+
+    async def _run(self) -> None:
+        next_rebuild = 0.0
+        while not self._stopping:
+            try:
+                if time.monotonic() >= next_rebuild:
+                    # Movies queued meanwhile are refreshed again afterwards
+                    await self.rebuild()
+                    next_rebuild = time.monotonic() + self.rebuild_interval
+                elif self._pending:
+                    movie_ids, self._pending = list(self._pending), set()
+                    await self.refresh(movie_ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error("Autocomplete index refresh failed", error=str(e))
+
+            if self._pending:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(next_rebuild - time.monotonic(), 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _listen(self, redis_client) -> None:
+        """Apply other workers' movie changes"""
+        from app.cache.redis import WORKER_ID
+
+        retry_delay = 1
+        while not self._stopping:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(settings.AUTOCOMPLETE_CHANNEL)
+                retry_delay = 1
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != WORKER_ID:
+                        self.notify(UUID(movie_id) for movie_id in payload.get("movie_ids", []))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Autocomplete listener error, reconnecting", error=str(e))
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+
+# Global indexes and refresher, created during application startup
+autocomplete_index: Optional[AutocompleteIndex] = None
+fuzzy_index = None
+facet_index: Optional[FacetIndex] = None
+autocomplete_refresher: Optional[AutocompleteRefresher] = None
+
+
+async def init_autocomplete() -> None:
+    """Create this worker's indexes and start building them"""
+    global autocomplete_index, fuzzy_index, facet_index, autocomplete_refresher
+    from app.services.fuzzy_index import TrigramIndex
+
+    autocomplete_index = AutocompleteIndex(max_results=settings.AUTOCOMPLETE_MAX_RESULTS)
+    facet_index = FacetIndex()
+    # PostgreSQL answers fuzzy searches itself through pg_trgm
+    if database.engine is None or database.engine.dialect.name != "postgresql":
+        fuzzy_index = TrigramIndex()
+    autocomplete_refresher = AutocompleteRefresher(
+        autocomplete_index,
+        rebuild_interval=settings.AUTOCOMPLETE_REBUILD_INTERVAL_SECONDS,
+        fuzzy_index=fuzzy_index,
+        facet_index=facet_index
+    )
+    autocomplete_refresher.start()
+
+
+async def close_autocomplete() -> None:
+    global autocomplete_index, fuzzy_index, facet_index, autocomplete_refresher
+
+    if autocomplete_refresher:
+        await autocomplete_refresher.stop()
+    autocomplete_index = fuzzy_index = facet_index = autocomplete_refresher = None
+
+
+def get_autocomplete_index() -> Optional[AutocompleteIndex]:
+    """The index once it has been built (None before startup or during the first build)"""
+    if autocomplete_index is not None and autocomplete_index.ready:
+        return autocomplete_index
+    return None
+
+
+def get_fuzzy_index():
+    """The in-process trigram index once built (None on PostgreSQL, before startup or during the first build)"""
+    if fuzzy_index is not None and fuzzy_index.ready:
+        return fuzzy_index
+    return None
+
+
+def get_facet_index() -> Optional[FacetIndex]:
+    """The facet bitsets once built (None before startup or during the first build)"""
+    if facet_index is not None and facet_index.ready:
+        return facet_index
+    return None
+
+
+async def publish_movie_changes(movie_ids: List[Any]) -> None:
+    """Re-index changed movies in this worker and tell the others"""
+    if autocomplete_refresher is not None:
+        autocomplete_refresher.notify(movie_ids)
+
+    from app.cache import redis as redis_cache
+    if redis_cache.redis_client is None:
+        return
+    try:
+        message = {"origin": redis_cache.WORKER_ID, "movie_ids": [str(movie_id) for movie_id in movie_ids]}
+        await redis_cache.redis_client.publish(settings.AUTOCOMPLETE_CHANNEL, json.dumps(message))
+    except Exception as e:
+        logger.warning("Autocomplete change publish error", error=str(e))
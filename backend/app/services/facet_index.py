@@ -0,0 +1,228 @@
+"""
+In-process facet bitsets for LemonNPie Backend API
+
+Every movie gets a bit position, and every facet value (a genre, a language,
+a decade, a year, a content type, a production state) is a Python int with the
+bits of its movies set. A result set is an int too, so the counts of every
+facet value are one AND and one popcount each, without a GROUP BY per facet.
+When every listing filter is a facet, the result set is an AND of bitsets
+and the counts need no query at all.
+
+Positions of deleted movies are reused, so the bitsets stay as wide as the
+catalogue. The autocomplete refresher builds the index and re-indexes the
+movies MovieService changes.
+"""
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.models.movie import Movie
+from app.models.relationships import MovieGenre, MovieLanguage
+
+FACETS = ("genre", "language", "decade", "year", "type", "production_state")
+
+# (movie_id, {facet: [values]})
+MovieFacetValues = Tuple[Any, Dict[str, List[str]]]
+
+
+def _bits_from_positions(positions: Iterable[int], width: int) -> int:
+    buffer = bytearray((width + 7) // 8)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class FacetIndex:
+    """Per-value movie bitsets for each facet"""
+
+    def __init__(self):
+        self._positions: Dict[Any, int] = {}
+        self._free: List[int] = []
+        self._width = 0
+        self._bits: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+        self._movie_values: Dict[Any, Dict[str, List[str]]] = {}
+        self.all_bits = 0
+        self.ready = False
+
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.incremental_updates = 0
+        self.last_update_ms = 0.0
+
+    def build(self, movies: Iterable[MovieFacetValues]) -> None:
+        """Replace the whole index"""
+        started = time.perf_counter()
+        self.__init__()
+        positions: Dict[str, Dict[str, List[int]]] = {facet: defaultdict(list) for facet in FACETS}
+        for position, (movie_id, values) in enumerate(movies):
+            self._positions[movie_id] = position
+            self._movie_values[movie_id] = values
+            for facet, facet_values in values.items():
+                for value in facet_values:
+                    positions[facet][value].append(position)
+
+        self._width = len(self._positions)
+        self.all_bits = (1 << self._width) - 1
+        self._bits = {
+            facet: {value: _bits_from_positions(value_positions, self._width) for value, value_positions in by_value.items()}
+            for facet, by_value in positions.items()
+        }
+        self.ready = True
+        self.builds = 1
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+
+    def replace(self, other: "FacetIndex") -> None:
+        """Take over another index's contents (built elsewhere, e.g. in a thread)"""
+        self._positions, self._free, self._width, self._bits, self._movie_values, self.all_bits = (
+            other._positions, other._free, other._width, other._bits, other._movie_values, other.all_bits
+        )
+        self.ready = True
+        self.builds += 1
+        self.last_build_ms = other.last_build_ms
+
+    def _set(self, facet: str, value: str, mask: int, on: bool) -> None:
+        by_value = self._bits[facet]
+        bits = by_value.get(value, 0)
+        bits = bits | mask if on else bits & ~mask
+        if bits:
+            by_value[value] = bits
+        else:
+            by_value.pop(value, None)
+
+    def update_movies(self, movies: Iterable[MovieFacetValues], removed: Iterable[Any] = ()) -> None:
+        """Re-index some movies' facet values and drop removed ones"""
+        started = time.perf_counter()
+        for movie_id, values in movies:
+            position = self._positions.get(movie_id)
+            if position is None:
+                position = self._free.pop() if self._free else self._width
+                self._width = max(self._width, position + 1)
+                self._positions[movie_id] = position
+                self.all_bits |= 1 << position
+            mask = 1 << position
+            for facet, facet_values in self._movie_values.get(movie_id, {}).items():
+                for value in facet_values:
+                    self._set(facet, value, mask, False)
+            for facet, facet_values in values.items():
+                for value in facet_values:
+                    self._set(facet, value, mask, True)
+            self._movie_values[movie_id] = values
+
+        for movie_id in removed:
+            position = self._positions.pop(movie_id, None)
+            if position is None:
+                continue
+            mask = 1 << position
+            for facet, facet_values in self._movie_values.pop(movie_id, {}).items():
+                for value in facet_values:
+                    self._set(facet, value, mask, False)
+            self.all_bits &= ~mask
+            self._free.append(position)
+
+        self.incremental_updates += 1
+        self.last_update_ms = (time.perf_counter() - started) * 1000
+
+    def bits_for(self, movie_ids: Iterable[Any]) -> int:
+        """Bitset of the given movies (unknown ids are ignored)"""
+        positions = self._positions
+        return _bits_from_positions(
+            (positions[movie_id] for movie_id in movie_ids if movie_id in positions), self._width
+        )
+
+    def filter_bits(self, filters: Dict[str, Any]) -> Optional[int]:
+        """
+        Bitset of the movies matching facet filters, or None if a filter is not a facet
+
+        Genre, language, year and type match exactly; production_state matches
+        any value containing it, case-insensitively, like the SQL filters.
+        """
+        bits = self.all_bits
+        for name, value in filters.items():
+            if value is None or value == "":
+                continue
+            if name == "production_state":
+                needle = str(value).lower()
+                bits &= _union(
+                    state_bits for state, state_bits in self._bits[name].items() if needle in state.lower()
+                )
+            elif name in ("genre", "language", "year", "type"):
+                bits &= self._bits[name].get(_facet_value(value), 0)
+            else:
+                return None
+        return bits
+
+    def counts(self, bits: int) -> Dict[str, Dict[str, int]]:
+        """Number of movies of the result set per facet value, most common first"""
+        facets = {}
+        for facet in FACETS:
+            counts = [(value, (value_bits & bits).bit_count()) for value, value_bits in self._bits[facet].items()]
+            facets[facet] = {
+                value: count for value, count in sorted(counts, key=lambda item: (-item[1], item[0])) if count
+            }
+        return facets
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the bitsets and position maps"""
+        size = sys.getsizeof(self._positions) + sys.getsizeof(self._movie_values) + sys.getsizeof(self.all_bits)
+        for by_value in self._bits.values():
+            size += sys.getsizeof(by_value) + sum(sys.getsizeof(bits) for bits in by_value.values())
+        return size
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Size, memory and rebuild timings for the performance endpoints"""
+        return {
+            "ready": self.ready,
+            "movies": len(self._positions),
+            "width": self._width,
+            "values": {facet: len(by_value) for facet, by_value in self._bits.items()},
+            "memory_bytes": self.memory_bytes(),
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 2),
+            "incremental_updates": self.incremental_updates,
+            "last_update_ms": round(self.last_update_ms, 2),
+        }
+
+
+def _union(bitsets: Iterable[int]) -> int:
+    result = 0
+    for bits in bitsets:
+        result |= bits
+    return result
+
+
+def _facet_value(value: Any) -> str:
+    return str(getattr(value, "value", value))
+
+
+async def load_movie_facets(db, movie_ids: Optional[List[Any]] = None) -> List[MovieFacetValues]:
+    """Facet values of movies (all movies by default)"""
+    query = select(Movie.id, Movie.release_date, Movie.type, Movie.production_state)
+    genre_query = select(MovieGenre.movie_id, MovieGenre.genre)
+    language_query = select(MovieLanguage.movie_id, MovieLanguage.language)
+    if movie_ids is not None:
+        query = query.where(Movie.id.in_(movie_ids))
+        genre_query = genre_query.where(MovieGenre.movie_id.in_(movie_ids))
+        language_query = language_query.where(MovieLanguage.movie_id.in_(movie_ids))
+
+    genres: Dict[Any, List[str]] = defaultdict(list)
+    for movie_id, genre in await db.execute(genre_query):
+        genres[movie_id].append(genre)
+    languages: Dict[Any, List[str]] = defaultdict(list)
+    for movie_id, language in await db.execute(language_query):
+        languages[movie_id].append(language)
+
+    movies = []
+    for row in await db.execute(query):
+        values = {"genre": genres[row.id], "language": languages[row.id]}
+        if row.release_date:
+            values["year"] = [str(row.release_date.year)]
+            values["decade"] = [f"{row.release_date.year // 10 * 10}s"]
+        if row.type:
+            values["type"] = [_facet_value(row.type)]
+        if row.production_state:
+            values["production_state"] = [row.production_state]
+        movies.append((row.id, values))
+    return movies
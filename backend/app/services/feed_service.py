@@ -0,0 +1,526 @@
+"""
+Activity feed timelines for LemonNPie Backend API
+
+Each user's feed is a Redis sorted set (feed:timeline:{user_id}) of activity
+references scored by time, capped at FEED_MAX_LENGTH. When someone posts a
+review, follows a user or adds to their watchlist, the reference is pushed to
+the timelines of their followers (fan-out on write), so reading a page is a
+ZREVRANGEBYSCORE plus one batched load of the referenced reviews, users and
+movies.
+
+Accounts with FEED_CELEBRITY_FOLLOWERS followers or more are not fanned out:
+their activity goes to their own capped outbox (feed:outbox:{user_id}), which
+readers merge in at read time (hybrid pull). Timelines expire when unread and
+are rebuilt from the database on the next read; only existing timelines are
+pushed to. A new follow backfills the followee's recent activity into the
+follower's timeline in a background job.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+import logging
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache.redis import get_redis
+from app.core.config import settings
+from app.models.movie import Movie
+from app.models.relationships import UserFollow, UserWatchlist
+from app.models.review import Review
+from app.models.user import User
+from app.schemas.user import ActivityFeedResponse, ActivityItem, UserPublicProfile
+
+logger = logging.getLogger(__name__)
+
+REVIEW_POSTED = "review_posted"
+USER_FOLLOWED = "user_followed"
+MOVIE_WATCHLISTED = "movie_watchlisted"
+FEED_KINDS = (REVIEW_POSTED, USER_FOLLOWED, MOVIE_WATCHLISTED)
+
+TIMELINE_KEY = "feed:timeline:{user_id}"
+OUTBOX_KEY = "feed:outbox:{user_id}"
+CELEBRITIES_KEY = "feed:celebrities"
+
+# Marks a built timeline, so an empty feed is not rebuilt on every read;
+# scored 0 it is always rank 0 and outside the "(0" read range
+BUILT_MARKER = "built"
+
+# (member, score)
+FeedEntry = Tuple[str, float]
+
+
+def timeline_key(user_id: Any) -> str:
+    return TIMELINE_KEY.format(user_id=user_id)
+
+
+def outbox_key(user_id: Any) -> str:
+    return OUTBOX_KEY.format(user_id=user_id)
+
+
+def feed_member(kind: str, actor_id: Any, ref_id: Any) -> str:
+    """Timeline member for an activity: who did what to which review, user or movie"""
+    return f"{kind}:{actor_id}:{ref_id}"
+
+
+def parse_member(member: str) -> Optional[Tuple[str, UUID, UUID]]:
+    """(kind, actor_id, ref_id) of a timeline member, or None for anything else"""
+    parts = member.split(":")
+    if len(parts) != 3 or parts[0] not in FEED_KINDS:
+        return None
+    try:
+        return parts[0], UUID(parts[1]), UUID(parts[2])
+    except ValueError:
+        return None
+
+
+def event_score(created_at: Optional[datetime]) -> float:
+    """Timeline score of an activity time (naive datetimes are UTC)"""
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at.timestamp()
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class FeedService:
+    """Fan-out-on-write activity timelines with pull for celebrity accounts"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # Writes
+
+    async def publish_event(
+        self,
+        kind: str,
+        actor_id: UUID,
+        ref_id: UUID,
+        created_at: Optional[datetime] = None
+    ) -> int:
+        """
+        Push an activity to the timelines of the actor's followers
+
+        Returns:
+            Number of timelines pushed to (0 for celebrity accounts, whose outbox is read instead)
+        """
+        redis = await get_redis()
+        member = feed_member(kind, actor_id, ref_id)
+        score = event_score(created_at)
+
+        if await self._update_celebrity(redis, actor_id):
+            await self._ensure_outbox(redis, actor_id)
+            key = outbox_key(actor_id)
+            pipe = redis.pipeline(transaction=False)
+            pipe.zadd(key, {member: score})
+            pipe.zremrangebyrank(key, 0, -(settings.FEED_MAX_LENGTH + 1))
+            pipe.expire(key, settings.FEED_TIMELINE_TTL_SECONDS)
+            await pipe.execute()
+            return 0
+
+        pushed = 0
+        for followers in _chunks(await self._follower_ids(actor_id), settings.FEED_FANOUT_BATCH_SIZE):
+            keys = [timeline_key(follower_id) for follower_id in followers]
+            pipe = redis.pipeline(transaction=False)
+            for key in keys:
+                pipe.exists(key)
+            existing = [key for key, exists in zip(keys, await pipe.execute()) if exists]
+            if not existing:
+                continue
+
+            pipe = redis.pipeline(transaction=False)
+            for key in existing:
+                pipe.zadd(key, {member: score})
+                # Rank 0 is the built marker
+                pipe.zremrangebyrank(key, 1, -(settings.FEED_MAX_LENGTH + 1))
+            await pipe.execute()
+            pushed += len(existing)
+        return pushed
+
+    async def retract_event(self, kind: str, actor_id: UUID, ref_id: UUID) -> None:
+        """Remove an undone activity from the actor's outbox and their followers' timelines"""
+        redis = await get_redis()
+        member = feed_member(kind, actor_id, ref_id)
+        await redis.zrem(outbox_key(actor_id), member)
+        if await redis.sismember(CELEBRITIES_KEY, str(actor_id)):
+            # Older fanned-out copies are dropped when a read finds them stale
+            return
+
+        for followers in _chunks(await self._follower_ids(actor_id), settings.FEED_FANOUT_BATCH_SIZE):
+            pipe = redis.pipeline(transaction=False)
+            for follower_id in followers:
+                pipe.zrem(timeline_key(follower_id), member)
+            await pipe.execute()
+
+    async def on_follow(self, follower_id: UUID, following_id: UUID, created_at: Optional[datetime] = None) -> None:
+        """Publish a new follow and backfill the followee's recent activity for the follower"""
+        await self.publish_event(USER_FOLLOWED, follower_id, following_id, created_at)
+
+        if settings.FEED_BACKFILL_IN_BACKGROUND:
+            try:
+                from app.tasks.feed_tasks import backfill_timeline_task
+
+                backfill_timeline_task.delay(str(follower_id), str(following_id))
+                return
+            except Exception as e:
+                logger.warning(f"Failed to queue feed backfill, running it inline: {e}")
+        await self.backfill(follower_id, following_id)
+
+    async def on_unfollow(self, follower_id: UUID, following_id: UUID) -> None:
+        """Retract the follow and drop the followee's activity from the follower's timeline"""
+        await self.retract_event(USER_FOLLOWED, follower_id, following_id)
+
+        redis = await get_redis()
+        key = timeline_key(follower_id)
+        actor = str(following_id)
+        members = [_decode(member) for member in await redis.zrange(key, 0, -1)]
+        doomed = [member for member in members if member.split(":")[1:2] == [actor]]
+        if doomed:
+            await redis.zrem(key, *doomed)
+
+    async def backfill(self, follower_id: UUID, following_id: UUID) -> int:
+        """
+        Merge a followee's recent activity into the follower's timeline
+
+        Returns:
+            Number of activities merged (0 when the timeline is not built, the
+            follow is gone or the followee is read through their outbox)
+        """
+        redis = await get_redis()
+        key = timeline_key(follower_id)
+        pipe = redis.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.sismember(CELEBRITIES_KEY, str(following_id))
+        exists, celebrity = await pipe.execute()
+        if not exists or celebrity:
+            return 0
+
+        follow = await self.db.execute(
+            select(UserFollow.follower_id).where(
+                UserFollow.follower_id == follower_id,
+                UserFollow.following_id == following_id
+            )
+        )
+        if follow.first() is None:
+            return 0
+
+        entries = await self._load_activity([following_id], settings.FEED_MAX_LENGTH)
+        if entries:
+            pipe = redis.pipeline(transaction=False)
+            pipe.zadd(key, dict(entries))
+            pipe.zremrangebyrank(key, 1, -(settings.FEED_MAX_LENGTH + 1))
+            await pipe.execute()
+        return len(entries)
+
+    # Reads
+
+    async def get_feed(self, user_id: UUID, page: int, per_page: int) -> ActivityFeedResponse:
+        """A page of the activities of the users someone follows, most recent first"""
+        offset = (page - 1) * per_page
+        try:
+            entries, total = await self._read_timeline(await get_redis(), user_id, offset, per_page)
+        except Exception as e:
+            logger.warning(f"Feed timeline unavailable, reading from the database: {e}")
+            entries = await self._load_activity(await self._following_ids(user_id), settings.FEED_MAX_LENGTH)
+            total = len(entries)
+            entries = entries[offset:offset + per_page]
+
+        activities, stale = await self._hydrate(entries)
+        if stale:
+            await self._drop_stale(user_id, stale)
+
+        return ActivityFeedResponse(
+            activities=activities,
+            total=total,
+            page=page,
+            per_page=per_page,
+            has_next=(offset + per_page) < total,
+            has_prev=page > 1
+        )
+
+    async def _read_timeline(self, redis, user_id: UUID, offset: int, limit: int) -> Tuple[List[FeedEntry], int]:
+        """A window of the timeline merged with followed celebrities' outboxes, and the total"""
+        key = timeline_key(user_id)
+        pipe = redis.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.smembers(CELEBRITIES_KEY)
+        exists, celebrities = await pipe.execute()
+        celebrities = {_decode(member) for member in celebrities}
+        if not exists:
+            await self._rebuild_timeline(redis, user_id, celebrities)
+
+        followed_celebrities = await self._followed_celebrities(user_id, celebrities)
+        if not followed_celebrities:
+            pipe = redis.pipeline(transaction=False)
+            pipe.zrevrangebyscore(key, "+inf", "(0", start=offset, num=limit, withscores=True)
+            pipe.zcount(key, "(0", "+inf")
+            pipe.expire(key, settings.FEED_TIMELINE_TTL_SECONDS)
+            entries, total, _ = await pipe.execute()
+            return [(_decode(member), score) for member, score in entries], total
+
+        # Every source's first offset + limit entries hold the merged window
+        for celebrity_id in followed_celebrities:
+            await self._ensure_outbox(redis, celebrity_id)
+        window = offset + limit
+        pipe = redis.pipeline(transaction=False)
+        pipe.zrevrangebyscore(key, "+inf", "(0", start=0, num=window, withscores=True)
+        pipe.zcount(key, "(0", "+inf")
+        pipe.expire(key, settings.FEED_TIMELINE_TTL_SECONDS)
+        for celebrity_id in followed_celebrities:
+            pipe.zrevrangebyscore(outbox_key(celebrity_id), "+inf", "-inf", start=0, num=window, withscores=True)
+            pipe.zcard(outbox_key(celebrity_id))
+        results = await pipe.execute()
+
+        merged: Dict[str, float] = {}
+        total = results[1]
+        for entries in [results[0]] + results[3::2]:
+            for member, score in entries:
+                merged[_decode(member)] = score
+        total += sum(results[4::2])
+        ranked = sorted(merged.items(), key=lambda entry: (-entry[1], entry[0]))
+        return ranked[offset:window], total
+
+    async def _rebuild_timeline(self, redis, user_id: UUID, celebrities: Set[str]) -> None:
+        """Build a missing timeline from the recent activity of the users followed"""
+        following_ids = [
+            following_id for following_id in await self._following_ids(user_id)
+            if str(following_id) not in celebrities
+        ]
+        entries = await self._load_activity(following_ids, settings.FEED_MAX_LENGTH)
+
+        key = timeline_key(user_id)
+        pipe = redis.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.zadd(key, {BUILT_MARKER: 0, **dict(entries)})
+        pipe.expire(key, settings.FEED_TIMELINE_TTL_SECONDS)
+        await pipe.execute()
+
+    async def _ensure_outbox(self, redis, actor_id: Any) -> None:
+        """Seed a celebrity's missing outbox from their recent activity"""
+        key = outbox_key(actor_id)
+        if await redis.exists(key):
+            return
+        entries = await self._load_activity([UUID(str(actor_id))], settings.FEED_MAX_LENGTH)
+        if entries:
+            pipe = redis.pipeline(transaction=False)
+            pipe.zadd(key, dict(entries))
+            pipe.expire(key, settings.FEED_TIMELINE_TTL_SECONDS)
+            await pipe.execute()
+
+    async def _hydrate(self, entries: List[FeedEntry]) -> Tuple[List[ActivityItem], List[str]]:
+        """
+        Load everything a page of timeline entries refers to in one query per table
+
+        Returns:
+            The activities, and the members whose review, follow or watchlist entry is gone
+        """
+        parsed = [(member, parse_member(member)) for member, _ in entries]
+        refs: Dict[str, List[Tuple[UUID, UUID]]] = {kind: [] for kind in FEED_KINDS}
+        for _, ref in parsed:
+            if ref is not None:
+                refs[ref[0]].append(ref[1:])
+
+        reviews = {}
+        if refs[REVIEW_POSTED]:
+            result = await self.db.execute(
+                select(Review).where(Review.id.in_([review_id for _, review_id in refs[REVIEW_POSTED]]))
+            )
+            reviews = {review.id: review for review in result.scalars().all()}
+
+        follows = {}
+        if refs[USER_FOLLOWED]:
+            result = await self.db.execute(
+                select(UserFollow.follower_id, UserFollow.following_id, UserFollow.created_at).where(
+                    UserFollow.follower_id.in_({actor_id for actor_id, _ in refs[USER_FOLLOWED]}),
+                    UserFollow.following_id.in_({followed_id for _, followed_id in refs[USER_FOLLOWED]})
+                )
+            )
+            follows = {(row.follower_id, row.following_id): row.created_at for row in result}
+
+        watchlisted = {}
+        if refs[MOVIE_WATCHLISTED]:
+            result = await self.db.execute(
+                select(UserWatchlist.user_id, UserWatchlist.movie_id, UserWatchlist.added_at).where(
+                    UserWatchlist.user_id.in_({actor_id for actor_id, _ in refs[MOVIE_WATCHLISTED]}),
+                    UserWatchlist.movie_id.in_({movie_id for _, movie_id in refs[MOVIE_WATCHLISTED]})
+                )
+            )
+            watchlisted = {(row.user_id, row.movie_id): row.added_at for row in result}
+
+        user_ids = {ref[1] for _, ref in parsed if ref is not None}
+        user_ids.update(followed_id for _, followed_id in refs[USER_FOLLOWED])
+        users = {}
+        if user_ids:
+            result = await self.db.execute(select(User).where(User.id.in_(user_ids), User.is_active == True))
+            users = {user.id: user for user in result.scalars().all()}
+
+        movie_ids = {review.movie_id for review in reviews.values()}
+        movie_ids.update(movie_id for _, movie_id in refs[MOVIE_WATCHLISTED])
+        movies = {}
+        if movie_ids:
+            result = await self.db.execute(select(Movie.id, Movie.title).where(Movie.id.in_(movie_ids)))
+            movies = {row.id: row.title for row in result}
+
+        from app.services.user_service import UserService
+
+        stats = await UserService().get_user_stats_many(
+            [ref[1] for _, ref in parsed if ref is not None and ref[1] in users], self.db
+        )
+
+        activities, stale = [], []
+        for member, ref in parsed:
+            activity = self._build_activity(ref, reviews, follows, watchlisted, users, movies, stats) if ref else None
+            if activity is None:
+                stale.append(member)
+            else:
+                activities.append(activity)
+        return activities, stale
+
+    @staticmethod
+    def _build_activity(ref, reviews, follows, watchlisted, users, movies, stats) -> Optional[ActivityItem]:
+        """The feed item for a timeline entry, or None if what it refers to is gone"""
+        kind, actor_id, ref_id = ref
+        user = users.get(actor_id)
+        if user is None:
+            return None
+        profile = UserPublicProfile(
+            id=user.id,
+            name=user.name,
+            bio=user.bio,
+            location=user.location,
+            avatar_url=user.avatar_url,
+            role=user.role,
+            is_verified=user.is_verified,
+            created_at=user.created_at,
+            stats=stats[actor_id]
+        )
+
+        if kind == REVIEW_POSTED:
+            review = reviews.get(ref_id)
+            if review is None or review.user_id != actor_id or review.movie_id not in movies:
+                return None
+            movie_title = movies[review.movie_id]
+            return ActivityItem(
+                id=review.id,
+                type=REVIEW_POSTED,
+                user=profile,
+                title=f"{user.name} reviewed {movie_title}",
+                description=f"Rated {review.lemon_pie_rating}/10: {review.review_text[:100]}{'...' if len(review.review_text) > 100 else ''}",
+                data={
+                    "movie_id": str(review.movie_id),
+                    "movie_title": movie_title,
+                    "rating": review.lemon_pie_rating,
+                    "review_id": str(review.id)
+                },
+                created_at=review.created_at
+            )
+
+        if kind == USER_FOLLOWED:
+            followed = users.get(ref_id)
+            if (actor_id, ref_id) not in follows or followed is None:
+                return None
+            return ActivityItem(
+                id=actor_id,  # Using follower_id as unique identifier
+                type=USER_FOLLOWED,
+                user=profile,
+                title=f"{user.name} followed {followed.name}",
+                description=f"{user.name} started following {followed.name}",
+                data={
+                    "followed_user_id": str(followed.id),
+                    "followed_user_name": followed.name
+                },
+                created_at=follows[(actor_id, ref_id)]
+            )
+
+        if (actor_id, ref_id) not in watchlisted or ref_id not in movies:
+            return None
+        movie_title = movies[ref_id]
+        return ActivityItem(
+            id=actor_id,  # Using combination as unique identifier
+            type=MOVIE_WATCHLISTED,
+            user=profile,
+            title=f"{user.name} added {movie_title} to watchlist",
+            description=f"{user.name} wants to watch {movie_title}",
+            data={
+                "movie_id": str(ref_id),
+                "movie_title": movie_title
+            },
+            created_at=watchlisted[(actor_id, ref_id)]
+        )
+
+    async def _drop_stale(self, user_id: UUID, members: List[str]) -> None:
+        """Remove entries whose activity was undone without being retracted"""
+        try:
+            redis = await get_redis()
+            pipe = redis.pipeline(transaction=False)
+            pipe.zrem(timeline_key(user_id), *members)
+            for member in members:
+                ref = parse_member(member)
+                if ref is not None:
+                    pipe.zrem(outbox_key(ref[1]), member)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to drop stale feed entries: {e}")
+
+    # Database
+
+    async def _load_activity(self, actor_ids: List[UUID], limit: int) -> List[FeedEntry]:
+        """The most recent activities of some users as timeline entries"""
+        if not actor_ids:
+            return []
+
+        queries = (
+            (REVIEW_POSTED, select(Review.user_id, Review.id, Review.created_at)
+                .where(Review.user_id.in_(actor_ids)).order_by(Review.created_at.desc())),
+            (USER_FOLLOWED, select(UserFollow.follower_id, UserFollow.following_id, UserFollow.created_at)
+                .where(UserFollow.follower_id.in_(actor_ids)).order_by(UserFollow.created_at.desc())),
+            (MOVIE_WATCHLISTED, select(UserWatchlist.user_id, UserWatchlist.movie_id, UserWatchlist.added_at)
+                .where(UserWatchlist.user_id.in_(actor_ids)).order_by(UserWatchlist.added_at.desc())),
+        )
+        entries = []
+        for kind, query in queries:
+            for actor_id, ref_id, created_at in await self.db.execute(query.limit(limit)):
+                entries.append((feed_member(kind, actor_id, ref_id), event_score(created_at)))
+        entries.sort(key=lambda entry: (-entry[1], entry[0]))
+        return entries[:limit]
+
+    async def _following_ids(self, user_id: UUID) -> List[UUID]:
+        result = await self.db.execute(select(UserFollow.following_id).where(UserFollow.follower_id == user_id))
+        return list(result.scalars().all())
+
+    async def _follower_ids(self, user_id: UUID) -> List[UUID]:
+        result = await self.db.execute(select(UserFollow.follower_id).where(UserFollow.following_id == user_id))
+        return list(result.scalars().all())
+
+    async def _followed_celebrities(self, user_id: UUID, celebrities: Set[str]) -> List[UUID]:
+        """The celebrity accounts a user follows"""
+        if not celebrities:
+            return []
+        result = await self.db.execute(
+            select(UserFollow.following_id).where(
+                UserFollow.follower_id == user_id,
+                UserFollow.following_id.in_([UUID(celebrity) for celebrity in celebrities])
+            )
+        )
+        return list(result.scalars().all())
+
+    async def _update_celebrity(self, redis, actor_id: UUID) -> bool:
+        """Whether the actor is read through their outbox, recording it for readers"""
+        result = await self.db.execute(
+            select(func.count(UserFollow.follower_id)).where(UserFollow.following_id == actor_id)
+        )
+        celebrity = (result.scalar() or 0) >= settings.FEED_CELEBRITY_FOLLOWERS
+        if celebrity:
+            await redis.sadd(CELEBRITIES_KEY, str(actor_id))
+        else:
+            await redis.srem(CELEBRITIES_KEY, str(actor_id))
+        return celebrity
@@ -0,0 +1,199 @@
+"""
+In-process trigram index for fuzzy movie and person search in LemonNPie Backend API
+
+The fallback for databases without pg_trgm. Titles, directors and cast names
+are split into pg_trgm-style trigrams (each folded word padded with two spaces
+in front and one behind) with an inverted index from trigram to names, so a
+misspelling such as "Funke Akindle" still shares most of its trigrams with
+"Funke Akindele". Similarity is the pg_trgm measure: shared trigrams over the
+union of both sets.
+
+Candidates come only from the rarest query trigrams' postings: a name at or
+above the threshold must share at least threshold x |query trigrams| of them,
+so it appears in at least one of the |query trigrams| - that + 1 rarest lists.
+Shared trigrams are then counted with set intersections against the remaining
+lists, so exact similarities need no per-name trigram sets.
+"""
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from app.services.autocomplete import MovieNames, normalize
+
+# (name, kind, similarity, {movie_id: popularity})
+TrigramMatch = Tuple[str, str, float, Dict[Any, float]]
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """pg_trgm-style trigrams of the folded words of text"""
+    return _trigrams(normalize(text))
+
+
+def _trigrams(normalized: str) -> FrozenSet[str]:
+    grams: Set[str] = set()
+    for word in normalized.split():
+        padded = f"  {word} "
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """Shared trigrams over all trigrams of either set"""
+    if not first or not second:
+        return 0.0
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+class _Name:
+    __slots__ = ("text", "kind", "key", "size", "refs")
+
+    def __init__(self, text: str, kind: str, key: str, size: int):
+        self.text = text
+        self.kind = kind
+        self.key = key  # normalized text
+        self.size = size  # number of trigrams
+        self.refs: Dict[Any, float] = {}  # movie id -> popularity
+
+
+class TrigramIndex:
+    """Inverted trigram index over (kind, name) pairs, maintained per movie like AutocompleteIndex"""
+
+    def __init__(self):
+        self._names: Dict[int, _Name] = {}
+        self._name_ids: Dict[Tuple[str, str], int] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._movie_names: Dict[Any, Set[int]] = {}
+        self._next_id = 0
+        self.ready = False
+
+        self.builds = 0
+        self.last_build_ms = 0.0
+        self.incremental_updates = 0
+        self.last_update_ms = 0.0
+        self.queries = 0
+
+    def _attach(self, movie_id: Any, kind: str, name: str, popularity: float) -> None:
+        normalized = normalize(name)
+        if not normalized:
+            return
+        name_id = self._name_ids.get((kind, normalized))
+        if name_id is None:
+            name_id = self._name_ids[(kind, normalized)] = self._next_id
+            self._next_id += 1
+            grams = _trigrams(normalized)
+            self._names[name_id] = _Name(name.strip(), kind, normalized, len(grams))
+            for gram in grams:
+                self._postings[gram].add(name_id)
+        self._names[name_id].refs[movie_id] = popularity
+        self._movie_names.setdefault(movie_id, set()).add(name_id)
+
+    def _detach(self, movie_id: Any) -> None:
+        for name_id in self._movie_names.pop(movie_id, set()):
+            entry = self._names[name_id]
+            entry.refs.pop(movie_id, None)
+            if entry.refs:
+                continue
+            del self._names[name_id]
+            del self._name_ids[(entry.kind, entry.key)]
+            for gram in _trigrams(entry.key):
+                postings = self._postings[gram]
+                postings.discard(name_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def build(self, movies: Iterable[MovieNames]) -> None:
+        """Replace the whole index"""
+        started = time.perf_counter()
+        self.__init__()
+        for movie_id, names, popularity in movies:
+            for kind, name in names:
+                self._attach(movie_id, kind, name, popularity)
+        self.ready = True
+        self.builds = 1
+        self.last_build_ms = (time.perf_counter() - started) * 1000
+
+    def replace(self, other: "TrigramIndex") -> None:
+        """Take over another index's contents (built elsewhere, e.g. in a thread)"""
+        self._names, self._name_ids, self._postings, self._movie_names, self._next_id = (
+            other._names, other._name_ids, other._postings, other._movie_names, other._next_id
+        )
+        self.ready = True
+        self.builds += 1
+        self.last_build_ms = other.last_build_ms
+
+    def update_movies(self, movies: Iterable[MovieNames], removed: Iterable[Any] = ()) -> None:
+        """Re-index some movies and drop removed ones"""
+        started = time.perf_counter()
+        movies = list(movies)
+        for movie_id in [movie_id for movie_id, _, _ in movies] + list(removed):
+            self._detach(movie_id)
+        for movie_id, names, popularity in movies:
+            for kind, name in names:
+                self._attach(movie_id, kind, name, popularity)
+        self.incremental_updates += 1
+        self.last_update_ms = (time.perf_counter() - started) * 1000
+
+    def search(
+        self,
+        query: str,
+        threshold: float = 0.3,
+        kinds: Optional[Set[str]] = None,
+        limit: int = 50
+    ) -> List[TrigramMatch]:
+        """Names at least threshold-similar to query, most similar first"""
+        self.queries += 1
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        size = len(query_grams)
+        required = max(1, math.ceil(threshold * size))
+        rarest = sorted(query_grams, key=lambda gram: len(self._postings.get(gram, ())))
+        prefix = size - required + 1
+        candidates: Set[int] = set()
+        shared: Counter = Counter()
+        for gram in rarest[:prefix]:
+            postings = self._postings.get(gram, set())
+            candidates |= postings
+            shared.update(postings)
+        for gram in rarest[prefix:]:
+            shared.update(candidates & self._postings.get(gram, set()))
+
+        matches = []
+        for name_id, count in shared.items():
+            if count < required:
+                continue
+            entry = self._names[name_id]
+            score = count / (size + entry.size - count)
+            if score >= threshold and (not kinds or entry.kind in kinds):
+                matches.append((entry.text, entry.kind, score, dict(entry.refs)))
+        matches.sort(key=lambda match: (-match[2], match[0]))
+        return matches[:limit]
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the index structures"""
+        size = sys.getsizeof(self._names) + sum(
+            sys.getsizeof(entry) + sys.getsizeof(entry.text) + sys.getsizeof(entry.key) + sys.getsizeof(entry.refs)
+            for entry in self._names.values()
+        )
+        size += sys.getsizeof(self._name_ids) + sys.getsizeof(self._movie_names)
+        size += sys.getsizeof(self._postings) + sum(sys.getsizeof(postings) for postings in self._postings.values())
+        return size
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Size, memory and rebuild timings for the performance endpoints"""
+        return {
+            "ready": self.ready,
+            "names": len(self._names),
+            "trigrams": len(self._postings),
+            "movies": len(self._movie_names),
+            "memory_bytes": self.memory_bytes(),
+            "builds": self.builds,
+            "last_build_ms": round(self.last_build_ms, 2),
+            "incremental_updates": self.incremental_updates,
+            "last_update_ms": round(self.last_update_ms, 2),
+            "queries": self.queries,
+        }
@@ -0,0 +1,352 @@
+"""
+Streaming latency sketches for LemonNPie Backend API
+
+Each worker keeps one DDSketch per (endpoint, status class, minute) in memory,
+fed by AnalyticsMiddleware, and flushes them every
+LATENCY_SKETCH_FLUSH_INTERVAL_SECONDS as compact blobs to the latency_sketches
+table. Sketches are mergeable, so any window's percentiles come from merging
+the stored rows, with bounded memory and a relative error of at most
+LATENCY_SKETCH_RELATIVE_ACCURACY.
+"""
+import asyncio
+import math
+import struct
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import and_, insert, select
+import structlog
+
+from app.core.config import settings
+from app.db import database
+from app.models.analytics_rollups import LatencySketch
+
+logger = structlog.get_logger(__name__)
+
+# Blob layout: version, relative accuracy, count, zero count, sum, min, max,
+# number of bins, then (index, count) pairs
+SKETCH_HEADER = struct.Struct("!BdQQdddI")
+SKETCH_BIN = struct.Struct("!iQ")
+SKETCH_VERSION = 1
+
+# Values at or below this are counted as zero (latencies are in milliseconds)
+MIN_INDEXABLE_VALUE = 1e-3
+
+DEFAULT_QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99, "p999": 0.999}
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees (DDSketch)
+
+    Values are counted in logarithmic buckets of ratio gamma, so every
+    quantile estimate is within relative_accuracy of the true value. When
+    there are more than max_bins buckets the lowest ones are collapsed, which
+    only affects accuracy at the bottom of the distribution.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = defaultdict(int)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Record value count times"""
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            self.bins[math.ceil(math.log(value) / self._log_gamma)] += count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets into one so at most max_bins remain"""
+        indexes = sorted(self.bins)
+        keep_from = indexes[len(indexes) - self.max_bins]
+        folded = sum(self.bins.pop(index) for index in indexes if index < keep_from)
+        self.bins[keep_from] += folded
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add another sketch's values (both must use the same accuracy)"""
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if not other.count:
+            return
+        for index, count in other.bins.items():
+            self.bins[index] += count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimated value at quantile q (0..1); 0.0 for an empty sketch"""
+        if not self.count:
+            return 0.0
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, quantiles: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Named quantiles, e.g. {"p50": ..., "p99": ...}"""
+        return {name: self.quantile(q) for name, q in (quantiles or DEFAULT_QUANTILES).items()}
+
+    @property
+    def average(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form for storage"""
+        header = SKETCH_HEADER.pack(
+            SKETCH_VERSION,
+            self.relative_accuracy,
+            self.count,
+            self.zero_count,
+            self.sum,
+            self.min if self.count else 0.0,
+            self.max if self.count else 0.0,
+            len(self.bins)
+        )
+        return header + b"".join(SKETCH_BIN.pack(index, count) for index, count in sorted(self.bins.items()))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DDSketch":
+        version, accuracy, count, zero_count, total, minimum, maximum, bin_count = SKETCH_HEADER.unpack_from(data)
+        if version != SKETCH_VERSION:
+            raise ValueError(f"Unsupported sketch version {version}")
+
+        sketch = cls(relative_accuracy=accuracy)
+        offset = SKETCH_HEADER.size
+        for _ in range(bin_count):
+            index, bin_count_value = SKETCH_BIN.unpack_from(data, offset)
+            sketch.bins[index] = bin_count_value
+            offset += SKETCH_BIN.size
+        sketch.count = count
+        sketch.zero_count = zero_count
+        sketch.sum = total
+        if count:
+            sketch.min, sketch.max = minimum, maximum
+        return sketch
+
+
+def status_class(status_code: int) -> str:
+    """"2xx", "4xx", ... for a status code"""
+    return f"{status_code // 100}xx"
+
+
+SketchKey = Tuple[datetime, str, str]  # (minute, endpoint, status class)
+
+
+class LatencySketchRecorder:
+    """Per-worker in-memory sketches with a background flusher"""
+
+    def __init__(
+        self,
+        relative_accuracy: float = 0.01,
+        flush_interval: float = 60.0,
+        max_keys: int = 5000
+    ):
+        self.relative_accuracy = relative_accuracy
+        self.flush_interval = flush_interval
+        self.max_keys = max_keys
+        self.sketches: Dict[SketchKey, DDSketch] = {}
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.dropped = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+        self.last_flush_ms = 0.0
+
+    def record(self, endpoint: str, status_code: int, latency_ms: float, at: Optional[datetime] = None) -> None:
+        """Add one request's latency to its minute's sketch"""
+        minute = (at or datetime.utcnow()).replace(second=0, microsecond=0)
+        key = (minute, endpoint, status_class(status_code))
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            if len(self.sketches) >= self.max_keys:
+                self.dropped += 1
+                return
+            sketch = self.sketches[key] = DDSketch(self.relative_accuracy)
+        sketch.add(latency_ms)
+        self.recorded += 1
+
+    def start(self) -> None:
+        """Start the background flusher"""
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write what is still in memory"""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write every in-memory sketch as one row and start afresh; returns rows written"""
+        if not self.sketches:
+            return 0
+
+        sketches, self.sketches = self.sketches, {}
+        started = time.perf_counter()
+        rows = [
+            {
+                "id": str(uuid4()),
+                "minute": minute,
+                "endpoint": endpoint,
+                "status_class": status,
+                "sample_count": sketch.count,
+                "sketch": sketch.to_bytes(),
+            }
+            for (minute, endpoint, status), sketch in sketches.items()
+        ]
+        try:
+            async with database.async_session_maker() as db:
+                await db.execute(insert(LatencySketch).values(rows))
+                await db.commit()
+        except Exception as e:
+            self.flush_errors += 1
+            logger.error("Latency sketch flush failed", sketches=len(rows), error=str(e))
+            return 0
+
+        self.flushed_rows += len(rows)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """In-memory size and counters for the performance endpoints"""
+        return {
+            "sketches_in_memory": len(self.sketches),
+            "bins_in_memory": sum(len(sketch.bins) for sketch in self.sketches.values()),
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "flushed_rows": self.flushed_rows,
+            "flush_errors": self.flush_errors,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+async def load_latency_sketches(
+    db,
+    start: datetime,
+    end: datetime,
+    endpoint: Optional[str] = None
+) -> Dict[Tuple[str, str], DDSketch]:
+    """
+    Merge the stored sketches of a window per (endpoint, status class)
+
+    Args:
+        db: Database session
+        start: Window start (the containing minute is included)
+        end: Window end (inclusive)
+        endpoint: Only this endpoint
+
+    Returns:
+        Merged sketch per (endpoint, status class)
+    """
+    conditions = [
+        LatencySketch.minute >= start.replace(second=0, microsecond=0),
+        LatencySketch.minute <= end
+    ]
+    if endpoint:
+        conditions.append(LatencySketch.endpoint == endpoint)
+
+    result = await db.execute(
+        select(LatencySketch.endpoint, LatencySketch.status_class, LatencySketch.sketch).where(and_(*conditions))
+    )
+    merged: Dict[Tuple[str, str], DDSketch] = {}
+    for row in result:
+        sketch = DDSketch.from_bytes(row.sketch)
+        key = (row.endpoint, row.status_class)
+        if key in merged:
+            merged[key].merge(sketch)
+        else:
+            merged[key] = sketch
+    return merged
+
+
+def merge_sketches(sketches: Iterable[DDSketch]) -> Optional[DDSketch]:
+    """One sketch holding all the given sketches' values (None if there are none)"""
+    merged = None
+    for sketch in sketches:
+        if merged is None:
+            merged = DDSketch(sketch.relative_accuracy)
+        merged.merge(sketch)
+    return merged
+
+
+def summarize_sketch(sketch: DDSketch) -> Dict[str, float]:
+    """Count, average and the default percentiles of a sketch"""
+    return {"count": sketch.count, "average": sketch.average, **sketch.quantiles()}
+
+
+# Global recorder, created during application startup
+latency_recorder: Optional[LatencySketchRecorder] = None
+
+
+async def init_latency_sketches() -> None:
+    """Create the per-worker recorder and start its flusher"""
+    global latency_recorder
+
+    latency_recorder = LatencySketchRecorder(
+        relative_accuracy=settings.LATENCY_SKETCH_RELATIVE_ACCURACY,
+        flush_interval=settings.LATENCY_SKETCH_FLUSH_INTERVAL_SECONDS,
+        max_keys=settings.LATENCY_SKETCH_MAX_KEYS
+    )
+    latency_recorder.start()
+
+
+async def close_latency_sketches() -> None:
+    """Flush in-memory sketches and stop the flusher"""
+    global latency_recorder
+
+    if latency_recorder:
+        await latency_recorder.stop()
+        latency_recorder = None
+
+
+def get_latency_recorder() -> Optional[LatencySketchRecorder]:
+    """Get the recorder (None before startup or after shutdown)"""
+    return latency_recorder
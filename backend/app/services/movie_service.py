@@ -4,184 +4,120 @@ Movie service for LemonNPie Backend API
 from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, asc, delete
+from sqlalchemy import select, func, and_, or_, desc, delete
 from sqlalchemy.orm import selectinload, joinedload
 
 from app.models.movie import Movie
 from app.models.relationships import MovieGenre, MovieLanguage, MovieCast
 from app.models.review import Review
+from app.models.movie_stats import MovieStatistics
 from app.schemas.movie import (
     MovieCreate, MovieUpdate, MovieResponse, MovieListResponse, 
-    MovieSearchFilters, MovieSortBy, PaginatedMovieResponse, MovieStats, CastMember
+    MovieSearchFilters, MovieSortBy, PaginatedMovieResponse, CastMember, MovieFacets
 )
 from app.models.enums import ModerationStatus
 from app.core.exceptions import NotFoundError, ValidationError
-from app.cache.redis import get_movie_cache_service, get_review_cache_service
-from app.db.optimization import OptimizedQueries
-from app.services.performance_service import monitor_performance
+from app.db.pagination import KeysetPaginator, count_rows
+from app.cache.redis import get_movie_cache_service, get_review_cache_service, get_search_cache_service
+from app.services.movie_stats_service import MovieStatsService
+from app.services.search_backends import index_movies, remove_movies
+from app.services.autocomplete import get_facet_index, publish_movie_changes
+from app.services.viewer_context import get_viewer_context
 
 
 class MovieService:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.stats_service = MovieStatsService(db)
 
     async def get_movies(
         self, 
         page: int = 1, 
         limit: int = 20,
         filters: Optional[MovieSearchFilters] = None,
-        sort_by: Optional[MovieSortBy] = None
+        sort_by: Optional[MovieSortBy] = None,
+        after: Optional[str] = None,
+        include_total: bool = False,
+        include_facets: bool = False,
+        user_id: Optional[UUID] = None
     ) -> PaginatedMovieResponse:
-        """Get paginated list of movies with filtering and sorting"""
+        """
+        Get paginated list of movies with filtering and sorting
+        
+        Pass ``after`` (a ``next_cursor`` from a previous response) to seek
+        instead of paging by number; the total is then only computed
+        (estimated) when ``include_total`` is set. ``include_facets`` adds
+        the facet counts of all matching movies. With ``user_id`` each movie
+        says whether it is on that user's watchlist and favorites.
+        """
         
         # Build base query
         query = select(Movie).options(
-            selectinload(Movie.genres),
-            selectinload(Movie.languages),
-            selectinload(Movie.cast),
-            selectinload(Movie.reviews)
+            selectinload(Movie.genres)
         )
         
         # Apply filters
-        if filters:
-            conditions = []
-            
-            if filters.genre:
-                genre_subquery = select(MovieGenre.movie_id).where(MovieGenre.genre == filters.genre)
-                conditions.append(Movie.id.in_(genre_subquery))
-            
-            if filters.year:
-                conditions.append(func.extract('year', Movie.release_date) == filters.year)
-            
-            if filters.language:
-                lang_subquery = select(MovieLanguage.movie_id).where(MovieLanguage.language == filters.language)
-                conditions.append(Movie.id.in_(lang_subquery))
-            
-            if filters.director:
-                conditions.append(Movie.director.ilike(f"%{filters.director}%"))
-            
-            if filters.production_state:
-                conditions.append(Movie.production_state.ilike(f"%{filters.production_state}%"))
-            
-            if filters.type:
-                conditions.append(Movie.type == filters.type)
-            
-            # Add rating filters if provided
-            if filters.rating_min is not None or filters.rating_max is not None:
-                # We need to join with reviews to filter by rating
-                avg_rating_subquery = (
-                    select(Review.movie_id)
-                    .group_by(Review.movie_id)
-                    .having(
-                        and_(
-                            func.avg(Review.lemon_pie_rating) >= (filters.rating_min or 0),
-                            func.avg(Review.lemon_pie_rating) <= (filters.rating_max or 10)
-                        )
-                    )
-                )
-                conditions.append(Movie.id.in_(avg_rating_subquery))
-            
-            if conditions:
-                query = query.where(and_(*conditions))
-        
-        # Apply sorting
-        if sort_by:
-            if sort_by.field == "title":
-                order_field = Movie.title
-            elif sort_by.field == "release_date":
-                order_field = Movie.release_date
-            elif sort_by.field == "created_at":
-                order_field = Movie.created_at
-            elif sort_by.field == "rating":
-                # For rating, we need to join with reviews and calculate average
-                avg_rating = func.coalesce(func.avg(Review.lemon_pie_rating), 0).label('avg_rating')
-                query = query.outerjoin(Review).group_by(Movie.id)
-                order_field = avg_rating
-            elif sort_by.field == "review_count":
-                # For review count, we need to count reviews
-                review_count = func.count(Review.id).label('review_count')
-                query = query.outerjoin(Review).group_by(Movie.id)
-                order_field = review_count
-            else:
-                order_field = Movie.created_at
-            
-            if sort_by.order == "asc":
-                query = query.order_by(asc(order_field))
-            else:
-                query = query.order_by(desc(order_field))
+        conditions = self._build_filter_conditions(filters)
+        if conditions:
+            query = query.where(and_(*conditions))
+        
+        # Resolve the sort key; movie id breaks ties
+        sort_field = sort_by.field if sort_by else "created_at"
+        sort_order = sort_by.order if sort_by else "desc"
+        if sort_field == "title":
+            order_field = Movie.title
+        elif sort_field == "release_date":
+            order_field = Movie.release_date
+        elif sort_field == "rating":
+            # Sort on the precomputed average from movie_stats
+            query = query.outerjoin(MovieStatistics, MovieStatistics.movie_id == Movie.id)
+            order_field = func.coalesce(MovieStatistics.average_rating, 0.0)
+        elif sort_field == "review_count":
+            # Sort on the precomputed review count from movie_stats
+            query = query.outerjoin(MovieStatistics, MovieStatistics.movie_id == Movie.id)
+            order_field = func.coalesce(MovieStatistics.review_count, 0)
         else:
-            query = query.order_by(desc(Movie.created_at))
+            sort_field = "created_at"
+            order_field = Movie.created_at
+        
+        paginator = KeysetPaginator(
+            f"movies:{sort_field}:{sort_order}",
+            order_field,
+            Movie.id,
+            descending=sort_order != "asc"
+        )
         
         # Get total count - use a simpler approach for count
-        count_query = select(func.count(Movie.id))
-        if filters:
-            count_conditions = []
-            
-            if filters.genre:
-                genre_subquery = select(MovieGenre.movie_id).where(MovieGenre.genre == filters.genre)
-                count_conditions.append(Movie.id.in_(genre_subquery))
-            
-            if filters.year:
-                count_conditions.append(func.extract('year', Movie.release_date) == filters.year)
-            
-            if filters.language:
-                lang_subquery = select(MovieLanguage.movie_id).where(MovieLanguage.language == filters.language)
-                count_conditions.append(Movie.id.in_(lang_subquery))
-            
-            if filters.director:
-                count_conditions.append(Movie.director.ilike(f"%{filters.director}%"))
-            
-            if filters.production_state:
-                count_conditions.append(Movie.production_state.ilike(f"%{filters.production_state}%"))
-            
-            if filters.type:
-                count_conditions.append(Movie.type == filters.type)
-            
-            # Add rating filters for count
-            if filters.rating_min is not None or filters.rating_max is not None:
-                avg_rating_subquery = (
-                    select(Review.movie_id)
-                    .group_by(Review.movie_id)
-                    .having(
-                        and_(
-                            func.avg(Review.lemon_pie_rating) >= (filters.rating_min or 0),
-                            func.avg(Review.lemon_pie_rating) <= (filters.rating_max or 10)
-                        )
-                    )
-                )
-                count_conditions.append(Movie.id.in_(avg_rating_subquery))
-            
-            if count_conditions:
-                count_query = count_query.where(and_(*count_conditions))
+        count_query = select(Movie.id)
+        if conditions:
+            count_query = count_query.where(and_(*conditions))
         
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
+        if after:
+            total = await count_rows(self.db, count_query, estimate=True) if include_total else None
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, after=after)
+        else:
+            total = await count_rows(self.db, count_query)
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, offset=(page - 1) * limit)
         
-        # Execute query
-        result = await self.db.execute(query)
-        movies = result.scalars().all()
+        movies = [row[0] for row in rows]
         
         # Convert to response format with stats
-        movie_responses = []
-        for movie in movies:
-            stats = await self._calculate_movie_stats(movie)
-            movie_response = MovieListResponse(
-                id=movie.id,
-                title=movie.title,
-                local_title=movie.local_title,
-                release_date=movie.release_date,
-                director=movie.director,
-                poster_url=movie.poster_url,
-                type=movie.type,
-                genres=[genre.genre for genre in movie.genres],
-                stats=stats,
-                created_at=movie.created_at
+        movie_responses = await self.build_movie_list_responses(movies)
+        await self.apply_viewer_context(movie_responses, user_id)
+        facets = await self.get_facet_counts(filters, conditions) if include_facets else None
+        
+        if after:
+            return PaginatedMovieResponse(
+                items=movie_responses,
+                total=total,
+                page=None,
+                limit=limit,
+                pages=None,
+                has_next=next_cursor is not None,
+                has_prev=True,
+                next_cursor=next_cursor,
+                facets=facets
             )
-            movie_responses.append(movie_response)
         
         # Calculate pagination info
         pages = (total + limit - 1) // limit
@@ -195,25 +131,83 @@ class MovieService:
             limit=limit,
             pages=pages,
             has_next=has_next,
-            has_prev=has_prev
+            has_prev=has_prev,
+            next_cursor=next_cursor,
+            facets=facets
         )
 
+    async def get_facet_counts(
+        self, filters: Optional[MovieSearchFilters], conditions: List[Any]
+    ) -> Optional[MovieFacets]:
+        """
+        Facet counts of the movies matching listing filters
+        
+        Read from this worker's facet bitsets (None until they are built).
+        Director and rating filters are not facets, so with those the
+        matching ids are read from the database first.
+        """
+        facet_index = get_facet_index()
+        if facet_index is None:
+            return None
+        
+        bits = facet_index.filter_bits(filters.dict(exclude_none=True) if filters else {})
+        if bits is None:
+            result = await self.db.execute(select(Movie.id).where(and_(*conditions)))
+            bits = facet_index.bits_for(result.scalars().all())
+        return MovieFacets(**facet_index.counts(bits))
+
+    def _build_filter_conditions(self, filters: Optional[MovieSearchFilters]) -> List[Any]:
+        """Build WHERE conditions for movie listing filters"""
+        conditions = []
+        if not filters:
+            return conditions
+        
+        if filters.genre:
+            genre_subquery = select(MovieGenre.movie_id).where(MovieGenre.genre == filters.genre)
+            conditions.append(Movie.id.in_(genre_subquery))
+        
+        if filters.year:
+            conditions.append(func.extract('year', Movie.release_date) == filters.year)
+        
+        if filters.language:
+            lang_subquery = select(MovieLanguage.movie_id).where(MovieLanguage.language == filters.language)
+            conditions.append(Movie.id.in_(lang_subquery))
+        
+        if filters.director:
+            conditions.append(Movie.director.ilike(f"%{filters.director}%"))
+        
+        if filters.production_state:
+            conditions.append(Movie.production_state.ilike(f"%{filters.production_state}%"))
+        
+        if filters.type:
+            conditions.append(Movie.type == filters.type)
+        
+        # Rating filters read the precomputed average from movie_stats
+        if filters.rating_min is not None or filters.rating_max is not None:
+            rating_subquery = select(MovieStatistics.movie_id).where(
+                MovieStatistics.review_count > 0,
+                MovieStatistics.average_rating >= (filters.rating_min or 0),
+                MovieStatistics.average_rating <= (filters.rating_max or 10)
+            )
+            conditions.append(Movie.id.in_(rating_subquery))
+        
+        return conditions
+
     async def get_movie_by_id(self, movie_id: UUID) -> MovieResponse:
         """Get movie by ID with full details and statistics"""
         
-        # Try to get from cache first
+        # Concurrent cache misses share a single load
         movie_cache = await get_movie_cache_service()
-        cached_movie = await movie_cache.get_movie(str(movie_id))
-        
-        if cached_movie:
-            # Convert cached data back to MovieResponse
-            return MovieResponse(**cached_movie)
-        
+        return await movie_cache.get_or_load_movie(
+            str(movie_id), lambda: self._load_movie_detail(movie_id), MovieResponse
+        )
+
+    async def _load_movie_detail(self, movie_id: UUID) -> MovieResponse:
+        """Load a movie with genres, languages, cast and statistics for caching"""
         query = select(Movie).options(
             selectinload(Movie.genres),
             selectinload(Movie.languages),
-            selectinload(Movie.cast),
-            selectinload(Movie.reviews)
+            selectinload(Movie.cast)
         ).where(Movie.id == movie_id)
         
         result = await self.db.execute(query)
@@ -223,7 +217,7 @@ class MovieService:
             raise NotFoundError(f"Movie with id {movie_id} not found")
         
         # Calculate statistics
-        stats = await self._calculate_movie_stats(movie)
+        stats = await self.stats_service.get_movie_stats(movie.id)
         
         # Convert cast to response format
         cast_members = [
@@ -258,9 +252,6 @@ class MovieService:
             updated_at=movie.updated_at
         )
         
-        # Cache the result
-        await movie_cache.set_movie(str(movie_id), movie_response.dict())
-        
         return movie_response
 
     async def create_movie(self, movie_data: MovieCreate) -> MovieResponse:
@@ -306,12 +297,16 @@ class MovieService:
             )
             self.db.add(movie_cast)
         
+        await index_movies(self.db, [movie.id])
         await self.db.commit()
         await self.db.refresh(movie)
         
-        # Invalidate movie lists cache since we added a new movie
+        # Invalidate movie lists and search results since we added a new movie
         movie_cache = await get_movie_cache_service()
         await movie_cache.invalidate_movie_lists()
+        search_cache = await get_search_cache_service()
+        await search_cache.invalidate_search_cache()
+        await publish_movie_changes([movie.id])
         
         return await self.get_movie_by_id(movie.id)
 
@@ -334,7 +329,6 @@ class MovieService:
         # Update genres if provided
         if movie_data.genres is not None:
             # Delete existing genres
-            from sqlalchemy import delete
             await self.db.execute(
                 delete(MovieGenre).where(MovieGenre.movie_id == movie_id)
             )
@@ -370,13 +364,17 @@ class MovieService:
                 )
                 self.db.add(movie_cast)
         
+        await index_movies(self.db, [movie.id])
         await self.db.commit()
         await self.db.refresh(movie)
         
-        # Invalidate caches for this movie and movie lists
+        # Invalidate caches for this movie, movie lists and search results
         movie_cache = await get_movie_cache_service()
         await movie_cache.invalidate_movie(str(movie_id))
         await movie_cache.invalidate_movie_lists()
+        search_cache = await get_search_cache_service()
+        await search_cache.invalidate_search_cache()
+        await publish_movie_changes([movie.id])
         
         return await self.get_movie_by_id(movie.id)
 
@@ -390,151 +388,72 @@ class MovieService:
         if not movie:
             raise NotFoundError(f"Movie with id {movie_id} not found")
         
+        await remove_movies(self.db, [movie_id])
         await self.db.delete(movie)
         await self.db.commit()
         
-        # Invalidate caches for this movie and movie lists
+        # Invalidate caches for this movie, movie lists and search results
         movie_cache = await get_movie_cache_service()
         await movie_cache.invalidate_movie(str(movie_id))
         await movie_cache.invalidate_movie_lists()
+        search_cache = await get_search_cache_service()
+        await search_cache.invalidate_search_cache()
+        await publish_movie_changes([movie_id])
         
         return True
 
-    @monitor_performance("calculate_movie_stats")
-    async def _calculate_movie_stats(self, movie: Movie) -> MovieStats:
-        """Calculate statistics for a movie with performance monitoring"""
-        
-        # Try to get from cache first
-        movie_cache = await get_movie_cache_service()
-        cached_stats = await movie_cache.get_movie_stats(str(movie.id))
-        
-        if cached_stats:
-            return MovieStats(**cached_stats)
-        
-        if not movie.reviews:
-            empty_stats = MovieStats()
-            await movie_cache.set_movie_stats(str(movie.id), empty_stats.dict())
-            return empty_stats
+    async def build_movie_list_responses(self, movies: List[Movie]) -> List[MovieListResponse]:
+        """Build list responses for movies, fetching all of their stats in one batch"""
         
-        reviews = movie.reviews
-        review_count = len(reviews)
-        
-        if review_count == 0:
-            empty_stats = MovieStats()
-            await movie_cache.set_movie_stats(str(movie.id), empty_stats.dict())
-            return empty_stats
-        
-        # Calculate averages
-        total_rating = sum(review.lemon_pie_rating for review in reviews)
-        average_rating = total_rating / review_count
-        
-        cultural_authenticity_total = sum(
-            review.cultural_authenticity_rating for review in reviews 
-            if review.cultural_authenticity_rating is not None
-        )
-        cultural_authenticity_count = sum(
-            1 for review in reviews 
-            if review.cultural_authenticity_rating is not None
-        )
-        cultural_authenticity_avg = (
-            cultural_authenticity_total / cultural_authenticity_count 
-            if cultural_authenticity_count > 0 else 0.0
-        )
-        
-        production_quality_total = sum(
-            review.production_quality_rating for review in reviews 
-            if review.production_quality_rating is not None
-        )
-        production_quality_count = sum(
-            1 for review in reviews 
-            if review.production_quality_rating is not None
-        )
-        production_quality_avg = (
-            production_quality_total / production_quality_count 
-            if production_quality_count > 0 else 0.0
-        )
-        
-        story_rating_total = sum(
-            review.story_rating for review in reviews 
-            if review.story_rating is not None
-        )
-        story_rating_count = sum(
-            1 for review in reviews 
-            if review.story_rating is not None
-        )
-        story_rating_avg = (
-            story_rating_total / story_rating_count 
-            if story_rating_count > 0 else 0.0
-        )
-        
-        acting_rating_total = sum(
-            review.acting_rating for review in reviews 
-            if review.acting_rating is not None
-        )
-        acting_rating_count = sum(
-            1 for review in reviews 
-            if review.acting_rating is not None
-        )
-        acting_rating_avg = (
-            acting_rating_total / acting_rating_count 
-            if acting_rating_count > 0 else 0.0
-        )
-        
-        cinematography_rating_total = sum(
-            review.cinematography_rating for review in reviews 
-            if review.cinematography_rating is not None
-        )
-        cinematography_rating_count = sum(
-            1 for review in reviews 
-            if review.cinematography_rating is not None
-        )
-        cinematography_rating_avg = (
-            cinematography_rating_total / cinematography_rating_count 
-            if cinematography_rating_count > 0 else 0.0
-        )
+        stats_by_movie = await self.stats_service.get_stats_for_movies(movie.id for movie in movies)
         
-        # Calculate rating distribution
-        rating_distribution = {}
-        for i in range(1, 11):
-            rating_distribution[i] = sum(
-                1 for review in reviews 
-                if review.lemon_pie_rating == i
+        return [
+            MovieListResponse(
+                id=movie.id,
+                title=movie.title,
+                local_title=movie.local_title,
+                release_date=movie.release_date,
+                director=movie.director,
+                poster_url=movie.poster_url,
+                type=movie.type,
+                genres=[genre.genre for genre in movie.genres],
+                stats=stats_by_movie[movie.id],
+                created_at=movie.created_at
             )
-        
-        movie_stats = MovieStats(
-            average_rating=round(average_rating, 2),
-            review_count=review_count,
-            rating_distribution=rating_distribution,
-            cultural_authenticity_avg=round(cultural_authenticity_avg, 2),
-            production_quality_avg=round(production_quality_avg, 2),
-            story_rating_avg=round(story_rating_avg, 2),
-            acting_rating_avg=round(acting_rating_avg, 2),
-            cinematography_rating_avg=round(cinematography_rating_avg, 2)
-        )
-        
-        # Cache the result
-        await movie_cache.set_movie_stats(str(movie.id), movie_stats.dict())
-        
-        return movie_stats
+            for movie in movies
+        ]
+
+    async def apply_viewer_context(self, movies: List[MovieListResponse], user_id: Optional[UUID]) -> None:
+        """Mark the movies on a viewer's watchlist and favorites, with one query for each list"""
+        if not user_id or not movies:
+            return
+        
+        viewer = get_viewer_context(self.db, user_id)
+        movie_ids = [movie.id for movie in movies]
+        in_watchlist = await viewer.watchlist.load_many(movie_ids)
+        is_favorite = await viewer.favorites.load_many(movie_ids)
+        for movie, watchlisted, favorite in zip(movies, in_watchlist, is_favorite):
+            movie.in_watchlist = watchlisted
+            movie.is_favorite = favorite
 
     async def get_trending_movies(self, limit: int = 10) -> List[MovieListResponse]:
         """Get trending movies based on recent review activity"""
         
-        # Try to get from cache first
+        # Concurrent cache misses share a single load
         movie_cache = await get_movie_cache_service()
-        cached_trending = await movie_cache.get_trending_movies()
-        
-        if cached_trending:
-            # Convert cached data back to MovieListResponse objects
-            return [MovieListResponse(**movie_data) for movie_data in cached_trending[:limit]]
-        
+        trending = await movie_cache.get_or_load_trending_movies(
+            lambda: self._load_trending_movies(limit)
+        )
+        return [MovieListResponse(**movie_data) for movie_data in trending[:limit]]
+
+    async def _load_trending_movies(self, limit: int) -> List[Dict[str, Any]]:
+        """Load movies with the most reviews in the last 30 days for caching"""
         # Get movies with recent reviews (last 30 days)
         from datetime import datetime, timedelta
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
         query = select(Movie).options(
-            selectinload(Movie.genres),
-            selectinload(Movie.reviews)
+            selectinload(Movie.genres)
         ).join(Review).where(
             Review.created_at >= thirty_days_ago
         ).group_by(Movie.id).order_by(
@@ -544,62 +463,66 @@ class MovieService:
         result = await self.db.execute(query)
         movies = result.scalars().all()
         
-        movie_responses = []
-        for movie in movies:
-            stats = await self._calculate_movie_stats(movie)
-            movie_response = MovieListResponse(
-                id=movie.id,
-                title=movie.title,
-                local_title=movie.local_title,
-                release_date=movie.release_date,
-                director=movie.director,
-                poster_url=movie.poster_url,
-                type=movie.type,
-                genres=[genre.genre for genre in movie.genres],
-                stats=stats,
-                created_at=movie.created_at
-            )
-            movie_responses.append(movie_response)
-        
-        # Cache the result
-        await movie_cache.set_trending_movies([movie.dict() for movie in movie_responses])
-        
-        return movie_responses
+        movie_responses = await self.build_movie_list_responses(movies)
+        return [movie.dict() for movie in movie_responses]
 
-    async def get_movie_reviews(self, movie_id: UUID, page: int = 1, limit: int = 20):
-        """Get paginated reviews for a specific movie"""
+    async def get_movie_reviews(
+        self,
+        movie_id: UUID,
+        page: int = 1,
+        limit: int = 20,
+        after: Optional[str] = None,
+        user_id: Optional[UUID] = None
+    ):
+        """
+        Get paginated reviews for a specific movie (newest first, seekable with ``after``)
+        
+        Pages are cached for everyone; with ``user_id`` each review then gets
+        that user's vote (``user_vote``), resolved for the page in one query.
+        """
+        page_data = await self._get_movie_reviews_page(movie_id, page, limit, after)
+        if not user_id:
+            return page_data
+        
+        review_ids = [UUID(str(review["id"])) for review in page_data["items"]]
+        votes = await get_viewer_context(self.db, user_id).votes.load_many(review_ids)
+        return {
+            **page_data,
+            "items": [{**review, "user_vote": vote} for review, vote in zip(page_data["items"], votes)]
+        }
+
+    async def _get_movie_reviews_page(self, movie_id: UUID, page: int, limit: int, after: Optional[str]):
+        """A page of a movie's approved reviews, shared by all viewers"""
         
-        # Try to get from cache first
+        # Try to get from cache first (page-numbered requests only)
         movie_cache = await get_movie_cache_service()
-        cached_reviews = await movie_cache.get_movie_reviews(str(movie_id), page, limit)
-        
-        if cached_reviews:
-            return cached_reviews
+        if not after:
+            cached_reviews = await movie_cache.get_movie_reviews(str(movie_id), page, limit)
+            
+            if cached_reviews:
+                return cached_reviews
         
         # Build query for reviews
-        query = select(Review).options(
-            selectinload(Review.user),
-            selectinload(Review.votes)
-        ).where(
-            Review.movie_id == movie_id,
-            Review.moderation_status == ModerationStatus.APPROVED
-        ).order_by(desc(Review.created_at))
-        
-        # Get total count
-        count_query = select(func.count(Review.id)).where(
+        conditions = [
             Review.movie_id == movie_id,
             Review.moderation_status == ModerationStatus.APPROVED
-        )
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar() or 0
+        ]
+        query = select(Review).options(
+            selectinload(Review.user)
+        ).where(*conditions)
+        paginator = KeysetPaginator(f"movie_reviews:{movie_id}", Review.created_at, Review.id)
         
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
+        if after:
+            total = None
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, after=after)
+        else:
+            # Get total count
+            count_query = select(func.count(Review.id)).where(*conditions)
+            total_result = await self.db.execute(count_query)
+            total = total_result.scalar() or 0
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, offset=(page - 1) * limit)
         
-        # Execute query
-        result = await self.db.execute(query)
-        reviews = result.scalars().all()
+        reviews = [row[0] for row in rows]
         
         # Convert to response format
         review_responses = []
@@ -632,6 +555,18 @@ class MovieService:
             }
             review_responses.append(review_response)
         
+        if after:
+            return {
+                "items": review_responses,
+                "total": None,
+                "page": None,
+                "limit": limit,
+                "pages": None,
+                "has_next": next_cursor is not None,
+                "has_prev": True,
+                "next_cursor": next_cursor
+            }
+        
         # Calculate pagination info
         pages = (total + limit - 1) // limit
         has_next = page < pages
@@ -644,7 +579,8 @@ class MovieService:
             "limit": limit,
             "pages": pages,
             "has_next": has_next,
-            "has_prev": has_prev
+            "has_prev": has_prev,
+            "next_cursor": next_cursor
         }
         
         # Cache the result
@@ -655,44 +591,27 @@ class MovieService:
     async def get_featured_movies(self, limit: int = 10) -> List[MovieListResponse]:
         """Get featured movies based on high ratings and review count"""
         
-        # Try to get from cache first
+        # Concurrent cache misses share a single load
         movie_cache = await get_movie_cache_service()
-        cached_featured = await movie_cache.get_featured_movies()
-        
-        if cached_featured:
-            # Convert cached data back to MovieListResponse objects
-            return [MovieListResponse(**movie_data) for movie_data in cached_featured[:limit]]
-        
+        featured = await movie_cache.get_or_load_featured_movies(
+            lambda: self._load_featured_movies(limit)
+        )
+        return [MovieListResponse(**movie_data) for movie_data in featured[:limit]]
+
+    async def _load_featured_movies(self, limit: int) -> List[Dict[str, Any]]:
+        """Load the best-rated movies with at least 5 reviews for caching"""
         query = select(Movie).options(
-            selectinload(Movie.genres),
-            selectinload(Movie.reviews)
-        ).outerjoin(Review).group_by(Movie.id).having(
-            func.count(Review.id) >= 5  # At least 5 reviews
+            selectinload(Movie.genres)
+        ).join(
+            MovieStatistics, MovieStatistics.movie_id == Movie.id
+        ).where(
+            MovieStatistics.review_count >= 5  # At least 5 reviews
         ).order_by(
-            desc(func.avg(Review.lemon_pie_rating))
+            desc(MovieStatistics.average_rating)
         ).limit(limit)
         
         result = await self.db.execute(query)
         movies = result.scalars().all()
         
-        movie_responses = []
-        for movie in movies:
-            stats = await self._calculate_movie_stats(movie)
-            movie_response = MovieListResponse(
-                id=movie.id,
-                title=movie.title,
-                local_title=movie.local_title,
-                release_date=movie.release_date,
-                director=movie.director,
-                poster_url=movie.poster_url,
-                type=movie.type,
-                genres=[genre.genre for genre in movie.genres],
-                stats=stats,
-                created_at=movie.created_at
-            )
-            movie_responses.append(movie_response)
-        
-        # Cache the result
-        await movie_cache.set_featured_movies([movie.dict() for movie in movie_responses])
-        
-        return movie_responses
\ No newline at end of file
+        movie_responses = await self.build_movie_list_responses(movies)
+        return [movie.dict() for movie in movie_responses]
\ No newline at end of file
@@ -0,0 +1,313 @@
+"""
+Movie statistics service for LemonNPie Backend API
+"""
+from typing import List, Dict, Iterable, Optional, Set
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case, update, delete, insert, Float, cast
+
+from app.models.review import Review
+from app.models.movie_stats import MovieStatistics
+from app.models.enums import ModerationStatus
+from app.schemas.movie import MovieStats
+from app.cache.redis import get_movie_cache_service
+from app.services.performance_service import monitor_performance
+
+
+# Review rating column -> materialized stats column prefix
+CATEGORY_RATINGS = {
+    "cultural_authenticity_rating": "cultural_authenticity",
+    "production_quality_rating": "production_quality",
+    "story_rating": "story",
+    "acting_rating": "acting",
+    "cinematography_rating": "cinematography",
+}
+
+# Materialized stats column prefix -> MovieStats field
+CATEGORY_STATS_FIELDS = {
+    "cultural_authenticity": "cultural_authenticity_avg",
+    "production_quality": "production_quality_avg",
+    "story": "story_rating_avg",
+    "acting": "acting_rating_avg",
+    "cinematography": "cinematography_rating_avg",
+}
+
+RATING_RANGE = range(1, 11)
+
+
+def review_stats_snapshot(review: Review) -> Optional[Dict[str, Optional[int]]]:
+    """
+    Capture the ratings a review contributes to its movie's statistics
+
+    Take a snapshot before and after mutating a review and hand both to
+    MovieStatsService.record_review_change.
+
+    Returns:
+        Rating values keyed by review column, or None if the review is not counted
+    """
+    if review.moderation_status != ModerationStatus.APPROVED:
+        return None
+
+    snapshot = {"lemon_pie_rating": review.lemon_pie_rating}
+    for rating_field in CATEGORY_RATINGS:
+        snapshot[rating_field] = getattr(review, rating_field)
+    return snapshot
+
+
+class MovieStatsService:
+    """Batch statistics engine backed by the materialized movie_stats table"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_movie_stats(self, movie_id: UUID) -> MovieStats:
+        """Get statistics for a single movie"""
+        stats = await self.get_stats_for_movies([movie_id])
+        return stats[movie_id]
+
+    @monitor_performance("get_stats_for_movies")
+    async def get_stats_for_movies(self, movie_ids: Iterable[UUID]) -> Dict[UUID, MovieStats]:
+        """
+        Get statistics for several movies at once
+
+        Cached stats are fetched with a single MGET; the remaining movies are
+        read from movie_stats in one query and written back in one pipelined
+        round-trip.
+
+        Args:
+            movie_ids: IDs of the movies to get statistics for
+
+        Returns:
+            Movie ID mapped to its statistics (every requested ID is present)
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        if not movie_ids:
+            return {}
+
+        movie_cache = await get_movie_cache_service()
+        cached_stats = await movie_cache.get_movie_stats_many([str(movie_id) for movie_id in movie_ids])
+
+        stats_by_movie: Dict[UUID, MovieStats] = {}
+        missing_ids: List[UUID] = []
+        for movie_id in movie_ids:
+            cached = cached_stats.get(str(movie_id))
+            if cached is not None:
+                stats_by_movie[movie_id] = MovieStats(**cached)
+            else:
+                missing_ids.append(movie_id)
+
+        if missing_ids:
+            loaded_stats = await self._load_stats(missing_ids)
+            stats_by_movie.update(loaded_stats)
+            await movie_cache.set_movie_stats_many({
+                str(movie_id): stats.dict() for movie_id, stats in loaded_stats.items()
+            })
+
+        return stats_by_movie
+
+    async def record_review_change(
+        self,
+        movie_id: UUID,
+        before: Optional[Dict[str, Optional[int]]],
+        after: Optional[Dict[str, Optional[int]]]
+    ) -> bool:
+        """
+        Apply the difference between two review snapshots to movie_stats
+
+        Runs in the caller's transaction; the caller commits. Pass None for
+        ``before`` on create and for ``after`` on delete.
+
+        Returns:
+            True if the movie's statistics changed
+        """
+        deltas = self._snapshot_deltas(before, after)
+        if not any(deltas.values()):
+            return False
+
+        await self._ensure_stats_row(movie_id)
+
+        new_count = MovieStatistics.review_count + deltas["review_count"]
+        new_sum = MovieStatistics.rating_sum + deltas["rating_sum"]
+        values = {
+            column: getattr(MovieStatistics, column) + delta
+            for column, delta in deltas.items()
+            if delta
+        }
+        values["average_rating"] = case(
+            (new_count > 0, cast(new_sum, Float) / new_count),
+            else_=0.0
+        )
+
+        await self.db.execute(
+            update(MovieStatistics)
+            .where(MovieStatistics.movie_id == movie_id)
+            .values(**values)
+        )
+        return True
+
+    async def invalidate_cached_stats(self, movie_ids: Iterable[UUID]) -> None:
+        """Drop cached statistics after a committed review change"""
+        movie_cache = await get_movie_cache_service()
+        for movie_id in set(movie_ids):
+            await movie_cache.invalidate_movie_stats(str(movie_id))
+
+    async def rebuild_stats(self, movie_ids: Optional[List[UUID]] = None) -> int:
+        """
+        Recompute movie_stats from the reviews table (backfill / drift repair)
+
+        Args:
+            movie_ids: Movies to rebuild; all movies when omitted
+
+        Returns:
+            Number of movie_stats rows written
+        """
+        columns = [
+            Review.movie_id,
+            func.count(Review.id).label("review_count"),
+            func.sum(Review.lemon_pie_rating).label("rating_sum"),
+        ]
+        for rating_field, prefix in CATEGORY_RATINGS.items():
+            rating_column = getattr(Review, rating_field)
+            columns.append(func.coalesce(func.sum(rating_column), 0).label(f"{prefix}_sum"))
+            columns.append(func.count(rating_column).label(f"{prefix}_count"))
+        columns.extend(
+            func.sum(case((Review.lemon_pie_rating == rating, 1), else_=0)).label(f"rating_{rating}")
+            for rating in RATING_RANGE
+        )
+
+        query = select(*columns).where(
+            Review.moderation_status == ModerationStatus.APPROVED
+        ).group_by(Review.movie_id)
+        clear_query = delete(MovieStatistics)
+        if movie_ids is not None:
+            query = query.where(Review.movie_id.in_(movie_ids))
+            clear_query = clear_query.where(MovieStatistics.movie_id.in_(movie_ids))
+
+        result = await self.db.execute(query)
+        rows = []
+        for row in result.fetchall():
+            values = dict(row._mapping)
+            values["average_rating"] = values["rating_sum"] / values["review_count"]
+            rows.append(values)
+
+        await self.db.execute(clear_query)
+        if rows:
+            await self.db.execute(insert(MovieStatistics), rows)
+        await self.db.commit()
+
+        return len(rows)
+
+    async def repair_stats(self, movie_ids: Optional[List[UUID]] = None) -> int:
+        """
+        Rebuild movie_stats and drop every cached copy of the statistics it replaced
+
+        A full rebuild invalidates each movie that had or now has a stats row,
+        so drifted stats, movie details and movie lists are not served until
+        their TTLs run out.
+
+        Args:
+            movie_ids: Movies to rebuild; all movies when omitted
+
+        Returns:
+            Number of movie_stats rows written
+        """
+        if movie_ids is None:
+            affected = await self._stats_movie_ids()
+        else:
+            affected = set(movie_ids)
+
+        rebuilt = await self.rebuild_stats(movie_ids)
+
+        if movie_ids is None:
+            affected |= await self._stats_movie_ids()
+        await self.invalidate_cached_stats(affected)
+        movie_cache = await get_movie_cache_service()
+        await movie_cache.invalidate_movie_lists()
+        return rebuilt
+
+    async def _stats_movie_ids(self) -> Set[UUID]:
+        result = await self.db.execute(select(MovieStatistics.movie_id))
+        return set(result.scalars().all())
+
+    async def _load_stats(self, movie_ids: List[UUID]) -> Dict[UUID, MovieStats]:
+        """Read precomputed statistics for the given movies in one query"""
+
+        result = await self.db.execute(
+            select(MovieStatistics).where(MovieStatistics.movie_id.in_(movie_ids))
+        )
+        rows = {row.movie_id: row for row in result.scalars().all()}
+
+        stats_by_movie: Dict[UUID, MovieStats] = {}
+        for movie_id in movie_ids:
+            row = rows.get(movie_id)
+            if row is None or row.review_count <= 0:
+                stats_by_movie[movie_id] = MovieStats()
+                continue
+
+            category_avgs = {}
+            for prefix, field_name in CATEGORY_STATS_FIELDS.items():
+                total = getattr(row, f"{prefix}_sum")
+                count = getattr(row, f"{prefix}_count")
+                category_avgs[field_name] = round(total / count, 2) if count > 0 else 0.0
+
+            stats_by_movie[movie_id] = MovieStats(
+                average_rating=round(row.rating_sum / row.review_count, 2),
+                review_count=row.review_count,
+                rating_distribution={
+                    rating: getattr(row, f"rating_{rating}") for rating in RATING_RANGE
+                },
+                **category_avgs
+            )
+
+        return stats_by_movie
+
+    async def _ensure_stats_row(self, movie_id: UUID) -> None:
+        """Create an empty movie_stats row if the movie does not have one yet"""
+        dialect = self.db.get_bind().dialect.name
+
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            existing = await self.db.execute(
+                select(MovieStatistics.movie_id).where(MovieStatistics.movie_id == movie_id)
+            )
+            if existing.scalar_one_or_none() is None:
+                self.db.add(MovieStatistics(movie_id=movie_id))
+                await self.db.flush()
+            return
+
+        await self.db.execute(
+            dialect_insert(MovieStatistics)
+            .values(movie_id=movie_id)
+            .on_conflict_do_nothing(index_elements=[MovieStatistics.movie_id])
+        )
+
+    @staticmethod
+    def _snapshot_deltas(
+        before: Optional[Dict[str, Optional[int]]],
+        after: Optional[Dict[str, Optional[int]]]
+    ) -> Dict[str, int]:
+        """Turn a before/after pair of review snapshots into column increments"""
+        deltas: Dict[str, int] = {"review_count": 0, "rating_sum": 0}
+        for prefix in CATEGORY_RATINGS.values():
+            deltas[f"{prefix}_sum"] = 0
+            deltas[f"{prefix}_count"] = 0
+        for rating in RATING_RANGE:
+            deltas[f"rating_{rating}"] = 0
+
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot is None:
+                continue
+            rating = snapshot["lemon_pie_rating"]
+            deltas["review_count"] += sign
+            deltas["rating_sum"] += sign * rating
+            deltas[f"rating_{rating}"] += sign
+            for rating_field, prefix in CATEGORY_RATINGS.items():
+                value = snapshot.get(rating_field)
+                if value is not None:
+                    deltas[f"{prefix}_sum"] += sign * value
+                    deltas[f"{prefix}_count"] += sign
+
+        return deltas
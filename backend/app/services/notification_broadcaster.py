@@ -106,25 +106,35 @@ class NotificationBroadcaster:
             logger.error(f"Failed to send unread count update to user {user_id}: {e}")
     
     @staticmethod
-    def get_connected_users() -> List[UUID]:
+    async def get_connected_users() -> List[UUID]:
         """
-        Get list of currently connected users
+        Get list of users connected to any process
         """
-        return connection_manager.get_connected_users()
+        stats = await connection_manager.get_cluster_stats()
+        return [UUID(user_id) for user_id in stats["connected_user_ids"]]
     
     @staticmethod
-    def get_connection_stats() -> Dict[str, int]:
+    async def get_connection_stats() -> Dict[str, int]:
         """
-        Get connection statistics
+        Get connection statistics across all processes
         """
+        stats = await connection_manager.get_cluster_stats()
         return {
-            "connected_users": len(connection_manager.get_connected_users()),
-            "total_connections": connection_manager.get_connection_count()
+            "connected_users": stats["connected_users"],
+            "total_connections": stats["total_connections"],
+            "nodes": stats["nodes"]
         }
     
     @staticmethod
-    def is_user_online(user_id: UUID) -> bool:
+    def get_delivery_stats() -> Dict[str, int]:
         """
-        Check if a user is currently connected
+        Get send queue depth and dropped message counts of this process
         """
-        return connection_manager.is_user_connected(user_id)
\ No newline at end of file
+        return connection_manager.get_delivery_stats()
+    
+    @staticmethod
+    async def is_user_online(user_id: UUID) -> bool:
+        """
+        Check if a user is currently connected to any process
+        """
+        return await connection_manager.is_user_online(user_id)
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Notification service for LemonNPie Backend API
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 import logging
@@ -10,9 +10,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, and_, or_, func
 from sqlalchemy.orm import selectinload
 
+from app.cache.redis import get_redis
 from app.models import Notification, NotificationPreference, User
 from app.models.enums import NotificationType
 from app.core.exceptions import NotFoundError, ValidationError
+from app.db.pagination import KeysetPaginator
+from app.services import unread_counters
 
 logger = logging.getLogger(__name__)
 
@@ -59,6 +62,7 @@ class NotificationService:
         self.db.add(notification)
         await self.db.commit()
         await self.db.refresh(notification)
+        await self._adjust_unread_counts([user_id], 1)
 
         # Send real-time notification if user is connected
         try:
@@ -112,6 +116,7 @@ class NotificationService:
             # Refresh all notifications
             for notification in notifications:
                 await self.db.refresh(notification)
+            await self._adjust_unread_counts(eligible_users, 1)
             
             # Send real-time notifications to connected users
             try:
@@ -134,11 +139,28 @@ class NotificationService:
         user_id: UUID,
         unread_only: bool = False,
         limit: int = 50,
-        offset: int = 0
+        offset: int = 0,
+        after: Optional[str] = None
     ) -> List[Notification]:
         """
         Get notifications for a user
         """
+        notifications, _ = await self.get_user_notifications_page(
+            user_id, unread_only=unread_only, limit=limit, offset=offset, after=after
+        )
+        return notifications
+
+    async def get_user_notifications_page(
+        self,
+        user_id: UUID,
+        unread_only: bool = False,
+        limit: int = 50,
+        offset: int = 0,
+        after: Optional[str] = None
+    ) -> Tuple[List[Notification], Optional[str]]:
+        """
+        Get a page of notifications for a user, newest first, and the cursor for the next page
+        """
         query = select(Notification).where(Notification.user_id == user_id)
         
         if unread_only:
@@ -152,11 +174,15 @@ class NotificationService:
             )
         )
         
-        query = query.order_by(Notification.created_at.desc())
-        query = query.offset(offset).limit(limit)
-        
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        paginator = KeysetPaginator(
+            f"notifications:{user_id}:{'unread' if unread_only else 'all'}",
+            Notification.created_at,
+            Notification.id
+        )
+        rows, next_cursor = await paginator.fetch_page(
+            self.db, query, limit, after=after, offset=0 if after else offset
+        )
+        return [row[0] for row in rows], next_cursor
 
     async def mark_notification_read(
         self,
@@ -184,11 +210,14 @@ class NotificationService:
             notification.read_at = datetime.utcnow()
             await self.db.commit()
             await self.db.refresh(notification)
+            counts = await self._adjust_unread_counts([user_id], -1)
             
             # Send updated unread count
             try:
                 from app.services.notification_broadcaster import NotificationBroadcaster
-                unread_count = await self.get_unread_count(user_id)
+                unread_count = counts.get(user_id)
+                if unread_count is None:
+                    unread_count = await self.get_unread_count(user_id)
                 await NotificationBroadcaster.send_unread_count_update(user_id, unread_count)
             except Exception as e:
                 logger.warning(f"Failed to send unread count update: {e}")
@@ -218,6 +247,7 @@ class NotificationService:
         
         if count > 0:
             await self.db.commit()
+            await self._reset_unread_count(user_id)
             
             # Send updated unread count (should be 0 now)
             try:
@@ -242,33 +272,121 @@ class NotificationService:
                     Notification.id == notification_id,
                     Notification.user_id == user_id
                 )
-            )
+            ).returning(Notification.is_read)
         )
+        deleted = result.scalars().all()
         
-        if result.rowcount > 0:
+        if deleted:
             await self.db.commit()
+            if not deleted[0]:
+                await self._adjust_unread_counts([user_id], -1)
             return True
         
         return False
 
     async def get_unread_count(self, user_id: UUID) -> int:
         """
-        Get count of unread notifications for a user
+        Get count of unread notifications for a user (from the Redis counter; counted on a miss)
+        """
+        try:
+            redis_client = await get_redis()
+            count = await unread_counters.get_unread(redis_client, user_id)
+        except RuntimeError:
+            # Redis not initialized
+            return await self._count_unread(user_id)
+        except Exception as e:
+            logger.warning(f"Failed to read unread counter: {e}")
+            return await self._count_unread(user_id)
+        
+        if count is None:
+            count = await self._count_unread(user_id)
+            try:
+                await unread_counters.load_unread(redis_client, user_id, count)
+            except Exception as e:
+                logger.warning(f"Failed to load unread counter: {e}")
+        return count
+
+    async def reconcile_unread_counts(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Correct the Redis unread counters against the database
+        
+        Expired notifications still count until this runs, and an update that
+        raced a counter load may have been missed. A counter written to while
+        its batch was being counted is left for the next run.
         """
+        redis_client = await get_redis()
+        checked = corrected = 0
+        batch: List[UUID] = []
+        
+        async for key in redis_client.scan_iter(match=unread_counters.unread_key("*"), count=batch_size):
+            batch.append(unread_counters.user_id_from_key(key))
+            if len(batch) >= batch_size:
+                corrected += await self._reconcile_unread_batch(redis_client, batch)
+                checked += len(batch)
+                batch = []
+        if batch:
+            corrected += await self._reconcile_unread_batch(redis_client, batch)
+            checked += len(batch)
+        
+        logger.info(f"Reconciled {checked} unread counters ({corrected} corrected)")
+        return {"checked": checked, "corrected": corrected}
+
+    async def _reconcile_unread_batch(self, redis_client, user_ids: List[UUID]) -> int:
+        values = await redis_client.mget([unread_counters.unread_key(user_id) for user_id in user_ids])
+        counts = await self._count_unread_by_user(user_ids)
+        drifted = {
+            user_id: value
+            for user_id, value in zip(user_ids, values)
+            if value is not None and int(value) != counts.get(user_id, 0)
+        }
+        return await unread_counters.reconcile_unread(redis_client, drifted, counts)
+
+    def _unread_filter(self):
+        return and_(
+            Notification.is_read == False,
+            or_(
+                Notification.expires_at.is_(None),
+                Notification.expires_at > datetime.utcnow()
+            )
+        )
+
+    async def _count_unread(self, user_id: UUID) -> int:
         result = await self.db.execute(
             select(func.count(Notification.id)).where(
-                and_(
-                    Notification.user_id == user_id,
-                    Notification.is_read == False,
-                    or_(
-                        Notification.expires_at.is_(None),
-                        Notification.expires_at > datetime.utcnow()
-                    )
-                )
+                Notification.user_id == user_id,
+                self._unread_filter()
             )
         )
         return result.scalar() or 0
 
+    async def _count_unread_by_user(self, user_ids: List[UUID]) -> Dict[UUID, int]:
+        result = await self.db.execute(
+            select(Notification.user_id, func.count(Notification.id))
+            .where(Notification.user_id.in_(user_ids), self._unread_filter())
+            .group_by(Notification.user_id)
+        )
+        return {user_id: count for user_id, count in result.all()}
+
+    async def _adjust_unread_counts(self, user_ids: List[UUID], amount: int) -> Dict[UUID, int]:
+        """
+        Move the unread counters after notifications were created, read or deleted
+        
+        Returns the new counts of users that had a counter.
+        """
+        try:
+            redis_client = await get_redis()
+            return await unread_counters.adjust_unread(redis_client, user_ids, amount)
+        except Exception as e:
+            logger.warning(f"Failed to update unread counters: {e}")
+            return {}
+
+    async def _reset_unread_count(self, user_id: UUID) -> None:
+        try:
+            redis_client = await get_redis()
+            await unread_counters.reset_unread(redis_client, user_id)
+        except Exception as e:
+            logger.warning(f"Failed to reset unread counter: {e}")
+
     async def cleanup_old_notifications(self, days_old: int = 30) -> int:
         """
         Clean up old read notifications
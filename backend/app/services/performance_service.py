@@ -11,7 +11,10 @@ import structlog
 
 from app.db.optimization import DatabaseOptimizer, QueryOptimizer
 from app.db.database import engine
-from app.cache.redis import get_cache_service
+from app.cache.redis import get_cache_service, get_cache_tier_statistics
+from app.services.analytics_ingest import get_analytics_queue
+from app.services.latency_sketch import get_latency_recorder
+from app.services.autocomplete import get_autocomplete_index, get_facet_index, get_fuzzy_index
 from app.core.config import settings
 
 logger = structlog.get_logger(__name__)
@@ -66,12 +69,32 @@ class PerformanceService:
                 "hit_rate": self._calculate_hit_rate(
                     redis_info.get("keyspace_hits", 0),
                     redis_info.get("keyspace_misses", 0)
-                )
+                ),
+                "tiers": get_cache_tier_statistics()
             }
         except Exception as e:
             logger.warning(f"Failed to get cache metrics: {e}")
             metrics["cache"]["error"] = str(e)
         
+        # Analytics ingestion queue
+        analytics_queue = get_analytics_queue()
+        if analytics_queue is not None:
+            metrics["application"]["analytics_ingest"] = analytics_queue.get_statistics()
+        
+        latency_recorder = get_latency_recorder()
+        if latency_recorder is not None:
+            metrics["application"]["latency_sketches"] = latency_recorder.get_statistics()
+        
+        autocomplete_index = get_autocomplete_index()
+        if autocomplete_index is not None:
+            metrics["application"]["autocomplete"] = autocomplete_index.get_statistics()
+        fuzzy_index = get_fuzzy_index()
+        if fuzzy_index is not None:
+            metrics["application"]["fuzzy_search"] = fuzzy_index.get_statistics()
+        facet_index = get_facet_index()
+        if facet_index is not None:
+            metrics["application"]["facets"] = facet_index.get_statistics()
+        
         return metrics
     
     async def monitor_query_performance(
@@ -102,32 +125,49 @@ class PerformanceService:
                 "error": str(e)
             }
     
-    async def get_cache_statistics(self) -> Dict[str, Any]:
-        """Get detailed cache statistics"""
+    async def get_cache_statistics(self, sample_size: int = 200) -> Dict[str, Any]:
+        """
+        Get detailed cache statistics
+        
+        Per-category key counts are estimated from a RANDOMKEY sample scaled
+        by DBSIZE, so the call stays O(sample_size) instead of walking the
+        keyspace.
+        """
         
         try:
             cache_service = await get_cache_service()
             redis_client = cache_service.redis
             
-            # Get all keys with patterns
-            patterns = [
-                "movie:*",
-                "user:*", 
-                "search:*",
-                "reviews:*",
-                "session:*"
-            ]
+            categories = ["movie", "user", "search", "reviews", "session"]
+            
+            total_keys = await redis_client.dbsize()
+            sampled_keys = []
+            if total_keys:
+                pipe = redis_client.pipeline(transaction=False)
+                for _ in range(min(sample_size, total_keys)):
+                    pipe.randomkey()
+                sampled_keys = [
+                    key.decode() if isinstance(key, bytes) else key
+                    for key in await pipe.execute()
+                    if key is not None
+                ]
             
             stats = {}
             
-            for pattern in patterns:
-                keys = await redis_client.keys(pattern)
-                category = pattern.replace(":*", "")
+            for category in categories:
+                category_keys = [key for key in sampled_keys if key.startswith(f"{category}:")]
+                estimated_count = (
+                    round(total_keys * len(category_keys) / len(sampled_keys))
+                    if sampled_keys else 0
+                )
                 stats[category] = {
-                    "key_count": len(keys),
-                    "sample_keys": keys[:5] if keys else []
+                    "key_count": estimated_count,
+                    "sample_keys": list(dict.fromkeys(category_keys))[:5]
                 }
             
+            stats["total_keys"] = total_keys
+            stats["sample_size"] = len(sampled_keys)
+            
             return stats
             
         except Exception as e:
@@ -135,7 +175,7 @@ class PerformanceService:
             return {"error": str(e)}
     
     async def clear_cache_by_pattern(self, pattern: str) -> int:
-        """Clear cache entries matching a pattern"""
+        """Clear cache entries matching a pattern (admin purge; SCAN-based)"""
         
         try:
             cache_service = await get_cache_service()
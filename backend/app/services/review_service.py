@@ -8,7 +8,7 @@ import math
 import logging
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, desc, asc, update, delete
+from sqlalchemy import select, func, and_, or_, desc, update, delete
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status, Depends
 
@@ -33,6 +33,10 @@ from app.schemas.review import (
 )
 from app.schemas.user import UserPublicProfile
 from app.db.database import get_db
+from app.db.pagination import KeysetPaginator, count_rows
+from app.services.movie_stats_service import MovieStatsService, review_stats_snapshot
+from app.services.feed_service import FeedService, REVIEW_POSTED
+from app.services.viewer_context import get_viewer_context
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +46,7 @@ class ReviewService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.stats_service = MovieStatsService(db)
     
     async def create_review(self, review_data: ReviewCreate, user_id: UUID) -> ReviewResponse:
         """Create a new review"""
@@ -92,9 +97,20 @@ class ReviewService:
         )
         
         self.db.add(review)
+        stats_changed = await self.stats_service.record_review_change(
+            review.movie_id, None, review_stats_snapshot(review)
+        )
         await self.db.commit()
         await self.db.refresh(review)
         
+        if stats_changed:
+            await self.stats_service.invalidate_cached_stats([review.movie_id])
+        
+        try:
+            await FeedService(self.db).publish_event(REVIEW_POSTED, user_id, review.id, review.created_at)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for review: {e}")
+        
         # Load user relationship for response
         await self.db.refresh(review, ['user'])
         
@@ -142,15 +158,22 @@ class ReviewService:
             )
         
         # Update fields
+        stats_before = review_stats_snapshot(review)
         update_data = review_data.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(review, field, value)
         
         review.updated_at = datetime.utcnow()
         
+        stats_changed = await self.stats_service.record_review_change(
+            review.movie_id, stats_before, review_stats_snapshot(review)
+        )
         await self.db.commit()
         await self.db.refresh(review)
         
+        if stats_changed:
+            await self.stats_service.invalidate_cached_stats([review.movie_id])
+        
         return await self._build_review_response(review, user_id)
     
     async def delete_review(self, review_id: UUID, user_id: UUID) -> bool:
@@ -173,9 +196,20 @@ class ReviewService:
                 detail="You can only delete your own reviews"
             )
         
+        stats_changed = await self.stats_service.record_review_change(
+            review.movie_id, review_stats_snapshot(review), None
+        )
         await self.db.delete(review)
         await self.db.commit()
         
+        if stats_changed:
+            await self.stats_service.invalidate_cached_stats([review.movie_id])
+        
+        try:
+            await FeedService(self.db).retract_event(REVIEW_POSTED, user_id, review_id)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for deleted review: {e}")
+        
         return True
     
     async def get_reviews(
@@ -184,9 +218,17 @@ class ReviewService:
         limit: int = 20,
         filters: Optional[ReviewFilters] = None,
         sort_by: Optional[ReviewSortBy] = None,
-        user_id: Optional[UUID] = None
+        user_id: Optional[UUID] = None,
+        after: Optional[str] = None,
+        include_total: bool = False
     ) -> PaginatedReviewResponse:
-        """Get paginated list of reviews with filtering and sorting"""
+        """
+        Get paginated list of reviews with filtering and sorting
+        
+        Pass ``after`` (a ``next_cursor`` from a previous response) to seek
+        instead of paging by number; the total is then only computed
+        (estimated) when ``include_total`` is set.
+        """
         
         # Build base query
         query = select(Review).options(
@@ -194,103 +236,63 @@ class ReviewService:
         )
         
         # Apply filters
-        if filters:
-            conditions = []
-            
-            if filters.movie_id:
-                conditions.append(Review.movie_id == filters.movie_id)
-            
-            if filters.user_id:
-                conditions.append(Review.user_id == filters.user_id)
-            
-            if filters.rating_min is not None:
-                conditions.append(Review.lemon_pie_rating >= filters.rating_min)
-            
-            if filters.rating_max is not None:
-                conditions.append(Review.lemon_pie_rating <= filters.rating_max)
-            
-            if filters.spoiler_warning is not None:
-                conditions.append(Review.spoiler_warning == filters.spoiler_warning)
-            
-            if filters.moderation_status:
-                conditions.append(Review.moderation_status == filters.moderation_status)
-            else:
-                # Default to approved reviews only
-                conditions.append(Review.moderation_status == ModerationStatus.APPROVED)
-            
-            if conditions:
-                query = query.where(and_(*conditions))
+        conditions = self._build_filter_conditions(filters)
+        query = query.where(and_(*conditions))
+        
+        # Resolve the sort key; review id breaks ties
+        sort_field = sort_by.field if sort_by else "created_at"
+        sort_order = sort_by.order if sort_by else "desc"
+        if sort_field == "updated_at":
+            order_field = Review.updated_at
+        elif sort_field == "lemon_pie_rating":
+            order_field = Review.lemon_pie_rating
+        elif sort_field == "helpful_votes":
+            order_field = Review.helpful_votes
+        elif sort_field == "helpfulness_score":
+            # Calculate helpfulness score as helpful_votes - unhelpful_votes
+            order_field = Review.helpful_votes - Review.unhelpful_votes
         else:
-            # Default to approved reviews only
-            query = query.where(Review.moderation_status == ModerationStatus.APPROVED)
-        
-        # Apply sorting
-        if sort_by:
-            order_func = desc if sort_by.order == "desc" else asc
-            
-            if sort_by.field == "created_at":
-                query = query.order_by(order_func(Review.created_at))
-            elif sort_by.field == "updated_at":
-                query = query.order_by(order_func(Review.updated_at))
-            elif sort_by.field == "lemon_pie_rating":
-                query = query.order_by(order_func(Review.lemon_pie_rating))
-            elif sort_by.field == "helpful_votes":
-                query = query.order_by(order_func(Review.helpful_votes))
-            elif sort_by.field == "helpfulness_score":
-                # Calculate helpfulness score as helpful_votes - unhelpful_votes
-                query = query.order_by(order_func(Review.helpful_votes - Review.unhelpful_votes))
-        else:
-            # Default sort by creation date (newest first)
-            query = query.order_by(desc(Review.created_at))
+            sort_field = "created_at"
+            order_field = Review.created_at
+        
+        paginator = KeysetPaginator(
+            f"reviews:{sort_field}:{sort_order}",
+            order_field,
+            Review.id,
+            descending=sort_order != "asc"
+        )
+        count_query = select(Review.id).where(and_(*conditions))
         
-        # Get total count
-        count_query = select(func.count(Review.id))
-        if filters:
-            # Apply same filters to count query
-            conditions = []
-            
-            if filters.movie_id:
-                conditions.append(Review.movie_id == filters.movie_id)
-            
-            if filters.user_id:
-                conditions.append(Review.user_id == filters.user_id)
-            
-            if filters.rating_min is not None:
-                conditions.append(Review.lemon_pie_rating >= filters.rating_min)
-            
-            if filters.rating_max is not None:
-                conditions.append(Review.lemon_pie_rating <= filters.rating_max)
-            
-            if filters.spoiler_warning is not None:
-                conditions.append(Review.spoiler_warning == filters.spoiler_warning)
-            
-            if filters.moderation_status:
-                conditions.append(Review.moderation_status == filters.moderation_status)
-            else:
-                conditions.append(Review.moderation_status == ModerationStatus.APPROVED)
-            
-            if conditions:
-                count_query = count_query.where(and_(*conditions))
+        if after:
+            total = await count_rows(self.db, count_query, estimate=True) if include_total else None
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, after=after)
         else:
-            count_query = count_query.where(Review.moderation_status == ModerationStatus.APPROVED)
-        
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
+            # Get total count
+            total = await count_rows(self.db, count_query)
+            rows, next_cursor = await paginator.fetch_page(self.db, query, limit, offset=(page - 1) * limit)
         
-        # Execute query
-        result = await self.db.execute(query)
-        reviews = result.scalars().all()
+        # Resolve the viewer's votes on the whole page with one query
+        if user_id:
+            await get_viewer_context(self.db, user_id).votes.load_many(row[0].id for row in rows)
         
         # Build response items
         items = []
-        for review in reviews:
-            review_response = await self._build_review_list_response(review, user_id)
+        for row in rows:
+            review_response = await self._build_review_list_response(row[0], user_id)
             items.append(review_response)
         
+        if after:
+            return PaginatedReviewResponse(
+                items=items,
+                total=total,
+                page=None,
+                limit=limit,
+                pages=None,
+                has_next=next_cursor is not None,
+                has_prev=True,
+                next_cursor=next_cursor
+            )
+        
         # Calculate pagination info
         pages = math.ceil(total / limit) if total > 0 else 1
         has_next = page < pages
@@ -303,9 +305,40 @@ class ReviewService:
             limit=limit,
             pages=pages,
             has_next=has_next,
-            has_prev=has_prev
+            has_prev=has_prev,
+            next_cursor=next_cursor
         )
     
+    def _build_filter_conditions(self, filters: Optional[ReviewFilters]) -> List[Any]:
+        """Build WHERE conditions for review listing filters (approved reviews by default)"""
+        if not filters:
+            return [Review.moderation_status == ModerationStatus.APPROVED]
+        
+        conditions = []
+        
+        if filters.movie_id:
+            conditions.append(Review.movie_id == filters.movie_id)
+        
+        if filters.user_id:
+            conditions.append(Review.user_id == filters.user_id)
+        
+        if filters.rating_min is not None:
+            conditions.append(Review.lemon_pie_rating >= filters.rating_min)
+        
+        if filters.rating_max is not None:
+            conditions.append(Review.lemon_pie_rating <= filters.rating_max)
+        
+        if filters.spoiler_warning is not None:
+            conditions.append(Review.spoiler_warning == filters.spoiler_warning)
+        
+        if filters.moderation_status:
+            conditions.append(Review.moderation_status == filters.moderation_status)
+        else:
+            # Default to approved reviews only
+            conditions.append(Review.moderation_status == ModerationStatus.APPROVED)
+        
+        return conditions
+    
     async def vote_on_review(self, review_id: UUID, vote_data: ReviewVoteCreate, user_id: UUID) -> ReviewResponse:
         """Vote on a review (helpful/unhelpful)"""
         
@@ -374,6 +407,7 @@ class ReviewService:
         
         await self.db.commit()
         await self.db.refresh(review)
+        get_viewer_context(self.db, user_id).votes.prime(review_id, vote_data.vote_type)
         
         # Send notification to review author (only for new votes or vote changes)
         if not existing_vote or existing_vote.vote_type != vote_data.vote_type:
@@ -447,6 +481,7 @@ class ReviewService:
         await self.db.delete(existing_vote)
         await self.db.commit()
         await self.db.refresh(review)
+        get_viewer_context(self.db, user_id).votes.prime(review_id, None)
         
         return await self._build_review_response(review, user_id)
     
@@ -508,11 +543,20 @@ class ReviewService:
             )
         )
         
+        stats_changed = False
         if report_count.scalar() >= 3:  # Auto-flag after 3 reports
+            stats_before = review_stats_snapshot(review)
             review.is_flagged = True
             review.moderation_status = ModerationStatus.PENDING
+            stats_changed = await self.stats_service.record_review_change(
+                review.movie_id, stats_before, review_stats_snapshot(review)
+            )
         
         await self.db.commit()
+        
+        if stats_changed:
+            await self.stats_service.invalidate_cached_stats([review.movie_id])
+        
         return True
     
     async def moderate_review(self, review_id: UUID, action_data: ReviewModerationAction, moderator_id: UUID) -> ReviewResponse:
@@ -531,6 +575,7 @@ class ReviewService:
             )
         
         # Apply moderation action
+        stats_before = review_stats_snapshot(review)
         if action_data.action == "approve":
             review.moderation_status = ModerationStatus.APPROVED
             review.is_flagged = False
@@ -557,9 +602,15 @@ class ReviewService:
                 )
             )
         
+        stats_changed = await self.stats_service.record_review_change(
+            review.movie_id, stats_before, review_stats_snapshot(review)
+        )
         await self.db.commit()
         await self.db.refresh(review)
         
+        if stats_changed:
+            await self.stats_service.invalidate_cached_stats([review.movie_id])
+        
         return await self._build_review_response(review, moderator_id)
     
     async def get_flagged_reviews(
@@ -599,24 +650,14 @@ class ReviewService:
         result = await self.db.execute(query)
         reviews = result.scalars().all()
         
+        # Resolve the moderator's votes on the whole page with one query
+        await get_viewer_context(self.db, moderator_id).votes.load_many(review.id for review in reviews)
+        
         # Build response items
         items = []
         for review in reviews:
-            review_response = await self._build_review_response(review, moderator_id)
-            items.append(ReviewListResponse(
-                id=review_response.id,
-                user=review_response.user,
-                movie_id=review_response.movie_id,
-                lemon_pie_rating=review_response.lemon_pie_rating,
-                review_text=review_response.review_text,
-                spoiler_warning=review_response.spoiler_warning,
-                helpful_votes=review_response.helpful_votes,
-                unhelpful_votes=review_response.unhelpful_votes,
-                helpfulness_score=review_response.helpfulness_score,
-                user_vote=review_response.user_vote,
-                created_at=review_response.created_at,
-                updated_at=review_response.updated_at
-            ))
+            review_response = await self._build_review_list_response(review, moderator_id)
+            items.append(review_response)
         
         # Calculate pagination info
         pages = math.ceil(total / limit) if total > 0 else 1
@@ -713,17 +754,10 @@ class ReviewService:
     async def _build_review_response(self, review: Review, user_id: Optional[UUID] = None) -> ReviewResponse:
         """Build a complete review response with user vote info"""
         
-        # Get user's vote if authenticated
+        # Get user's vote if authenticated (batched with the rest of the request's reviews)
         user_vote = None
         if user_id:
-            vote_query = select(ReviewVote.vote_type).where(
-                and_(
-                    ReviewVote.user_id == user_id,
-                    ReviewVote.review_id == review.id
-                )
-            )
-            vote_result = await self.db.execute(vote_query)
-            user_vote = vote_result.scalar_one_or_none()
+            user_vote = await get_viewer_context(self.db, user_id).votes.load(review.id)
         
         # Calculate helpfulness score
         helpfulness_score = review.helpful_votes - review.unhelpful_votes
@@ -767,17 +801,10 @@ class ReviewService:
     async def _build_review_list_response(self, review: Review, user_id: Optional[UUID] = None) -> ReviewListResponse:
         """Build a review list response (lighter version)"""
         
-        # Get user's vote if authenticated
+        # Get user's vote if authenticated (batched with the rest of the request's reviews)
         user_vote = None
         if user_id:
-            vote_query = select(ReviewVote.vote_type).where(
-                and_(
-                    ReviewVote.user_id == user_id,
-                    ReviewVote.review_id == review.id
-                )
-            )
-            vote_result = await self.db.execute(vote_query)
-            user_vote = vote_result.scalar_one_or_none()
+            user_vote = await get_viewer_context(self.db, user_id).votes.load(review.id)
         
         # Calculate helpfulness score
         helpfulness_score = review.helpful_votes - review.unhelpful_votes
@@ -0,0 +1,391 @@
+"""
+Full-text search backends for LemonNPie Backend API
+
+Every movie has one search document in movie_search_index, rebuilt by
+MovieService whenever the movie, its genres or its cast change. The document
+has four weighted fields: titles (A), cast names (B), credits - director,
+producer, production company, state and genres - (C) and the plot summary (D).
+
+PostgresSearchBackend stores the document as a weighted tsvector behind a GIN
+index and ranks matches with ts_rank_cd. SqliteSearchBackend mirrors it into an
+FTS5 table ranked by bm25. LikeSearchBackend scans the plain-text document for
+other databases. SEARCH_BACKEND picks one; "auto" follows the database dialect.
+
+fuzzy_match() is the typo-tolerant fallback for queries full-text search finds
+nothing for: pg_trgm similarity over titles, directors and cast names on
+PostgreSQL, the worker's in-process trigram index (app.services.fuzzy_index)
+everywhere else.
+"""
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Type
+from uuid import UUID
+
+from sqlalchemy import Float, and_, case, column, delete, desc, func, literal, literal_column, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.config import settings
+from app.models.movie import Movie
+from app.models.movie_stats import MovieStatistics
+from app.models.relationships import MovieCast, MovieGenre
+from app.models.search import MovieSearchIndex
+from app.services.autocomplete import get_fuzzy_index
+
+# Query words beyond this are ignored
+MAX_QUERY_TERMS = 8
+
+# Rebuild batch size (one round of document queries and one write per batch)
+INDEX_BATCH_SIZE = 500
+
+# FTS5 column weights for bm25, in column order: titles, cast_names, credits, plot
+SQLITE_BM25_WEIGHTS = "10.0, 5.0, 2.0, 1.0"
+
+# Similar names considered per fuzzy search
+FUZZY_CANDIDATES = 200
+
+
+@dataclass
+class SearchDocument:
+    """The searchable text of one movie, split by field weight"""
+    movie_id: UUID
+    titles: str
+    cast_names: str
+    credits: str
+    plot: str
+
+    @property
+    def text(self) -> str:
+        return "\n".join(part for part in (self.titles, self.cast_names, self.credits, self.plot) if part)
+
+
+@dataclass
+class FuzzyMatch:
+    """A movie whose title, director or cast name is similar to a fuzzy query"""
+    movie_id: UUID
+    name: str
+    similarity: float
+    popularity: float
+
+    @property
+    def score(self) -> float:
+        """Similarity lifted by the movie's review count"""
+        return self.similarity * (1 + settings.SEARCH_FUZZY_POPULARITY_WEIGHT * math.log1p(self.popularity))
+
+
+def search_terms(query: str) -> List[str]:
+    """Lower-cased words of a query, without operators or punctuation"""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_QUERY_TERMS]
+
+
+def _join(*values: Optional[str]) -> str:
+    return " ".join(value for value in values if value)
+
+
+async def load_search_documents(db, movie_ids: List[UUID]) -> List[SearchDocument]:
+    """Build the search documents of the given movies (missing movies are skipped)"""
+    if not movie_ids:
+        return []
+
+    result = await db.execute(select(Movie).where(Movie.id.in_(movie_ids)))
+    movies = result.scalars().all()
+
+    genres: Dict[UUID, List[str]] = {movie.id: [] for movie in movies}
+    result = await db.execute(select(MovieGenre.movie_id, MovieGenre.genre).where(MovieGenre.movie_id.in_(movie_ids)))
+    for movie_id, genre in result:
+        genres[movie_id].append(genre)
+
+    cast: Dict[UUID, List[str]] = {movie.id: [] for movie in movies}
+    result = await db.execute(
+        select(MovieCast.movie_id, MovieCast.actor_name).where(MovieCast.movie_id.in_(movie_ids))
+    )
+    for movie_id, actor_name in result:
+        cast[movie_id].append(actor_name)
+
+    return [
+        SearchDocument(
+            movie_id=movie.id,
+            titles=_join(movie.title, movie.local_title),
+            cast_names=_join(*cast[movie.id]),
+            credits=_join(
+                movie.director, movie.producer, movie.production_company, movie.production_state, *genres[movie.id]
+            ),
+            plot=movie.plot_summary or ""
+        )
+        for movie in movies
+    ]
+
+
+class SearchBackend:
+    """
+    Maintains movie_search_index and turns queries into ranked matches
+
+    match() returns a selectable of (movie_id, rank) for SearchService to join
+    against movies; a higher rank is a better match.
+    """
+    name = "base"
+
+    async def index_documents(self, db, documents: List[SearchDocument]) -> None:
+        raise NotImplementedError
+
+    async def remove_movies(self, db, movie_ids: List[UUID]) -> None:
+        await db.execute(delete(MovieSearchIndex).where(MovieSearchIndex.movie_id.in_(movie_ids)))
+
+    def match(self, terms: List[str], cast_only: bool = False):
+        raise NotImplementedError
+
+    async def fuzzy_match(
+        self, db, query: str, cast_only: bool = False, limit: int = FUZZY_CANDIDATES
+    ) -> List[FuzzyMatch]:
+        """Movies with a name at least SEARCH_FUZZY_THRESHOLD similar to query, most similar first"""
+        fuzzy_index = get_fuzzy_index()
+        if fuzzy_index is None:
+            return []
+        names = fuzzy_index.search(
+            query, settings.SEARCH_FUZZY_THRESHOLD, kinds={"cast"} if cast_only else None, limit=limit
+        )
+        return [
+            FuzzyMatch(movie_id, name, name_similarity, popularity)
+            for name, _, name_similarity, refs in names
+            for movie_id, popularity in refs.items()
+        ]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Weighted tsvector in movie_search_index (GIN indexed), ranked by ts_rank_cd"""
+    name = "postgres"
+
+    def _vector(self, value: str, weight: str):
+        return func.setweight(func.to_tsvector(settings.SEARCH_TEXT_CONFIG, value), literal_column(f"'{weight}'"))
+
+    async def index_documents(self, db, documents: List[SearchDocument]) -> None:
+        if not documents:
+            return
+        rows = [
+            {
+                "movie_id": document.movie_id,
+                "search_vector": self._vector(document.titles, "A")
+                .op("||")(self._vector(document.cast_names, "B"))
+                .op("||")(self._vector(document.credits, "C"))
+                .op("||")(self._vector(document.plot, "D")),
+                "title_vector": self._vector(document.titles, "A"),
+                "content_vector": self._vector(document.plot, "D"),
+                "updated_at": func.now(),
+            }
+            for document in documents
+        ]
+        stmt = pg_insert(MovieSearchIndex).values(rows)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[MovieSearchIndex.movie_id],
+            set_={
+                "search_vector": stmt.excluded.search_vector,
+                "title_vector": stmt.excluded.title_vector,
+                "content_vector": stmt.excluded.content_vector,
+                "updated_at": stmt.excluded.updated_at,
+            }
+        ))
+
+    def match(self, terms: List[str], cast_only: bool = False):
+        # Prefix match every word; cast searches only look at B-weighted lexemes
+        weights = "B" if cast_only else ""
+        tsquery = func.to_tsquery(settings.SEARCH_TEXT_CONFIG, " & ".join(f"{term}:*{weights}" for term in terms))
+        return select(
+            MovieSearchIndex.movie_id,
+            func.ts_rank_cd(MovieSearchIndex.search_vector, tsquery).label("rank")
+        ).where(MovieSearchIndex.search_vector.op("@@")(tsquery))
+
+    async def fuzzy_match(
+        self, db, query: str, cast_only: bool = False, limit: int = FUZZY_CANDIDATES
+    ) -> List[FuzzyMatch]:
+        # "%" uses the trigram GIN indexes with the transaction-local threshold
+        await db.execute(select(func.set_config(
+            "pg_trgm.similarity_threshold", str(settings.SEARCH_FUZZY_THRESHOLD), True
+        )))
+        columns = [(MovieCast.movie_id, MovieCast.actor_name)]
+        if not cast_only:
+            columns += [(Movie.id, Movie.title), (Movie.id, Movie.local_title), (Movie.id, Movie.director)]
+        names = union_all(*[
+            select(
+                movie_id.label("movie_id"),
+                name.label("name"),
+                func.similarity(name, query).label("similarity")
+            ).where(name.op("%")(query))
+            for movie_id, name in columns
+        ]).subquery()
+
+        result = await db.execute(
+            select(
+                names.c.movie_id, names.c.name, names.c.similarity,
+                func.coalesce(MovieStatistics.review_count, 0)
+            ).outerjoin(
+                MovieStatistics, MovieStatistics.movie_id == names.c.movie_id
+            ).order_by(desc(names.c.similarity)).limit(limit)
+        )
+        return [
+            FuzzyMatch(movie_id, name, float(name_similarity), float(popularity))
+            for movie_id, name, name_similarity, popularity in result
+        ]
+
+
+class SqliteSearchBackend(SearchBackend):
+    """FTS5 table keyed by the movie_search_index rowid, ranked by bm25"""
+    name = "sqlite"
+
+    async def _rowids(self, db, movie_ids: List[UUID]) -> Dict[UUID, int]:
+        result = await db.execute(
+            select(MovieSearchIndex.movie_id, column("rowid")).where(MovieSearchIndex.movie_id.in_(movie_ids))
+        )
+        return {movie_id: rowid for movie_id, rowid in result}
+
+    async def _delete_fts_rows(self, db, rowids: Iterable[int]) -> None:
+        rows = [{"rowid": rowid} for rowid in rowids]
+        if rows:
+            await db.execute(text("DELETE FROM movie_search_fts WHERE rowid = :rowid"), rows)
+
+    async def index_documents(self, db, documents: List[SearchDocument]) -> None:
+        if not documents:
+            return
+        stmt = sqlite_insert(MovieSearchIndex).values([
+            {
+                "movie_id": document.movie_id,
+                "search_vector": document.text,
+                "title_vector": document.titles,
+                "content_vector": document.plot,
+            }
+            for document in documents
+        ])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[MovieSearchIndex.movie_id],
+            set_={
+                "search_vector": stmt.excluded.search_vector,
+                "title_vector": stmt.excluded.title_vector,
+                "content_vector": stmt.excluded.content_vector,
+                "updated_at": func.current_timestamp(),
+            }
+        ))
+
+        # The upsert keeps each movie's rowid, so its FTS row is replaced in place
+        rowids = await self._rowids(db, [document.movie_id for document in documents])
+        await self._delete_fts_rows(db, rowids.values())
+        await db.execute(
+            text(
+                "INSERT INTO movie_search_fts (rowid, titles, cast_names, credits, plot) "
+                "VALUES (:rowid, :titles, :cast_names, :credits, :plot)"
+            ),
+            [
+                {
+                    "rowid": rowids[document.movie_id],
+                    "titles": document.titles,
+                    "cast_names": document.cast_names,
+                    "credits": document.credits,
+                    "plot": document.plot,
+                }
+                for document in documents
+            ]
+        )
+
+    async def remove_movies(self, db, movie_ids: List[UUID]) -> None:
+        await self._delete_fts_rows(db, (await self._rowids(db, movie_ids)).values())
+        await super().remove_movies(db, movie_ids)
+
+    def match(self, terms: List[str], cast_only: bool = False):
+        expression = " ".join(f'"{term}"*' for term in terms)
+        if cast_only:
+            expression = f"cast_names : ({expression})"
+        return text(
+            "SELECT movie_search_index.movie_id AS movie_id, "
+            f"-bm25(movie_search_fts, {SQLITE_BM25_WEIGHTS}) AS rank "
+            "FROM movie_search_fts "
+            "JOIN movie_search_index ON movie_search_index.rowid = movie_search_fts.rowid "
+            "WHERE movie_search_fts MATCH :expression"
+        ).bindparams(expression=expression).columns(
+            column("movie_id", MovieSearchIndex.movie_id.type), column("rank", Float)
+        )
+
+
+class LikeSearchBackend(SearchBackend):
+    """Plain-text documents scanned with ILIKE; title matches rank first"""
+    name = "like"
+
+    async def index_documents(self, db, documents: List[SearchDocument]) -> None:
+        if not documents:
+            return
+        await super().remove_movies(db, [document.movie_id for document in documents])
+        db.add_all([
+            MovieSearchIndex(
+                movie_id=document.movie_id,
+                search_vector=document.text,
+                title_vector=document.titles,
+                content_vector=document.plot
+            )
+            for document in documents
+        ])
+        await db.flush()
+
+    def match(self, terms: List[str], cast_only: bool = False):
+        if cast_only:
+            conditions = [
+                MovieSearchIndex.movie_id.in_(
+                    select(MovieCast.movie_id).where(MovieCast.actor_name.ilike(f"%{term}%"))
+                )
+                for term in terms
+            ]
+            rank = literal(1.0)
+        else:
+            conditions = [MovieSearchIndex.search_vector.ilike(f"%{term}%") for term in terms]
+            rank = case(
+                (and_(*[MovieSearchIndex.title_vector.ilike(f"%{term}%") for term in terms]), 2.0),
+                else_=1.0
+            )
+        return select(MovieSearchIndex.movie_id, rank.label("rank")).where(and_(*conditions))
+
+
+SEARCH_BACKENDS: Dict[str, Type[SearchBackend]] = {
+    backend.name: backend for backend in (PostgresSearchBackend, SqliteSearchBackend, LikeSearchBackend)
+}
+
+DIALECT_BACKENDS = {"postgresql": "postgres", "sqlite": "sqlite"}
+
+
+def get_search_backend(db) -> SearchBackend:
+    """The configured backend, or the one matching the session's database for "auto" """
+    name = settings.SEARCH_BACKEND
+    if name == "auto":
+        name = DIALECT_BACKENDS.get(db.get_bind().dialect.name, LikeSearchBackend.name)
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown search backend: {name}")
+    return SEARCH_BACKENDS[name]()
+
+
+async def index_movies(db, movie_ids: List[UUID]) -> None:
+    """Rebuild the search documents of the given movies (flushes pending changes first)"""
+    await db.flush()
+    backend = get_search_backend(db)
+    documents = await load_search_documents(db, movie_ids)
+    await backend.index_documents(db, documents)
+
+    missing = set(movie_ids) - {document.movie_id for document in documents}
+    if missing:
+        await backend.remove_movies(db, list(missing))
+
+
+async def remove_movies(db, movie_ids: List[UUID]) -> None:
+    """Drop the search documents of the given movies"""
+    await get_search_backend(db).remove_movies(db, movie_ids)
+
+
+async def rebuild_search_index(db, movie_ids: Optional[List[UUID]] = None) -> int:
+    """
+    Re-index the given movies (all movies by default) in batches
+
+    Returns:
+        Number of movies indexed; the caller commits
+    """
+    if movie_ids is None:
+        result = await db.execute(select(Movie.id).order_by(Movie.id))
+        movie_ids = list(result.scalars().all())
+
+    for start in range(0, len(movie_ids), INDEX_BATCH_SIZE):
+        await index_movies(db, movie_ids[start:start + INDEX_BATCH_SIZE])
+    return len(movie_ids)
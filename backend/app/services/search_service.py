@@ -1,18 +1,20 @@
 """
 Search service for LemonNPie Backend API
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, text, or_, and_, desc
 from sqlalchemy.orm import selectinload
 
 from app.models.movie import Movie
-from app.models.search import MovieSearchIndex
-from app.models.relationships import MovieGenre, MovieLanguage, MovieCast
-from app.schemas.movie import MovieListResponse, MovieStats
+from app.models.relationships import MovieGenre, MovieLanguage
+from app.schemas.movie import MovieFacets, MovieListResponse
 from app.services.movie_service import MovieService
+from app.services.search_backends import get_search_backend, search_terms
+from app.services.autocomplete import get_autocomplete_index, get_facet_index, normalize
 from app.cache.redis import get_search_cache_service
+from app.db.pagination import InvalidCursorError, KeysetPaginator, decode_cursor, encode_cursor
 import json
 import hashlib
 
@@ -30,42 +32,225 @@ class SearchService:
         offset: int = 0
     ) -> List[MovieListResponse]:
         """
-        Advanced movie search using PostgreSQL full-text search with fallback to LIKE search
+        Ranked full-text movie search over the movie search index
         """
-        # Try to get from cache first
-        query_hash = self._generate_query_hash(query, filters, limit, offset)
-        search_cache = await get_search_cache_service()
-        cached_result = await search_cache.get_search_results(query_hash)
+        movies, _ = await self.search_movies_with_suggestion(query, filters, limit, offset)
+        return movies
+
+    async def search_movies_with_suggestion(
+        self,
+        query: str,
+        filters: Optional[Dict] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> Tuple[List[MovieListResponse], Optional[str]]:
+        """
+        Ranked full-text movie search, falling back to typo-tolerant matching
         
-        if cached_result:
-            return [MovieListResponse(**movie_data) for movie_data in cached_result]
+        Returns:
+            The page of movies and, for fuzzy results, the closest title or name ("did you mean")
+        """
+        movies, did_you_mean, _ = await self.search_movies_page(query, filters, limit, offset)
+        return movies, did_you_mean
+
+    async def search_movies_page(
+        self,
+        query: str,
+        filters: Optional[Dict] = None,
+        limit: int = 20,
+        offset: int = 0,
+        after: Optional[str] = None
+    ) -> Tuple[List[MovieListResponse], Optional[str], Optional[str]]:
+        """
+        One page of search_movies_with_suggestion, continuing from a cursor
         
-        # Build search query
-        search_query = select(Movie).options(
-            selectinload(Movie.genres),
-            selectinload(Movie.languages),
-            selectinload(Movie.cast),
-            selectinload(Movie.reviews)
+        Full-text results seek past the cursor's (rank, id); fuzzy results,
+        ranked in Python, carry their position instead. A cursor takes
+        precedence over offset.
+        
+        Returns:
+            The page of movies, the "did you mean" suggestion and the cursor for the next page
+        
+        Raises:
+            InvalidCursorError: If the cursor was not issued for this search
+        """
+        # Concurrent cache misses share a single search
+        query_hash = self._generate_query_hash(query, filters, limit, offset, after)
+        search_cache = await get_search_cache_service()
+        cached = await search_cache.get_or_load_search_results(
+            query_hash, lambda: self._load_movie_search(query, filters, limit, offset, after)
         )
+        movies = [MovieListResponse(**movie_data) for movie_data in cached["results"]]
+        return movies, cached["did_you_mean"], cached.get("next_cursor")
+
+    async def _load_movie_search(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        limit: int,
+        offset: int,
+        after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Full-text results, or fuzzy ones when full-text search finds nothing at all"""
+        scope = self._cursor_scope(query, filters)
+        fuzzy_scope = f"{scope}:fuzzy"
+        if after:
+            try:
+                position = decode_cursor(fuzzy_scope, after)[0]
+            except InvalidCursorError:
+                position = None  # a full-text cursor, checked by the paginator
+            if position is not None:
+                return await self._load_fuzzy_page(query, filters, limit, position, fuzzy_scope)
         
-        # Add search conditions
-        search_conditions = []
+        results, next_cursor = await self._run_movie_search_page(query, filters, limit, offset, after, scope)
+        if results or not search_terms(query):
+            return {"results": results, "did_you_mean": None, "next_cursor": next_cursor}
+        if (offset or after) and await self._run_movie_search(query, filters, 1, 0):
+            # Past the end of the full-text results
+            return {"results": [], "did_you_mean": None, "next_cursor": None}
+        return await self._load_fuzzy_page(query, filters, limit, offset, fuzzy_scope)
+
+    async def _load_fuzzy_page(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        limit: int,
+        position: int,
+        scope: str
+    ) -> Dict[str, Any]:
+        """A page of fuzzy results and the cursor to the next one (read one extra to know)"""
+        page = await self._run_fuzzy_search(query, filters, limit + 1, position)
+        next_cursor = None
+        if len(page["results"]) > limit:
+            page["results"] = page["results"][:limit]
+            next_cursor = encode_cursor(scope, [position + limit])
+        return dict(page, next_cursor=next_cursor)
+
+    async def _run_movie_search(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        limit: int,
+        offset: int
+    ) -> List[Dict[str, Any]]:
+        """Run a ranked movie search against the search index for caching"""
+        results, _ = await self._run_movie_search_page(
+            query, filters, limit, offset, None, self._cursor_scope(query, filters)
+        )
+        return results
+
+    async def _run_movie_search_page(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        limit: int,
+        offset: int,
+        after: Optional[str],
+        scope: str
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Ranked movie search ordered by (rank, id), seeking past a cursor"""
+        search_query = select(Movie).options(
+            selectinload(Movie.genres)
+        )
         
+        # Rank by the search backend's relevance score when there is a query
+        ranked = None
         if query and query.strip():
-            # Use LIKE search for SQLite compatibility
-            search_term = f"%{query.strip()}%"
-            search_conditions.append(
-                or_(
-                    Movie.title.ilike(search_term),
-                    Movie.local_title.ilike(search_term),
-                    Movie.director.ilike(search_term),
-                    Movie.producer.ilike(search_term),
-                    Movie.production_company.ilike(search_term),
-                    Movie.plot_summary.ilike(search_term)
-                )
-            )
+            terms = search_terms(query)
+            if not terms:
+                return [], None
+            ranked = get_search_backend(self.db).match(terms).subquery()
+            search_query = search_query.join(ranked, ranked.c.movie_id == Movie.id)
+        
+        search_conditions = self._filter_conditions(filters)
+        if search_conditions:
+            search_query = search_query.where(and_(*search_conditions))
+        
+        if ranked is not None:
+            paginator = KeysetPaginator(scope, ranked.c.rank, Movie.id)
+        else:
+            paginator = KeysetPaginator(scope, Movie.title, Movie.id, descending=False)
+        rows, next_cursor = await paginator.fetch_page(
+            self.db, search_query, limit, after=after, offset=0 if after else offset
+        )
+        
+        # Convert to response format
+        movie_responses = await self.movie_service.build_movie_list_responses([row[0] for row in rows])
+        return [movie.dict() for movie in movie_responses], next_cursor
+
+    async def _run_fuzzy_search(
+        self,
+        query: str,
+        filters: Optional[Dict],
+        limit: int,
+        offset: int,
+        cast_only: bool = False
+    ) -> Dict[str, Any]:
+        """Movies with a title, director or cast name similar to the query, for caching"""
+        matches = await get_search_backend(self.db).fuzzy_match(self.db, query, cast_only=cast_only)
+        if not matches:
+            return {"results": [], "did_you_mean": None}
+        
+        conditions = [Movie.id.in_(list({match.movie_id for match in matches}))] + self._filter_conditions(filters)
+        result = await self.db.execute(
+            select(Movie).options(selectinload(Movie.genres)).where(and_(*conditions))
+        )
+        movies = {movie.id: movie for movie in result.scalars().all()}
+        matches = [match for match in matches if match.movie_id in movies]
+        if not matches:
+            return {"results": [], "did_you_mean": None}
+        
+        # A movie ranks by its best matching name, lifted by its popularity
+        scores: Dict[Any, float] = {}
+        for match in matches:
+            scores[match.movie_id] = max(match.score, scores.get(match.movie_id, 0.0))
+        ranked_movies = sorted(movies.values(), key=lambda movie: (-scores[movie.id], movie.title))
+        
+        closest = max(matches, key=lambda match: (match.similarity, match.score))
+        did_you_mean = closest.name if normalize(closest.name) != normalize(query) else None
+        
+        movie_responses = await self.movie_service.build_movie_list_responses(ranked_movies[offset:offset + limit])
+        return {"results": [movie.dict() for movie in movie_responses], "did_you_mean": did_you_mean}
+
+    async def get_search_facets(self, query: str, filters: Optional[Dict] = None) -> Optional[MovieFacets]:
+        """
+        Facet counts of all movies a search matches (full-text, else fuzzy)
+        
+        Counted on this worker's facet bitsets; None until they are built.
+        """
+        facet_index = get_facet_index()
+        if facet_index is None:
+            return None
+        movie_ids = await self._matching_movie_ids(query, filters)
+        return MovieFacets(**facet_index.counts(facet_index.bits_for(movie_ids)))
+
+    async def _matching_movie_ids(self, query: str, filters: Optional[Dict]) -> List[Any]:
+        """Ids of every movie a search returns, on any page"""
+        terms = search_terms(query)
+        if not terms:
+            return []
+        
+        backend = get_search_backend(self.db)
+        conditions = self._filter_conditions(filters)
+        ranked = backend.match(terms).subquery()
+        result = await self.db.execute(
+            select(Movie.id).join(ranked, ranked.c.movie_id == Movie.id).where(*conditions)
+        )
+        movie_ids = result.scalars().all()
+        if movie_ids:
+            return movie_ids
         
-        # Add filters
+        matches = await backend.fuzzy_match(self.db, query)
+        if not matches:
+            return []
+        result = await self.db.execute(
+            select(Movie.id).where(Movie.id.in_(list({match.movie_id for match in matches})), *conditions)
+        )
+        return result.scalars().all()
+
+    def _filter_conditions(self, filters: Optional[Dict]) -> List[Any]:
+        """WHERE conditions for the search filters"""
+        search_conditions = []
         if filters:
             if filters.get("genre"):
                 genre_subquery = select(MovieGenre.movie_id).where(MovieGenre.genre == filters["genre"])
@@ -84,53 +269,27 @@ class SearchService:
             if filters.get("production_state"):
                 search_conditions.append(Movie.production_state.ilike(f"%{filters['production_state']}%"))
             
+            if filters.get("type"):
+                search_conditions.append(Movie.type == filters["type"])
+            
             if filters.get("rating_min"):
                 # This would require a subquery to calculate average ratings
                 pass  # Skip for now, can be added later
         
-        if search_conditions:
-            search_query = search_query.where(and_(*search_conditions))
-        
-        # Order by relevance (for now, just by title similarity and then by rating)
-        search_query = search_query.order_by(Movie.title, desc(Movie.created_at))
-        
-        # Apply pagination
-        search_query = search_query.offset(offset).limit(limit)
-        
-        # Execute query
-        result = await self.db.execute(search_query)
-        movies = result.scalars().all()
-        
-        # Convert to response format
-        movie_responses = []
-        for movie in movies:
-            stats = await self.movie_service._calculate_movie_stats(movie)
-            movie_response = MovieListResponse(
-                id=movie.id,
-                title=movie.title,
-                local_title=movie.local_title,
-                release_date=movie.release_date,
-                director=movie.director,
-                poster_url=movie.poster_url,
-                type=movie.type,
-                genres=[genre.genre for genre in movie.genres],
-                stats=stats,
-                created_at=movie.created_at
-            )
-            movie_responses.append(movie_response)
-        
-        # Cache the result
-        await search_cache.set_search_results(query_hash, [movie.dict() for movie in movie_responses])
-        
-        return movie_responses
+        return search_conditions
 
     async def suggest_movies(self, partial_query: str, limit: int = 5) -> List[str]:
         """
-        Provide search suggestions using similarity matching
+        Provide search suggestions for a prefix of titles, directors and cast names
         """
         if not partial_query or len(partial_query.strip()) < 2:
             return []
         
+        # Served from this worker's autocomplete index once it is built
+        autocomplete_index = get_autocomplete_index()
+        if autocomplete_index is not None:
+            return autocomplete_index.suggest(partial_query, limit)
+        
         # Try to get from cache first
         search_cache = await get_search_cache_service()
         cached_result = await search_cache.get_search_suggestions(partial_query.strip())
@@ -183,59 +342,69 @@ class SearchService:
         """
         Search movies by cast member name
         """
-        query_hash = f"cast:{hashlib.md5(actor_name.encode()).hexdigest()}:{limit}"
-        search_cache = await get_search_cache_service()
-        cached_result = await search_cache.get_search_results(query_hash)
-        if cached_result:
-            return [MovieListResponse(**movie_data) for movie_data in cached_result]
+        movies, _ = await self.search_by_cast_with_suggestion(actor_name, limit)
+        return movies
+
+    async def search_by_cast_with_suggestion(
+        self, actor_name: str, limit: int = 20
+    ) -> Tuple[List[MovieListResponse], Optional[str]]:
+        """
+        Search movies by cast member name, falling back to similar names
         
-        # Find movies with the specified actor
-        cast_subquery = select(MovieCast.movie_id).where(
-            MovieCast.actor_name.ilike(f"%{actor_name}%")
+        Returns:
+            The movies and, for fuzzy results, the closest cast name ("did you mean")
+        """
+        query_hash = f"cast:fuzzy:{hashlib.md5(actor_name.encode()).hexdigest()}:{limit}"
+        search_cache = await get_search_cache_service()
+        cached = await search_cache.get_or_load_search_results(
+            query_hash, lambda: self._load_cast_search(actor_name, limit)
         )
+        return [MovieListResponse(**movie_data) for movie_data in cached["results"]], cached["did_you_mean"]
+
+    async def _load_cast_search(self, actor_name: str, limit: int) -> Dict[str, Any]:
+        """Cast search results, or movies with a similar cast name when there are none"""
+        results = await self._run_cast_search(actor_name, limit)
+        if results or not search_terms(actor_name):
+            return {"results": results, "did_you_mean": None}
+        return await self._run_fuzzy_search(actor_name, None, limit, 0, cast_only=True)
+
+    async def _run_cast_search(self, actor_name: str, limit: int) -> List[Dict[str, Any]]:
+        """Find movies featuring a cast member for caching"""
+        terms = search_terms(actor_name)
+        if not terms:
+            return []
         
+        # Cast names are their own field in the search documents
+        ranked = get_search_backend(self.db).match(terms, cast_only=True).subquery()
         query = select(Movie).options(
-            selectinload(Movie.genres),
-            selectinload(Movie.languages),
-            selectinload(Movie.cast),
-            selectinload(Movie.reviews)
-        ).where(
-            Movie.id.in_(cast_subquery)
-        ).order_by(desc(Movie.created_at)).limit(limit)
+            selectinload(Movie.genres)
+        ).join(
+            ranked, ranked.c.movie_id == Movie.id
+        ).order_by(desc(ranked.c.rank), desc(Movie.created_at)).limit(limit)
         
         result = await self.db.execute(query)
         movies = result.scalars().all()
         
         # Convert to response format
-        movie_responses = []
-        for movie in movies:
-            stats = await self.movie_service._calculate_movie_stats(movie)
-            movie_response = MovieListResponse(
-                id=movie.id,
-                title=movie.title,
-                local_title=movie.local_title,
-                release_date=movie.release_date,
-                director=movie.director,
-                poster_url=movie.poster_url,
-                type=movie.type,
-                genres=[genre.genre for genre in movie.genres],
-                stats=stats,
-                created_at=movie.created_at
-            )
-            movie_responses.append(movie_response)
-        
-        # Cache the result
-        await search_cache.set_search_results(query_hash, [movie.dict() for movie in movie_responses])
-        
-        return movie_responses
+        movie_responses = await self.movie_service.build_movie_list_responses(movies)
+        return [movie.dict() for movie in movie_responses]
+
+    def _cursor_scope(self, query: str, filters: Optional[Dict]) -> str:
+        """Cursor scope of a search, so a cursor only continues the search that issued it"""
+        key_string = json.dumps({"query": query, "filters": filters or {}}, sort_keys=True)
+        return f"search:{hashlib.md5(key_string.encode()).hexdigest()}"
 
-    def _generate_query_hash(self, query: str, filters: Optional[Dict], limit: int, offset: int) -> str:
+    def _generate_query_hash(
+        self, query: str, filters: Optional[Dict], limit: int, offset: int, after: Optional[str] = None
+    ) -> str:
         """Generate hash for search query parameters"""
         key_data = {
             "query": query,
             "filters": filters or {},
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "after": after,
+            "fuzzy": True
         }
         key_string = json.dumps(key_data, sort_keys=True)
         return hashlib.md5(key_string.encode()).hexdigest()
\ No newline at end of file
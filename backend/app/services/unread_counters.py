@@ -0,0 +1,125 @@
+"""
+Per-user unread notification counters for LemonNPie Backend API
+
+notifications:unread:{user_id} holds a user's unread count. Creating
+notifications increments it, reading or deleting an unread one decrements it
+and marking everything read zeroes it, so the hot paths (WebSocket connect,
+mark_read, the notifications list) read one key instead of running COUNT(*).
+Counters are only adjusted while they exist; a missing one is loaded from the
+database on the next read. Notifications expiring, and the narrow window
+between a database write and its counter update, leave drift that the
+periodic reconciliation corrects.
+"""
+import hashlib
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from redis.exceptions import NoScriptError
+
+from app.core.config import settings
+
+UNREAD_KEY = "notifications:unread:{user_id}"
+
+# KEYS: counters; ARGV[1]: amount to add to each counter that exists.
+# Returns each counter's new value, or -1 where there was none.
+ADJUST_SCRIPT = """
+local results = {}
+for i, key in ipairs(KEYS) do
+    local value = redis.call('GET', key)
+    if value then
+        local updated = math.max(tonumber(value) + tonumber(ARGV[1]), 0)
+        redis.call('SET', key, updated, 'KEEPTTL')
+        results[i] = updated
+    else
+        results[i] = -1
+    end
+end
+return results
+"""
+
+# KEYS: counters; ARGV: expected value, then database count, per counter.
+# A counter still holding the value read before the count is replaced with
+# it; one that changed meanwhile is left for the next run.
+RECONCILE_SCRIPT = """
+local replaced = 0
+for i, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[2 * i - 1] then
+        redis.call('SET', key, ARGV[2 * i], 'KEEPTTL')
+        replaced = replaced + 1
+    end
+end
+return replaced
+"""
+
+ADJUST_SCRIPT_SHA = hashlib.sha1(ADJUST_SCRIPT.encode()).hexdigest()
+RECONCILE_SCRIPT_SHA = hashlib.sha1(RECONCILE_SCRIPT.encode()).hexdigest()
+
+
+def unread_key(user_id: UUID) -> str:
+    return UNREAD_KEY.format(user_id=user_id)
+
+
+def user_id_from_key(key) -> UUID:
+    if isinstance(key, bytes):
+        key = key.decode()
+    return UUID(key.rsplit(":", 1)[1])
+
+
+async def _run_script(redis_client, script: str, sha: str, keys: List[str], args: List) -> List[int]:
+    """Run a script, sending its source only if Redis doesn't have it cached"""
+    try:
+        return await redis_client.evalsha(sha, len(keys), *keys, *args)
+    except NoScriptError:
+        return await redis_client.eval(script, len(keys), *keys, *args)
+
+
+async def get_unread(redis_client, user_id: UUID) -> Optional[int]:
+    """A user's unread count, None if there is no counter"""
+    value = await redis_client.get(unread_key(user_id))
+    return int(value) if value is not None else None
+
+
+async def load_unread(redis_client, user_id: UUID, count: int) -> None:
+    """Seed a missing counter with a database count (a counter already there wins)"""
+    await redis_client.set(unread_key(user_id), count, ex=settings.NOTIFICATION_UNREAD_COUNTER_TTL, nx=True)
+
+
+async def reset_unread(redis_client, user_id: UUID) -> None:
+    """Zero a user's counter (all of their notifications were read)"""
+    await redis_client.set(unread_key(user_id), 0, ex=settings.NOTIFICATION_UNREAD_COUNTER_TTL)
+
+
+async def adjust_unread(redis_client, user_ids: Iterable[UUID], amount: int) -> Dict[UUID, int]:
+    """
+    Add amount to the users' existing counters in one round trip
+
+    Returns:
+        New counts of the users that had a counter
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    keys = [unread_key(user_id) for user_id in user_ids]
+    results = await _run_script(redis_client, ADJUST_SCRIPT, ADJUST_SCRIPT_SHA, keys, [amount])
+    return {user_id: int(count) for user_id, count in zip(user_ids, results) if int(count) >= 0}
+
+
+async def reconcile_unread(redis_client, expected: Dict[UUID, bytes], counts: Dict[UUID, int]) -> int:
+    """
+    Replace counters with database counts where they still hold the expected value
+
+    Args:
+        redis_client: Redis client
+        expected: Counter values as read (GET/MGET) before counting
+        counts: Database unread counts of the same users
+
+    Returns:
+        Number of counters replaced
+    """
+    keys, args = [], []
+    for user_id, value in expected.items():
+        keys.append(unread_key(user_id))
+        args += [value, counts.get(user_id, 0)]
+    if not keys:
+        return 0
+    return int(await _run_script(redis_client, RECONCILE_SCRIPT, RECONCILE_SCRIPT_SHA, keys, args))
@@ -1,7 +1,7 @@
 """
 User service for LemonNPie Backend API
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from uuid import UUID
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,9 +13,12 @@ from app.models.user import User
 from app.models.relationships import UserFollow, UserWatchlist, UserFavorite
 from app.models.review import Review
 from app.models.movie import Movie
-from app.schemas.user import UserProfileUpdate, UserStats, UserProfileResponse, UserPublicProfile, UserListResponse, ActivityFeedResponse, ActivityItem, MovieListResponse, MovieListItem
+from app.schemas.user import UserProfileUpdate, UserStats, UserProfileResponse, UserPublicProfile, UserListResponse, ActivityFeedResponse, MovieListResponse, MovieListItem
 from app.core.exceptions import LemonPieException
+from app.db.pagination import KeysetPaginator
+from app.auth.principal import invalidate_principal
 from app.cache.redis import get_user_cache_service
+from app.services.viewer_context import get_viewer_context
 
 logger = logging.getLogger(__name__)
 
@@ -46,13 +49,14 @@ class UserService:
     
     async def get_user_stats(self, user_id: UUID, db: AsyncSession) -> UserStats:
         """Calculate user statistics"""
-        # Try to get from cache first
+        # Concurrent cache misses share a single load
         user_cache = await get_user_cache_service()
-        cached_stats = await user_cache.get_user_stats(str(user_id))
-        
-        if cached_stats:
-            return UserStats(**cached_stats)
-        
+        return await user_cache.get_or_load_user_stats(
+            str(user_id), lambda: self._load_user_stats(user_id, db), UserStats
+        )
+    
+    async def _load_user_stats(self, user_id: UUID, db: AsyncSession) -> UserStats:
+        """Count a user's reviews, follows and lists for caching"""
         # Get review count and average rating
         review_stats_query = select(
             func.count(Review.id).label('total_reviews'),
@@ -99,11 +103,58 @@ class UserService:
             favorites_count=favorites_count
         )
         
-        # Cache the result
-        await user_cache.set_user_stats(str(user_id), user_stats.dict())
-        
         return user_stats
     
+    async def get_user_stats_many(self, user_ids: List[UUID], db: AsyncSession) -> Dict[UUID, UserStats]:
+        """Statistics of several users: one cache round trip, grouped counts for the misses"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        
+        user_cache = await get_user_cache_service()
+        cached = await user_cache.get_user_stats_many([str(user_id) for user_id in user_ids], UserStats)
+        stats = {user_id: user_stats for user_id, user_stats in zip(user_ids, cached) if user_stats is not None}
+        
+        missing = [user_id for user_id in user_ids if user_id not in stats]
+        if missing:
+            loaded = await self._load_user_stats_many(missing, db)
+            await user_cache.set_user_stats_many({str(user_id): user_stats for user_id, user_stats in loaded.items()})
+            stats.update(loaded)
+        return stats
+    
+    async def _load_user_stats_many(self, user_ids: List[UUID], db: AsyncSession) -> Dict[UUID, UserStats]:
+        """Count several users' reviews, follows and lists with one grouped query each"""
+        reviews_result = await db.execute(
+            select(Review.user_id, func.count(Review.id), func.avg(Review.lemon_pie_rating))
+            .where(Review.user_id.in_(user_ids))
+            .group_by(Review.user_id)
+        )
+        reviews = {user_id: (count, average) for user_id, count, average in reviews_result}
+        
+        async def grouped_count(column, count_column) -> Dict[UUID, int]:
+            result = await db.execute(
+                select(column, func.count(count_column)).where(column.in_(user_ids)).group_by(column)
+            )
+            return dict(result.all())
+        
+        followers = await grouped_count(UserFollow.following_id, UserFollow.follower_id)
+        following = await grouped_count(UserFollow.follower_id, UserFollow.following_id)
+        watchlist = await grouped_count(UserWatchlist.user_id, UserWatchlist.movie_id)
+        favorites = await grouped_count(UserFavorite.user_id, UserFavorite.movie_id)
+        
+        stats = {}
+        for user_id in user_ids:
+            total_reviews, average_rating = reviews.get(user_id, (0, None))
+            stats[user_id] = UserStats(
+                total_reviews=total_reviews,
+                average_rating=float(average_rating) if average_rating else None,
+                followers_count=followers.get(user_id, 0),
+                following_count=following.get(user_id, 0),
+                watchlist_count=watchlist.get(user_id, 0),
+                favorites_count=favorites.get(user_id, 0)
+            )
+        return stats
+    
     async def update_user_profile(
         self, 
         user_id: UUID, 
@@ -128,6 +179,9 @@ class UserService:
         await db.commit()
         await db.refresh(user)
         
+        if "name" in update_dict:
+            await invalidate_principal(user_id)
+        
         return user
     
     async def get_user_profile(
@@ -225,6 +279,14 @@ class UserService:
         db.add(follow)
         await db.commit()
         
+        # Fan out to the follower's followers and backfill their own timeline
+        try:
+            from app.services.feed_service import FeedService
+            
+            await FeedService(db).on_follow(follower_id, following_id, follow.created_at)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for follow: {e}")
+        
         # Send notification to the followed user
         try:
             from app.services.notification_trigger import NotificationTrigger
@@ -270,6 +332,13 @@ class UserService:
         
         await db.delete(follow_obj)
         await db.commit()
+        
+        try:
+            from app.services.feed_service import FeedService
+            
+            await FeedService(db).on_unfollow(follower_id, following_id)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for unfollow: {e}")
     
     async def get_user_followers(
         self, 
@@ -392,170 +461,10 @@ class UserService:
         per_page: int, 
         db: AsyncSession
     ) -> ActivityFeedResponse:
-        """Get activity feed for a user based on who they follow"""
-        offset = (page - 1) * per_page
-        
-        # Get list of users that this user follows
-        following_query = select(UserFollow.following_id).where(
-            UserFollow.follower_id == user_id
-        )
-        following_result = await db.execute(following_query)
-        following_ids = [row[0] for row in following_result.fetchall()]
-        
-        if not following_ids:
-            # User doesn't follow anyone, return empty feed
-            return ActivityFeedResponse(
-                activities=[],
-                total=0,
-                page=page,
-                per_page=per_page,
-                has_next=False,
-                has_prev=False
-            )
-        
-        activities = []
-        
-        # Get recent reviews from followed users
-        reviews_query = (
-            select(Review, User, Movie)
-            .join(User, Review.user_id == User.id)
-            .join(Movie, Review.movie_id == Movie.id)
-            .where(Review.user_id.in_(following_ids))
-            .order_by(Review.created_at.desc())
-            .limit(per_page * 2)  # Get more to mix with other activities
-        )
-        
-        reviews_result = await db.execute(reviews_query)
-        reviews = reviews_result.fetchall()
-        
-        for review, user, movie in reviews:
-            user_stats = await self.get_user_stats(user.id, db)
-            user_profile = UserPublicProfile(
-                id=user.id,
-                name=user.name,
-                bio=user.bio,
-                location=user.location,
-                avatar_url=user.avatar_url,
-                role=user.role,
-                is_verified=user.is_verified,
-                created_at=user.created_at,
-                stats=user_stats
-            )
-            
-            activities.append(ActivityItem(
-                id=review.id,
-                type="review_posted",
-                user=user_profile,
-                title=f"{user.name} reviewed {movie.title}",
-                description=f"Rated {review.lemon_pie_rating}/10: {review.review_text[:100]}{'...' if len(review.review_text) > 100 else ''}",
-                data={
-                    "movie_id": str(movie.id),
-                    "movie_title": movie.title,
-                    "rating": review.lemon_pie_rating,
-                    "review_id": str(review.id)
-                },
-                created_at=review.created_at
-            ))
-        
-        # Get recent follows from followed users
-        from sqlalchemy.orm import aliased
-        follower_alias = aliased(User)
-        followed_alias = aliased(User)
-        
-        follows_query = (
-            select(UserFollow, follower_alias, followed_alias)
-            .join(follower_alias, UserFollow.follower_id == follower_alias.id)
-            .join(followed_alias, UserFollow.following_id == followed_alias.id)
-            .where(UserFollow.follower_id.in_(following_ids))
-            .order_by(UserFollow.created_at.desc())
-            .limit(per_page)
-        )
-        
-        follows_result = await db.execute(follows_query)
-        follows = follows_result.fetchall()
+        """Get activity feed for a user based on who they follow (precomputed timeline)"""
+        from app.services.feed_service import FeedService
         
-        for follow, follower, followed in follows:
-            follower_stats = await self.get_user_stats(follower.id, db)
-            follower_profile = UserPublicProfile(
-                id=follower.id,
-                name=follower.name,
-                bio=follower.bio,
-                location=follower.location,
-                avatar_url=follower.avatar_url,
-                role=follower.role,
-                is_verified=follower.is_verified,
-                created_at=follower.created_at,
-                stats=follower_stats
-            )
-            
-            activities.append(ActivityItem(
-                id=follow.follower_id,  # Using follower_id as unique identifier
-                type="user_followed",
-                user=follower_profile,
-                title=f"{follower.name} followed {followed.name}",
-                description=f"{follower.name} started following {followed.name}",
-                data={
-                    "followed_user_id": str(followed.id),
-                    "followed_user_name": followed.name
-                },
-                created_at=follow.created_at
-            ))
-        
-        # Get recent watchlist additions from followed users
-        watchlist_query = (
-            select(UserWatchlist, User, Movie)
-            .join(User, UserWatchlist.user_id == User.id)
-            .join(Movie, UserWatchlist.movie_id == Movie.id)
-            .where(UserWatchlist.user_id.in_(following_ids))
-            .order_by(UserWatchlist.added_at.desc())
-            .limit(per_page)
-        )
-        
-        watchlist_result = await db.execute(watchlist_query)
-        watchlist_items = watchlist_result.fetchall()
-        
-        for watchlist_item, user, movie in watchlist_items:
-            user_stats = await self.get_user_stats(user.id, db)
-            user_profile = UserPublicProfile(
-                id=user.id,
-                name=user.name,
-                bio=user.bio,
-                location=user.location,
-                avatar_url=user.avatar_url,
-                role=user.role,
-                is_verified=user.is_verified,
-                created_at=user.created_at,
-                stats=user_stats
-            )
-            
-            activities.append(ActivityItem(
-                id=watchlist_item.user_id,  # Using combination as unique identifier
-                type="movie_watchlisted",
-                user=user_profile,
-                title=f"{user.name} added {movie.title} to watchlist",
-                description=f"{user.name} wants to watch {movie.title}",
-                data={
-                    "movie_id": str(movie.id),
-                    "movie_title": movie.title
-                },
-                created_at=watchlist_item.added_at
-            ))
-        
-        # Sort all activities by creation time and paginate
-        activities.sort(key=lambda x: x.created_at, reverse=True)
-        total = len(activities)
-        
-        # Apply pagination
-        paginated_activities = activities[offset:offset + per_page]
-        
-        return ActivityFeedResponse(
-            activities=paginated_activities,
-            total=total,
-            page=page,
-            per_page=per_page,
-            has_next=(offset + per_page) < total,
-            has_prev=page > 1
-        )
+        return await FeedService(db).get_feed(user_id, page, per_page)
     
     async def add_to_watchlist(
         self, 
@@ -591,6 +500,14 @@ class UserService:
         watchlist_item = UserWatchlist(user_id=user_id, movie_id=movie_id)
         db.add(watchlist_item)
         await db.commit()
+        get_viewer_context(db, user_id).watchlist.prime(movie_id, True)
+        
+        try:
+            from app.services.feed_service import FeedService, MOVIE_WATCHLISTED
+            
+            await FeedService(db).publish_event(MOVIE_WATCHLISTED, user_id, movie_id, watchlist_item.added_at)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for watchlist addition: {e}")
     
     async def remove_from_watchlist(
         self, 
@@ -618,40 +535,51 @@ class UserService:
         
         await db.delete(item)
         await db.commit()
+        get_viewer_context(db, user_id).watchlist.prime(movie_id, False)
+        
+        try:
+            from app.services.feed_service import FeedService, MOVIE_WATCHLISTED
+            
+            await FeedService(db).retract_event(MOVIE_WATCHLISTED, user_id, movie_id)
+        except Exception as e:
+            logger.warning(f"Failed to update activity feeds for watchlist removal: {e}")
     
     async def get_user_watchlist(
         self, 
         user_id: UUID, 
         page: int, 
         per_page: int, 
-        db: AsyncSession
+        db: AsyncSession,
+        after: Optional[str] = None
     ) -> MovieListResponse:
-        """Get user's watchlist with pagination"""
+        """Get user's watchlist with pagination (seekable with ``after``)"""
         offset = (page - 1) * per_page
         
-        # Get total count
-        total_query = select(func.count(UserWatchlist.movie_id)).where(
-            UserWatchlist.user_id == user_id
-        )
-        total_result = await db.execute(total_query)
-        total = total_result.scalar() or 0
-        
         # Get watchlist items with movie details
         watchlist_query = (
             select(UserWatchlist, Movie)
             .join(Movie, UserWatchlist.movie_id == Movie.id)
             .where(UserWatchlist.user_id == user_id)
-            .order_by(UserWatchlist.added_at.desc())
-            .offset(offset)
-            .limit(per_page)
+        )
+        paginator = KeysetPaginator(
+            f"watchlist:{user_id}", UserWatchlist.added_at, UserWatchlist.movie_id
         )
         
-        watchlist_result = await db.execute(watchlist_query)
-        watchlist_items = watchlist_result.fetchall()
+        if after:
+            total = None
+            watchlist_items, next_cursor = await paginator.fetch_page(db, watchlist_query, per_page, after=after)
+        else:
+            # Get total count
+            total_query = select(func.count(UserWatchlist.movie_id)).where(
+                UserWatchlist.user_id == user_id
+            )
+            total_result = await db.execute(total_query)
+            total = total_result.scalar() or 0
+            watchlist_items, next_cursor = await paginator.fetch_page(db, watchlist_query, per_page, offset=offset)
         
         # Convert to movie list items
         movies = []
-        for watchlist_item, movie in watchlist_items:
+        for watchlist_item, movie, *_ in watchlist_items:
             movies.append(
                 MovieListItem(
                     id=movie.id,
@@ -666,13 +594,25 @@ class UserService:
                 )
             )
         
+        if after:
+            return MovieListResponse(
+                movies=movies,
+                total=None,
+                page=None,
+                per_page=per_page,
+                has_next=next_cursor is not None,
+                has_prev=True,
+                next_cursor=next_cursor
+            )
+        
         return MovieListResponse(
             movies=movies,
             total=total,
             page=page,
             per_page=per_page,
             has_next=(offset + per_page) < total,
-            has_prev=page > 1
+            has_prev=page > 1,
+            next_cursor=next_cursor
         )
     
     async def add_to_favorites(
@@ -709,6 +649,7 @@ class UserService:
         favorite_item = UserFavorite(user_id=user_id, movie_id=movie_id)
         db.add(favorite_item)
         await db.commit()
+        get_viewer_context(db, user_id).favorites.prime(movie_id, True)
     
     async def remove_from_favorites(
         self, 
@@ -736,6 +677,7 @@ class UserService:
         
         await db.delete(item)
         await db.commit()
+        get_viewer_context(db, user_id).favorites.prime(movie_id, False)
     
     async def get_user_favorites(
         self, 
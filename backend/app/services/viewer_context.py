@@ -0,0 +1,145 @@
+"""
+Per-request viewer context for LemonNPie Backend API
+
+Listings show whether the signed-in viewer voted on each review and whether
+each movie is on their watchlist or favorites. Rather than one query per
+item, every lookup goes through a BatchLoader: keys requested together are
+resolved with a single IN query, and answers are remembered for the rest of
+the request.
+
+The context lives in the database session's info dict, and a session is
+opened per request, so every service working on a request shares the same
+loaders and the same answers.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.enums import VoteType
+from app.models.relationships import ReviewVote, UserFavorite, UserWatchlist
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+SESSION_INFO_KEY = "viewer_contexts"
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Coalesces single-key loads into batch calls (DataLoader-style)
+
+    Keys requested in the same event loop turn are dispatched together on the
+    next one; each key is loaded at most once per loader.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Dict[K, V]]], default: Optional[V] = None):
+        self._batch_fn = batch_fn
+        self._default = default
+        self._futures: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self.batches = 0
+
+    def load(self, key: K) -> "asyncio.Future[V]":
+        """The value for key, batched with the other keys requested this turn"""
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                self._dispatch_task = loop.create_task(self._dispatch())
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> List[V]:
+        """Values for several keys, in order, with one batch call for the new ones"""
+        return list(await asyncio.gather(*[self.load(key) for key in keys]))
+
+    def prime(self, key: K, value: V) -> None:
+        """Record a value known without loading it (e.g. just written)"""
+        future = self._futures.get(key)
+        if future is None or future.done():
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+
+    def clear(self, key: K) -> None:
+        """Forget a key so the next load queries it again"""
+        future = self._futures.get(key)
+        if future is not None and future.done():
+            del self._futures[key]
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        self.batches += 1
+        try:
+            values = await self._batch_fn(keys)
+        except BaseException as e:
+            for key in keys:
+                future = self._futures.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                    # Mark retrieved so an unawaited future does not log a warning
+                    future.exception()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+        for key in keys:
+            future = self._futures.get(key)
+            if future is not None and not future.done():
+                future.set_result(values.get(key, self._default))
+
+
+class ViewerContext:
+    """What one viewer has done to the reviews and movies of a request"""
+
+    def __init__(self, db: AsyncSession, user_id: Optional[UUID]):
+        self.db = db
+        self.user_id = user_id
+        self.votes: BatchLoader[UUID, Optional[VoteType]] = BatchLoader(self._load_votes)
+        self.watchlist: BatchLoader[UUID, bool] = BatchLoader(self._load_watchlist, default=False)
+        self.favorites: BatchLoader[UUID, bool] = BatchLoader(self._load_favorites, default=False)
+
+    async def _load_votes(self, review_ids: List[UUID]) -> Dict[UUID, VoteType]:
+        if self.user_id is None:
+            return {}
+        result = await self.db.execute(
+            select(ReviewVote.review_id, ReviewVote.vote_type).where(
+                ReviewVote.user_id == self.user_id,
+                ReviewVote.review_id.in_(review_ids)
+            )
+        )
+        return dict(result.all())
+
+    async def _load_watchlist(self, movie_ids: List[UUID]) -> Dict[UUID, bool]:
+        if self.user_id is None:
+            return {}
+        result = await self.db.execute(
+            select(UserWatchlist.movie_id).where(
+                UserWatchlist.user_id == self.user_id,
+                UserWatchlist.movie_id.in_(movie_ids)
+            )
+        )
+        return {movie_id: True for movie_id in result.scalars().all()}
+
+    async def _load_favorites(self, movie_ids: List[UUID]) -> Dict[UUID, bool]:
+        if self.user_id is None:
+            return {}
+        result = await self.db.execute(
+            select(UserFavorite.movie_id).where(
+                UserFavorite.user_id == self.user_id,
+                UserFavorite.movie_id.in_(movie_ids)
+            )
+        )
+        return {movie_id: True for movie_id in result.scalars().all()}
+
+
+def get_viewer_context(db: AsyncSession, user_id: Optional[UUID]) -> ViewerContext:
+    """The viewer's context for this request (session), created on first use"""
+    contexts: Dict[Any, ViewerContext] = db.info.setdefault(SESSION_INFO_KEY, {})
+    context = contexts.get(user_id)
+    if context is None:
+        context = contexts[user_id] = ViewerContext(db, user_id)
+    return context
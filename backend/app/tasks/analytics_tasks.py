@@ -0,0 +1,58 @@
+"""
+Analytics background tasks for LemonNPie Backend API
+"""
+import asyncio
+from typing import Dict, Any
+import logging
+
+from app.core.celery_app import celery_app
+from app.db import database
+from app.db.database import get_db, init_db
+from app.services.analytics_rollup_service import AnalyticsRollupService
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task
+def run_analytics_rollups_task():
+    """
+    Periodic task to fold newly closed hours and days into the rollup tables
+    """
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            result = loop.run_until_complete(_run_analytics_rollups_async())
+            return result
+        finally:
+            loop.close()
+
+    except Exception as exc:
+        logger.error(f"Failed to run analytics rollups: {exc}")
+        return {"error": str(exc)}
+
+
+async def _run_analytics_rollups_async() -> Dict[str, Any]:
+    """
+    Async helper to run the incremental rollup job
+    """
+    if database.async_session_maker is None:
+        await init_db()
+
+    async for session in get_db():
+        try:
+            rollup_service = AnalyticsRollupService(session)
+
+            processed = await rollup_service.run()
+
+            return {
+                "success": True,
+                "periods_processed": processed
+            }
+
+        except Exception as e:
+            logger.error(f"Error running analytics rollups: {e}")
+            raise
+        finally:
+            await session.close()
@@ -0,0 +1,65 @@
+"""
+Activity feed background tasks for LemonNPie Backend API
+"""
+import asyncio
+from typing import Dict, Any
+from uuid import UUID
+import logging
+
+from app.core.celery_app import celery_app
+from app.cache.redis import init_redis, close_redis
+from app.db import database
+from app.db.database import get_db, init_db
+from app.services.feed_service import FeedService
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task
+def backfill_timeline_task(follower_id: str, following_id: str):
+    """
+    Task to merge a newly followed user's recent activity into the follower's timeline
+    """
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            result = loop.run_until_complete(_backfill_timeline_async(follower_id, following_id))
+            return result
+        finally:
+            loop.close()
+
+    except Exception as exc:
+        logger.error(f"Failed to backfill timeline of {follower_id}: {exc}")
+        return {"error": str(exc)}
+
+
+async def _backfill_timeline_async(follower_id: str, following_id: str) -> Dict[str, Any]:
+    """
+    Async helper to backfill a timeline
+    """
+    if database.async_session_maker is None:
+        await init_db()
+
+    # The client is bound to this task's event loop
+    await init_redis()
+    try:
+        async for session in get_db():
+            try:
+                feed_service = FeedService(session)
+
+                merged = await feed_service.backfill(UUID(follower_id), UUID(following_id))
+
+                return {
+                    "success": True,
+                    "activities_merged": merged
+                }
+
+            except Exception as e:
+                logger.error(f"Error backfilling timeline: {e}")
+                raise
+            finally:
+                await session.close()
+    finally:
+        await close_redis()
@@ -10,6 +10,7 @@ from celery import current_task
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.celery_app import celery_app
+from app.cache.redis import init_redis, close_redis
 from app.db.database import get_db
 from app.models import Notification, NotificationPreference, User
 from app.models.enums import NotificationType
@@ -120,6 +121,26 @@ def cleanup_old_notifications_task():
         return {"error": str(exc)}
 
 
+@celery_app.task
+def reconcile_unread_counters_task():
+    """
+    Periodic task to correct the Redis unread counters against the database
+    """
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        
+        try:
+            result = loop.run_until_complete(_reconcile_unread_counters_async())
+            return result
+        finally:
+            loop.close()
+            
+    except Exception as exc:
+        logger.error(f"Failed to reconcile unread counters: {exc}")
+        return {"error": str(exc)}
+
+
 async def _send_notification_async(
     user_id: UUID,
     notification_type: NotificationType,
@@ -130,29 +151,34 @@ async def _send_notification_async(
     """
     Async helper to send a single notification
     """
-    async for session in get_db():
-        try:
-            notification_service = NotificationService(session)
-            
-            notification = await notification_service.create_notification(
-                user_id=user_id,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                data=data
-            )
-            
-            return {
-                "success": True,
-                "notification_id": str(notification.id),
-                "user_id": str(user_id)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error creating notification: {e}")
-            raise
-        finally:
-            await session.close()
+    # Real-time delivery publishes to the web processes; the client is bound to this task's event loop
+    await init_redis()
+    try:
+        async for session in get_db():
+            try:
+                notification_service = NotificationService(session)
+                
+                notification = await notification_service.create_notification(
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    data=data
+                )
+                
+                return {
+                    "success": True,
+                    "notification_id": str(notification.id),
+                    "user_id": str(user_id)
+                }
+                
+            except Exception as e:
+                logger.error(f"Error creating notification: {e}")
+                raise
+            finally:
+                await session.close()
+    finally:
+        await close_redis()
 
 
 async def _send_bulk_notifications_async(
@@ -165,29 +191,34 @@ async def _send_bulk_notifications_async(
     """
     Async helper to send notifications to multiple users
     """
-    async for session in get_db():
-        try:
-            notification_service = NotificationService(session)
-            
-            notifications = await notification_service.create_bulk_notifications(
-                user_ids=user_ids,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                data=data
-            )
-            
-            return {
-                "success": True,
-                "notifications_created": len(notifications),
-                "user_count": len(user_ids)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error creating bulk notifications: {e}")
-            raise
-        finally:
-            await session.close()
+    # Real-time delivery publishes to the web processes; the client is bound to this task's event loop
+    await init_redis()
+    try:
+        async for session in get_db():
+            try:
+                notification_service = NotificationService(session)
+                
+                notifications = await notification_service.create_bulk_notifications(
+                    user_ids=user_ids,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    data=data
+                )
+                
+                return {
+                    "success": True,
+                    "notifications_created": len(notifications),
+                    "user_count": len(user_ids)
+                }
+                
+            except Exception as e:
+                logger.error(f"Error creating bulk notifications: {e}")
+                raise
+            finally:
+                await session.close()
+    finally:
+        await close_redis()
 
 
 async def _cleanup_old_notifications_async() -> Dict[str, Any]:
@@ -209,4 +240,30 @@ async def _cleanup_old_notifications_async() -> Dict[str, Any]:
             logger.error(f"Error cleaning up notifications: {e}")
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def _reconcile_unread_counters_async() -> Dict[str, Any]:
+    """
+    Async helper to reconcile unread counters
+    """
+    await init_redis()
+    try:
+        async for session in get_db():
+            try:
+                notification_service = NotificationService(session)
+                
+                result = await notification_service.reconcile_unread_counts()
+                
+                return {
+                    "success": True,
+                    **result
+                }
+                
+            except Exception as e:
+                logger.error(f"Error reconciling unread counters: {e}")
+                raise
+            finally:
+                await session.close()
+    finally:
+        await close_redis()
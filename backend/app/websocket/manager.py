@@ -1,14 +1,28 @@
 """
 WebSocket connection manager for real-time notifications
+
+Sockets live in the web process that accepted them, so messages travel
+between processes over Redis pub/sub. Users are hashed onto
+WEBSOCKET_SHARDS channels; a web process subscribes only to the shards of
+its connected users (plus the broadcast channel) and delivers what arrives
+to its local sockets. Any process - including a Celery worker holding no
+sockets - can send: local sockets are written directly and the message is
+published to the user's shard for the rest of the fleet.
 """
 import json
 import logging
-from typing import Dict, List, Set, Optional, Any
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Set, Optional, Any, Union
 from uuid import UUID
 import asyncio
 
 from fastapi import WebSocket, WebSocketDisconnect
+from app.cache.redis import WORKER_ID, get_redis
+from app.core.config import settings
 from app.models.enums import NotificationType
+from app.websocket.presence import PresenceRegistry
+from app.websocket.writer import ConnectionWriter, DeliveryStats
 
 logger = logging.getLogger(__name__)
 
@@ -18,85 +32,124 @@ class ConnectionManager:
     Manages WebSocket connections for real-time notifications
     """
     
-    def __init__(self):
+    def __init__(self, node_id: str = WORKER_ID):
         # Store active connections by user_id
         self.active_connections: Dict[UUID, Set[WebSocket]] = {}
         # Store user_id by websocket for quick lookup
         self.connection_users: Dict[WebSocket, UUID] = {}
+        # Each socket is written by its own task from a bounded queue
+        self.writers: Dict[WebSocket, ConnectionWriter] = {}
+        self.delivery_stats = DeliveryStats()
         
+        # Identifies this process on the pub/sub channels and in the presence registry
+        self.node_id = node_id
+        self.presence = PresenceRegistry(node_id)
+        self.broadcast_channel = f"{settings.WEBSOCKET_CHANNEL_PREFIX}:broadcast"
+        # Shard channels this process needs, by number of local users hashed onto them
+        self.shard_users: Dict[str, int] = {}
+        self.pubsub = None
+        self.listener: Optional[asyncio.Task] = None
+        self.heartbeat: Optional[asyncio.Task] = None
+        self.reaper: Optional[asyncio.Task] = None
+    
+    def shard_channel(self, user_id: UUID) -> str:
+        """
+        Pub/sub channel carrying a user's messages (stable across processes)
+        """
+        shard = zlib.crc32(str(user_id).encode()) % settings.WEBSOCKET_SHARDS
+        return f"{settings.WEBSOCKET_CHANNEL_PREFIX}:shard:{shard}"
+    
+    async def start(self):
+        """
+        Start receiving other processes' messages and heartbeating presence
+        """
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self._listen())
+        if self.heartbeat is None or self.heartbeat.done():
+            self.heartbeat = asyncio.create_task(self._heartbeat())
+        if self.reaper is None or self.reaper.done():
+            self.reaper = asyncio.create_task(self._reap_stalled_writers())
+    
+    async def stop(self):
+        """
+        Stop the background tasks and leave the presence registry
+        """
+        for task in (self.listener, self.heartbeat, self.reaper):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self.listener = self.heartbeat = self.reaper = None
+        await self.presence.remove()
+    
     async def connect(self, websocket: WebSocket, user_id: UUID):
         """
         Accept a new WebSocket connection and associate it with a user
         """
         await websocket.accept()
+        self.writers[websocket] = ConnectionWriter(websocket, self.disconnect, self.delivery_stats)
         
         # Add connection to user's set
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
+            await self._add_shard_user(user_id)
         
         self.active_connections[user_id].add(websocket)
         self.connection_users[websocket] = user_id
+        await self.presence.set_user(user_id, len(self.active_connections[user_id]))
         
         logger.info(f"WebSocket connected for user {user_id}")
         
         # Send connection confirmation
-        await self.send_personal_message(
-            user_id=user_id,
-            message={
-                "type": "connection_established",
-                "message": "Connected to notification service",
-                "timestamp": asyncio.get_event_loop().time()
-            }
-        )
+        self.send_to_socket(websocket, {
+            "type": "connection_established",
+            "message": "Connected to notification service",
+            "timestamp": asyncio.get_event_loop().time()
+        })
     
-    def disconnect(self, websocket: WebSocket):
+    async def disconnect(self, websocket: WebSocket):
         """
         Remove a WebSocket connection
         """
-        user_id = self.connection_users.get(websocket)
+        user_id = self.connection_users.pop(websocket, None)
+        writer = self.writers.pop(websocket, None)
+        if writer is not None:
+            writer.stop()
         
         if user_id:
             # Remove from user's connections
-            if user_id in self.active_connections:
-                self.active_connections[user_id].discard(websocket)
-                
-                # Remove user entry if no more connections
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
+            connections = self.active_connections.get(user_id, set())
+            connections.discard(websocket)
             
-            # Remove from connection lookup
-            del self.connection_users[websocket]
+            # Remove user entry if no more connections
+            if not connections:
+                self.active_connections.pop(user_id, None)
+                await self._remove_shard_user(user_id)
+            await self.presence.set_user(user_id, len(connections))
             
             logger.info(f"WebSocket disconnected for user {user_id}")
     
     async def send_personal_message(self, user_id: UUID, message: Dict[str, Any]):
         """
-        Send a message to all connections for a specific user
+        Send a message to all connections for a specific user, on any process
         """
-        if user_id not in self.active_connections:
-            logger.debug(f"No active connections for user {user_id}")
-            return
-        
-        # Get all connections for this user
-        connections = self.active_connections[user_id].copy()
-        
-        # Send message to all user's connections
-        disconnected_connections = []
-        
-        for connection in connections:
-            try:
-                await connection.send_text(json.dumps(message))
-            except Exception as e:
-                logger.warning(f"Failed to send message to connection: {e}")
-                disconnected_connections.append(connection)
-        
-        # Clean up disconnected connections
-        for connection in disconnected_connections:
-            self.disconnect(connection)
+        text = json.dumps(message)
+        self._enqueue(user_id, text)
+        await self._publish(self.shard_channel(user_id), text, [user_id])
+    
+    def send_to_socket(self, websocket: WebSocket, message: Dict[str, Any]):
+        """
+        Queue a reply on one connection of this process (e.g. an answer to a client request)
+        """
+        writer = self.writers.get(websocket)
+        if writer is not None:
+            writer.offer(json.dumps(message))
     
     async def send_notification(
-        self, 
-        user_id: UUID, 
+        self,
+        user_id: UUID,
         notification_type: NotificationType,
         title: str,
         message: str,
@@ -106,17 +159,9 @@ class ConnectionManager:
         """
         Send a real-time notification to a user
         """
-        notification_message = {
-            "type": "notification",
-            "notification_type": notification_type.value,
-            "title": title,
-            "message": message,
-            "data": data or {},
-            "timestamp": asyncio.get_event_loop().time()
-        }
-        
-        if notification_id:
-            notification_message["notification_id"] = str(notification_id)
+        notification_message = self._notification_message(
+            notification_type, title, message, data, notification_id
+        )
         
         await self.send_personal_message(user_id, notification_message)
         logger.info(f"Sent real-time notification to user {user_id}: {notification_type}")
@@ -130,59 +175,231 @@ class ConnectionManager:
         data: Optional[Dict[str, Any]] = None
     ):
         """
-        Send notifications to multiple users
+        Send notifications to multiple users (one publish per shard)
         """
-        tasks = []
+        # Encoded once and shared by every socket and shard
+        text = json.dumps(self._notification_message(notification_type, title, message, data))
         
+        shards: Dict[str, List[UUID]] = defaultdict(list)
         for user_id in user_ids:
-            task = self.send_notification(
-                user_id=user_id,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                data=data
-            )
-            tasks.append(task)
-        
-        # Send all notifications concurrently
-        await asyncio.gather(*tasks, return_exceptions=True)
+            self._enqueue(user_id, text)
+            shards[self.shard_channel(user_id)].append(user_id)
+        
+        # Publish to all shards concurrently
+        await asyncio.gather(
+            *[self._publish(channel, text, users) for channel, users in shards.items()],
+            return_exceptions=True
+        )
         logger.info(f"Sent bulk notifications to {len(user_ids)} users: {notification_type}")
     
     async def broadcast_system_message(self, message: Dict[str, Any]):
         """
-        Broadcast a message to all connected users
+        Broadcast a message to all connected users, on every process
         """
-        if not self.active_connections:
-            logger.debug("No active connections for broadcast")
-            return
-        
-        tasks = []
-        
-        for user_id in self.active_connections.keys():
-            task = self.send_personal_message(user_id, message)
-            tasks.append(task)
-        
-        await asyncio.gather(*tasks, return_exceptions=True)
-        logger.info(f"Broadcasted system message to {len(self.active_connections)} users")
+        text = json.dumps(message)
+        self._enqueue_all(text)
+        await self._publish(self.broadcast_channel, text)
+        logger.info(f"Broadcasted system message to {len(self.active_connections)} local users and the fleet")
     
     def get_connected_users(self) -> List[UUID]:
         """
-        Get list of currently connected user IDs
+        Get list of user IDs connected to this process
         """
         return list(self.active_connections.keys())
     
     def get_connection_count(self) -> int:
         """
-        Get total number of active connections
+        Get total number of active connections on this process
         """
         return sum(len(connections) for connections in self.active_connections.values())
     
     def is_user_connected(self, user_id: UUID) -> bool:
         """
-        Check if a user has any active connections
+        Check if a user has any active connections on this process
         """
         return user_id in self.active_connections and len(self.active_connections[user_id]) > 0
+    
+    async def is_user_online(self, user_id: UUID) -> bool:
+        """
+        Check if a user has an active connection on any process
+        """
+        return self.is_user_connected(user_id) or await self.presence.is_online(user_id)
+    
+    async def get_cluster_stats(self) -> Dict[str, Any]:
+        """
+        Connected users and connection counts across the fleet
+        
+        Falls back to this process's own connections when Redis is unavailable.
+        """
+        nodes = await self.presence.snapshot() or {}
+        # This process's own counts are authoritative (its hash may lag a heartbeat)
+        nodes[self.node_id] = {
+            str(user_id): len(connections) for user_id, connections in self.active_connections.items()
+        }
+        
+        connected_users: Set[str] = set()
+        for node_users in nodes.values():
+            connected_users.update(node_users)
+        
+        return {
+            "connected_users": len(connected_users),
+            "total_connections": sum(sum(node_users.values()) for node_users in nodes.values()),
+            "nodes": len(nodes),
+            "connected_user_ids": sorted(connected_users)
+        }
+    
+    def get_delivery_stats(self) -> Dict[str, int]:
+        """
+        Send queue depth and delivery counters of this process
+        """
+        depths = [writer.depth for writer in self.writers.values()]
+        return {
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            **self.delivery_stats.snapshot()
+        }
+    
+    @staticmethod
+    def _notification_message(
+        notification_type: NotificationType,
+        title: str,
+        message: str,
+        data: Optional[Dict[str, Any]] = None,
+        notification_id: Optional[UUID] = None
+    ) -> Dict[str, Any]:
+        notification_message = {
+            "type": "notification",
+            "notification_type": notification_type.value,
+            "title": title,
+            "message": message,
+            "data": data or {},
+            "timestamp": asyncio.get_event_loop().time()
+        }
+        
+        if notification_id:
+            notification_message["notification_id"] = str(notification_id)
+        return notification_message
+    
+    def _enqueue(self, user_id: UUID, text: str):
+        """
+        Queue an encoded message on this process's connections for a user
+        """
+        for connection in self.active_connections.get(user_id, ()):
+            self.writers[connection].offer(text)
+    
+    def _enqueue_all(self, text: str, user_ids: Optional[List[UUID]] = None):
+        for user_id in (self.active_connections.keys() if user_ids is None else user_ids):
+            self._enqueue(user_id, text)
+    
+    async def _publish(self, channel: str, text: str, user_ids: Optional[List[UUID]] = None):
+        """
+        Publish an encoded message for the other processes (to every user when user_ids is None)
+        """
+        payload = {"origin": self.node_id, "text": text}
+        if user_ids is not None:
+            payload["users"] = [str(user_id) for user_id in user_ids]
+        
+        try:
+            redis_client = await get_redis()
+            await redis_client.publish(channel, json.dumps(payload))
+        except Exception as e:
+            logger.warning(f"Failed to publish WebSocket message to {channel}: {e}")
+    
+    def handle_published(self, data: Union[str, bytes]):
+        """
+        Deliver a message published by another process to the local sockets it targets
+        """
+        try:
+            payload = json.loads(data)
+        except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
+            logger.warning("Ignoring malformed WebSocket pub/sub message")
+            return
+        
+        # Already delivered locally by the sender
+        if payload.get("origin") == self.node_id:
+            return
+        
+        users = payload.get("users")
+        self._enqueue_all(payload.get("text", ""), None if users is None else [UUID(user_id) for user_id in users])
+    
+    async def _add_shard_user(self, user_id: UUID):
+        channel = self.shard_channel(user_id)
+        self.shard_users[channel] = self.shard_users.get(channel, 0) + 1
+        if self.shard_users[channel] == 1:
+            await self._set_subscription(channel, subscribe=True)
+    
+    async def _remove_shard_user(self, user_id: UUID):
+        channel = self.shard_channel(user_id)
+        self.shard_users[channel] = self.shard_users.get(channel, 1) - 1
+        if self.shard_users[channel] <= 0:
+            del self.shard_users[channel]
+            await self._set_subscription(channel, subscribe=False)
+    
+    async def _set_subscription(self, channel: str, subscribe: bool):
+        """
+        Follow a shard's first local user or drop its last (the listener resubscribes after reconnecting)
+        """
+        if self.pubsub is None:
+            return
+        try:
+            if subscribe:
+                await self.pubsub.subscribe(channel)
+            else:
+                await self.pubsub.unsubscribe(channel)
+        except Exception as e:
+            logger.warning(f"Failed to update subscription to {channel}: {e}")
+    
+    async def _listen(self):
+        """
+        Receive the broadcast channel and local users' shards until cancelled
+        """
+        retry_delay = 1
+        while True:
+            try:
+                redis_client = await get_redis()
+                self.pubsub = pubsub = redis_client.pubsub()
+                await pubsub.subscribe(self.broadcast_channel, *self.shard_users)
+                retry_delay = 1
+                
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.handle_published(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket pub/sub listener error, reconnecting: {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 30)
+            finally:
+                pubsub, self.pubsub = self.pubsub, None
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+    
+    async def _heartbeat(self):
+        """
+        Refresh this process's presence until cancelled
+        """
+        while True:
+            await self.presence.heartbeat({
+                user_id: len(connections) for user_id, connections in self.active_connections.items()
+            })
+            await asyncio.sleep(settings.WEBSOCKET_PRESENCE_HEARTBEAT)
+    
+    async def _reap_stalled_writers(self):
+        """
+        Close sockets whose current send has exceeded the send timeout, until cancelled
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_SEND_TIMEOUT / 2)
+            now = loop.time()
+            for writer in list(self.writers.values()):
+                writer.close_if_stalled(now)
 
 
 # Global connection manager instance
-connection_manager = ConnectionManager()
\ No newline at end of file
+connection_manager = ConnectionManager()
@@ -0,0 +1,132 @@
+"""
+Fleet-wide presence registry for WebSocket connections
+"""
+import logging
+import time
+from typing import Dict, List, Optional, Union
+from uuid import UUID
+
+from app.cache.redis import get_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _text(value: Union[str, bytes]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class PresenceRegistry:
+    """
+    Tracks which users have sockets open on which web process
+    
+    Each process keeps a hash of its connected users (user id -> open sockets)
+    and heartbeats its node id into a sorted set scored by time. A process
+    that stops heartbeating drops out of every read after
+    WEBSOCKET_PRESENCE_TTL seconds, and its hash expires with it.
+    """
+    
+    def __init__(self, node_id: str):
+        self.node_id = node_id
+        self.nodes_key = f"{settings.WEBSOCKET_CHANNEL_PREFIX}:nodes"
+        self.node_key = self.presence_key(node_id)
+    
+    @staticmethod
+    def presence_key(node_id: str) -> str:
+        """Key of a process's connected-users hash"""
+        return f"{settings.WEBSOCKET_CHANNEL_PREFIX}:presence:{node_id}"
+    
+    async def set_user(self, user_id: UUID, connections: int) -> None:
+        """
+        Record how many sockets this process holds for a user (0 removes them)
+        """
+        try:
+            redis_client = await get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                if connections:
+                    pipe.hset(self.node_key, str(user_id), connections)
+                    pipe.expire(self.node_key, settings.WEBSOCKET_PRESENCE_TTL)
+                    pipe.zadd(self.nodes_key, {self.node_id: time.time()})
+                else:
+                    pipe.hdel(self.node_key, str(user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to update presence of user {user_id}: {e}")
+    
+    async def heartbeat(self, connections: Dict[UUID, int]) -> None:
+        """
+        Keep this process alive in the registry and rewrite its users from local state
+        
+        The rewrite repairs any update lost while Redis was unavailable.
+        """
+        now = time.time()
+        try:
+            redis_client = await get_redis()
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.zadd(self.nodes_key, {self.node_id: now})
+                pipe.zremrangebyscore(self.nodes_key, "-inf", now - settings.WEBSOCKET_PRESENCE_TTL)
+                pipe.delete(self.node_key)
+                if connections:
+                    pipe.hset(self.node_key, mapping={str(user_id): count for user_id, count in connections.items()})
+                    pipe.expire(self.node_key, settings.WEBSOCKET_PRESENCE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"WebSocket presence heartbeat failed: {e}")
+    
+    async def remove(self) -> None:
+        """
+        Drop this process from the registry (on shutdown)
+        """
+        try:
+            redis_client = await get_redis()
+            async with redis_client.pipeline(transaction=True) as pipe:
+                pipe.zrem(self.nodes_key, self.node_id)
+                pipe.delete(self.node_key)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to remove WebSocket presence: {e}")
+    
+    async def live_nodes(self) -> List[str]:
+        """
+        Node ids that heartbeated within the presence TTL
+        """
+        redis_client = await get_redis()
+        nodes = await redis_client.zrevrangebyscore(
+            self.nodes_key, "+inf", time.time() - settings.WEBSOCKET_PRESENCE_TTL
+        )
+        return [_text(node) for node in nodes]
+    
+    async def is_online(self, user_id: UUID) -> bool:
+        """
+        Whether any live process holds a socket for the user
+        """
+        try:
+            nodes = await self.live_nodes()
+            redis_client = await get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for node_id in nodes:
+                    pipe.hexists(self.presence_key(node_id), str(user_id))
+                return any(await pipe.execute())
+        except Exception as e:
+            logger.warning(f"Failed to read presence of user {user_id}: {e}")
+            return False
+    
+    async def snapshot(self) -> Optional[Dict[str, Dict[str, int]]]:
+        """
+        Connected users of every live process ({node id: {user id: sockets}}), None if unavailable
+        """
+        try:
+            nodes = await self.live_nodes()
+            redis_client = await get_redis()
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for node_id in nodes:
+                    pipe.hgetall(self.presence_key(node_id))
+                users = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to read WebSocket presence: {e}")
+            return None
+        
+        return {
+            node_id: {_text(user_id): int(count) for user_id, count in node_users.items()}
+            for node_id, node_users in zip(nodes, users)
+        }
@@ -0,0 +1,155 @@
+"""
+Per-connection outbound queues for WebSocket delivery
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# What a full queue does with the next message
+DROP_OLDEST = "drop_oldest"
+DISCONNECT = "disconnect"
+
+
+class DeliveryStats:
+    """
+    Delivery counters shared by the writers of a process
+    """
+    
+    def __init__(self):
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.send_failures = 0
+    
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_failures": self.send_failures
+        }
+
+
+class ConnectionWriter:
+    """
+    Sends one socket's messages from a bounded queue in its own task
+    
+    Producers enqueue already-encoded text without awaiting the socket, so a
+    slow client only ever delays itself. When its queue is full the
+    overflow policy either drops the oldest queued message or closes the
+    socket. A send still pending after the timeout closes it too (checked
+    by the manager's reaper rather than a timer per message).
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        on_close: Callable[[WebSocket], Awaitable[None]],
+        stats: DeliveryStats,
+        max_queue: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        send_timeout: Optional[float] = None
+    ):
+        self.websocket = websocket
+        self.on_close = on_close
+        self.stats = stats
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue or settings.WEBSOCKET_SEND_QUEUE_SIZE)
+        self.overflow_policy = overflow_policy or settings.WEBSOCKET_OVERFLOW_POLICY
+        self.send_timeout = send_timeout or settings.WEBSOCKET_SEND_TIMEOUT
+        self.closed = False
+        # When the pending send started (None while idle)
+        self.sending_since: Optional[float] = None
+        self.closing: Optional[asyncio.Task] = None
+        self.task = asyncio.create_task(self._run())
+    
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent"""
+        return self.queue.qsize()
+    
+    def offer(self, text: str) -> bool:
+        """
+        Queue an encoded message; False if it was dropped or the socket is closing
+        """
+        if self.closed:
+            return False
+        
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            pass
+        
+        if self.overflow_policy == DISCONNECT:
+            logger.warning("Closing slow WebSocket consumer (send queue full)")
+            self.stats.slow_disconnects += 1
+            self.stats.dropped += 1
+            self._close(status.WS_1013_TRY_AGAIN_LATER)
+            return False
+        
+        # Keep the newest messages (unread counts and the like supersede older ones)
+        self.queue.get_nowait()
+        self.queue.put_nowait(text)
+        self.stats.dropped += 1
+        return True
+    
+    def stop(self):
+        """
+        Stop sending (the socket is already going away)
+        """
+        self.closed = True
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+    
+    def close_if_stalled(self, now: float) -> bool:
+        """
+        Close the socket if its pending send has exceeded the send timeout
+        """
+        if self.closed or self.sending_since is None or now - self.sending_since < self.send_timeout:
+            return False
+        logger.warning("Closing slow WebSocket consumer (send timed out)")
+        self.stats.slow_disconnects += 1
+        self._close(status.WS_1013_TRY_AGAIN_LATER)
+        return True
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                text = await self.queue.get()
+                self.sending_since = loop.time()
+                await self.websocket.send_text(text)
+                self.sending_since = None
+                self.stats.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send message to connection: {e}")
+            self.stats.send_failures += 1
+            self._close(None)
+    
+    def _close(self, code: Optional[int]):
+        """
+        Stop this writer, close the socket and let the manager forget it
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.stats.dropped += self.queue.qsize()
+        if self.task is not asyncio.current_task():
+            self.task.cancel()
+        self.closing = asyncio.create_task(self._finish(code))
+    
+    async def _finish(self, code: Optional[int]):
+        if code is not None:
+            try:
+                await self.websocket.close(code=code)
+            except Exception:
+                pass
+        await self.on_close(self.websocket)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Backfill the HyperLogLog unique counters from user_activities
+
+Run once after deploying the counters, so week and month uniques (admin
+dashboard, content report) cover the days before they existed. Safe to re-run.
+"""
+import argparse
+import asyncio
+from datetime import date, timedelta
+from app.core.config import settings
+from app.db.database import init_db, get_db
+from app.services.unique_counters import backfill_unique_counters
+from app.cache.redis import init_redis, close_redis, get_redis
+
+async def backfill(days):
+    """Load the counters for the last `days` days, today included"""
+    print("Backfilling unique counters...")
+    
+    # Initialize database and cache
+    await init_db()
+    await init_redis()
+    
+    end_date = date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    async for session in get_db():
+        try:
+            added = await backfill_unique_counters(session, await get_redis(), start_date, end_date)
+            
+            print(f"✅ Backfilled {added} daily activities from {start_date} to {end_date}")
+            return added
+        
+        except Exception as e:
+            print(f"❌ Error backfilling unique counters: {e}")
+            raise
+        finally:
+            await close_redis()
+            break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the unique counters from user_activities")
+    parser.add_argument("--days", type=int, default=settings.ANALYTICS_HLL_RETENTION_DAYS,
+                        help="Days to backfill, ending today (default: the counters' retention)")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.days))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Measure the request middleware stack's throughput on a trivial endpoint
+
+Requests are driven straight through the ASGI app in-process (no server or
+HTTP client), so the figures show what the middleware itself costs. Compare
+"bare" (no middleware) with "stack" (setup_middleware, as in create_app).
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from uuid import uuid4
+
+from fastapi import FastAPI
+
+from app.auth.jwt_service import jwt_service
+from app.main import setup_middleware
+from app.models.enums import UserRole
+
+
+def build_app(with_middleware: bool) -> FastAPI:
+    """A FastAPI app with one trivial endpoint, optionally behind the middleware stack"""
+    app = FastAPI()
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"pong": True}
+
+    if with_middleware:
+        setup_middleware(app)
+    return app
+
+
+async def run_requests(app: FastAPI, total: int, concurrency: int, token: str) -> float:
+    """Send total GET requests, concurrency at a time; returns requests per second"""
+    headers = [
+        (b"host", b"localhost"),
+        (b"accept", b"application/json"),
+        (b"authorization", f"Bearer {token}".encode()),
+    ]
+
+    async def request() -> None:
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": "/api/v1/ping", "raw_path": b"/api/v1/ping",
+            "query_string": b"page=1", "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 50000), "server": ("localhost", 8000),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                assert message["status"] == 200, message
+
+        await app(scope, receive, send)
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            await request()
+
+    # Warm up (route compilation, token cache)
+    await worker(100)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(total // concurrency) for _ in range(concurrency)])
+    return (total // concurrency) * concurrency / (time.perf_counter() - started)
+
+
+async def main(total: int, concurrency: int) -> None:
+    token = jwt_service.create_access_token(uuid4(), "bench@example.com", UserRole.USER)
+    # Keep per-request logs (and any stray prints) out of the measurement
+    logging.disable(logging.INFO)
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, with_middleware in (("bare", False), ("stack", True)):
+            results[name] = await run_requests(build_app(with_middleware), total, concurrency, token)
+
+    for name, rps in results.items():
+        print(f"{name:>6}: {rps:8.0f} requests/s")
+    print(f"middleware overhead: {1e6 / results['stack'] - 1e6 / results['bare']:.0f} us/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the request middleware stack")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests per run")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
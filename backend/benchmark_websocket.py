@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Load-test WebSocket fan-out with thousands of simulated sockets
+
+Sockets are in-process stand-ins whose sends take a configurable time, a
+few of them much longer (slow consumers). Each broadcast is timed until
+every fast socket has received it:
+
+- "direct": await each socket's send in turn and encode per socket (how
+  delivery worked before per-connection writers)
+- "queued": ConnectionManager.broadcast_system_message, with one writer
+  task and bounded queue per socket
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from app.cache.mock_redis import init_mock_redis
+from app.websocket.manager import ConnectionManager
+
+
+class Delivered:
+    """Counts frames received by the fast sockets and wakes the waiter at a target"""
+
+    def __init__(self):
+        self.count = 0
+        self.target = 0
+        self.reached = asyncio.Event()
+
+    def add(self):
+        self.count += 1
+        if self.count >= self.target:
+            self.reached.set()
+
+    async def wait_for(self, target: int):
+        self.target = target
+        self.reached.clear()
+        if self.count < target:
+            await self.reached.wait()
+
+
+class SimulatedSocket:
+    """Accepts every frame after a fixed delay"""
+
+    def __init__(self, delay: float, delivered: Delivered = None):
+        self.delay = delay
+        self.delivered = delivered
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.delivered is not None:
+            self.delivered.add()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def build_sockets(count: int, slow: int, delay: float, slow_delay: float, delivered: Delivered) -> List[SimulatedSocket]:
+    return [
+        SimulatedSocket(slow_delay) if i < slow else SimulatedSocket(delay, delivered)
+        for i in range(count)
+    ]
+
+
+async def run_direct(sockets, delivered: Delivered, messages: int) -> Dict[str, Any]:
+    """Await every send in turn, encoding per socket"""
+    started = time.perf_counter()
+    for i in range(messages):
+        message = {"type": "system_announcement", "sequence": i}
+        for socket in sockets:
+            await socket.send_text(json.dumps(message))
+    return {"seconds": (time.perf_counter() - started) / messages}
+
+
+async def run_queued(sockets, delivered: Delivered, messages: int) -> Dict[str, Any]:
+    """Broadcast through the connection manager's per-socket writers"""
+    fast = sum(socket.delivered is not None for socket in sockets)
+    manager = ConnectionManager(node_id="benchmark")
+    for socket in sockets:
+        await manager.connect(socket, uuid4())
+    await delivered.wait_for(fast)  # connection_established
+
+    max_depth = 0
+    started = time.perf_counter()
+    for i in range(messages):
+        await manager.broadcast_system_message({"type": "system_announcement", "sequence": i})
+        max_depth = max(max_depth, manager.get_delivery_stats()["max_queue_depth"])
+        await delivered.wait_for(fast * (i + 2))
+    result = {"seconds": (time.perf_counter() - started) / messages}
+
+    result.update(manager.get_delivery_stats(), max_queue_depth=max_depth)
+    for socket in list(manager.writers):
+        await manager.disconnect(socket)
+    return result
+
+
+async def main(args) -> None:
+    # Keep per-message logs out of the measurement
+    logging.disable(logging.WARNING)
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        await init_mock_redis()
+        for name, run in (("direct", run_direct), ("queued", run_queued)):
+            delivered = Delivered()
+            sockets = build_sockets(args.sockets, args.slow, args.delay, args.slow_delay, delivered)
+            results[name] = await run(sockets, delivered, args.messages)
+
+    for name, result in results.items():
+        print(f"{name:>6}: {result['seconds'] * 1000:9.1f} ms per broadcast to {args.sockets} sockets ({args.slow} slow)")
+    queued = results["queued"]
+    print(
+        f"queued: max queue depth {queued['max_queue_depth']}, {queued['queued_messages']} still queued, "
+        f"{queued['dropped']} dropped, {queued['slow_disconnects']} slow consumers closed"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test WebSocket broadcast fan-out")
+    parser.add_argument("--sockets", type=int, default=10000, help="Simulated sockets")
+    parser.add_argument("--slow", type=int, default=10, help="Sockets that are slow consumers")
+    parser.add_argument("--messages", type=int, default=5, help="Broadcasts to time")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds per send on a normal socket")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="Seconds per send on a slow socket")
+    asyncio.run(main(parser.parse_args()))
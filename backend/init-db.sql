@@ -182,6 +182,35 @@ CREATE TABLE IF NOT EXISTS notifications (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Materialized per-movie review statistics (approved reviews only)
+CREATE TABLE IF NOT EXISTS movie_stats (
+    movie_id UUID PRIMARY KEY REFERENCES movies(id) ON DELETE CASCADE,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    rating_sum INTEGER NOT NULL DEFAULT 0,
+    average_rating DOUBLE PRECISION NOT NULL DEFAULT 0,
+    cultural_authenticity_sum INTEGER NOT NULL DEFAULT 0,
+    cultural_authenticity_count INTEGER NOT NULL DEFAULT 0,
+    production_quality_sum INTEGER NOT NULL DEFAULT 0,
+    production_quality_count INTEGER NOT NULL DEFAULT 0,
+    story_sum INTEGER NOT NULL DEFAULT 0,
+    story_count INTEGER NOT NULL DEFAULT 0,
+    acting_sum INTEGER NOT NULL DEFAULT 0,
+    acting_count INTEGER NOT NULL DEFAULT 0,
+    cinematography_sum INTEGER NOT NULL DEFAULT 0,
+    cinematography_count INTEGER NOT NULL DEFAULT 0,
+    rating_1 INTEGER NOT NULL DEFAULT 0,
+    rating_2 INTEGER NOT NULL DEFAULT 0,
+    rating_3 INTEGER NOT NULL DEFAULT 0,
+    rating_4 INTEGER NOT NULL DEFAULT 0,
+    rating_5 INTEGER NOT NULL DEFAULT 0,
+    rating_6 INTEGER NOT NULL DEFAULT 0,
+    rating_7 INTEGER NOT NULL DEFAULT 0,
+    rating_8 INTEGER NOT NULL DEFAULT 0,
+    rating_9 INTEGER NOT NULL DEFAULT 0,
+    rating_10 INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
@@ -200,6 +229,8 @@ CREATE INDEX IF NOT EXISTS idx_user_favorites_user_id ON user_favorites(user_id)
 CREATE INDEX IF NOT EXISTS idx_review_votes_review_id ON review_votes(review_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_user_id ON notifications(user_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_is_read ON notifications(is_read);
+CREATE INDEX IF NOT EXISTS idx_movie_stats_review_count ON movie_stats(review_count);
+CREATE INDEX IF NOT EXISTS idx_movie_stats_average_rating ON movie_stats(average_rating);
 
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -236,37 +267,15 @@ CREATE INDEX IF NOT EXISTS idx_movie_search_vector ON movie_search_index USING G
 CREATE INDEX IF NOT EXISTS idx_movie_title_vector ON movie_search_index USING GIN(title_vector);
 CREATE INDEX IF NOT EXISTS idx_movie_content_vector ON movie_search_index USING GIN(content_vector);
 
--- Function to update search vectors
-CREATE OR REPLACE FUNCTION update_movie_search_vector()
-RETURNS TRIGGER AS $$
-BEGIN
-    INSERT INTO movie_search_index (movie_id, search_vector, title_vector, content_vector)
-    VALUES (
-        NEW.id,
-        to_tsvector('english', 
-            COALESCE(NEW.title, '') || ' ' ||
-            COALESCE(NEW.local_title, '') || ' ' ||
-            COALESCE(NEW.director, '') || ' ' ||
-            COALESCE(NEW.producer, '') || ' ' ||
-            COALESCE(NEW.production_company, '') || ' ' ||
-            COALESCE(NEW.production_state, '')
-        ),
-        to_tsvector('english', COALESCE(NEW.title, '') || ' ' || COALESCE(NEW.local_title, '')),
-        to_tsvector('english', COALESCE(NEW.plot_summary, ''))
-    )
-    ON CONFLICT (movie_id) DO UPDATE SET
-        search_vector = EXCLUDED.search_vector,
-        title_vector = EXCLUDED.title_vector,
-        content_vector = EXCLUDED.content_vector,
-        updated_at = CURRENT_TIMESTAMP;
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
+-- Trigram indexes for typo-tolerant title and name search
+CREATE INDEX IF NOT EXISTS idx_movies_title_trgm ON movies USING GIN(title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_movies_local_title_trgm ON movies USING GIN(local_title gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_movies_director_trgm ON movies USING GIN(director gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_movie_cast_actor_name_trgm ON movie_cast USING GIN(actor_name gin_trgm_ops);
 
--- Trigger to automatically update search vectors
-CREATE TRIGGER trigger_update_movie_search
-    AFTER INSERT OR UPDATE ON movies
-    FOR EACH ROW EXECUTE FUNCTION update_movie_search_vector();
+-- Search documents are written by the application (app/services/search_backends.py)
+-- because they include cast names and genres with per-field weights; run
+-- rebuild_search_index.py after bulk imports that bypass MovieService.
 
 -- Function to update search index updated_at timestamp
 CREATE TRIGGER update_movie_search_index_updated_at BEFORE UPDATE ON movie_search_index
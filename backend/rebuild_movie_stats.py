@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized movie_stats table from reviews
+
+Run once after deploying the movie_stats table, or to repair drift.
+"""
+import argparse
+import asyncio
+from uuid import UUID
+from app.db.database import init_db, get_db
+from app.services.movie_stats_service import MovieStatsService
+from app.cache.redis import init_redis, close_redis
+
+async def rebuild_movie_stats(movie_ids=None):
+    """Recompute movie statistics for the given movies (all movies by default)"""
+    print("Rebuilding movie statistics...")
+    
+    # Initialize database and cache
+    await init_db()
+    await init_redis()
+    
+    async for session in get_db():
+        try:
+            stats_service = MovieStatsService(session)
+            # Rebuilds the table and invalidates the cached stats it replaced
+            rebuilt = await stats_service.repair_stats(movie_ids)
+            
+            print(f"✅ Rebuilt statistics for {rebuilt} movies")
+            return rebuilt
+            
+        except Exception as e:
+            print(f"❌ Error rebuilding movie statistics: {e}")
+            await session.rollback()
+            raise
+        finally:
+            await close_redis()
+            break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the movie_stats table from reviews")
+    parser.add_argument("--movie-id", action="append", type=UUID, dest="movie_ids",
+                        help="Only rebuild this movie (may be repeated)")
+    args = parser.parse_args()
+    asyncio.run(rebuild_movie_stats(args.movie_ids))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Rebuild the movie search index (movie_search_index, plus movie_search_fts on SQLite)
+
+Run once after deploying full-text search, after bulk imports that bypass
+MovieService, or to repair drift.
+"""
+import argparse
+import asyncio
+from uuid import UUID
+from app.db.database import init_db, get_db
+from app.services.search_backends import get_search_backend, rebuild_search_index
+from app.cache.redis import init_redis, close_redis, get_search_cache_service
+
+async def rebuild(movie_ids=None):
+    """Re-index the given movies (all movies by default)"""
+    print("Rebuilding movie search index...")
+    
+    # Initialize database and cache
+    await init_db()
+    await init_redis()
+    
+    async for session in get_db():
+        try:
+            backend = get_search_backend(session)
+            indexed = await rebuild_search_index(session, movie_ids)
+            await session.commit()
+            
+            search_cache = await get_search_cache_service()
+            await search_cache.invalidate_search_cache()
+            
+            print(f"✅ Indexed {indexed} movies with the {backend.name} search backend")
+            return indexed
+            
+        except Exception as e:
+            print(f"❌ Error rebuilding search index: {e}")
+            await session.rollback()
+            raise
+        finally:
+            await close_redis()
+            break
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the movie full-text search index")
+    parser.add_argument("--movie-id", action="append", type=UUID, dest="movie_ids",
+                        help="Only re-index this movie (may be repeated)")
+    args = parser.parse_args()
+    asyncio.run(rebuild(args.movie_ids))
@@ -142,4 +142,15 @@ async def admin_token(test_db_session: AsyncSession) -> str:
     # Generate JWT token
     jwt_service = JWTService()
     token = jwt_service.create_access_token(admin_user.id, admin_user.email, admin_user.role)
-    return token
\ No newline at end of file
+    return token
+
+@pytest_asyncio.fixture
+async def mock_redis():
+    """Initialize the in-process mock Redis used by the cache services"""
+    from app.cache import mock_redis as mock_redis_module
+    
+    await mock_redis_module.init_mock_redis()
+    
+    yield mock_redis_module.mock_redis_client
+    
+    await mock_redis_module.close_mock_redis()
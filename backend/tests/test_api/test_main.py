@@ -2,7 +2,12 @@
 Tests for main FastAPI application
 """
 import pytest
-from httpx import AsyncClient
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.middleware import analytics_middleware
+from app.middleware.analytics_middleware import AnalyticsMiddleware
+from app.services.latency_sketch import LatencySketchRecorder
 
 
 @pytest.mark.asyncio
@@ -105,4 +110,54 @@ async def test_exception_handlers():
     # Check exception handlers are registered
     assert LemonPieException in app.exception_handlers
     assert HTTPException in app.exception_handlers
-    assert Exception in app.exception_handlers
\ No newline at end of file
+    assert Exception in app.exception_handlers
+
+@pytest.mark.asyncio
+async def test_middleware_stack_responses(async_client: AsyncClient):
+    """Test the middleware stack's headers and early error responses"""
+    response = await async_client.get("/health")
+    
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert response.headers["x-frame-options"] == "DENY"
+    assert "server" not in response.headers
+    
+    # Role-based access answers before the endpoint runs
+    response = await async_client.post("/api/v1/reviews", json={})
+    
+    assert response.status_code == 401
+    assert response.json()["error"] == "http_error"
+    assert response.headers["x-frame-options"] == "DENY"
+    
+    # Suspicious query parameters are rejected
+    response = await async_client.get("/api/v1/movies", params={"search": "1 OR 1=1"})
+    
+    assert response.status_code == 400
+    assert "search" in response.json()["message"]
+
+
+@pytest.mark.asyncio
+async def test_analytics_middleware_records_failed_requests(monkeypatch):
+    """An endpoint that raises is recorded as a 5xx"""
+    recorder = LatencySketchRecorder()
+    monkeypatch.setattr(analytics_middleware, "get_latency_recorder", lambda: recorder)
+    monkeypatch.setattr(analytics_middleware, "get_analytics_queue", lambda: None)
+    
+    app = FastAPI()
+    app.add_middleware(AnalyticsMiddleware)
+    
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+    
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+    
+    transport = ASGITransport(app=app, raise_app_exceptions=False)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/ok")).status_code == 200
+        assert (await client.get("/boom")).status_code == 500
+    
+    assert {(endpoint, status) for _, endpoint, status in recorder.sketches} == {
+        ("GET /ok", "2xx"), ("GET /boom", "5xx")
+    }
@@ -12,6 +12,8 @@ from app.models.movie import Movie, ContentType
 from app.models.relationships import MovieGenre, MovieLanguage, MovieCast
 from app.models.review import Review, ModerationStatus
 from app.models.enums import CastRole
+from app.schemas.movie import MovieCreate
+from app.services.movie_service import MovieService
 
 
 @pytest.mark.asyncio
@@ -850,6 +852,37 @@ async def test_search_pagination(async_client: AsyncClient, test_db_session: Asy
     assert len(data) == 5
 
 
+@pytest.mark.asyncio
+async def test_search_cursor_pagination(async_client: AsyncClient, test_db_session: AsyncSession, mock_redis):
+    """Search pages continue from X-Next-Cursor instead of restarting"""
+    # Created through the service so they are in the search index
+    movie_service = MovieService(test_db_session)
+    for i in range(5):
+        await movie_service.create_movie(MovieCreate(title=f"Nollywood Movie {i}", release_date=date(2023, 1, 1)))
+    
+    response = await async_client.get("/api/v1/movies/search?q=Nollywood&limit=2")
+    assert response.status_code == 200
+    seen = [movie["id"] for movie in response.json()]
+    cursor = response.headers["x-next-cursor"]
+    
+    while cursor:
+        response = await async_client.get(f"/api/v1/movies/search?q=Nollywood&limit=2&after={cursor}")
+        assert response.status_code == 200
+        page = [movie["id"] for movie in response.json()]
+        assert page and not set(page) & set(seen)
+        seen += page
+        cursor = response.headers.get("x-next-cursor")
+    
+    assert len(seen) == 5
+    
+    # A cursor only continues the search that issued it
+    first = await async_client.get("/api/v1/movies/search?q=Nollywood&limit=2")
+    response = await async_client.get(
+        f"/api/v1/movies/search?q=Movie&limit=2&after={first.headers['x-next-cursor']}"
+    )
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_search_empty_query(async_client: AsyncClient):
     """Test search with empty query"""
@@ -0,0 +1,102 @@
+"""
+Tests for the authenticated principal cache
+"""
+import time
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.auth.dependencies import _active_principal
+from app.auth.jwt_service import jwt_service
+from app.auth.principal import TokenCache, decode_token, get_principal, token_cache
+from app.models.user import User, UserRole
+from app.services.admin_service import AdminService
+
+
+@pytest.fixture
+def user_queries(test_db_engine):
+    """SQL statements reading the users table while the test runs"""
+    executed = []
+    record = lambda *args: executed.append(args[2]) if "FROM users" in args[2] else None
+    event.listen(test_db_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(test_db_engine.sync_engine, "before_cursor_execute", record)
+
+
+async def _create_user(db, role=UserRole.USER) -> User:
+    user = User(email=f"{role.value.lower()}@example.com", password_hash="hashed", name="Chioma", role=role)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+def test_verified_tokens_are_reused(monkeypatch):
+    """A token's signature is checked once; the LRU is bounded and honours expiry"""
+    token_cache.clear()
+    calls = []
+    verify_token = jwt_service.verify_token
+    monkeypatch.setattr(jwt_service, "verify_token", lambda token: calls.append(token) or verify_token(token))
+
+    user_id = uuid4()
+    token = jwt_service.create_access_token(user_id, "a@example.com", UserRole.USER)
+    assert decode_token(token)["sub"] == str(user_id)
+    assert decode_token(token)["sub"] == str(user_id)
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException):
+        decode_token("not-a-token")
+    with pytest.raises(HTTPException):
+        decode_token("not-a-token")
+    assert len(calls) == 3
+
+    cache = TokenCache(max_entries=2)
+    cache.set("a", {"sub": "1", "exp": time.time() + 60})
+    cache.set("b", {"sub": "2", "exp": time.time() + 60})
+    cache.get("a")
+    cache.set("c", {"sub": "3", "exp": time.time() + 60})
+    assert cache.get("a")["sub"] == "1"
+    assert cache.get("b") is None
+    cache.set("expired", {"sub": "4", "exp": time.time() - 1})
+    assert cache.get("expired") is None
+
+
+@pytest.mark.asyncio
+async def test_requests_skip_the_user_query(async_client, test_db_session, mock_redis, user_queries):
+    """Authenticated requests read the principal from cache after the first one"""
+    user = await _create_user(test_db_session)
+    headers = {"Authorization": f"Bearer {jwt_service.create_access_token(user.id, user.email, user.role)}"}
+
+    for _ in range(3):
+        response = await async_client.get("/api/v1/stats", headers=headers)
+        assert response.status_code == 200
+    assert len(user_queries) == 1
+
+    # Endpoints needing the full row still load it
+    response = await async_client.get("/api/v1/me", headers=headers)
+    assert response.json()["email"] == user.email
+
+
+@pytest.mark.asyncio
+async def test_admin_changes_invalidate_the_principal(test_db_session, mock_redis, user_queries):
+    """Role changes, suspension and activation apply on the user's next request"""
+    admin = await _create_user(test_db_session, UserRole.ADMIN)
+    user = await _create_user(test_db_session)
+    admin_service = AdminService(test_db_session)
+
+    assert (await get_principal(user.id, test_db_session)).role == UserRole.USER
+    await admin_service.update_user_role(user.id, UserRole.CRITIC, admin.id)
+    assert (await get_principal(user.id, test_db_session)).role == UserRole.CRITIC
+
+    await admin_service.suspend_user(user.id, "Spam", None, admin.id)
+    with pytest.raises(HTTPException) as exc_info:
+        await _active_principal(user.id, test_db_session)
+    assert exc_info.value.detail == "Inactive user"
+
+    await admin_service.activate_user(user.id, "Appealed", admin.id)
+    assert (await _active_principal(user.id, test_db_session)).is_active
+
+    user_queries.clear()
+    await get_principal(user.id, test_db_session)
+    assert user_queries == []
@@ -0,0 +1,123 @@
+"""
+Tests for the GCRA rate limiter
+"""
+import time
+
+import pytest
+from fastapi import HTTPException, Request
+
+from app.auth.rate_limiter import GCRA_SCRIPT, Rate, RateLimiter, parse_rate, rate_limit, rate_limiter
+from app.cache import mock_redis as mock_redis_module
+from app.core.config import settings
+
+
+def _request(ip: str = "203.0.113.7", path: str = "/api/v1/search") -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": path, "headers": [],
+        "query_string": b"", "client": (ip, 5000),
+    })
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable wall clock for the mock Redis script"""
+    now = [time.time()]
+    monkeypatch.setattr(mock_redis_module.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.mark.asyncio
+async def test_bursts_are_counted_exactly(mock_redis, clock):
+    """Every request of a same-instant burst counts, and capacity returns at the emission rate"""
+    limiter = RateLimiter()
+    results = [await limiter.is_allowed("rate_limit:ip:1", 5, 60) for _ in range(7)]
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False] * 2
+    assert [info["remaining"] for _, info in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[-1][1]["retry_after"] == 12
+
+    # One key, one value, whatever the limit
+    assert len(mock_redis._data) == 1
+
+    clock[0] += 12
+    assert (await limiter.is_allowed("rate_limit:ip:1", 5, 60))[0]
+    assert not (await limiter.is_allowed("rate_limit:ip:1", 5, 60))[0]
+
+
+@pytest.mark.asyncio
+async def test_several_limits_are_charged_together(mock_redis, clock):
+    """A request is charged to all of its limits, or to none when one of them is exhausted"""
+    limiter = RateLimiter()
+    user_limit = ("rate_limit:user:1", Rate(3, 60))
+    ip_limit = ("rate_limit:ip:1", Rate(10, 60))
+
+    assert all([(await limiter.hit([user_limit, ip_limit])).allowed for _ in range(3)])
+    denied = await limiter.hit([user_limit, ip_limit])
+    assert (denied.allowed, denied.limit) == (False, 3)
+
+    # The denied request used none of the IP's allowance
+    for _ in range(7):
+        assert (await limiter.hit([ip_limit])).allowed
+    assert not (await limiter.hit([ip_limit])).allowed
+
+
+@pytest.mark.asyncio
+async def test_local_leases_skip_redis(mock_redis, clock, monkeypatch):
+    """Generous limits are served from leased tokens; strict ones go to Redis every time"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_LOCAL_TOKENS", 10)
+    await mock_redis.script_load(GCRA_SCRIPT)
+    calls = []
+    evalsha = mock_redis.evalsha
+
+    async def counting_evalsha(*args):
+        calls.append(args)
+        return await evalsha(*args)
+
+    monkeypatch.setattr(mock_redis, "evalsha", counting_evalsha)
+    limiter = RateLimiter()
+
+    results = [await limiter.hit([("rate_limit:user:1", Rate(1000, 60))]) for _ in range(20)]
+    assert all(result.allowed for result in results)
+    assert [result.remaining for result in results] == list(range(999, 979, -1))
+    assert len(calls) == 2
+
+    calls.clear()
+    for _ in range(5):
+        assert (await limiter.hit([("rate_limit:ip:1", Rate(5, 60))])).allowed
+    assert not (await limiter.hit([("rate_limit:ip:1", Rate(5, 60))])).allowed
+    assert len(calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_decorator_enforces_limits(mock_redis, clock):
+    """Decorated endpoints raise 429 with rate limit headers once a limit is used up"""
+    assert parse_rate("5/minute") == Rate(5, 60)
+
+    @rate_limit(("2/minute", rate_limiter.get_ip_key), ("100/hour", rate_limiter.get_endpoint_key))
+    async def search(request: Request, q: str):
+        return q
+
+    assert await search(request=_request(), q="jollof") == "jollof"
+    assert await search(_request(), "suya") == "suya"
+    with pytest.raises(HTTPException) as exc_info:
+        await search(request=_request(), q="again")
+    assert exc_info.value.status_code == 429
+    assert exc_info.value.headers["Retry-After"] == "30"
+    assert exc_info.value.headers["X-RateLimit-Limit"] == "2"
+
+    # Other clients have their own allowance
+    assert await search(request=_request(ip="198.51.100.1"), q="puff-puff") == "puff-puff"
+
+    with pytest.raises(TypeError):
+        rate_limit(("1/second", rate_limiter.get_ip_key))(lambda q: q)
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_fails_open(mock_redis, monkeypatch):
+    """Requests are allowed when the limiter cannot reach Redis"""
+    async def unavailable(*args):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(mock_redis, "evalsha", unavailable)
+    allowed, info = await RateLimiter().is_allowed("rate_limit:ip:1", 5, 60)
+    assert allowed
+    assert info["remaining"] == 4
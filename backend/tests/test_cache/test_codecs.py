@@ -0,0 +1,200 @@
+"""
+Tests for cache value codecs
+"""
+import pytest
+import time
+from datetime import date, datetime
+from uuid import uuid4
+
+from app.cache.codecs import (
+    CacheCodec, CacheEnvelope, CodecError, available_codecs, ZLIB_FLAG, PYDANTIC_TAG
+)
+from app.cache.redis import CacheService
+from app.models.user import UserRole
+from app.schemas.movie import CastMember, MovieResponse, MovieStats
+from app.schemas.review import PaginatedReviewResponse, ReviewListResponse
+from app.schemas.user import UserPublicProfile
+
+
+def make_movie_response() -> MovieResponse:
+    """A fully populated movie detail payload"""
+    return MovieResponse(
+        id=uuid4(),
+        title="The Wedding Party",
+        local_title="Ìgbéyàwó",
+        release_date=date(2016, 9, 10),
+        runtime=110,
+        plot_summary="A lavish Lagos wedding goes hilariously wrong. " * 8,
+        director="Kemi Adetiba",
+        producer="Mo Abudu",
+        production_company="EbonyLife Films",
+        production_state="Lagos",
+        box_office_ng="453000000",
+        poster_url="https://example.com/poster.jpg",
+        trailer_url="https://example.com/trailer.mp4",
+        genres=["Comedy", "Romance"],
+        languages=["English", "Yoruba"],
+        cast=[CastMember(actor_name=f"Actor {i}", character_name=f"Character {i}") for i in range(12)],
+        stats=MovieStats(
+            average_rating=7.8,
+            review_count=240,
+            rating_distribution={i: i * 3 for i in range(1, 11)},
+            cultural_authenticity_avg=8.1
+        ),
+        created_at=datetime(2024, 1, 5, 10, 30),
+        updated_at=datetime(2024, 2, 1, 8, 0)
+    )
+
+
+def make_review_page(count: int = 20) -> PaginatedReviewResponse:
+    """A page of movie reviews as returned by the listing endpoints"""
+    movie_id = uuid4()
+    items = [
+        ReviewListResponse(
+            id=uuid4(),
+            user=UserPublicProfile(
+                id=uuid4(),
+                name=f"Reviewer {i}",
+                role=UserRole.USER,
+                is_verified=i % 2 == 0,
+                created_at=datetime(2023, 6, 1)
+            ),
+            movie_id=movie_id,
+            lemon_pie_rating=1 + i % 10,
+            review_text="Strong performances and a sharp script; the second act drags a little. " * 4,
+            spoiler_warning=False,
+            helpful_votes=i,
+            unhelpful_votes=1,
+            helpfulness_score=i - 1,
+            created_at=datetime(2024, 3, 1, 12, i),
+            updated_at=datetime(2024, 3, 1, 12, i)
+        )
+        for i in range(count)
+    ]
+    return PaginatedReviewResponse(
+        items=items, total=200, page=1, limit=count, pages=10, has_next=True, has_prev=False
+    )
+
+
+@pytest.mark.parametrize("codec_name", sorted(available_codecs()))
+def test_codec_round_trip(codec_name):
+    """Every installed codec round-trips plain values and tags its output"""
+    codec = CacheCodec(codec=codec_name, compression=None)
+    value = {"title": "Movie", "ratings": [1, 2, 3], "score": 7.5, "flagged": False, "local_title": None}
+
+    encoded = codec.encode(value)
+
+    assert encoded[0] == available_codecs()[codec_name].tag
+    assert codec.decode(encoded) == value
+
+
+def test_codec_handles_datetimes_uuids_and_models():
+    """Values with datetimes, UUIDs and nested models are stored as their JSON form"""
+    codec = CacheCodec(codec="json", compression=None)
+    movie_id = uuid4()
+
+    decoded = codec.decode(codec.encode({"id": movie_id, "at": datetime(2024, 1, 1), "stats": MovieStats()}))
+
+    assert decoded["id"] == str(movie_id)
+    assert decoded["at"] == "2024-01-01T00:00:00"
+    assert decoded["stats"]["review_count"] == 0
+
+
+def test_pydantic_models_round_trip_directly():
+    """Models are stored as JSON bytes and restored with model_validate_json"""
+    codec = CacheCodec(compression=None)
+    movie = make_movie_response()
+
+    encoded = codec.encode(movie)
+
+    assert encoded[0] == PYDANTIC_TAG
+    assert codec.decode(encoded, MovieResponse) == movie
+    # Without a model the payload is still readable as a dict
+    assert codec.decode(encoded)["title"] == movie.title
+
+
+def test_compression_above_threshold():
+    """Payloads at or above the threshold are compressed and flagged in the tag byte"""
+    codec = CacheCodec(codec="json", compression="zlib", compression_threshold=256)
+    small = {"title": "Movie"}
+    large = {"reviews": ["A solid, well-paced thriller."] * 100}
+
+    assert codec.encode(small)[0] & ZLIB_FLAG == 0
+    encoded = codec.encode(large)
+    assert encoded[0] & ZLIB_FLAG
+    assert len(encoded) < len(CacheCodec(codec="json", compression=None).encode(large))
+    assert codec.decode(encoded) == large
+
+
+def test_envelope_and_bad_payloads():
+    """Envelopes keep their expiry metadata; unknown or empty payloads are rejected"""
+    codec = CacheCodec()
+    envelope = CacheEnvelope(make_movie_response(), 1700000000.5, 0.25)
+
+    decoded = codec.decode(codec.encode(envelope), MovieResponse)
+
+    assert decoded == envelope
+    with pytest.raises(CodecError):
+        codec.decode(b"\x3fpayload")
+    with pytest.raises(CodecError):
+        codec.decode(b"")
+    with pytest.raises(CodecError):
+        CacheCodec(codec="pickle")
+
+
+@pytest.mark.asyncio
+async def test_cache_service_model_path(mock_redis):
+    """CacheService restores models stored with set() when asked for one"""
+    cache = CacheService(mock_redis, codec=CacheCodec())
+    movie = make_movie_response()
+
+    await cache.set("movie:1", movie, 60)
+
+    assert await cache.get("movie:1", model=MovieResponse) == movie
+    assert (await cache.get("movie:1"))["id"] == str(movie.id)
+
+    # Entries that no codec recognises read as misses
+    await mock_redis.set("movie:2", b"\x80\x04legacy-pickle")
+    assert await cache.get("movie:2", "default") == "default"
+
+
+def test_codec_microbenchmark():
+    """Compare payload size and encode/decode time of each codec on real payloads"""
+    payloads = {
+        "movie_response": (make_movie_response(), MovieResponse),
+        "review_page": (make_review_page(), PaginatedReviewResponse),
+    }
+    variants = [(name, compression) for name in sorted(available_codecs()) for compression in (None, "zlib")]
+    iterations = 200
+    rows = []
+
+    for payload_name, (model_instance, model) in payloads.items():
+        plain = model_instance.model_dump()
+        for codec_name, compression in variants + [("pydantic", None), ("pydantic", "zlib")]:
+            if codec_name == "pydantic":
+                codec = CacheCodec(compression=compression, compression_threshold=1024)
+                value, decode_model = model_instance, model
+            else:
+                codec = CacheCodec(codec=codec_name, compression=compression, compression_threshold=1024)
+                value, decode_model = plain, None
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                encoded = codec.encode(value)
+            encode_us = (time.perf_counter() - started) / iterations * 1e6
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                decoded = codec.decode(encoded, decode_model)
+            decode_us = (time.perf_counter() - started) / iterations * 1e6
+
+            # Every variant must restore something the response model accepts
+            assert model.model_validate(decoded) == model_instance
+            rows.append((payload_name, codec_name, compression or "-", len(encoded), encode_us, decode_us))
+
+    print("\npayload         codec     compression   bytes   encode_us   decode_us")
+    for row in rows:
+        print("%-15s %-9s %-11s %7d %11.1f %11.1f" % row)
+
+    sizes = {(payload, codec, compression): size for payload, codec, compression, size, _, _ in rows}
+    assert sizes[("review_page", "json", "zlib")] < sizes[("review_page", "json", "-")]
@@ -2,10 +2,16 @@
 Tests for Redis cache service
 """
 import pytest
+import asyncio
+import time
 from datetime import timedelta
 import json
 
-from app.cache.redis import CacheService, cache_key, cache_result
+from app.cache import redis as redis_cache
+from app.cache.local import LocalCache, MISSING
+from app.cache.redis import (
+    CacheService, MovieCacheService, UserCacheService, SearchCacheService, cache_key, cache_result
+)
 
 
 @pytest.mark.asyncio
@@ -186,4 +192,206 @@ async def test_cache_service_error_handling(test_redis):
     assert await cache.exists("test_key") is False
     assert await cache.increment("counter") == 0
     assert await cache.expire("test_key", 60) is False
-    assert await cache.delete_pattern("test:*") == 0
\ No newline at end of file
+    assert await cache.delete_pattern("test:*") == 0
+    assert await cache.get_generation("test") == 0
+    assert await cache.bump_generation("test") == 0
+
+@pytest.mark.asyncio
+async def test_generation_bump_invalidates_namespace(mock_redis):
+    """Bumping a namespace generation hides every entry written under it"""
+    cache = CacheService(mock_redis)
+    
+    key = await cache.versioned_key("movie:1:reviews", "p1", "l20")
+    assert key == "movie:1:reviews:g0:p1:l20"
+    await cache.set(key, {"items": []})
+    
+    assert await cache.bump_generation("movie:1:reviews") == 1
+    assert await cache.versioned_key("movie:1:reviews", "p1", "l20") == "movie:1:reviews:g1:p1:l20"
+    assert await cache.get(await cache.versioned_key("movie:1:reviews", "p1", "l20")) is None
+    
+    # Other namespaces keep their generation
+    assert await cache.get_generation("movie:2:reviews") == 0
+
+
+@pytest.mark.asyncio
+async def test_specialized_invalidation_without_keys(mock_redis):
+    """Movie, user and search invalidation never enumerate the keyspace"""
+    async def fail(*args, **kwargs):
+        raise AssertionError("keyspace should not be enumerated")
+    
+    mock_redis.keys = fail
+    mock_redis.scan_iter = fail
+    cache = CacheService(mock_redis)
+    movie_cache = MovieCacheService(cache)
+    user_cache = UserCacheService(cache)
+    search_cache = SearchCacheService(cache)
+    
+    await movie_cache.set_movie("1", {"title": "Movie"})
+    await movie_cache.set_movie_reviews("1", 1, 20, {"items": [1]})
+    await user_cache.set_user_watchlist("u1", 1, 20, {"movies": [1]})
+    await search_cache.set_search_results("hash", [{"title": "Movie"}])
+    
+    await movie_cache.invalidate_movie("1")
+    await movie_cache.invalidate_movie_lists()
+    await user_cache.invalidate_user_lists("u1")
+    
+    assert await movie_cache.get_movie("1") is None
+    assert await movie_cache.get_movie_reviews("1", 1, 20) is None
+    assert await user_cache.get_user_watchlist("u1", 1, 20) is None
+    assert await search_cache.get_search_results("hash") is None
+
+
+def test_local_cache_lru_and_namespace_ttls():
+    """The L1 evicts least recently used entries and only caches configured namespaces"""
+    local = LocalCache(max_entries=2, namespace_ttls={"movie": 60})
+    
+    assert local.set("movie:1", {"id": 1}) is True
+    assert local.set("movie:2", {"id": 2}) is True
+    assert local.get("movie:1") == {"id": 1}
+    
+    # movie:2 is now least recently used
+    local.set("movie:3", {"id": 3})
+    assert local.get("movie:2") is MISSING
+    assert local.get("movie:1") == {"id": 1}
+    assert local.evictions == 1
+    
+    # Unconfigured namespaces and zero TTLs are not cached locally
+    assert local.set("user:1:profile", {"id": 1}) is False
+    assert local.set("movie:4", {"id": 4}, ttl=0) is True
+    assert local.ttl_for("search:movies") == 0
+    
+    stats = local.get_statistics()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_hits_without_redis(mock_redis, monkeypatch):
+    """Reads are served from L1 once populated and writes publish invalidations"""
+    local = LocalCache(namespace_ttls={"movie": 60, "gen": 30})
+    cache = CacheService(mock_redis, local)
+    published = []
+    
+    async def publish(channel, message):
+        published.append(json.loads(message))
+        return 0
+    
+    monkeypatch.setattr(mock_redis, "publish", publish)
+    
+    await cache.set("movie:1", {"title": "Movie"}, ttl=300)
+    await mock_redis.delete("movie:1")
+    
+    # Still served from L1 even though Redis lost the key
+    assert await cache.get("movie:1") == {"title": "Movie"}
+    assert await cache.get_many(["movie:1", "movie:2"]) == [{"title": "Movie"}, None]
+    
+    await cache.delete("movie:1")
+    assert local.get("movie:1") is MISSING
+    assert published[-1]["keys"] == ["movie:1"]
+    
+    assert await cache.get_generation("movie:1:reviews") == 0
+    await cache.bump_generation("movie:1:reviews")
+    assert await cache.get_generation("movie:1:reviews") == 1
+    assert published[-1]["keys"] == ["gen:movie:1:reviews"]
+    assert published[-1]["origin"] == redis_cache.WORKER_ID
+
+
+def test_invalidation_messages_from_other_workers(monkeypatch):
+    """Messages from other workers drop keys; our own messages are ignored"""
+    local = LocalCache(namespace_ttls={"movie": 60})
+    monkeypatch.setattr(redis_cache, "local_cache", local)
+    local.set("movie:1", 1)
+    local.set("movie:2", 2)
+    
+    redis_cache.apply_invalidation_message(json.dumps({"origin": redis_cache.WORKER_ID, "keys": ["movie:1"]}))
+    assert local.get("movie:1") == 1
+    
+    redis_cache.apply_invalidation_message(json.dumps({"origin": "other", "keys": ["movie:1"]}))
+    assert local.get("movie:1") is MISSING
+    
+    redis_cache.apply_invalidation_message(json.dumps({"origin": "other", "flush": True}))
+    assert len(local) == 0
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_coalesces_concurrent_misses(mock_redis):
+    """Concurrent misses for one key run the loader once"""
+    cache = CacheService(mock_redis)
+    calls = 0
+    
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"movies": [1, 2, 3]}
+    
+    results = await asyncio.gather(*[cache.get_or_set("movies:trending", loader, ttl=60) for _ in range(10)])
+    
+    assert calls == 1
+    assert all(result == {"movies": [1, 2, 3]} for result in results)
+    assert await cache.get("movies:trending") == {"movies": [1, 2, 3]}
+    assert await mock_redis.get("lock:movies:trending") is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_serves_stale_while_another_worker_refreshes(mock_redis):
+    """An expired entry is served as-is while another process holds the refresh lock"""
+    cache = CacheService(mock_redis)
+    
+    async def old_loader():
+        return ["old"]
+    
+    async def new_loader():
+        raise AssertionError("another worker is refreshing")
+    
+    await cache.get_or_set("movies:featured", old_loader, ttl=60, stale_ttl=300)
+    envelope = await cache._get_raw("movies:featured")
+    envelope = envelope._replace(fresh_until=time.time() - 1)
+    await cache.set("movies:featured", envelope, 300)
+    await mock_redis.set("lock:movies:featured", "other-worker", px=5000, nx=True)
+    
+    # Plain reads no longer see the expired value; get_or_set serves it stale
+    assert await cache.get("movies:featured") is None
+    assert await cache.get_or_set("movies:featured", new_loader, ttl=60, stale_ttl=300) == ["old"]
+    
+    # Once the lock is free the next caller refreshes it
+    await mock_redis.delete("lock:movies:featured")
+    
+    async def refreshed_loader():
+        return ["new"]
+    
+    assert await cache.get_or_set("movies:featured", refreshed_loader, ttl=60, stale_ttl=300) == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_waits_for_lock_holder(mock_redis, monkeypatch):
+    """Without a stale value, callers wait for the worker holding the lock"""
+    monkeypatch.setattr(redis_cache, "LOCK_POLL_INTERVAL", 0.01)
+    cache = CacheService(mock_redis)
+    await mock_redis.set("lock:movie:1", "other-worker", px=5000, nx=True)
+    
+    async def other_worker_fills():
+        await asyncio.sleep(0.05)
+        await cache.set("movie:1", {"title": "Movie"}, 60)
+    
+    async def loader():
+        raise AssertionError("the lock holder loads this value")
+    
+    filler = asyncio.create_task(other_worker_fills())
+    assert await cache.get_or_set("movie:1", loader, ttl=60) == {"title": "Movie"}
+    await filler
+
+
+@pytest.mark.asyncio
+async def test_get_or_set_early_expiration(mock_redis):
+    """A large beta makes a caller refresh a still-fresh entry"""
+    cache = CacheService(mock_redis)
+    values = iter([1, 2])
+    
+    async def loader():
+        await asyncio.sleep(0.01)
+        return next(values)
+    
+    assert await cache.get_or_set("movie:1:score", loader, ttl=60, beta=0) == 1
+    assert await cache.get_or_set("movie:1:score", loader, ttl=60, beta=0) == 1
+    assert await cache.get_or_set("movie:1:score", loader, ttl=60, beta=1e9) == 2
@@ -0,0 +1,94 @@
+"""
+Tests for keyset (cursor) pagination
+"""
+import pytest
+from datetime import date, datetime
+from uuid import uuid4
+
+from app.db.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.models.movie import Movie, ContentType
+from app.schemas.movie import MovieSortBy
+from app.services.movie_service import MovieService
+
+
+def test_cursor_round_trip():
+    """Cursor values decode back to their original types"""
+    movie_id = uuid4()
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250)
+
+    cursor = encode_cursor("movies:created_at:desc", [created_at, movie_id])
+
+    assert decode_cursor("movies:created_at:desc", cursor) == [created_at, movie_id]
+    assert decode_cursor("movies:release_date:asc", encode_cursor("movies:release_date:asc", [date(2020, 1, 2), 7])) == [date(2020, 1, 2), 7]
+
+
+def test_cursor_rejects_tampering_and_other_scopes():
+    """Cursors are signed and bound to the listing that issued them"""
+    cursor = encode_cursor("movies:created_at:desc", [datetime(2024, 5, 1), uuid4()])
+    payload, signature = cursor.split(".")
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("movies:created_at:desc", f"{payload}x.{signature}")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("movies:created_at:desc", "not-a-cursor")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("movies:title:asc", cursor)
+
+
+@pytest.mark.asyncio
+async def test_movie_listing_cursor_walks_every_row_once(test_db_session, mock_redis):
+    """Following next_cursor visits every movie exactly once, ties included"""
+    # Same release date for several movies exercises the id tiebreaker
+    movies = [
+        Movie(title=f"Movie {i}", release_date=date(2023, 1, 1 + i // 3), type=ContentType.MOVIE)
+        for i in range(7)
+    ]
+    test_db_session.add_all(movies)
+    await test_db_session.commit()
+
+    movie_service = MovieService(test_db_session)
+    sort_by = MovieSortBy(field="release_date", order="desc")
+
+    first_page = await movie_service.get_movies(page=1, limit=3, sort_by=sort_by)
+    assert first_page.total == 7
+    assert first_page.next_cursor is not None
+
+    seen = [item.id for item in first_page.items]
+    cursor = first_page.next_cursor
+    while cursor:
+        next_page = await movie_service.get_movies(limit=3, sort_by=sort_by, after=cursor)
+        assert next_page.total is None
+        assert next_page.page is None
+        seen.extend(item.id for item in next_page.items)
+        cursor = next_page.next_cursor
+
+    assert sorted(seen) == sorted(movie.id for movie in movies)
+    assert len(seen) == len(set(seen))
+
+    release_dates = {movie.id: movie.release_date for movie in movies}
+    ordered_dates = [release_dates[movie_id] for movie_id in seen]
+    assert ordered_dates == sorted(ordered_dates, reverse=True)
+
+    # Page-numbered requests keep working and agree with the cursor walk
+    second_page = await movie_service.get_movies(page=2, limit=3, sort_by=sort_by)
+    assert [item.id for item in second_page.items] == seen[3:6]
+    assert second_page.has_prev is True
+
+
+@pytest.mark.asyncio
+async def test_movie_listing_cursor_with_total(test_db_session, mock_redis):
+    """An estimated total can be requested alongside a cursor page"""
+    test_db_session.add_all([
+        Movie(title=f"Movie {i}", release_date=date(2023, 1, 1), type=ContentType.MOVIE)
+        for i in range(4)
+    ])
+    await test_db_session.commit()
+
+    movie_service = MovieService(test_db_session)
+    first_page = await movie_service.get_movies(page=1, limit=2)
+    next_page = await movie_service.get_movies(limit=2, after=first_page.next_cursor, include_total=True)
+
+    assert next_page.total == 4
+    assert len(next_page.items) == 2
+    assert next_page.has_next is False
+    assert next_page.next_cursor is None
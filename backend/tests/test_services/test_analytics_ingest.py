@@ -0,0 +1,90 @@
+"""
+Tests for buffered analytics ingestion
+"""
+import pytest
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import database
+from app.models.analytics import SystemMetrics, UserActivity, UserEngagementMetrics
+from app.models.user import User
+from app.services.analytics_ingest import AnalyticsIngestQueue
+
+
+@pytest.fixture
+def ingest_sessions(test_db_engine, monkeypatch):
+    """Point the flusher's session factory at the test database"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    return session_maker
+
+
+async def count_rows(test_db_session, model) -> int:
+    result = await test_db_session.execute(select(func.count()).select_from(model))
+    return result.scalar()
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_rows_and_engagement(test_db_session, ingest_sessions):
+    """Queued rows are written in batches and folded into daily engagement"""
+    user = User(email="viewer@example.com", password_hash="x", name="Viewer")
+    test_db_session.add(user)
+    await test_db_session.commit()
+
+    queue = AnalyticsIngestQueue(max_size=100, batch_size=3)
+    for _ in range(2):
+        queue.track_user_activity(user_id=user.id, activity_type="view_movie", resource_type="movie", resource_id=uuid4())
+    queue.track_user_activity(user_id=user.id, activity_type="write_review")
+    queue.track_user_activity(user_id=None, activity_type="browse_movies")
+    queue.track_system_metric("response_time", 12.5, "ms", "api", {"status_code": 200})
+
+    assert await queue.flush() == 5
+    assert queue.batches == 2
+    assert await count_rows(test_db_session, UserActivity) == 4
+    assert await count_rows(test_db_session, SystemMetrics) == 1
+
+    # A later batch updates the same day's engagement row instead of adding one
+    queue.track_user_activity(user_id=user.id, activity_type="login")
+    await queue.flush()
+
+    result = await test_db_session.execute(select(UserEngagementMetrics))
+    engagements = result.scalars().all()
+    assert len(engagements) == 1
+    await test_db_session.refresh(engagements[0])
+    assert engagements[0].movies_viewed == 2
+    assert engagements[0].pages_viewed == 2
+    assert engagements[0].reviews_written == 1
+    assert engagements[0].session_count == 1
+    assert queue.get_statistics()["flushed"] == 6
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_and_counts():
+    """Producers never wait: events beyond capacity are dropped and counted"""
+    queue = AnalyticsIngestQueue(max_size=2, batch_size=10)
+
+    assert queue.track_system_metric("response_time", 1.0) is True
+    assert queue.track_system_metric("response_time", 2.0) is True
+    assert queue.track_system_metric("response_time", 3.0) is False
+
+    stats = queue.get_statistics()
+    assert stats["queue_depth"] == 2
+    assert stats["enqueued"] == 2
+    assert stats["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_queue(test_db_session, ingest_sessions):
+    """Stopping the flusher writes everything still queued and refuses new events"""
+    queue = AnalyticsIngestQueue(max_size=100, batch_size=50, flush_interval_ms=60000)
+    queue.start()
+    for i in range(5):
+        queue.track_system_metric("response_time", float(i), "ms", "api")
+
+    await queue.stop()
+
+    assert await count_rows(test_db_session, SystemMetrics) == 5
+    assert queue.track_system_metric("response_time", 1.0) is False
+    assert queue.get_statistics()["queue_depth"] == 0
@@ -0,0 +1,151 @@
+"""
+Tests for analytics rollups
+"""
+import pytest
+from datetime import date, datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import select
+
+from app.models.analytics import SystemMetrics, UserActivity
+from app.models.analytics_rollups import ActivityRollup, ActiveUserRollup, SystemMetricRollup
+from app.models.movie import Movie
+from app.models.review import Review
+from app.models.user import User
+from app.services.admin_service import AdminService
+from app.services.analytics_reporting_service import AnalyticsReportingService
+from app.services.analytics_rollup_service import (
+    AnalyticsRollupService, MetricAggregate, ROLLUP_ACTIVITY_HOURLY
+)
+
+NOW = datetime(2024, 3, 10, 12, 30)
+
+
+async def create_user(test_db_session, email: str = "viewer@example.com") -> User:
+    user = User(email=email, password_hash="x", name="Viewer", created_at=datetime(2024, 3, 1, 9, 0))
+    test_db_session.add(user)
+    await test_db_session.commit()
+    return user
+
+
+def activity(user_id, activity_type: str, created_at: datetime) -> UserActivity:
+    return UserActivity(user_id=str(user_id) if user_id else None, activity_type=activity_type, created_at=created_at)
+
+
+@pytest.mark.asyncio
+async def test_rollup_job_is_incremental(test_db_session):
+    """Closed hours are rolled up once; the watermark moves and the open hour stays raw"""
+    user = await create_user(test_db_session)
+    test_db_session.add_all([
+        activity(user.id, "view_movie", datetime(2024, 3, 9, 10, 15)),
+        activity(user.id, "view_movie", datetime(2024, 3, 9, 10, 45)),
+        activity(None, "view_movie", datetime(2024, 3, 9, 10, 50)),
+        activity(user.id, "login", datetime(2024, 3, 10, 11, 10)),
+        activity(user.id, "browse_movies", datetime(2024, 3, 10, 12, 20)),
+    ])
+    await test_db_session.commit()
+    service = AnalyticsRollupService(test_db_session)
+
+    processed = await service.run(now=NOW)
+
+    # 2024-03-09 10:00 up to the last closed hour, 12:00
+    assert processed[ROLLUP_ACTIVITY_HOURLY] == 26
+    assert await service.get_watermark(ROLLUP_ACTIVITY_HOURLY) == datetime(2024, 3, 10, 12, 0)
+    result = await test_db_session.execute(select(ActivityRollup).order_by(ActivityRollup.period_start))
+    rollups = [(r.activity_type, r.event_count, r.unique_users) for r in result.scalars().all()]
+    assert rollups == [("view_movie", 3, 1), ("login", 1, 1)]
+
+    result = await test_db_session.execute(select(ActiveUserRollup).where(ActiveUserRollup.day == date(2024, 3, 9)))
+    day = result.scalar_one()
+    assert (day.daily_active_users, day.weekly_active_users) == (1, 1)
+
+    # Nothing new has closed
+    assert (await service.run(now=NOW))[ROLLUP_ACTIVITY_HOURLY] == 0
+
+    # Closed hours are read from the rollups, the open hour from the raw table
+    test_db_session.add(activity(user.id, "view_movie", datetime(2024, 3, 9, 10, 55)))
+    await test_db_session.commit()
+    counts = await service.activity_counts(datetime(2024, 3, 9), datetime(2024, 3, 10, 13, 0))
+    assert counts == {"view_movie": 3, "login": 1, "browse_movies": 1}
+
+    # The next hour is picked up once it closes
+    assert (await service.run(now=NOW + timedelta(hours=1)))[ROLLUP_ACTIVITY_HOURLY] == 1
+
+
+@pytest.mark.asyncio
+async def test_system_health_report_merges_rollups_and_tail(test_db_session):
+    """Latency histograms are rolled up per route and merged with the open hour"""
+    movie_path = "GET /api/v1/movies/{}".format(uuid4())
+    samples = [(datetime(2024, 3, 10, 10, minute), float(minute * 10), 200) for minute in range(1, 11)]
+    samples += [(datetime(2024, 3, 10, 11, 5), 900.0, 503), (datetime(2024, 3, 10, 12, 25), 40.0, 200)]
+    test_db_session.add_all([
+        SystemMetrics(
+            metric_name="response_time", metric_value=value, metric_unit="ms", component="api",
+            extra_data={"endpoint": movie_path, "status_code": status}, timestamp=timestamp
+        )
+        for timestamp, value, status in samples
+    ])
+    await test_db_session.commit()
+    await AnalyticsRollupService(test_db_session).run(now=NOW)
+
+    result = await test_db_session.execute(
+        select(SystemMetricRollup).where(SystemMetricRollup.endpoint == "GET /api/v1/movies/{id}")
+    )
+    assert sum(r.sample_count for r in result.scalars().all()) == 11
+
+    report = await AnalyticsReportingService(test_db_session).generate_system_health_report(
+        datetime(2024, 3, 10, 10, 0), datetime(2024, 3, 10, 12, 30)
+    )
+
+    expected_average = sum(value for _, value, _ in samples) / len(samples)
+    assert report.performance_metrics["response_time"]["average"] == pytest.approx(expected_average)
+    assert report.component_health["api"]["response_time_maximum"] == 900.0
+    assert report.error_rates["api"] == pytest.approx(100.0 / 12)
+    assert 100.0 <= report.performance_metrics["response_time"]["p95"] <= 900.0
+
+
+@pytest.mark.asyncio
+async def test_admin_review_trends_from_rollups(test_db_session):
+    """Review trends combine daily rollups for closed days with today's raw reviews"""
+    user = await create_user(test_db_session)
+    other = await create_user(test_db_session, "other@example.com")
+    movies = [Movie(title=f"Movie {i}", release_date=date(2020, 1, 1)) for i in range(3)]
+    test_db_session.add_all(movies)
+    await test_db_session.commit()
+
+    def review(author, movie, rating, created_at):
+        return Review(
+            user_id=author.id, movie_id=movie.id, lemon_pie_rating=rating,
+            review_text="A fine film", created_at=created_at
+        )
+
+    test_db_session.add_all([
+        review(user, movies[0], 8, datetime(2024, 3, 8, 9, 0)),
+        review(other, movies[0], 6, datetime(2024, 3, 8, 18, 0)),
+        review(user, movies[1], 10, datetime(2024, 3, 10, 8, 0)),
+    ])
+    await test_db_session.commit()
+    await AnalyticsRollupService(test_db_session).run(now=NOW)
+
+    admin = AdminService(test_db_session)
+    trends = await admin._get_review_trends(date(2024, 3, 1), date(2024, 3, 10))
+    activity_by_day = await admin._get_user_activity(date(2024, 3, 1), date(2024, 3, 10))
+
+    assert trends == [
+        {"date": "2024-03-08", "count": 2, "avg_rating": 7.0},
+        {"date": "2024-03-10", "count": 1, "avg_rating": 10.0},
+    ]
+    assert activity_by_day[0] == {"date": "2024-03-08", "reviews": 2, "active_users": 2}
+    assert await admin._get_user_growth(date(2024, 3, 1), date(2024, 3, 10)) == [{"date": "2024-03-01", "count": 2}]
+
+
+def test_metric_aggregate_quantiles():
+    """Quantiles interpolate inside histogram buckets and stay within min/max"""
+    aggregate = MetricAggregate()
+    for value in range(1, 101):
+        aggregate.add(float(value))
+
+    assert aggregate.average == 50.5
+    assert 90.0 <= aggregate.quantile(0.95) <= 100.0
+    assert aggregate.quantile(1.0) == 100.0
+    assert MetricAggregate().quantile(0.5) == 0.0
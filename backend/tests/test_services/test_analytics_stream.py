@@ -0,0 +1,157 @@
+"""
+Tests for the analytics event stream
+"""
+import asyncio
+import pytest
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import database
+from app.models.analytics import ContentMetrics, SystemMetrics, UserActivity
+from app.services import analytics_stream
+from app.services.analytics_ingest import AnalyticsIngestQueue, SINK_STREAM
+from app.services.analytics_stream import AnalyticsStreamConsumer, decode_event, encode_event, publish_events
+
+
+@pytest.fixture
+def ingest_sessions(test_db_engine, monkeypatch):
+    """Point the consumer's session factory at the test database"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    return session_maker
+
+
+async def count_rows(test_db_session, model) -> int:
+    result = await test_db_session.execute(select(func.count()).select_from(model))
+    return result.scalar()
+
+
+def make_consumer(mock_redis, name: str, claim_idle_ms: int = 60000) -> AnalyticsStreamConsumer:
+    return AnalyticsStreamConsumer(
+        mock_redis, name, batch_size=10, block_ms=0, claim_idle_ms=claim_idle_ms,
+        stream="analytics:test", group="writers"
+    )
+
+
+def system_metric(name: str) -> tuple:
+    return ("system_metric", {
+        "id": str(uuid4()), "metric_name": name, "metric_value": 1.0, "metric_unit": "ms",
+        "component": "api", "extra_data": None, "timestamp": "2024-01-01T00:00:00"
+    })
+
+
+def test_event_round_trip():
+    """Encoded events decode to the same row with datetimes restored"""
+    queue = AnalyticsIngestQueue()
+    queue.track_user_activity(user_id=uuid4(), activity_type="view_movie", extra_data={"path": "/movies"})
+    kind, row = queue.queue.get_nowait()
+
+    assert decode_event(encode_event(kind, row)) == (kind, row)
+
+
+@pytest.mark.asyncio
+async def test_stream_sink_publishes_and_consumer_writes(test_db_session, ingest_sessions, mock_redis, monkeypatch):
+    """Events queued with the stream sink are written and acknowledged by a consumer"""
+    monkeypatch.setattr("app.core.config.settings.ANALYTICS_STREAM_KEY", "analytics:test")
+    queue = AnalyticsIngestQueue(sink=SINK_STREAM)
+    queue.track_user_activity(user_id=None, activity_type="browse_movies")
+    queue.track_system_metric("response_time", 8.0, "ms", "api")
+    movie_id = uuid4()
+    for _ in range(3):
+        queue.increment_content_metric("movie", movie_id, "view_count")
+
+    assert await queue.flush() == 5
+    assert await mock_redis.xlen("analytics:test") == 5
+    assert await count_rows(test_db_session, UserActivity) == 0
+
+    consumer = make_consumer(mock_redis, "worker-1")
+    await consumer.ensure_group()
+    await consumer.ensure_group()  # idempotent
+    assert await consumer.process(await consumer.read_batch()) == 5
+
+    assert await count_rows(test_db_session, UserActivity) == 1
+    assert await count_rows(test_db_session, SystemMetrics) == 1
+    result = await test_db_session.execute(select(ContentMetrics))
+    metrics = result.scalars().all()
+    # Increments are summed into one row per metric
+    assert [(m.metric_type, m.metric_value) for m in metrics] == [("view_count", 3.0)]
+    assert mock_redis._groups[("analytics:test", "writers")]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_pending_entries_are_reclaimed(test_db_session, ingest_sessions, mock_redis, monkeypatch):
+    """Entries read by a consumer that died before acking are processed by another"""
+    monkeypatch.setattr("app.core.config.settings.ANALYTICS_STREAM_KEY", "analytics:test")
+    await publish_events(mock_redis, [("system_metric", {
+        "id": str(uuid4()), "metric_name": "response_time", "metric_value": 1.0, "metric_unit": "ms",
+        "component": "api", "extra_data": None, "timestamp": "2024-01-01T00:00:00"
+    })])
+    await mock_redis.xadd("analytics:test", {"k": b"unknown", "d": b"\x01{}"})
+
+    crashed = make_consumer(mock_redis, "worker-1")
+    await crashed.ensure_group()
+    assert len(await crashed.read_batch()) == 2
+
+    survivor = make_consumer(mock_redis, "worker-2", claim_idle_ms=0)
+    assert await survivor.reclaim_pending() == 1
+
+    assert survivor.reclaimed == 2
+    assert survivor.malformed == 1
+    assert await count_rows(test_db_session, SystemMetrics) == 1
+    assert mock_redis._groups[("analytics:test", "writers")]["pending"] == {}
+
+
+@pytest.mark.asyncio
+async def test_unwritable_entry_is_dead_lettered(test_db_session, ingest_sessions, mock_redis, monkeypatch):
+    """One entry that always fails to write is isolated; the rest of its batch is written"""
+    write_batch = analytics_stream.write_analytics_batch
+
+    async def failing_write(db, batch):
+        if any(row["metric_name"] == "poison" for _, row in batch):
+            raise ValueError("violates foreign key constraint")
+        await write_batch(db, batch)
+
+    monkeypatch.setattr("app.core.config.settings.ANALYTICS_STREAM_KEY", "analytics:test")
+    monkeypatch.setattr(analytics_stream, "write_analytics_batch", failing_write)
+    await publish_events(mock_redis, [system_metric(name) for name in ("a", "b", "poison", "c", "d")])
+    worker = make_consumer(mock_redis, "worker-1", claim_idle_ms=0)
+    await worker.ensure_group()
+
+    assert await worker.process(await worker.read_batch()) == 4
+
+    assert worker.dead_lettered == 1
+    assert await count_rows(test_db_session, SystemMetrics) == 4
+    assert mock_redis._groups[("analytics:test", "writers")]["pending"] == {}
+    [(_, fields)] = mock_redis._streams["analytics:test:dead"]
+    assert decode_event(fields)[1]["metric_name"] == "poison"
+    assert "foreign key" in fields["error"]
+    assert await worker.reclaim_pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_database_outage_keeps_entries_pending(test_db_session, ingest_sessions, mock_redis, monkeypatch):
+    """An unreachable database dead-letters nothing, and a failing startup reclaim does not stop the worker"""
+    async def unavailable(db, batch):
+        raise OperationalError("INSERT", {}, ConnectionRefusedError("connection refused"))
+
+    monkeypatch.setattr("app.core.config.settings.ANALYTICS_STREAM_KEY", "analytics:test")
+    monkeypatch.setattr(analytics_stream, "write_analytics_batch", unavailable)
+    await publish_events(mock_redis, [system_metric("a"), system_metric("b")])
+    crashed = make_consumer(mock_redis, "worker-1")
+    await crashed.ensure_group()
+    assert len(await crashed.read_batch()) == 2
+
+    survivor = make_consumer(mock_redis, "worker-2", claim_idle_ms=0)
+    stop_event = asyncio.Event()
+    task = asyncio.create_task(survivor.run(stop_event))
+    await asyncio.sleep(0.05)
+    stop_event.set()
+    await asyncio.wait_for(task, 5)
+
+    assert survivor.errors == 1
+    assert survivor.dead_lettered == 0
+    assert len(mock_redis._groups[("analytics:test", "writers")]["pending"]) == 2
+    assert "analytics:test:dead" not in mock_redis._streams
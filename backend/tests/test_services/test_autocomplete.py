@@ -0,0 +1,109 @@
+"""
+Tests for the in-process autocomplete index
+"""
+import pytest
+import random
+from datetime import date
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import database
+from app.models.movie import Movie
+from app.models.movie_stats import MovieStatistics
+from app.models.relationships import MovieCast
+from app.services import autocomplete
+from app.services.autocomplete import AutocompleteIndex, AutocompleteRefresher, normalize
+from app.services.search_service import SearchService
+
+
+@pytest.fixture
+def autocomplete_sessions(test_db_engine, monkeypatch):
+    """Point the refresher's session factory at the test database"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    return session_maker
+
+
+def test_normalize_folds_case_and_diacritics():
+    """Yoruba, Igbo and Hausa spellings match their plain-ASCII prefixes"""
+    assert normalize("Ọ̀gá Bọ̀lájí") == "oga bolaji"
+    assert normalize("Ẹ̀gbọ́n Mi") == "egbon mi"
+    assert normalize("Ɗan Kano — ƙauna") == "dan kano kauna"
+    assert normalize("  King's   Ransom ") == "kings ransom"
+
+
+def test_suggestions_ranked_by_popularity():
+    """Any word start matches; shared names add up their movies' popularity"""
+    index = AutocompleteIndex(max_results=3)
+    index.build([
+        ("m1", [("title", "The Wedding Party"), ("director", "Kemi Adetiba"), ("cast", "Adesua Etomi")], 50.0),
+        ("m2", [("title", "The Wedding Party 2"), ("director", "Niyi Akinmolayan"), ("cast", "Adesua Etomi")], 30.0),
+        ("m3", [("title", "King of Boys"), ("director", "Kemi Adetiba"), ("cast", "Sola Sobowale")], 40.0),
+        ("m4", [("title", "Ọ̀gá Bọ̀lájí"), ("title", "Ẹ̀gbọ́n Mi")], 5.0),
+    ])
+
+    assert index.suggest("wed", 5) == ["The Wedding Party", "The Wedding Party 2"]
+    assert index.suggest("party", 5) == ["The Wedding Party", "The Wedding Party 2"]
+    assert index.suggest("ke", 5) == ["Kemi Adetiba"]
+    assert index.suggest("a", 2) == ["Kemi Adetiba", "Adesua Etomi"]
+    assert index.suggest("ogá b", 5) == ["Ọ̀gá Bọ̀lájí"]
+    assert index.suggest("xyz", 5) == []
+    assert index.get_statistics()["suggestions"] == 9
+    assert index.get_statistics()["memory_bytes"] > 0
+
+
+def test_incremental_updates_match_full_build():
+    """Any sequence of movie updates leaves the same index as a rebuild"""
+    rng = random.Random(3)
+    words = ["ada", "adaeze", "bola", "bolaji", "chi", "chioma", "dan", "kano", "oga", "wedding"]
+    movies = {}
+    index = AutocompleteIndex(max_results=4)
+    index.build([])
+
+    for step in range(300):
+        movie_id = rng.randrange(40)
+        if rng.random() < 0.2:
+            movies.pop(movie_id, None)
+            index.update_movies([], removed=[movie_id])
+            continue
+        names = [("title", " ".join(rng.sample(words, rng.randint(1, 3)))) for _ in range(rng.randint(1, 3))]
+        movies[movie_id] = (movie_id, names, float(rng.randrange(100)))
+        index.update_movies([movies[movie_id]])
+
+    rebuilt = AutocompleteIndex(max_results=4)
+    rebuilt.build(movies.values())
+    assert index._keys == rebuilt._keys
+    for prefix in ["a", "ad", "b", "bo", "bolaji", "c", "d", "k", "o", "w", "wedding b"]:
+        assert index.suggest(prefix, 4) == rebuilt.suggest(prefix, 4)
+        # Precomputed short-prefix results agree with a fresh scan
+        assert index.suggest(prefix, 4) == [index._entries[key].text for key in index._scan(normalize(prefix), 4)]
+
+
+@pytest.mark.asyncio
+async def test_refresher_and_search_service(test_db_session, autocomplete_sessions, mock_redis, monkeypatch):
+    """The index is built from the database, refreshed per movie and serves suggestions"""
+    popular = Movie(title="Ọ̀gá Bọ̀lájí", release_date=date(2018, 1, 1), director="Tope Oshin")
+    niche = Movie(title="Oga Landlord", release_date=date(2019, 1, 1))
+    test_db_session.add_all([popular, niche])
+    await test_db_session.flush()
+    test_db_session.add_all([
+        MovieCast(movie_id=popular.id, actor_name="Ògúndèjì Sola", character_name="Lead"),
+        MovieStatistics(movie_id=popular.id, review_count=12),
+    ])
+    await test_db_session.commit()
+
+    index = AutocompleteIndex()
+    refresher = AutocompleteRefresher(index)
+    await refresher.rebuild()
+    assert index.suggest("oga", 5) == ["Ọ̀gá Bọ̀lájí", "Oga Landlord"]
+    assert index.suggest("ogun", 5) == ["Ògúndèjì Sola"]
+
+    niche.title = "Oga Landlady"
+    await test_db_session.commit()
+    await refresher.refresh([niche.id, uuid4()])
+    assert index.suggest("oga l", 5) == ["Oga Landlady"]
+    assert index.get_statistics()["incremental_updates"] == 1
+
+    monkeypatch.setattr(autocomplete, "autocomplete_index", index)
+    assert await SearchService(test_db_session).suggest_movies("Tope", 5) == ["Tope Oshin"]
@@ -0,0 +1,133 @@
+"""
+Tests for facet bitsets and faceted movie listing and search
+"""
+import pytest
+import random
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import database
+from app.models.enums import ContentType
+from app.schemas.movie import MovieCreate, MovieSearchFilters, MovieUpdate
+from app.services import autocomplete
+from app.services.autocomplete import AutocompleteIndex, AutocompleteRefresher
+from app.services.facet_index import FACETS, FacetIndex
+from app.services.movie_service import MovieService
+from app.services.search_service import SearchService
+
+
+@pytest.fixture
+def facet_refresher(test_db_engine, monkeypatch):
+    """A refresher maintaining a facet index that the services read"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    index = FacetIndex()
+    monkeypatch.setattr(autocomplete, "facet_index", index)
+    return AutocompleteRefresher(AutocompleteIndex(), facet_index=index)
+
+
+def _brute_force_counts(movies, selected):
+    counts = {facet: {} for facet in FACETS}
+    for movie_id in selected:
+        for facet, values in movies[movie_id].items():
+            for value in values:
+                counts[facet][value] = counts[facet].get(value, 0) + 1
+    return counts
+
+
+def test_incremental_updates_match_brute_force_counts():
+    """Any sequence of updates and removals counts like a scan over the movies"""
+    rng = random.Random(7)
+    genres = ["Comedy", "Drama", "Thriller", "Romance"]
+    movies = {}
+    index = FacetIndex()
+    index.build([])
+
+    for step in range(400):
+        movie_id = rng.randrange(60)
+        if rng.random() < 0.25:
+            movies.pop(movie_id, None)
+            index.update_movies([], removed=[movie_id])
+        else:
+            year = rng.choice([1999, 2016, 2018, 2020])
+            movies[movie_id] = {
+                "genre": rng.sample(genres, rng.randint(0, 2)),
+                "language": rng.sample(["English", "Yoruba", "Igbo"], rng.randint(1, 2)),
+                "year": [str(year)],
+                "decade": [f"{year // 10 * 10}s"],
+                "type": [rng.choice(["movie", "series"])],
+                "production_state": [rng.choice(["Lagos", "Enugu", "Kano"])],
+            }
+            index.update_movies([(movie_id, movies[movie_id])])
+
+    assert index.counts(index.all_bits) == _brute_force_counts(movies, movies)
+    assert index._width <= 60
+
+    drama = [movie_id for movie_id, values in movies.items() if "Drama" in values["genre"]]
+    assert index.counts(index.filter_bits({"genre": "Drama"})) == _brute_force_counts(movies, drama)
+    assert index.counts(index.bits_for(drama + ["unknown"])) == _brute_force_counts(movies, drama)
+
+    rebuilt = FacetIndex()
+    rebuilt.build(movies.items())
+    assert rebuilt.counts(rebuilt.all_bits) == index.counts(index.all_bits)
+
+
+def test_filter_bits_follow_sql_filter_semantics():
+    """Exact genre, year and type; substring state; non-facet filters are not answered"""
+    index = FacetIndex()
+    index.build([
+        ("m1", {"genre": ["Drama"], "year": ["2018"], "type": ["movie"], "production_state": ["Lagos State"]}),
+        ("m2", {"genre": ["Drama"], "year": ["2020"], "type": ["series"], "production_state": ["Lagos"]}),
+        ("m3", {"genre": ["Comedy"], "year": ["2018"], "type": ["movie"], "production_state": ["Enugu"]}),
+    ])
+
+    assert index.filter_bits({}) == 0b111
+    assert index.filter_bits({"genre": "Drama", "production_state": "lagos"}) == 0b011
+    assert index.filter_bits({"year": 2018, "type": ContentType.MOVIE}) == 0b101
+    assert index.filter_bits({"genre": "Horror"}) == 0
+    assert index.filter_bits({"genre": "Drama", "director": "Kemi"}) is None
+    assert index.counts(0b011)["year"] == {"2018": 1, "2020": 1}
+
+
+@pytest.mark.asyncio
+async def test_listing_and_search_facets(test_db_session, mock_redis, facet_refresher):
+    """Listing and search return counts over all matching movies and follow movie changes"""
+    movie_service = MovieService(test_db_session)
+    wedding = await movie_service.create_movie(MovieCreate(
+        title="The Wedding Party", release_date=date(2016, 12, 16), director="Kemi Adetiba",
+        production_state="Lagos", genres=["Comedy", "Romance"], languages=["English", "Yoruba"]
+    ))
+    await movie_service.create_movie(MovieCreate(
+        title="King of Boys", release_date=date(2018, 10, 26), director="Kemi Adetiba",
+        production_state="Lagos", genres=["Drama"], languages=["English"], type=ContentType.SERIES
+    ))
+    await movie_service.create_movie(MovieCreate(
+        title="Living in Bondage", release_date=date(1992, 6, 1),
+        production_state="Enugu", genres=["Drama"], languages=["Igbo"]
+    ))
+    await facet_refresher.rebuild()
+
+    page = await movie_service.get_movies(limit=1, include_facets=True)
+    assert len(page.items) == 1
+    assert page.facets.genre == {"Drama": 2, "Comedy": 1, "Romance": 1}
+    assert page.facets.decade == {"2010s": 2, "1990s": 1}
+    assert page.facets.type == {"movie": 2, "series": 1}
+    assert (await movie_service.get_movies()).facets is None
+
+    # Facet filters are answered from the bitsets, others from the matching ids
+    page = await movie_service.get_movies(filters=MovieSearchFilters(genre="Drama"), include_facets=True)
+    assert page.facets.production_state == {"Enugu": 1, "Lagos": 1}
+    page = await movie_service.get_movies(filters=MovieSearchFilters(director="kemi"), include_facets=True)
+    assert page.facets.language == {"English": 2, "Yoruba": 1}
+
+    search_facets = await SearchService(test_db_session).get_search_facets("kemi")
+    assert search_facets.year == {"2016": 1, "2018": 1}
+
+    await movie_service.update_movie(wedding.id, MovieUpdate(genres=["Drama"]))
+    await facet_refresher.refresh([wedding.id])
+    assert (await movie_service.get_movies(include_facets=True)).facets.genre == {"Drama": 3}
+
+    await movie_service.delete_movie(wedding.id)
+    await facet_refresher.refresh([wedding.id])
+    assert (await movie_service.get_movies(include_facets=True)).facets.genre == {"Drama": 2}
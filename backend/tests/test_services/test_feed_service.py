@@ -0,0 +1,184 @@
+"""
+Tests for fan-out-on-write activity feed timelines
+"""
+import pytest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, event
+
+from app.core.config import settings
+from app.models.movie import Movie, ContentType
+from app.models.review import Review
+from app.models.user import User, UserRole
+from app.schemas.review import ReviewCreate
+from app.services.feed_service import (
+    CELEBRITIES_KEY, REVIEW_POSTED, FeedService, feed_member, outbox_key, timeline_key
+)
+from app.services.notification_trigger import NotificationTrigger
+from app.services.review_service import ReviewService
+from app.services.user_service import UserService
+
+
+@pytest.fixture(autouse=True)
+def no_background_tasks(monkeypatch):
+    """Backfill new follows in the request and skip follower notifications (no Celery broker)"""
+    monkeypatch.setattr(settings, "FEED_BACKFILL_IN_BACKGROUND", False)
+    monkeypatch.setattr(NotificationTrigger, "send_new_follower_notification", lambda **kwargs: None)
+
+
+async def _create_users_and_movies(db, user_count=3, movie_count=2):
+    users = [
+        User(email=f"user{i}@example.com", password_hash="hashed", name=f"User {i}", role=UserRole.USER)
+        for i in range(user_count)
+    ]
+    movies = [
+        Movie(title=f"Movie {i}", release_date=date(2023, 1, 1), type=ContentType.MOVIE)
+        for i in range(movie_count)
+    ]
+    db.add_all(users + movies)
+    await db.commit()
+    return users, movies
+
+
+@pytest.mark.asyncio
+async def test_events_fan_out_to_built_timelines(test_db_session, mock_redis):
+    """Reviews and watchlist additions reach built timelines; missing ones are rebuilt on read"""
+    (alice, bob, carol), (movie, other_movie) = await _create_users_and_movies(test_db_session)
+    user_service = UserService()
+    feed_service = FeedService(test_db_session)
+    await user_service.follow_user(bob.id, alice.id, test_db_session)
+    await user_service.follow_user(carol.id, alice.id, test_db_session)
+
+    assert (await feed_service.get_feed(bob.id, 1, 20)).total == 0
+    assert await mock_redis.exists(timeline_key(bob.id))
+
+    review = await ReviewService(test_db_session).create_review(
+        ReviewCreate(movie_id=movie.id, lemon_pie_rating=8, review_text="A Lagos classic, loved it"), alice.id
+    )
+    await user_service.add_to_watchlist(alice.id, other_movie.id, test_db_session)
+
+    # Pushed to Bob's timeline; Carol's is built when she first reads it
+    assert await mock_redis.zcard(timeline_key(bob.id)) == 3
+    assert not await mock_redis.exists(timeline_key(carol.id))
+    for user in (bob, carol):
+        feed = await feed_service.get_feed(user.id, 1, 20)
+        assert {(item.type, item.title) for item in feed.activities} == {
+            ("review_posted", "User 0 reviewed Movie 0"),
+            ("movie_watchlisted", "User 0 added Movie 1 to watchlist"),
+        }
+        assert feed.total == 2
+
+    review_item = next(item for item in feed.activities if item.type == "review_posted")
+    assert review_item.data["review_id"] == str(review.id)
+    assert review_item.user.stats.total_reviews == 1
+
+
+@pytest.mark.asyncio
+async def test_pages_are_read_from_a_capped_timeline(test_db_session, test_db_engine, mock_redis, monkeypatch):
+    """Deep pages are exact, the timeline is capped, and hydration is a fixed number of queries"""
+    monkeypatch.setattr(settings, "FEED_MAX_LENGTH", 25)
+    (alice, bob), movies = await _create_users_and_movies(test_db_session, user_count=2, movie_count=30)
+    await UserService().follow_user(bob.id, alice.id, test_db_session)
+    feed_service = FeedService(test_db_session)
+    await feed_service.get_feed(bob.id, 1, 1)
+
+    started = datetime(2024, 5, 1, 12, 0)
+    reviews = [
+        Review(user_id=alice.id, movie_id=movie.id, lemon_pie_rating=7, review_text=f"Review number {i}",
+               created_at=started + timedelta(minutes=i))
+        for i, movie in enumerate(movies)
+    ]
+    test_db_session.add_all(reviews)
+    await test_db_session.commit()
+    for review in reviews:
+        await feed_service.publish_event(REVIEW_POSTED, alice.id, review.id, review.created_at)
+
+    assert await mock_redis.zcard(timeline_key(bob.id)) == 25 + 1  # and the built marker
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(test_db_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        pages = [await feed_service.get_feed(bob.id, page, 7) for page in range(1, 5)]
+    finally:
+        event.remove(test_db_engine.sync_engine, "before_cursor_execute", record)
+
+    newest_first = [review.id for review in reversed(reviews)][:25]
+    assert [item.id for page in pages for item in page.activities] == newest_first
+    assert [(page.total, page.has_next) for page in pages] == [(25, True), (25, True), (25, True), (25, False)]
+    # Reviews, users and movies per page whatever its size, and grouped stats counts once
+    assert len(statements) <= 4 * 3 + 5
+
+
+@pytest.mark.asyncio
+async def test_celebrity_activity_is_pulled_at_read_time(test_db_session, mock_redis, monkeypatch):
+    """Accounts over the follower threshold write to their outbox, merged into readers' pages"""
+    monkeypatch.setattr(settings, "FEED_CELEBRITY_FOLLOWERS", 2)
+    (alice, bob, carol), (movie, _) = await _create_users_and_movies(test_db_session)
+    user_service = UserService()
+    feed_service = FeedService(test_db_session)
+    await user_service.follow_user(bob.id, alice.id, test_db_session)
+    await user_service.follow_user(carol.id, alice.id, test_db_session)
+    await user_service.follow_user(bob.id, carol.id, test_db_session)
+    await feed_service.get_feed(bob.id, 1, 20)
+
+    review = await ReviewService(test_db_session).create_review(
+        ReviewCreate(movie_id=movie.id, lemon_pie_rating=9, review_text="Sola Sobowale carries it"), alice.id
+    )
+    member = feed_member(REVIEW_POSTED, alice.id, review.id)
+    assert await mock_redis.sismember(CELEBRITIES_KEY, str(alice.id))
+    assert await mock_redis.zscore(timeline_key(bob.id), member) is None
+    assert await mock_redis.zscore(outbox_key(alice.id), member) is not None
+
+    feed = await feed_service.get_feed(bob.id, 1, 20)
+    assert [item.title for item in feed.activities] == ["User 0 reviewed Movie 0", "User 2 followed User 0"]
+
+    # Carol is below the threshold, so her activity is still fanned out
+    await user_service.add_to_watchlist(carol.id, movie.id, test_db_session)
+    assert await mock_redis.zcard(timeline_key(bob.id)) == 3
+    assert (await feed_service.get_feed(bob.id, 1, 20)).total == 3
+
+
+@pytest.mark.asyncio
+async def test_follows_backfill_and_undone_activity_is_retracted(test_db_session, mock_redis):
+    """A new follow backfills the followee's history; deletions and unfollows leave the feed"""
+    (alice, bob, carol), (movie, other_movie) = await _create_users_and_movies(test_db_session)
+    user_service = UserService()
+    feed_service = FeedService(test_db_session)
+    review = await ReviewService(test_db_session).create_review(
+        ReviewCreate(movie_id=movie.id, lemon_pie_rating=8, review_text="Kemi Adetiba at her best"), alice.id
+    )
+    await user_service.add_to_watchlist(alice.id, other_movie.id, test_db_session)
+    await user_service.follow_user(carol.id, bob.id, test_db_session)
+    for user in (bob, carol):
+        await feed_service.get_feed(user.id, 1, 20)
+
+    await user_service.follow_user(bob.id, alice.id, test_db_session)
+    feed = await feed_service.get_feed(bob.id, 1, 20)
+    assert {item.type for item in feed.activities} == {"review_posted", "movie_watchlisted"}
+    feed = await feed_service.get_feed(carol.id, 1, 20)
+    assert [item.title for item in feed.activities] == ["User 1 followed User 0"]
+
+    await ReviewService(test_db_session).delete_review(review.id, alice.id)
+    await user_service.remove_from_watchlist(alice.id, other_movie.id, test_db_session)
+    assert (await feed_service.get_feed(bob.id, 1, 20)).total == 0
+
+    await user_service.add_to_watchlist(alice.id, movie.id, test_db_session)
+    await user_service.unfollow_user(bob.id, alice.id, test_db_session)
+    assert await mock_redis.zcard(timeline_key(bob.id)) == 1
+    assert (await feed_service.get_feed(carol.id, 1, 20)).total == 0
+
+    # Activity undone behind the feed's back is dropped when read
+    await user_service.follow_user(carol.id, alice.id, test_db_session)
+    other_review = Review(user_id=alice.id, movie_id=other_movie.id, lemon_pie_rating=6, review_text="Second look")
+    test_db_session.add(other_review)
+    await test_db_session.commit()
+    await feed_service.publish_event(REVIEW_POSTED, alice.id, other_review.id, other_review.created_at)
+    await test_db_session.execute(delete(Review).where(Review.id == other_review.id))
+    await test_db_session.commit()
+
+    feed = await feed_service.get_feed(carol.id, 1, 20)
+    assert [item.type for item in feed.activities] == ["movie_watchlisted"]
+    assert await mock_redis.zscore(
+        timeline_key(carol.id), feed_member(REVIEW_POSTED, alice.id, other_review.id)
+    ) is None
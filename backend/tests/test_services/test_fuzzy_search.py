@@ -0,0 +1,148 @@
+"""
+Tests for typo-tolerant movie and cast search
+"""
+import pytest
+from datetime import date
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db import database
+from app.models.movie_stats import MovieStatistics
+from app.schemas.movie import MovieCreate
+from app.services import autocomplete
+from app.services.autocomplete import AutocompleteIndex, AutocompleteRefresher
+from app.services.fuzzy_index import TrigramIndex, similarity, trigrams
+from app.services.movie_service import MovieService
+from app.services.search_service import SearchService
+
+
+@pytest.fixture
+def fuzzy_index(test_db_engine, monkeypatch):
+    """A trigram index built from the test database and used by the search backends"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    index = TrigramIndex()
+    monkeypatch.setattr(autocomplete, "fuzzy_index", index)
+    return index
+
+
+async def _create_catalogue(db):
+    movie_service = MovieService(db)
+    king = await movie_service.create_movie(MovieCreate(
+        title="King of Boys",
+        release_date=date(2018, 10, 26),
+        director="Kemi Adetiba",
+        cast=[{"actor_name": "Sola Sobowale", "character_name": "Eniola Salami"}]
+    ))
+    kings = await movie_service.create_movie(MovieCreate(
+        title="Kings of Lagos",
+        release_date=date(2020, 1, 1),
+        cast=[{"actor_name": "Funke Akindele", "character_name": "Jenifa"}]
+    ))
+    await movie_service.create_movie(MovieCreate(
+        title="Omo Ghetto",
+        release_date=date(2020, 12, 25),
+        director="Funke Akindele",
+        cast=[{"actor_name": "Chioma Akpotha", "character_name": "Lefty"}]
+    ))
+    db.add(MovieStatistics(movie_id=king.id, review_count=500))
+    await db.commit()
+    return king, kings
+
+
+def test_trigram_similarity_matches_pg_trgm():
+    """Words are padded like pg_trgm and similarity is shared over all trigrams"""
+    assert trigrams("Cat") == {"  c", " ca", "cat", "at "}
+    assert trigrams("Ọ̀gá") == trigrams("oga")
+    assert similarity(trigrams("word"), trigrams("two words")) == pytest.approx(4 / 11)
+    assert similarity(trigrams(""), trigrams("cat")) == 0.0
+
+
+def test_trigram_index_search_and_updates():
+    """Misspellings find their names; thresholds, kinds and updates are honoured"""
+    index = TrigramIndex()
+    index.build([
+        ("m1", [("title", "King of Boys"), ("director", "Kemi Adetiba")], 50.0),
+        ("m2", [("title", "The Wedding Party"), ("cast", "Adesua Etomi"), ("director", "Kemi Adetiba")], 30.0),
+    ])
+
+    name, kind, score, refs = index.search("Kng of Boys", 0.3)[0]
+    assert (name, kind, refs) == ("King of Boys", "title", {"m1": 50.0})
+    assert 0.3 <= score < 1.0
+    assert index.search("Kemi Adetbia", 0.3)[0][3] == {"m1": 50.0, "m2": 30.0}
+    assert index.search("Adesua Etomy", 0.3, kinds={"cast"})[0][0] == "Adesua Etomi"
+    assert index.search("Kemi Adetbia", 0.3, kinds={"cast"}) == []
+    assert index.search("Kng of Boys", 0.95) == []
+
+    # Every candidate the posting-list filter skips is below the threshold
+    for query in ["wedding", "kemi", "boys party", "adesua kemi"]:
+        query_grams = trigrams(query)
+        expected = sorted(
+            entry.text for entry in index._names.values() if similarity(query_grams, trigrams(entry.text)) >= 0.2
+        )
+        assert sorted(match[0] for match in index.search(query, 0.2)) == expected
+
+    index.update_movies([("m2", [("title", "The Wedding Party 2")], 30.0)], removed=["m1"])
+    assert index.search("Kng of Boys", 0.3) == []
+    assert index.search("Kemi Adetiba", 0.3) == []
+    assert index.search("Weding Party", 0.3)[0][0] == "The Wedding Party 2"
+    assert index.get_statistics()["names"] == 1
+
+
+@pytest.mark.asyncio
+async def test_misspelled_search_falls_back_to_fuzzy(test_db_session, mock_redis, fuzzy_index, monkeypatch):
+    """Misspelled titles and names find movies ranked by similarity and popularity, with a suggestion"""
+    await _create_catalogue(test_db_session)
+    await AutocompleteRefresher(AutocompleteIndex(), fuzzy_index=fuzzy_index).rebuild()
+    search_service = SearchService(test_db_session)
+
+    # Exact full-text matches are unchanged
+    movies, did_you_mean = await search_service.search_movies_with_suggestion("King of Boys")
+    assert [movie.title for movie in movies] == ["King of Boys"]
+    assert did_you_mean is None
+
+    movies, did_you_mean = await search_service.search_movies_with_suggestion("Kng of Boys")
+    assert [movie.title for movie in movies][0] == "King of Boys"
+    assert did_you_mean == "King of Boys"
+
+    # Director and cast names match too; filters still apply
+    movies, did_you_mean = await search_service.search_movies_with_suggestion("Funke Akindle")
+    assert {movie.title for movie in movies} == {"Kings of Lagos", "Omo Ghetto"}
+    assert did_you_mean == "Funke Akindele"
+    movies, _ = await search_service.search_movies_with_suggestion("Funke Akindle", {"year": 2018})
+    assert movies == []
+
+    # Fuzzy results page by cursor as well
+    first, _, cursor = await search_service.search_movies_page("Funke Akindle", limit=1)
+    second, did_you_mean, last_cursor = await search_service.search_movies_page("Funke Akindle", limit=1, after=cursor)
+    assert {first[0].title, second[0].title} == {"Kings of Lagos", "Omo Ghetto"}
+    assert did_you_mean == "Funke Akindele"
+    assert last_cursor is None
+
+    cast_movies, did_you_mean = await search_service.search_by_cast_with_suggestion("Funke Akindle")
+    assert [movie.title for movie in cast_movies] == ["Kings of Lagos"]
+    assert did_you_mean == "Funke Akindele"
+
+    # Nothing is similar enough above a strict threshold
+    monkeypatch.setattr(settings, "SEARCH_FUZZY_THRESHOLD", 0.95)
+    assert await SearchService(test_db_session)._run_fuzzy_search("Kng of Boys", None, 20, 0) == {
+        "results": [], "did_you_mean": None
+    }
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_results_ranked_by_popularity(test_db_session, mock_redis, fuzzy_index, monkeypatch):
+    """A slightly less similar title with many more reviews ranks first"""
+    await _create_catalogue(test_db_session)
+    await AutocompleteRefresher(AutocompleteIndex(), fuzzy_index=fuzzy_index).rebuild()
+    search_service = SearchService(test_db_session)
+
+    # "Kings of" is closer to Kings of Lagos, but King of Boys has the reviews
+    result = await search_service._run_fuzzy_search("Kings of", None, 20, 0)
+    assert [movie["title"] for movie in result["results"]] == ["King of Boys", "Kings of Lagos"]
+    assert result["did_you_mean"] == "Kings of Lagos"
+
+    monkeypatch.setattr(settings, "SEARCH_FUZZY_POPULARITY_WEIGHT", 0.0)
+    result = await search_service._run_fuzzy_search("Kings of", None, 20, 0)
+    assert [movie["title"] for movie in result["results"]] == ["Kings of Lagos", "King of Boys"]
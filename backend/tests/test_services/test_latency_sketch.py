@@ -0,0 +1,92 @@
+"""
+Tests for streaming latency sketches
+"""
+import pytest
+import random
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db import database
+from app.models.analytics_rollups import LatencySketch
+from app.services.analytics_reporting_service import AnalyticsReportingService
+from app.services.analytics_service import AnalyticsService
+from app.services.latency_sketch import DDSketch, LatencySketchRecorder, load_latency_sketches
+
+
+@pytest.fixture
+def sketch_sessions(test_db_engine, monkeypatch):
+    """Point the recorder's session factory at the test database"""
+    session_maker = async_sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    return session_maker
+
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_within_relative_accuracy():
+    """Every percentile is within the configured relative error of the exact value"""
+    rng = random.Random(42)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.95, 0.99, 0.999):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=0.01)
+    assert sketch.count == len(values)
+    assert len(sketch.bins) < 1000
+
+
+def test_merge_and_serialization():
+    """Merging sketches equals sketching the union; blobs round-trip"""
+    rng = random.Random(7)
+    first, second, union = DDSketch(), DDSketch(), DDSketch()
+    for i in range(5000):
+        value = rng.expovariate(1 / 80)
+        (first if i % 2 else second).add(value)
+        union.add(value)
+
+    restored = DDSketch.from_bytes(first.to_bytes())
+    restored.merge(DDSketch.from_bytes(second.to_bytes()))
+
+    assert restored.count == union.count
+    assert restored.quantiles() == pytest.approx(union.quantiles())
+    assert restored.min == union.min and restored.max == union.max
+    with pytest.raises(ValueError):
+        restored.merge(DDSketch(relative_accuracy=0.05))
+
+
+@pytest.mark.asyncio
+async def test_recorder_flush_and_reports(test_db_session, sketch_sessions):
+    """Flushed per-minute sketches are merged by the summary and health report"""
+    at = datetime(2024, 3, 10, 10, 15, 30)
+    recorder = LatencySketchRecorder(max_keys=3)
+    for latency in range(1, 101):
+        recorder.record("GET /api/v1/movies/{movie_id}", 200, float(latency), at=at)
+    recorder.record("GET /api/v1/movies/{movie_id}", 503, 2000.0, at=at)
+    recorder.record("GET /api/v1/search", 200, 30.0, at=at.replace(minute=16))
+    recorder.record("GET /api/v1/users/me", 200, 5.0, at=at)  # over max_keys
+
+    assert recorder.get_statistics()["dropped"] == 1
+    assert await recorder.flush() == 3
+    assert recorder.sketches == {}
+    result = await test_db_session.execute(select(func.count()).select_from(LatencySketch))
+    assert result.scalar() == 3
+
+    start, end = datetime(2024, 3, 10, 10, 0), datetime(2024, 3, 10, 11, 0)
+    sketches = await load_latency_sketches(test_db_session, start, end, endpoint="GET /api/v1/movies/{movie_id}")
+    assert set(sketches) == {("GET /api/v1/movies/{movie_id}", "2xx"), ("GET /api/v1/movies/{movie_id}", "5xx")}
+    assert sketches[("GET /api/v1/movies/{movie_id}", "2xx")].quantile(0.5) == pytest.approx(50, rel=0.02)
+
+    summary = await AnalyticsService(test_db_session).get_system_performance_summary(start_date=start, end_date=end)
+    assert summary["endpoints"]["GET /api/v1/movies/{movie_id}"]["count"] == 101
+    assert summary["metrics"]["api:response_time"]["p99"] == pytest.approx(100, rel=0.02)
+    assert summary["endpoints"]["GET /api/v1/search"]["p50"] == pytest.approx(30, rel=0.01)
+
+    report = await AnalyticsReportingService(test_db_session).generate_system_health_report(start, end)
+    assert report.performance_metrics["response_time"]["p95"] == pytest.approx(96, rel=0.02)
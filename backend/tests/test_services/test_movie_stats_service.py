@@ -0,0 +1,165 @@
+"""
+Tests for batched and materialized movie statistics
+"""
+import pytest
+from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache.redis import get_movie_cache_service
+from app.models.user import User, UserRole
+from app.models.movie import Movie, ContentType
+from app.models.relationships import MovieGenre
+from app.models.review import Review
+from app.models.enums import ModerationStatus
+from app.schemas.review import ReviewCreate, ReviewUpdate, ReviewModerationAction
+from app.services.movie_service import MovieService
+from app.services.movie_stats_service import MovieStatsService
+from app.services.review_service import ReviewService
+
+
+async def _create_movies_with_reviews(db: AsyncSession):
+    users = [
+        User(email=f"user{i}@example.com", password_hash="hashed", name=f"User {i}", role=UserRole.USER)
+        for i in range(3)
+    ]
+    reviewed = Movie(title="Reviewed", release_date=date(2023, 1, 1), type=ContentType.MOVIE)
+    unreviewed = Movie(title="Unreviewed", release_date=date(2023, 2, 1), type=ContentType.MOVIE)
+    db.add_all(users + [reviewed, unreviewed])
+    await db.flush()
+
+    db.add(MovieGenre(movie_id=reviewed.id, genre="Drama"))
+    db.add_all([
+        Review(user_id=users[0].id, movie_id=reviewed.id, lemon_pie_rating=8, review_text="Great",
+               story_rating=9, acting_rating=7),
+        Review(user_id=users[1].id, movie_id=reviewed.id, lemon_pie_rating=6, review_text="Fine",
+               story_rating=6),
+        Review(user_id=users[2].id, movie_id=reviewed.id, lemon_pie_rating=8, review_text="Good"),
+    ])
+    await db.commit()
+    await MovieStatsService(db).rebuild_stats()
+    return reviewed, unreviewed
+
+
+@pytest.mark.asyncio
+async def test_stats_for_movies_single_aggregate(test_db_session, mock_redis):
+    """Stats for several movies come from one grouped aggregate"""
+    reviewed, unreviewed = await _create_movies_with_reviews(test_db_session)
+
+    stats = await MovieStatsService(test_db_session).get_stats_for_movies([reviewed.id, unreviewed.id])
+
+    assert stats[reviewed.id].review_count == 3
+    assert stats[reviewed.id].average_rating == 7.33
+    assert stats[reviewed.id].story_rating_avg == 7.5
+    assert stats[reviewed.id].acting_rating_avg == 7.0
+    assert stats[reviewed.id].cultural_authenticity_avg == 0.0
+    assert stats[reviewed.id].rating_distribution[8] == 2
+    assert stats[reviewed.id].rating_distribution[6] == 1
+    assert sum(stats[reviewed.id].rating_distribution.values()) == 3
+    assert stats[unreviewed.id].review_count == 0
+    assert stats[unreviewed.id].rating_distribution == {}
+
+
+@pytest.mark.asyncio
+async def test_stats_for_movies_served_from_cache(test_db_session, mock_redis):
+    """A second lookup is answered from the cache without touching the database"""
+    reviewed, _ = await _create_movies_with_reviews(test_db_session)
+    stats_service = MovieStatsService(test_db_session)
+
+    first = await stats_service.get_stats_for_movies([reviewed.id])
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("database should not be queried")
+
+    stats_service._load_stats = fail
+    second = await stats_service.get_stats_for_movies([reviewed.id])
+
+    assert second[reviewed.id] == first[reviewed.id]
+
+
+@pytest.mark.asyncio
+async def test_movie_listing_uses_batched_stats(test_db_session, mock_redis):
+    """Movie listings carry stats without loading the reviews relationship"""
+    reviewed, unreviewed = await _create_movies_with_reviews(test_db_session)
+
+    page = await MovieService(test_db_session).get_movies(page=1, limit=10)
+
+    items = {item.id: item for item in page.items}
+    assert items[reviewed.id].stats.review_count == 3
+    assert items[reviewed.id].genres == ["Drama"]
+    assert items[unreviewed.id].stats.review_count == 0
+
+
+@pytest.mark.asyncio
+async def test_review_writes_maintain_stats(test_db_session, mock_redis):
+    """Creating, updating, moderating and deleting reviews keeps movie_stats in step"""
+    reviewed, _ = await _create_movies_with_reviews(test_db_session)
+    author = User(email="author@example.com", password_hash="hashed", name="Author", role=UserRole.USER)
+    test_db_session.add(author)
+    await test_db_session.commit()
+
+    review_service = ReviewService(test_db_session)
+    stats_service = MovieStatsService(test_db_session)
+
+    created = await review_service.create_review(
+        ReviewCreate(movie_id=reviewed.id, lemon_pie_rating=10, review_text="An absolute classic",
+                     acting_rating=9),
+        author.id
+    )
+    stats = await stats_service.get_movie_stats(reviewed.id)
+    assert stats.review_count == 4
+    assert stats.average_rating == 8.0
+    assert stats.acting_rating_avg == 8.0
+    assert stats.rating_distribution[10] == 1
+
+    await review_service.update_review(created.id, ReviewUpdate(lemon_pie_rating=2), author.id)
+    stats = await stats_service.get_movie_stats(reviewed.id)
+    assert stats.average_rating == 6.0
+    assert stats.rating_distribution[10] == 0
+    assert stats.rating_distribution[2] == 1
+
+    await review_service.moderate_review(created.id, ReviewModerationAction(action="reject"), author.id)
+    stats = await stats_service.get_movie_stats(reviewed.id)
+    assert stats.review_count == 3
+    assert stats.average_rating == 7.33
+
+    await review_service.moderate_review(created.id, ReviewModerationAction(action="approve"), author.id)
+    await review_service.delete_review(created.id, author.id)
+    stats = await stats_service.get_movie_stats(reviewed.id)
+    assert stats.review_count == 3
+    assert stats.acting_rating_avg == 7.0
+
+
+@pytest.mark.asyncio
+async def test_rebuild_stats_repairs_drift(test_db_session, mock_redis):
+    """Rebuilding recomputes stats from approved reviews only"""
+    reviewed, unreviewed = await _create_movies_with_reviews(test_db_session)
+    rejected = User(email="rejected@example.com", password_hash="hashed", name="Rejected", role=UserRole.USER)
+    test_db_session.add(rejected)
+    await test_db_session.flush()
+    test_db_session.add(Review(user_id=rejected.id, movie_id=reviewed.id, lemon_pie_rating=1,
+                               review_text="Rejected", moderation_status=ModerationStatus.REJECTED))
+    await test_db_session.commit()
+
+    stats_service = MovieStatsService(test_db_session)
+    assert await stats_service.rebuild_stats([reviewed.id, unreviewed.id]) == 1
+
+    stats = await stats_service.get_stats_for_movies([reviewed.id, unreviewed.id])
+    assert stats[reviewed.id].review_count == 3
+    assert stats[reviewed.id].rating_distribution.get(1, 0) == 0
+    assert stats[unreviewed.id].review_count == 0
+
+
+@pytest.mark.asyncio
+async def test_full_rebuild_invalidates_cached_stats(test_db_session, mock_redis):
+    """A full rebuild drops the drifted stats, movie detail and lists from the cache"""
+    reviewed, unreviewed = await _create_movies_with_reviews(test_db_session)
+    movie_cache = await get_movie_cache_service()
+    await movie_cache.set_movie_stats(str(reviewed.id), {"review_count": 99})
+    await movie_cache.set_movie(str(reviewed.id), {"title": "Reviewed", "stats": {"review_count": 99}})
+    await movie_cache.set_trending_movies([{"id": str(reviewed.id)}])
+
+    assert await MovieStatsService(test_db_session).repair_stats() == 1
+
+    assert await movie_cache.get_movie_stats(str(reviewed.id)) is None
+    assert await movie_cache.get_movie(str(reviewed.id)) is None
+    assert await movie_cache.get_trending_movies() is None
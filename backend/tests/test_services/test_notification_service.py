@@ -0,0 +1,101 @@
+"""
+Tests for notification service unread counters
+"""
+import pytest
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import update
+
+from app.models import Notification, User
+from app.models.enums import NotificationType
+from app.services.notification_service import NotificationService
+from app.services.unread_counters import get_unread, reconcile_unread, unread_key
+
+
+async def create_users(db, count: int):
+    users = [User(email=f"reader{i}@example.com", password_hash="hashed", name=f"Reader {i}") for i in range(count)]
+    db.add_all(users)
+    await db.commit()
+    return users
+
+
+async def notify(service: NotificationService, user, **kwargs) -> Notification:
+    return await service.create_notification(
+        user_id=user.id, notification_type=NotificationType.SYSTEM_ANNOUNCEMENT,
+        title="Hello", message="Something happened", **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_counter_follows_notification_lifecycle(test_db_session, mock_redis):
+    """Create, read, delete and read-all move the counter without recounting"""
+    user, other = await create_users(test_db_session, 2)
+    service = NotificationService(test_db_session)
+
+    # Writes leave a missing counter alone; the first read loads it
+    first = await notify(service, user)
+    assert await get_unread(mock_redis, user.id) is None
+    assert await service.get_unread_count(user.id) == 1
+    assert unread_key(user.id) in mock_redis._expiry
+
+    second = await notify(service, user)
+    await notify(service, user)
+    assert await get_unread(mock_redis, user.id) == 3
+
+    await service.mark_notification_read(first.id, user.id)
+    await service.mark_notification_read(first.id, user.id)
+    assert await get_unread(mock_redis, user.id) == 2
+
+    # Deleting a read notification leaves the count alone, an unread one lowers it
+    assert await service.delete_notification(first.id, user.id)
+    assert await get_unread(mock_redis, user.id) == 2
+    assert await service.delete_notification(second.id, user.id)
+    assert await get_unread(mock_redis, user.id) == 1
+
+    await service.get_unread_count(other.id)
+    await service.create_bulk_notifications(
+        [user.id, other.id], NotificationType.SYSTEM_ANNOUNCEMENT, "All", "Everyone"
+    )
+    assert await get_unread(mock_redis, user.id) == 2
+    assert await get_unread(mock_redis, other.id) == 1
+
+    assert await service.mark_all_notifications_read(user.id) == 2
+    assert await service.get_unread_count(user.id) == 0
+    assert await service._count_unread(user.id) == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_expired_notifications(test_db_session, mock_redis):
+    """Reconciliation drops notifications that expired since they were counted"""
+    reader, bystander = await create_users(test_db_session, 2)
+    service = NotificationService(test_db_session)
+    expiring = await notify(service, reader, expires_at=datetime.utcnow() + timedelta(hours=1))
+    await notify(service, reader)
+    await notify(service, bystander)
+    assert await service.get_unread_count(reader.id) == 2
+    assert await service.get_unread_count(bystander.id) == 1
+
+    await test_db_session.execute(
+        update(Notification).where(Notification.id == expiring.id)
+        .values(expires_at=datetime.utcnow() - timedelta(minutes=1))
+    )
+    await test_db_session.commit()
+    assert await service.get_unread_count(reader.id) == 2
+
+    assert await service.reconcile_unread_counts(batch_size=1) == {"checked": 2, "corrected": 1}
+    assert await service.get_unread_count(reader.id) == 1
+    assert await service.get_unread_count(bystander.id) == 1
+    assert unread_key(reader.id) in mock_redis._expiry
+
+
+@pytest.mark.asyncio
+async def test_reconcile_skips_counters_changed_meanwhile(mock_redis):
+    """A counter that moved after it was read is left for the next run"""
+    user_id = uuid4()
+    await mock_redis.set(unread_key(user_id), "5")
+    expected = {user_id: await mock_redis.get(unread_key(user_id))}
+    await mock_redis.set(unread_key(user_id), "6")
+
+    assert await reconcile_unread(mock_redis, expected, {user_id: 4}) == 0
+    assert await get_unread(mock_redis, user_id) == 6
@@ -0,0 +1,97 @@
+"""
+Tests for ranked full-text movie search
+"""
+import pytest
+from datetime import date
+
+from sqlalchemy import func, select, text
+
+from app.core.config import settings
+from app.models.search import MovieSearchIndex
+from app.schemas.movie import MovieCreate, MovieUpdate
+from app.services.movie_service import MovieService
+from app.services.search_backends import LikeSearchBackend, SqliteSearchBackend, get_search_backend
+from app.services.search_service import SearchService
+
+
+async def _create_catalogue(db):
+    movie_service = MovieService(db)
+    wedding = await movie_service.create_movie(MovieCreate(
+        title="The Wedding Party",
+        release_date=date(2016, 12, 16),
+        director="Kemi Adetiba",
+        plot_summary="A chaotic Lagos wedding",
+        genres=["Comedy"],
+        cast=[{"actor_name": "Adesua Etomi", "character_name": "Lead"}, {"actor_name": "Banky Wellington", "character_name": "Lead"}]
+    ))
+    lionheart = await movie_service.create_movie(MovieCreate(
+        title="Lionheart",
+        release_date=date(2018, 12, 21),
+        director="Genevieve Nnaji",
+        plot_summary="A family business story set before a wedding",
+        genres=["Drama"],
+        cast=[{"actor_name": "Genevieve Nnaji", "character_name": "Lead"}, {"actor_name": "Pete Edochie", "character_name": "Lead"}]
+    ))
+    king = await movie_service.create_movie(MovieCreate(
+        title="King of Boys",
+        release_date=date(2018, 10, 26),
+        director="Kemi Adetiba",
+        plot_summary="A political thriller",
+        genres=["Thriller"],
+        cast=[{"actor_name": "Sola Sobowale", "character_name": "Lead"}]
+    ))
+    return wedding, lionheart, king
+
+
+@pytest.mark.asyncio
+async def test_search_is_ranked_by_field_weight(test_db_session, mock_redis):
+    """Title matches outrank plot matches; cast, genres and prefixes are searchable"""
+    wedding, lionheart, king = await _create_catalogue(test_db_session)
+    assert isinstance(get_search_backend(test_db_session), SqliteSearchBackend)
+
+    search_service = SearchService(test_db_session)
+    results = await search_service._run_movie_search("wedding", None, 20, 0)
+    assert [movie["title"] for movie in results] == ["The Wedding Party", "Lionheart"]
+
+    assert [m["title"] for m in await search_service._run_movie_search("etomi", None, 20, 0)] == ["The Wedding Party"]
+    assert [m["title"] for m in await search_service._run_movie_search("thrill", None, 20, 0)] == ["King of Boys"]
+    assert await search_service._run_movie_search("wedding", {"genre": "Thriller"}, 20, 0) == []
+    assert await search_service._run_movie_search("!!!", None, 20, 0) == []
+
+    # Cast search only matches cast names, not the director of the same name
+    cast_results = await search_service._run_cast_search("Genevieve", 20)
+    assert [movie["title"] for movie in cast_results] == ["Lionheart"]
+    assert await search_service._run_cast_search("Kemi", 20) == []
+
+
+@pytest.mark.asyncio
+async def test_index_follows_movie_changes(test_db_session, mock_redis):
+    """Create, update and delete keep movie_search_index and the FTS table in sync"""
+    wedding, lionheart, king = await _create_catalogue(test_db_session)
+    movie_service = MovieService(test_db_session)
+    search_service = SearchService(test_db_session)
+
+    await movie_service.update_movie(king.id, MovieUpdate(title="Queen of Lagos", cast=[{"actor_name": "Toni Tones", "character_name": "Lead"}]))
+    assert [m["title"] for m in await search_service._run_movie_search("queen", None, 20, 0)] == ["Queen of Lagos"]
+    assert await search_service._run_movie_search("king", None, 20, 0) == []
+    assert [m["title"] for m in await search_service._run_cast_search("tones", 20)] == ["Queen of Lagos"]
+    assert await search_service._run_cast_search("sobowale", 20) == []
+
+    await movie_service.delete_movie(wedding.id)
+    assert await search_service._run_movie_search("etomi", None, 20, 0) == []
+    index_rows = await test_db_session.execute(select(func.count()).select_from(MovieSearchIndex))
+    fts_rows = await test_db_session.execute(text("SELECT count(*) FROM movie_search_fts"))
+    assert index_rows.scalar() == fts_rows.scalar() == 2
+
+
+@pytest.mark.asyncio
+async def test_like_backend_fallback(test_db_session, mock_redis, monkeypatch):
+    """The LIKE backend searches the same documents without a full-text index"""
+    monkeypatch.setattr(settings, "SEARCH_BACKEND", "like")
+    await _create_catalogue(test_db_session)
+    assert isinstance(get_search_backend(test_db_session), LikeSearchBackend)
+
+    search_service = SearchService(test_db_session)
+    results = await search_service._run_movie_search("wedding", None, 20, 0)
+    assert [movie["title"] for movie in results] == ["The Wedding Party", "Lionheart"]
+    assert [m["title"] for m in await search_service._run_cast_search("Edochie", 20)] == ["Lionheart"]
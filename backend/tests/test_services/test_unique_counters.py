@@ -0,0 +1,136 @@
+"""
+Tests for HyperLogLog unique counters
+"""
+import pytest
+from datetime import date, datetime, timedelta
+
+from app.models.analytics import UserActivity
+from app.services.admin_service import AdminService
+from app.services.analytics_ingest import ACTIVITY, write_analytics_batch
+from app.services.analytics_reporting_service import AnalyticsReportingService
+from app.services.unique_counters import (
+    backfill_unique_counters, count_active_users, count_movie_viewers, dau_key, record_unique_visitors
+)
+
+
+def activity_row(user_id, activity_type: str, created_at: datetime, **extra) -> dict:
+    return {
+        "user_id": user_id,
+        "session_id": extra.get("session_id"),
+        "activity_type": activity_type,
+        "resource_type": "movie" if extra.get("resource_id") else None,
+        "resource_id": extra.get("resource_id"),
+        "ip_address": extra.get("ip_address"),
+        "created_at": created_at,
+    }
+
+
+@pytest.mark.asyncio
+async def test_daily_counters_union_across_days(mock_redis):
+    """Range counts are the union of the day keys, not their sum"""
+    await record_unique_visitors(mock_redis, [
+        activity_row("u1", "login", datetime(2024, 3, 8, 9, 0)),
+        activity_row("u2", "login", datetime(2024, 3, 8, 10, 0)),
+        activity_row("u1", "login", datetime(2024, 3, 9, 9, 0)),
+        activity_row("u3", "view_movie", datetime(2024, 3, 9, 9, 0), resource_id="m1"),
+        activity_row("u3", "write_review", datetime(2024, 3, 10, 9, 0), resource_id="m1"),
+        activity_row("u1", "view_movie", datetime(2024, 3, 10, 9, 5), resource_id="m1"),
+        # Anonymous activity counts towards neither, as in the exact queries
+        activity_row(None, "view_movie", datetime(2024, 3, 9, 9, 5), resource_id="m1", session_id="s1"),
+        activity_row(None, "view_movie", datetime(2024, 3, 10, 9, 6), resource_id="m2", ip_address="10.0.0.1"),
+    ])
+
+    assert await count_active_users(mock_redis, date(2024, 3, 8), date(2024, 3, 8)) == 2
+    assert await count_active_users(mock_redis, date(2024, 3, 8), date(2024, 3, 10)) == 3
+    assert await count_movie_viewers(mock_redis, ["m1", "m2", "m3"], date(2024, 3, 8), date(2024, 3, 10)) == {
+        "m1": 2, "m2": 0, "m3": 0
+    }
+    assert dau_key(date(2024, 3, 8)) in mock_redis._expiry
+
+
+@pytest.mark.asyncio
+async def test_batch_write_updates_counters(test_db_session, mock_redis):
+    """The analytics batch writer feeds the counters alongside the raw rows"""
+    at = datetime(2024, 3, 9, 12, 0)
+    await write_analytics_batch(test_db_session, [
+        (ACTIVITY, activity_row("user-1", "view_movie", at, resource_id="movie-1")),
+        (ACTIVITY, activity_row("user-2", "view_movie", at, resource_id="movie-1")),
+        (ACTIVITY, activity_row("user-1", "search", at)),
+    ])
+    await test_db_session.commit()
+
+    assert await count_active_users(mock_redis, date(2024, 3, 9), date(2024, 3, 9)) == 2
+    assert (await count_movie_viewers(mock_redis, ["movie-1"], date(2024, 3, 9), date(2024, 3, 9)))["movie-1"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reports_use_counters_unless_exact(test_db_session, mock_redis):
+    """Active users come from the counters; exact_uniques counts the raw rows"""
+    at = datetime(2024, 3, 9, 12, 0)
+    test_db_session.add_all([
+        UserActivity(user_id="user-1", activity_type="login", created_at=at),
+        UserActivity(user_id="user-2", activity_type="login", created_at=at),
+    ])
+    await test_db_session.commit()
+    # Counters only know one of them (e.g. tracking started after the first login)
+    await record_unique_visitors(mock_redis, [activity_row("user-1", "login", at)])
+
+    service = AnalyticsReportingService(test_db_session)
+    start, end = datetime(2024, 3, 9), datetime(2024, 3, 9, 23, 59)
+    assert await service._count_active_users(start, end) == 1
+    assert await service._count_active_users(start, end, exact_uniques=True) == 2
+
+    admin = AdminService(test_db_session)
+    assert await admin._count_active_users(date(2024, 3, 9), date(2024, 3, 9)) == 1
+
+
+@pytest.mark.asyncio
+async def test_counters_and_exact_counts_agree(test_db_session, mock_redis):
+    """Both paths count the same viewers; a backfill loads days written before the counters"""
+    day = datetime(2024, 3, 9, 12, 0)
+    rows = [
+        activity_row("user-1", "view_movie", day, resource_id="movie-1"),
+        activity_row("user-2", "write_review", day, resource_id="movie-1"),
+        activity_row(None, "view_movie", day, resource_id="movie-1", session_id="s1"),
+        activity_row("user-3", "login", day - timedelta(days=1)),
+    ]
+    test_db_session.add_all([UserActivity(**row) for row in rows])
+    await test_db_session.commit()
+
+    service = AnalyticsReportingService(test_db_session)
+    start, end = datetime(2024, 3, 8), datetime(2024, 3, 9, 23, 59)
+    assert await service._count_active_users(start, end) == 0
+    assert await backfill_unique_counters(test_db_session, mock_redis, start.date(), end.date()) == 3
+    assert await backfill_unique_counters(test_db_session, mock_redis, start.date(), end.date()) == 3
+
+    for exact in (False, True):
+        assert await service._count_active_users(start, end, exact_uniques=exact) == 3
+        assert await service._count_movie_viewers(["movie-1"], start, end, exact_uniques=exact) == {"movie-1": 2}
+
+
+@pytest.mark.asyncio
+async def test_counter_failure_falls_back_to_exact(test_db_session, mock_redis, monkeypatch):
+    """A Redis error mid-report is answered from the raw rows"""
+    at = datetime(2024, 3, 9, 12, 0)
+    test_db_session.add(UserActivity(**activity_row("user-1", "view_movie", at, resource_id="movie-1")))
+    await test_db_session.commit()
+
+    async def unavailable(*keys):
+        raise ConnectionError("Redis went away")
+
+    monkeypatch.setattr(mock_redis, "pfcount", unavailable)
+    service = AnalyticsReportingService(test_db_session)
+    start, end = datetime(2024, 3, 9), datetime(2024, 3, 9, 23, 59)
+    assert await service._count_active_users(start, end) == 1
+    assert await service._count_movie_viewers(["movie-1"], start, end) == {"movie-1": 1}
+    assert await AdminService(test_db_session)._count_active_users(date(2024, 3, 9), date(2024, 3, 9)) == 1
+
+
+@pytest.mark.asyncio
+async def test_mock_pfadd_semantics(mock_redis):
+    """pfadd reports changes; pfmerge stores the union"""
+    assert await mock_redis.pfadd("hll:a", "x", "y") == 1
+    assert await mock_redis.pfadd("hll:a", "x") == 0
+    await mock_redis.pfadd("hll:b", "y", "z")
+    assert await mock_redis.pfmerge("hll:c", "hll:a", "hll:b")
+    assert await mock_redis.pfcount("hll:c") == 3
@@ -0,0 +1,151 @@
+"""
+Tests for batched per-viewer votes and list membership
+"""
+import asyncio
+import pytest
+from datetime import date
+
+from sqlalchemy import event
+
+from app.models.enums import ModerationStatus, VoteType
+from app.models.movie import Movie, ContentType
+from app.models.relationships import ReviewVote, UserFavorite, UserWatchlist
+from app.models.review import Review
+from app.models.user import User, UserRole
+from app.schemas.review import ReviewVoteCreate
+from app.services.movie_service import MovieService
+from app.services.notification_trigger import NotificationTrigger
+from app.services.review_service import ReviewService
+from app.services.viewer_context import BatchLoader, get_viewer_context
+
+
+@pytest.fixture
+def statements(test_db_engine):
+    """SQL statements executed while the test runs"""
+    executed = []
+    record = lambda *args: executed.append(args[2])
+    event.listen(test_db_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(test_db_engine.sync_engine, "before_cursor_execute", record)
+
+
+async def _create_reviews(db, count=12):
+    author = User(email="author@example.com", password_hash="hashed", name="Author", role=UserRole.USER)
+    viewer = User(email="viewer@example.com", password_hash="hashed", name="Viewer", role=UserRole.USER)
+    movies = [
+        Movie(title=f"Movie {i}", release_date=date(2023, 1, 1 + i), type=ContentType.MOVIE)
+        for i in range(count)
+    ]
+    db.add_all([author, viewer] + movies)
+    await db.flush()
+    reviews = [
+        Review(user_id=author.id, movie_id=movie.id, lemon_pie_rating=7, review_text=f"Review of {movie.title}")
+        for movie in movies
+    ]
+    db.add_all(reviews)
+    await db.flush()
+    db.add_all([
+        ReviewVote(user_id=viewer.id, review_id=reviews[0].id, vote_type=VoteType.HELPFUL),
+        ReviewVote(user_id=viewer.id, review_id=reviews[1].id, vote_type=VoteType.UNHELPFUL),
+        UserWatchlist(user_id=viewer.id, movie_id=movies[0].id),
+        UserFavorite(user_id=viewer.id, movie_id=movies[1].id),
+    ])
+    await db.commit()
+    return author, viewer, movies, reviews
+
+
+def _vote_queries(statements):
+    return [statement for statement in statements if "FROM review_votes" in statement]
+
+
+@pytest.mark.asyncio
+async def test_batch_loader_coalesces_and_caches():
+    """Loads in one turn become one batch; primed, cached and failed keys behave"""
+    calls = []
+
+    async def batch_fn(keys):
+        calls.append(sorted(keys))
+        if "bad" in keys:
+            raise ValueError("boom")
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    loader = BatchLoader(batch_fn, default="?")
+    assert await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a")) == ["A", "B", "A"]
+    assert await loader.load_many(["a", "c", "missing"]) == ["A", "C", "?"]
+    assert calls == [["a", "b"], ["c", "missing"]]
+
+    loader.prime("d", "primed")
+    assert await loader.load("d") == "primed"
+    loader.clear("a")
+    assert await loader.load("a") == "A"
+    assert len(calls) == 3
+
+    with pytest.raises(ValueError):
+        await loader.load_many(["bad", "e"])
+    # Failed keys are not cached
+    assert await loader.load("e") == "E"
+
+
+@pytest.mark.asyncio
+async def test_review_listings_resolve_votes_in_one_query(test_db_session, mock_redis, statements, monkeypatch):
+    """Every review page costs one vote query for a signed-in viewer, and none for anonymous ones"""
+    monkeypatch.setattr(NotificationTrigger, "send_review_vote_notification", lambda **kwargs: None)
+    author, viewer, movies, reviews = await _create_reviews(test_db_session)
+    review_service = ReviewService(test_db_session)
+
+    statements.clear()
+    page = await review_service.get_reviews(limit=20, user_id=viewer.id)
+    votes = {item.id: item.user_vote for item in page.items}
+    assert votes[reviews[0].id] == VoteType.HELPFUL
+    assert votes[reviews[1].id] == VoteType.UNHELPFUL
+    assert sum(vote is not None for vote in votes.values()) == 2
+    assert len(_vote_queries(statements)) == 1
+
+    # The request's answers are reused, and votes cast in it are seen
+    voted = await review_service.vote_on_review(reviews[2].id, ReviewVoteCreate(vote_type=VoteType.HELPFUL), viewer.id)
+    assert voted.user_vote == VoteType.HELPFUL
+    page = await review_service.get_reviews(limit=20, user_id=viewer.id)
+    assert {item.id: item.user_vote for item in page.items}[reviews[2].id] == VoteType.HELPFUL
+    assert (await review_service.remove_vote(reviews[2].id, viewer.id)).user_vote is None
+
+    statements.clear()
+    page = await review_service.get_reviews(limit=20)
+    assert all(item.user_vote is None for item in page.items)
+    assert _vote_queries(statements) == []
+
+    # The flagged queue batches the moderator's votes too
+    for review in reviews:
+        review.moderation_status = ModerationStatus.PENDING
+    await test_db_session.commit()
+    statements.clear()
+    flagged = await ReviewService(test_db_session).get_flagged_reviews(author.id, limit=20)
+    assert flagged.total == len(reviews)
+    assert len(_vote_queries(statements)) == 1
+
+
+@pytest.mark.asyncio
+async def test_movie_listings_mark_the_viewers_lists(test_db_session, mock_redis, statements):
+    """Watchlist and favorite flags and movie review votes are per viewer on shared pages"""
+    author, viewer, movies, reviews = await _create_reviews(test_db_session)
+    movie_service = MovieService(test_db_session)
+
+    statements.clear()
+    page = await movie_service.get_movies(limit=20, user_id=viewer.id)
+    flags = {movie.id: (movie.in_watchlist, movie.is_favorite) for movie in page.items}
+    assert flags[movies[0].id] == (True, False)
+    assert flags[movies[1].id] == (False, True)
+    assert flags[movies[2].id] == (False, False)
+    assert len([statement for statement in statements if "FROM user_watchlist" in statement]) == 1
+    assert len([statement for statement in statements if "FROM user_favorites" in statement]) == 1
+
+    anonymous = await movie_service.get_movies(limit=20)
+    assert {(movie.in_watchlist, movie.is_favorite) for movie in anonymous.items} == {(None, None)}
+
+    # The cached page is shared; only the overlay is the viewer's
+    reviewed = await movie_service.get_movie_reviews(movies[0].id, user_id=viewer.id)
+    assert [item["user_vote"] for item in reviewed["items"]] == [VoteType.HELPFUL]
+    cached = await movie_service.get_movie_reviews(movies[0].id)
+    assert "user_vote" not in cached["items"][0]
+
+    # A viewer's context is shared by every service on the request's session
+    assert get_viewer_context(test_db_session, viewer.id) is get_viewer_context(test_db_session, viewer.id)
@@ -0,0 +1 @@
+# WebSocket tests
\ No newline at end of file
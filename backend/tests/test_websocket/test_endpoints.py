@@ -0,0 +1,107 @@
+"""
+Tests for the notifications WebSocket endpoint
+"""
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.auth.jwt_service import jwt_service
+from app.db import database
+from app.db.database import Base, get_db
+from app.models import Notification, User
+from app.models.enums import NotificationType
+
+
+class ASGIWebSocket:
+    """A WebSocket client speaking ASGI to the app in-process"""
+    
+    def __init__(self, app, path: str, query_string: bytes):
+        self.to_app: asyncio.Queue = asyncio.Queue()
+        self.from_app: asyncio.Queue = asyncio.Queue()
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": path,
+            "raw_path": path.encode(), "root_path": "", "query_string": query_string,
+            "headers": [(b"host", b"test")], "client": ("127.0.0.1", 50000), "server": ("test", 80),
+            "subprotocols": [],
+        }
+        self.to_app.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(app(scope, self.to_app.get, self.from_app.put))
+    
+    async def receive(self) -> dict:
+        while True:
+            message = await asyncio.wait_for(self.from_app.get(), 5)
+            if message["type"] == "websocket.send":
+                return json.loads(message["text"])
+            assert message["type"] == "websocket.accept", message
+    
+    async def send(self, data: dict) -> None:
+        await self.to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+    
+    async def close(self) -> None:
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, 5)
+
+
+@pytest_asyncio.fixture
+async def small_pool(tmp_path, monkeypatch):
+    """A database whose pool (2 connections) is shared by the HTTP and WebSocket paths"""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", pool_size=2, max_overflow=0, pool_timeout=2
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(database, "async_session_maker", session_maker)
+    
+    yield engine
+    
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_open_sockets_do_not_hold_database_connections(test_app, mock_redis, small_pool):
+    """Many open sockets leave the pool free for HTTP requests"""
+    async with database.async_session_maker() as db:
+        user = User(email="viewer@example.com", password_hash="hashed", name="Ngozi")
+        db.add(user)
+        await db.flush()
+        notification = Notification(user_id=user.id, type=NotificationType.NEW_FOLLOWER, title="Hi", message="New follower")
+        db.add(notification)
+        await db.commit()
+    
+    async def get_test_db():
+        async with database.async_session_maker() as session:
+            yield session
+    test_app.dependency_overrides[get_db] = get_test_db
+    
+    token = jwt_service.create_access_token(user.id, user.email, user.role)
+    sockets = [ASGIWebSocket(test_app, "/ws/notifications", f"token={token}".encode()) for _ in range(10)]
+    for socket in sockets:
+        assert (await socket.receive())["type"] == "connection_established"
+        assert await socket.receive() == {"type": "unread_count", "count": 1}
+    assert small_pool.pool.checkedout() == 0
+    
+    async with AsyncClient(transport=ASGITransport(app=test_app), base_url="http://test") as client:
+        response = await asyncio.wait_for(
+            client.get("/api/v1/stats", headers={"Authorization": f"Bearer {token}"}), 5
+        )
+    assert response.status_code == 200
+    assert response.json()["unread_count"] == 1
+    
+    # Reads open a session only for the request
+    await sockets[0].send({"type": "mark_read", "notification_id": str(notification.id)})
+    updates = [await sockets[0].receive() for _ in range(2)]
+    assert {"type": "unread_count", "count": 0} in updates
+    assert small_pool.pool.checkedout() == 0
+    
+    for socket in sockets:
+        await socket.close()
+    
+    # An invalid token is refused before anything is held
+    rejected = ASGIWebSocket(test_app, "/ws/notifications", f"token={uuid4()}".encode())
+    assert (await asyncio.wait_for(rejected.from_app.get(), 5))["type"] == "websocket.close"
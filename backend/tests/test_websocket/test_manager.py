@@ -0,0 +1,155 @@
+"""
+Tests for WebSocket delivery and presence across processes
+"""
+import asyncio
+import json
+import time
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.models.enums import NotificationType
+from app.websocket.manager import ConnectionManager
+from app.websocket.writer import DISCONNECT
+
+
+class FakeWebSocket:
+    """Records the frames sent to it"""
+    
+    def __init__(self, delay=0.0):
+        self.sent = []
+        self.delay = delay
+        self.close_code = None
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, text):
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+    
+    async def close(self, code=1000):
+        self.close_code = code
+    
+    def received(self, message_type):
+        return [message for message in self.sent if message["type"] == message_type]
+
+
+async def _eventually(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def nodes(mock_redis):
+    """Two web processes and a worker process sharing Redis"""
+    managers = [ConnectionManager(node_id=name) for name in ("web-a", "web-b", "worker")]
+    for manager in managers[:2]:
+        await manager.start()
+    await _eventually(lambda: all(manager.pubsub is not None for manager in managers[:2]))
+    yield managers
+    for manager in managers:
+        await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_messages_reach_sockets_on_other_processes(nodes, mock_redis):
+    """Any process can notify a user; each socket receives the message exactly once"""
+    web_a, web_b, worker = nodes
+    user_id, other_id = uuid4(), uuid4()
+    socket_a, socket_b, other_socket = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await web_a.connect(socket_a, user_id)
+    await web_b.connect(socket_b, user_id)
+    await web_b.connect(other_socket, other_id)
+    
+    # A worker holds no sockets; both processes deliver to their own
+    await worker.send_notification(user_id, NotificationType.NEW_FOLLOWER, "Hi", "New follower")
+    await _eventually(lambda: socket_a.received("notification") and socket_b.received("notification"))
+    
+    await web_a.send_bulk_notifications([user_id, other_id], NotificationType.NEW_FOLLOWER, "Hi", "Again")
+    await _eventually(lambda: len(other_socket.received("notification")) == 1)
+    await web_b.broadcast_system_message({"type": "system_announcement", "title": "Maintenance"})
+    await _eventually(lambda: socket_a.received("system_announcement"))
+    await asyncio.sleep(0.05)
+    
+    assert len(socket_a.received("notification")) == 2
+    assert len(socket_b.received("notification")) == 2
+    assert len(other_socket.received("notification")) == 1
+    assert len(socket_b.received("system_announcement")) == 1
+    
+    # A process only follows the shards of its own users
+    assert web_a.shard_channel(user_id) in web_a.pubsub.channels
+    await web_a.disconnect(socket_a)
+    assert web_a.shard_channel(user_id) not in web_a.pubsub.channels
+
+
+@pytest.mark.asyncio
+async def test_presence_spans_processes(nodes, mock_redis):
+    """Online checks and stats see every live process's sockets"""
+    web_a, web_b, worker = nodes
+    user_id = uuid4()
+    socket = FakeWebSocket()
+    await web_b.connect(socket, user_id)
+    await web_b.connect(FakeWebSocket(), user_id)
+    await web_a.connect(FakeWebSocket(), uuid4())
+    
+    assert await worker.is_user_online(user_id)
+    stats = await worker.get_cluster_stats()
+    assert (stats["connected_users"], stats["total_connections"]) == (2, 3)
+    assert str(user_id) in stats["connected_user_ids"]
+    
+    # A process that stops heartbeating drops out
+    await mock_redis.zadd(web_b.presence.nodes_key, {"web-b": time.time() - settings.WEBSOCKET_PRESENCE_TTL - 1})
+    assert not await worker.is_user_online(user_id)
+    
+    await web_b.presence.heartbeat({user_id: 2})
+    assert await worker.is_user_online(user_id)
+    await web_b.disconnect(socket)
+    assert await worker.is_user_online(user_id)
+    await web_b.disconnect(next(iter(web_b.active_connections[user_id])))
+    assert not await worker.is_user_online(user_id)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumers_only_delay_themselves(mock_redis, monkeypatch):
+    """Each socket has a bounded queue; overflow drops old messages or closes the socket"""
+    monkeypatch.setattr(settings, "WEBSOCKET_SEND_QUEUE_SIZE", 3)
+    manager = ConnectionManager(node_id="web")
+    user_id, slow_id, stalled_id = uuid4(), uuid4(), uuid4()
+    fast, slow, stalled = FakeWebSocket(), FakeWebSocket(delay=60), FakeWebSocket(delay=60)
+    await manager.connect(fast, user_id)
+    await manager.connect(slow, slow_id)
+    await manager.connect(stalled, stalled_id)
+    
+    for i in range(10):
+        await manager.broadcast_system_message({"type": "system_announcement", "sequence": i})
+        await asyncio.sleep(0.01)
+    await _eventually(lambda: len(fast.received("system_announcement")) == 10)
+    
+    # The slow socket keeps the newest messages; the oldest were dropped
+    stats = manager.get_delivery_stats()
+    assert stats["max_queue_depth"] == 3
+    assert stats["dropped"] == 14
+    assert [json.loads(text)["sequence"] for text in manager.writers[slow].queue._queue] == [7, 8, 9]
+    
+    # Under the disconnect policy a full queue closes the socket
+    manager.writers[slow].overflow_policy = DISCONNECT
+    await manager.send_personal_message(slow_id, {"type": "notification"})
+    await _eventually(lambda: not manager.is_user_connected(slow_id))
+    assert slow.close_code == 1013
+    assert manager.get_delivery_stats()["slow_disconnects"] == 1
+    
+    # A send pending past the timeout closes the socket too
+    writer = manager.writers[stalled]
+    assert not writer.close_if_stalled(writer.sending_since + 1)
+    assert writer.close_if_stalled(writer.sending_since + settings.WEBSOCKET_SEND_TIMEOUT)
+    await _eventually(lambda: not manager.is_user_connected(stalled_id))
+    assert manager.get_delivery_stats()["slow_disconnects"] == 2
+    assert manager.is_user_connected(user_id)
+    
+    await manager.disconnect(fast)
+    assert manager.get_delivery_stats()["connections"] == 0